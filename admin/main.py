@@ -12,6 +12,7 @@ from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import get_db
+from utils.metrics import install_http_metrics
 from .routes import admin_routes, user_routes, subscription_routes, broadcast_routes, settings_routes
 
 # Получаем путь к директории admin
@@ -26,6 +27,9 @@ app = FastAPI(
     redoc_url="/admin/redoc",
 )
 
+# HTTP метрики и /metrics для Prometheus
+install_http_metrics(app, "admin")
+
 # Монтируем статические файлы
 static_dir = BASE_DIR / "static"
 static_dir.mkdir(exist_ok=True)
@@ -71,6 +75,20 @@ async def check_admin_access(tg_id: int = None):
     return True
 
 
+@app.on_event("startup")
+async def startup_event():
+    """Запуск фоновых сервисов админ-панели"""
+    from .services.system_sampler import get_system_sampler
+    get_system_sampler().start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Остановка фоновых сервисов админ-панели"""
+    from .services.system_sampler import get_system_sampler
+    await get_system_sampler().stop()
+
+
 @app.get("/", response_class=HTMLResponse)
 async def root():
     """Редирект на админ панель"""
@@ -3,7 +3,7 @@ Broadcast Routes
 Управление рассылками
 """
 
-from fastapi import APIRouter, Request, Depends, Form, UploadFile, File
+from fastapi import APIRouter, Request, Depends, Form, UploadFile, File, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -11,13 +11,19 @@ from sqlalchemy import select
 from pathlib import Path
 from typing import Optional
 import os
+import logging
 import aiofiles
 
 from database import get_db
 from database.models import User
+from utils.media_registry import get_media_registry
+from utils.send_queue import Lane, install_send_queue, send_lane
+from src.config.config import config as bot_config
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 # Настраиваем шаблоны
 BASE_DIR = Path(__file__).resolve().parent.parent
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
@@ -26,6 +32,10 @@ templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 UPLOAD_DIR = BASE_DIR / "static" / "images"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# Сообщений в секунду для рассылки из админки - доля общего лимита токена
+# (ADMIN_BROADCAST_RATE); бот отправляет с остатком, BOT_SEND_RATE
+BROADCAST_RATE = bot_config.ADMIN_BROADCAST_RATE
+
 
 @router.get("/", response_class=HTMLResponse)
 async def broadcast_form(
@@ -50,6 +60,7 @@ async def broadcast_form(
 
 @router.post("/send")
 async def send_broadcast(
+    request: Request,
     message: str = Form(...),
     image: Optional[UploadFile] = File(None),
     button_text: Optional[str] = Form(None),
@@ -57,7 +68,6 @@ async def send_broadcast(
     db: AsyncSession = Depends(get_db)
 ):
     """Отправить рассылку"""
-    import asyncio
     from aiogram import Bot
     from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
     
@@ -67,14 +77,19 @@ async def send_broadcast(
         raise HTTPException(status_code=500, detail="BOT_TOKEN not configured")
     
     bot = Bot(token=bot_token)
+    send_queue = install_send_queue(bot, global_rate=BROADCAST_RATE, name="admin_send")
     
     # Сохраняем изображение если есть
     image_path = None
+    image_content = None
     if image and image.filename:
         image_path = UPLOAD_DIR / image.filename
         async with aiofiles.open(image_path, 'wb') as f:
-            content = await image.read()
-            await f.write(content)
+            image_content = await image.read()
+            await f.write(image_content)
+    
+    # Картинка загружается в Telegram один раз, остальным уходит по file_id
+    media_registry = get_media_registry()
     
     # Создаем клавиатуру если есть кнопка
     keyboard = None
@@ -93,29 +108,31 @@ async def send_broadcast(
     success_count = 0
     failed_count = 0
     
-    for user in users:
-        try:
-            if image_path:
-                with open(image_path, 'rb') as photo:
-                    await bot.send_photo(
-                        chat_id=user.tg_id,
-                        photo=photo,
+    # Темп и повторы после 429 - забота очереди отправки
+    with send_lane(Lane.BROADCAST):
+        for user in users:
+            try:
+                if image_content:
+                    await media_registry.send_cached_photo(
+                        bot,
+                        user.tg_id,
+                        image_content,
+                        filename=image.filename,
                         caption=message,
                         reply_markup=keyboard
                     )
-            else:
-                await bot.send_message(
-                    chat_id=user.tg_id,
-                    text=message,
-                    reply_markup=keyboard
-                )
-            success_count += 1
-            # Небольшая задержка для избежания флуда
-            await asyncio.sleep(0.05)
-        except Exception as e:
-            failed_count += 1
-            print(f"Failed to send to {user.tg_id}: {e}")
+                else:
+                    await bot.send_message(
+                        chat_id=user.tg_id,
+                        text=message,
+                        reply_markup=keyboard
+                    )
+                success_count += 1
+            except Exception as e:
+                failed_count += 1
+                logger.warning(f"⚠️ Рассылка: не удалось отправить {user.tg_id}: {e}")
     
+    await send_queue.close()
     await bot.session.close()
     
     return templates.TemplateResponse(
@@ -7,16 +7,25 @@ from fastapi import APIRouter, Request, Depends, Form
 from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 from pathlib import Path
+from typing import Any, Dict, List
 import os
+import logging
 
 from database import get_db
-from database.models import Settings
-from api.marzban_api import MarzbanAPI
+from database.models import Settings, Subscription
+from api.marzban_api import MarzbanAPI, MarzbanPageError, SubscriptionData
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
+# Параметры синхронизации с Marzban
+SYNC_PAGE_SIZE = 1000
+SYNC_MAX_PAGE_SIZE = 5000
+SYNC_DIFF_LIMIT = 500  # Максимум изменений в ответе dry_run
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 
@@ -74,53 +83,159 @@ async def test_connection():
 
 
 @router.post("/sync")
-async def sync_subscriptions(db: AsyncSession = Depends(get_db)):
-    """Синхронизация подписок с Marzban"""
+async def sync_subscriptions(
+    dry_run: bool = False,
+    page_size: int = SYNC_PAGE_SIZE,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Синхронизация подписок с Marzban
+
+    Пользователи Marzban читаются постранично, для каждой страницы локальные
+    подписки загружаются одним запросом IN (...), а изменения применяются
+    одним пакетным UPDATE. В режиме dry_run ничего не записывается,
+    возвращается только список изменений.
+
+    Если очередная страница Marzban не получена, уже сверенные страницы
+    сохраняются, а ответ помечается как частичный (partial, HTTP 502).
+    Ошибка базы данных прерывает синхронизацию и откатывает транзакцию целиком.
+    """
+    client = None
+    page_size = max(1, min(page_size, SYNC_MAX_PAGE_SIZE))
+
+    stats = {
+        "scanned": 0,
+        "matched": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "missing": 0,
+    }
+    changes = []
+    failure = None
+
     try:
-        from database.models import Subscription, User
-        
         client = await get_marzban_client()
-        
-        # Получаем все подписки из Marzban
-        marzban_users = await client.get_all_subscriptions()
-        
-        synced_count = 0
-        error_count = 0
-        
-        for marzban_user in marzban_users:
-            try:
-                # Ищем подписку в нашей БД
-                result = await db.execute(
-                    select(Subscription).where(
-                        Subscription.marzban_username == marzban_user.username
+        try:
+            async for page in client.iter_subscription_pages(page_size=page_size):
+                stats["scanned"] += len(page)
+
+                page_changes = await _reconcile_page(db, page, stats)
+                if not page_changes:
+                    continue
+
+                if dry_run:
+                    free_slots = SYNC_DIFF_LIMIT - len(changes)
+                    if free_slots > 0:
+                        changes.extend(page_changes[:free_slots])
+                else:
+                    await db.execute(
+                        update(Subscription),
+                        [
+                            {
+                                "id": change["id"],
+                                "is_active": change["is_active"][1],
+                                "used_traffic": change["used_traffic"][1],
+                            }
+                            for change in page_changes
+                        ]
                     )
-                )
-                subscription = result.scalar_one_or_none()
-                
-                if subscription:
-                    # Обновляем статус
-                    subscription.is_active = marzban_user.status == "active"
-                    subscription.used_traffic = marzban_user.used_traffic
-                    synced_count += 1
-            
-            except Exception as e:
-                error_count += 1
-                continue
-        
-        await db.commit()
-        await client.close()
-        
-        return JSONResponse({
-            "success": True,
-            "message": f"✅ Синхронизировано: {synced_count}, ошибок: {error_count}"
-        })
-    
+
+                stats["updated"] += len(page_changes)
+        except MarzbanPageError as e:
+            logger.error(f"❌ Синхронизация с Marzban прервана: {e}")
+            failure = str(e)
+
+        if not dry_run:
+            await db.commit()
+
+        logger.info(f"🔄 Синхронизация с Marzban (dry_run={dry_run}, partial={failure is not None}): {stats}")
+
+        status_code = 200
+        if failure:
+            status_code = 502
+            message = f"⚠️ Синхронизация неполная: {failure}. Сверено: {stats['scanned']}, обновлено: {stats['updated']}"
+        elif dry_run:
+            message = f"🔍 Будет обновлено: {stats['updated']}, без изменений: {stats['unchanged']}"
+        else:
+            message = f"✅ Синхронизировано: {stats['matched']}, обновлено: {stats['updated']}"
+
+        body = {
+            "success": failure is None,
+            "partial": failure is not None,
+            "message": message,
+            "stats": stats,
+        }
+        if dry_run:
+            body.update({
+                "dry_run": True,
+                "changes": changes,
+                "changes_truncated": stats["updated"] > len(changes),
+            })
+        return JSONResponse(body, status_code=status_code)
+
     except Exception as e:
+        logger.error(f"❌ Синхронизация с Marzban отменена: {e}")
+        await db.rollback()
         return JSONResponse({
             "success": False,
             "message": f"❌ Ошибка синхронизации: {str(e)}"
         }, status_code=500)
 
+    finally:
+        if client is not None:
+            await client.close()
+
+
+async def _reconcile_page(
+    db: AsyncSession,
+    page: List[SubscriptionData],
+    stats: Dict[str, int]
+) -> List[Dict[str, Any]]:
+    """
+    Сравнить страницу пользователей Marzban с локальными подписками
+
+    Args:
+        db: Сессия базы данных
+        page: Страница пользователей Marzban
+        stats: Счетчики синхронизации (обновляются на месте)
+
+    Returns:
+        Список изменений вида {"id", "marzban_username", поле: (было, станет)}
+    """
+    remote = {user.username: user for user in page}
+
+    result = await db.execute(
+        select(
+            Subscription.id,
+            Subscription.marzban_username,
+            Subscription.is_active,
+            Subscription.used_traffic,
+        ).where(Subscription.marzban_username.in_(list(remote)))
+    )
+    local_rows = result.all()
+
+    stats["matched"] += len(local_rows)
+    stats["missing"] += len(remote) - len(local_rows)
+
+    page_changes = []
+    for row in local_rows:
+        marzban_user = remote[row.marzban_username]
+        is_active = marzban_user.status == "active"
+        used_traffic = marzban_user.used_traffic or 0
+
+        if row.is_active == is_active and row.used_traffic == used_traffic:
+            stats["unchanged"] += 1
+            continue
+
+        page_changes.append({
+            "id": row.id,
+            "marzban_username": row.marzban_username,
+            "is_active": (row.is_active, is_active),
+            "used_traffic": (row.used_traffic, used_traffic),
+        })
+
+    return page_changes
+
 
 @router.get("/users", response_class=HTMLResponse)
 async def marzban_users(
@@ -0,0 +1,20 @@
+"""
+Admin Panel Services
+Фоновые сервисы админ-панели
+"""
+
+from .backup_service import BackupService, BackupJob, get_backup_service
+from .log_reader import LogFilter, tail_lines, read_from_offset
+from .system_sampler import SystemSampler, SystemSample, get_system_sampler
+
+__all__ = [
+    'BackupService',
+    'BackupJob',
+    'get_backup_service',
+    'LogFilter',
+    'tail_lines',
+    'read_from_offset',
+    'SystemSampler',
+    'SystemSample',
+    'get_system_sampler',
+]
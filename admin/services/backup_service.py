@@ -0,0 +1,366 @@
+"""
+Backup Service
+Фоновое резервное копирование базы данных со сжатием на лету
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import uuid
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, date
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse, unquote
+
+from sqlalchemy import select, func
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BACKUP_DIR = Path(os.getenv("BACKUP_DIR", "backups"))
+
+# Размер блока чтения вывода mysqldump
+CHUNK_SIZE = 64 * 1024
+
+# Сколько строк выгружать за одну выборку при логическом экспорте
+EXPORT_BATCH_SIZE = 1000
+
+# Расширения файлов резервных копий (для списка и скачивания)
+BACKUP_SUFFIXES = (".sql", ".sql.gz", ".sql.zst", ".jsonl.gz", ".jsonl.zst")
+
+
+@dataclass
+class BackupJob:
+    """Состояние задачи резервного копирования"""
+    id: str
+    kind: str  # mysqldump | jsonl
+    compression: str  # gzip | zstd
+    file: str
+    status: str = "pending"  # pending | running | done | failed
+    bytes_in: int = 0  # Байт несжатого дампа
+    bytes_out: int = 0  # Байт записано на диск
+    rows_done: int = 0
+    rows_total: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+
+    @property
+    def progress(self) -> Optional[float]:
+        """Прогресс в процентах (если известен общий объем)"""
+        if self.status == "done":
+            return 100.0
+        if not self.rows_total:
+            return None
+        return round(min(self.rows_done / self.rows_total * 100, 99.9), 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Сериализация для JSON ответа"""
+        data = asdict(self)
+        data["file"] = Path(self.file).name
+        data["progress"] = self.progress
+        data["created_at"] = self.created_at.isoformat()
+        data["finished_at"] = self.finished_at.isoformat() if self.finished_at else None
+        return data
+
+
+class _CompressedWriter:
+    """
+    Потоковая запись со сжатием
+
+    Сжатие и запись на диск выполняются в пуле потоков, чтобы не блокировать
+    event loop админ-панели.
+    """
+
+    def __init__(self, path: Path, compression: str):
+        self._raw = open(path, "wb")
+        try:
+            if compression == "zstd":
+                self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+                self._flush = self._compressor.flush
+            else:
+                self._compressor = None
+                self._gzip = gzip.GzipFile(fileobj=self._raw, mode="wb", compresslevel=6)
+        except Exception:
+            self._raw.close()
+            raise
+
+    def _write_sync(self, chunk: bytes):
+        if self._compressor is not None:
+            self._raw.write(self._compressor.compress(chunk))
+        else:
+            self._gzip.write(chunk)
+
+    def _close_sync(self):
+        try:
+            if self._compressor is not None:
+                self._raw.write(self._flush())
+            else:
+                self._gzip.close()
+        finally:
+            self._raw.close()
+
+    async def write(self, chunk: bytes):
+        await asyncio.to_thread(self._write_sync, chunk)
+
+    async def close(self):
+        await asyncio.to_thread(self._close_sync)
+
+    def tell(self) -> int:
+        return self._raw.tell()
+
+
+def _json_default(value: Any) -> Any:
+    """Сериализация значений, которые json не умеет сам"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
+
+class BackupService:
+    """
+    Сервис резервного копирования
+
+    Отвечает за:
+    - Запуск бэкапов в фоне (mysqldump или логический экспорт в JSONL)
+    - Сжатие дампа gzip/zstd на лету
+    - Хранение прогресса задач для опроса из админ-панели
+    """
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable] = None,
+        database_url: Optional[str] = None,
+        backup_dir: Path = BACKUP_DIR,
+        max_jobs: int = 50
+    ):
+        """
+        Инициализация сервиса
+
+        Args:
+            session_factory: Фабрика AsyncSession (по умолчанию AsyncSessionLocal)
+            database_url: URL базы данных (по умолчанию DATABASE_URL)
+            backup_dir: Директория для бэкапов
+            max_jobs: Сколько последних задач хранить в памяти
+        """
+        self._session_factory = session_factory
+        self.database_url = database_url if database_url is not None else os.getenv("DATABASE_URL", "")
+        self.backup_dir = Path(backup_dir)
+        self.max_jobs = max_jobs
+        self._jobs: Dict[str, BackupJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def session_factory(self) -> Callable:
+        if self._session_factory is None:
+            from database import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory
+
+    def default_kind(self) -> str:
+        """mysqldump для MySQL, логический экспорт для остальных БД"""
+        return "mysqldump" if self.database_url.startswith("mysql") else "jsonl"
+
+    def start_backup(self, kind: Optional[str] = None, compression: str = "gzip") -> BackupJob:
+        """
+        Запустить резервное копирование в фоне
+
+        Args:
+            kind: mysqldump или jsonl (по умолчанию - по типу БД)
+            compression: gzip или zstd
+
+        Returns:
+            BackupJob: Созданная задача
+        """
+        kind = kind or self.default_kind()
+        if kind not in ("mysqldump", "jsonl"):
+            raise ValueError(f"Неизвестный тип бэкапа: {kind}")
+        if kind == "mysqldump" and not self.database_url.startswith("mysql"):
+            raise ValueError("mysqldump поддерживается только для MySQL")
+        if compression not in ("gzip", "zstd"):
+            raise ValueError(f"Неизвестный тип сжатия: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("Библиотека zstandard не установлена")
+
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        suffix = ".sql" if kind == "mysqldump" else ".jsonl"
+        suffix += ".gz" if compression == "gzip" else ".zst"
+        job_id = uuid.uuid4().hex[:12]
+        backup_file = self.backup_dir / f"yovpn_backup_{timestamp}_{job_id}{suffix}"
+
+        job = BackupJob(id=job_id, kind=kind, compression=compression, file=str(backup_file))
+        self._jobs[job_id] = job
+        self._trim_jobs()
+
+        runner = self._run_mysqldump if kind == "mysqldump" else self._run_jsonl_export
+        self._tasks[job_id] = asyncio.create_task(self._run(job, runner))
+
+        logger.info(f"💾 Запущен бэкап {job_id} ({kind}, {compression}): {backup_file.name}")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[BackupJob]:
+        """Получить задачу по ID"""
+        return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[BackupJob]:
+        """Последние задачи (новые первыми)"""
+        return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    async def wait(self, job_id: str) -> Optional[BackupJob]:
+        """Дождаться завершения задачи"""
+        task = self._tasks.get(job_id)
+        if task:
+            await asyncio.shield(task)
+        return self._jobs.get(job_id)
+
+    def _trim_jobs(self):
+        """Удалить из памяти самые старые завершенные задачи"""
+        finished = [job for job in self.list_jobs() if job.status in ("done", "failed")]
+        while len(self._jobs) > self.max_jobs and finished:
+            job = finished.pop()
+            self._jobs.pop(job.id, None)
+            self._tasks.pop(job.id, None)
+
+    async def _run(self, job: BackupJob, runner: Callable):
+        """Выполнить задачу и зафиксировать результат"""
+        job.status = "running"
+        try:
+            # Ошибка открытия файла или компрессора тоже завершает задачу как failed
+            writer = _CompressedWriter(Path(job.file), job.compression)
+            try:
+                await runner(job, writer)
+            finally:
+                await writer.close()
+                job.bytes_out = Path(job.file).stat().st_size
+            job.status = "done"
+            logger.info(
+                f"✅ Бэкап {job.id} готов: {job.bytes_in / 1024**2:.1f} MB -> "
+                f"{job.bytes_out / 1024**2:.1f} MB"
+            )
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logger.error(f"❌ Ошибка бэкапа {job.id}: {e}")
+            Path(job.file).unlink(missing_ok=True)
+        finally:
+            job.finished_at = datetime.now()
+
+    async def _run_mysqldump(self, job: BackupJob, writer: _CompressedWriter):
+        """Потоковый mysqldump через asyncio subprocess"""
+        url = urlparse(self.database_url.replace("+aiomysql", "").replace("+asyncmy", "").replace("+pymysql", ""))
+
+        command = [
+            "mysqldump",
+            f"-h{url.hostname or 'localhost'}",
+            f"-P{url.port or 3306}",
+            f"-u{unquote(url.username or 'root')}",
+            "--single-transaction",
+            "--quick",
+            url.path.lstrip("/"),
+        ]
+
+        # Пароль передаем через окружение, а не в аргументах процесса
+        env = dict(os.environ)
+        env["MYSQL_PWD"] = unquote(url.password or "")
+
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env,
+        )
+
+        # stderr читаем параллельно, чтобы процесс не завис на заполненном пайпе
+        stderr_task = asyncio.create_task(process.stderr.read())
+        try:
+            while True:
+                chunk = await process.stdout.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                job.bytes_in += len(chunk)
+                await writer.write(chunk)
+                job.bytes_out = writer.tell()
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+            raise
+        finally:
+            return_code = await process.wait()
+            stderr = await stderr_task
+
+        if return_code != 0:
+            raise RuntimeError(f"mysqldump завершился с кодом {return_code}: {stderr.decode(errors='replace').strip()}")
+
+    async def _run_jsonl_export(self, job: BackupJob, writer: _CompressedWriter):
+        """
+        Логический экспорт таблиц в JSONL
+
+        Каждая строка файла: {"table": ..., "row": {...}}. Работает с любой
+        БД, поддерживаемой SQLAlchemy (включая SQLite).
+        """
+        from database.models import User, Subscription, Transaction
+
+        models = [User, Subscription, Transaction]
+
+        async with self.session_factory() as session:
+            job.rows_total = 0
+            for model in models:
+                job.rows_total += await session.scalar(select(func.count()).select_from(model)) or 0
+
+            for model in models:
+                table = model.__table__
+                columns = [column.name for column in table.columns]
+                last_id = None
+
+                # Keyset-пагинация по первичному ключу - память не зависит от размера таблицы
+                while True:
+                    query = select(*table.columns).order_by(table.c.id).limit(EXPORT_BATCH_SIZE)
+                    if last_id is not None:
+                        query = query.where(table.c.id > last_id)
+                    rows = (await session.execute(query)).all()
+                    if not rows:
+                        break
+
+                    lines = []
+                    for row in rows:
+                        record = {"table": table.name, "row": dict(zip(columns, row))}
+                        lines.append(json.dumps(record, ensure_ascii=False, default=_json_default))
+                    chunk = ("\n".join(lines) + "\n").encode("utf-8")
+
+                    job.bytes_in += len(chunk)
+                    job.rows_done += len(rows)
+                    await writer.write(chunk)
+                    job.bytes_out = writer.tell()
+
+                    last_id = rows[-1].id
+
+
+# Глобальный экземпляр сервиса
+_backup_service: Optional[BackupService] = None
+
+
+def get_backup_service() -> BackupService:
+    """
+    Получить глобальный экземпляр сервиса бэкапов
+
+    Returns:
+        BackupService: Экземпляр сервиса
+    """
+    global _backup_service
+    if _backup_service is None:
+        _backup_service = BackupService()
+    return _backup_service
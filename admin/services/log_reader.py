@@ -0,0 +1,175 @@
+"""
+Log Reader
+Чтение хвоста лог-файла без загрузки всего файла в память
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+# Размер блока при чтении файла с конца
+BLOCK_SIZE = 64 * 1024
+
+# Сколько байт максимум просматривать при фильтрации, чтобы запрос
+# по редкому фильтру не превращался в чтение всего файла
+MAX_SCAN_BYTES = 32 * 1024 * 1024
+
+# Максимум байт, отдаваемых за один шаг follow
+MAX_FOLLOW_BYTES = 256 * 1024
+
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL")
+
+
+@dataclass
+class LogFilter:
+    """
+    Фильтр строк лога
+
+    Формат строки: "%(asctime)s %(levelname)s %(name)s: %(message)s"
+    """
+    level: Optional[str] = None
+    user_id: Optional[int] = None
+    query: Optional[str] = None
+
+    def __post_init__(self):
+        self.level = self.level.upper() if self.level else None
+        self._level_token = f" {self.level} " if self.level else None
+        self._user_re = re.compile(rf"(?<!\d){self.user_id}(?!\d)") if self.user_id else None
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.level or self.user_id or self.query)
+
+    def matches(self, line: str) -> bool:
+        """Проверить, подходит ли строка под фильтр"""
+        if self._level_token and self._level_token not in line:
+            return False
+        if self.query and self.query not in line:
+            return False
+        if self._user_re and not self._user_re.search(line):
+            return False
+        return True
+
+
+def tail_lines(
+    path: str,
+    lines: int = 100,
+    log_filter: Optional[LogFilter] = None,
+    block_size: int = BLOCK_SIZE,
+    max_scan_bytes: int = MAX_SCAN_BYTES
+) -> Tuple[List[str], int]:
+    """
+    Получить последние N строк файла, читая его блоками с конца
+
+    Без фильтра читается ровно столько блоков, сколько нужно для N строк,
+    поэтому время и память не зависят от размера файла.
+
+    Args:
+        path: Путь к файлу
+        lines: Количество строк
+        log_filter: Фильтр строк (уровень, user id, подстрока)
+        block_size: Размер блока чтения
+        max_scan_bytes: Максимум просматриваемых байт при фильтрации
+
+    Returns:
+        Tuple[List[str], int]: (Строки в прямом порядке, размер файла - offset для follow)
+    """
+    if log_filter is not None and log_filter.is_empty:
+        log_filter = None
+
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        file_size = f.tell()
+        position = file_size
+
+        result: List[str] = []
+        remainder = b""
+        scanned = 0
+
+        while position > 0 and len(result) < lines:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size) + remainder
+            scanned += read_size
+
+            parts = block.split(b"\n")
+            # Первая часть может быть неполной строкой - дочитаем со следующим блоком
+            remainder = parts[0] if position > 0 else b""
+            complete = parts[1:] if position > 0 else parts
+
+            # Защита от гигантской строки без переводов - память остается ограниченной
+            if len(remainder) > max_scan_bytes:
+                remainder = b""
+
+            for raw in reversed(complete):
+                if not raw:
+                    continue
+                line = raw.decode('utf-8', errors='replace').rstrip("\r")
+                if log_filter is None or log_filter.matches(line):
+                    result.append(line)
+                    if len(result) >= lines:
+                        break
+
+            if log_filter is not None and scanned >= max_scan_bytes:
+                break
+
+    result.reverse()
+    return result, file_size
+
+
+def read_from_offset(
+    path: str,
+    offset: int,
+    log_filter: Optional[LogFilter] = None,
+    max_bytes: int = MAX_FOLLOW_BYTES
+) -> Tuple[List[str], int]:
+    """
+    Прочитать новые строки начиная с запомненного offset
+
+    Возвращаются только полные строки; незавершенная строка будет
+    прочитана при следующем вызове. Если файл стал короче offset
+    (ротация логов), чтение начинается с начала файла.
+
+    Args:
+        path: Путь к файлу
+        offset: Позиция, с которой продолжать
+        log_filter: Фильтр строк
+        max_bytes: Максимум байт за один вызов
+
+    Returns:
+        Tuple[List[str], int]: (Новые строки, новый offset)
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        file_size = f.tell()
+
+        if offset > file_size:
+            offset = 0
+
+        if offset == file_size:
+            return [], offset
+
+        f.seek(offset)
+        data = f.read(min(max_bytes, file_size - offset))
+
+    last_newline = data.rfind(b"\n")
+    if last_newline == -1:
+        if len(data) < max_bytes:
+            return [], offset
+        # Строка длиннее max_bytes - отдаем как есть, чтобы не зависнуть
+        last_newline = len(data) - 1
+
+    chunk = data[:last_newline + 1]
+    new_offset = offset + len(chunk)
+
+    result = []
+    for raw in chunk.split(b"\n"):
+        if not raw:
+            continue
+        line = raw.decode('utf-8', errors='replace').rstrip("\r")
+        if log_filter is None or log_filter.matches(line):
+            result.append(line)
+
+    return result, new_offset
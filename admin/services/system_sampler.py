@@ -0,0 +1,179 @@
+"""
+System Sampler
+Фоновый сбор системных метрик для страницы мониторинга
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Any, Deque, Dict, List, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# Интервал сбора метрик (секунды)
+SAMPLE_INTERVAL = float(os.getenv("MONITORING_SAMPLE_INTERVAL", "5"))
+
+# Размер кольцевого буфера (по умолчанию час истории при интервале 5 секунд)
+HISTORY_SIZE = int(os.getenv("MONITORING_HISTORY_SIZE", "720"))
+
+
+@dataclass(frozen=True)
+class SystemSample:
+    """Один замер системных метрик"""
+    timestamp: float
+    cpu_percent: float
+    memory_percent: float
+    memory_used: float  # GB
+    memory_total: float  # GB
+    disk_percent: float
+    disk_used: float  # GB
+    disk_total: float  # GB
+    process_rss: float  # MB
+    loop_lag_ms: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class SystemSampler:
+    """
+    Фоновый сборщик системных метрик
+
+    Отвечает за:
+    - Периодический замер CPU, памяти, диска, RSS процесса и задержки event loop
+    - Хранение истории в кольцевом буфере фиксированного размера
+    - Выдачу последнего замера за O(1) без блокировки запросов
+    """
+
+    def __init__(
+        self,
+        interval: float = SAMPLE_INTERVAL,
+        history_size: int = HISTORY_SIZE,
+        disk_path: str = "/"
+    ):
+        """
+        Инициализация сборщика
+
+        Args:
+            interval: Интервал между замерами в секундах
+            history_size: Количество хранимых замеров
+            disk_path: Путь, для которого считается заполненность диска
+        """
+        self.interval = interval
+        self.disk_path = disk_path
+        self._samples: Deque[SystemSample] = deque(maxlen=history_size)
+        self._process = psutil.Process(os.getpid())
+        self._task: Optional[asyncio.Task] = None
+
+        # Первый вызов cpu_percent(None) инициализирует счетчики и возвращает 0
+        psutil.cpu_percent(interval=None)
+
+    def _collect(self, loop_lag_ms: float) -> SystemSample:
+        """Снять метрики (выполняется в пуле потоков)"""
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+
+        return SystemSample(
+            timestamp=time.time(),
+            # interval=None - процент с момента предыдущего вызова, без ожидания
+            cpu_percent=psutil.cpu_percent(interval=None),
+            memory_percent=memory.percent,
+            memory_used=memory.used / (1024**3),
+            memory_total=memory.total / (1024**3),
+            disk_percent=disk.percent,
+            disk_used=disk.used / (1024**3),
+            disk_total=disk.total / (1024**3),
+            process_rss=self._process.memory_info().rss / (1024**2),
+            loop_lag_ms=loop_lag_ms,
+        )
+
+    async def sample_once(self, loop_lag_ms: float = 0.0) -> SystemSample:
+        """Сделать один замер и положить его в буфер"""
+        sample = await asyncio.to_thread(self._collect, loop_lag_ms)
+        self._samples.append(sample)
+        return sample
+
+    async def _run(self):
+        """Цикл сбора метрик"""
+        loop = asyncio.get_running_loop()
+        loop_lag_ms = 0.0
+
+        while True:
+            try:
+                await self.sample_once(loop_lag_ms)
+            except Exception as e:
+                logger.error(f"❌ Ошибка сбора системных метрик: {e}")
+
+            # Задержка event loop = насколько позже запланированного мы проснулись
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            loop_lag_ms = max(0.0, (loop.time() - expected) * 1000)
+
+    def start(self):
+        """Запустить фоновый сбор"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"📈 Сбор системных метрик запущен (интервал: {self.interval}s)")
+
+    async def stop(self):
+        """Остановить фоновый сбор"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def is_running(self) -> bool:
+        """Запущен ли сбор"""
+        return self._task is not None and not self._task.done()
+
+    def latest(self) -> Optional[SystemSample]:
+        """Последний замер (O(1))"""
+        return self._samples[-1] if self._samples else None
+
+    def history(self, field: str, points: Optional[int] = None) -> List[float]:
+        """
+        История одной метрики для спарклайна
+
+        Args:
+            field: Имя поля SystemSample (например, cpu_percent)
+            points: Сколько последних точек вернуть (по умолчанию все, 0 и меньше - ни одной)
+
+        Returns:
+            List[float]: Значения от старых к новым
+        """
+        if field not in SystemSample.__dataclass_fields__:
+            raise ValueError(f"Неизвестная метрика: {field}")
+
+        samples = list(self._samples)
+        if points is not None:
+            # samples[-0:] вернул бы весь буфер
+            samples = samples[-points:] if points > 0 else []
+        return [getattr(sample, field) for sample in samples]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+# Глобальный экземпляр сборщика
+_system_sampler: Optional[SystemSampler] = None
+
+
+def get_system_sampler() -> SystemSampler:
+    """
+    Получить глобальный экземпляр сборщика метрик
+
+    Returns:
+        SystemSampler: Экземпляр сборщика
+    """
+    global _system_sampler
+    if _system_sampler is None:
+        _system_sampler = SystemSampler()
+    return _system_sampler
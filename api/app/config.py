@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 import os
 
 
@@ -12,6 +12,8 @@ class Settings(BaseSettings):
     
     # Telegram
     telegram_bot_token: str
+    telegram_init_data_max_age: int = 86400  # 1 day after auth_date, 0 - no expiry
+    telegram_init_data_cache_size: int = 10000
     
     # Security
     secret_key: str
@@ -49,7 +51,22 @@ class Settings(BaseSettings):
     
     # Performance settings
     max_concurrent_requests: int = 100
-    request_timeout: int = 30
+    request_timeout: int = 30  # seconds an admitted request may run, then 504 (0 - no limit)
+    
+    # Admission control: queue per limit and how long a request may wait in it
+    max_queued_requests: int = 50
+    queue_timeout: float = 1.0  # seconds, then 503 + Retry-After
+    # Per-route limits (route template -> requests in flight), Marzban-bound routes
+    route_concurrency_limits: Dict[str, int] = {
+        "/api/subscription/activate": 50,
+        "/api/subscription/{user_id}": 50,
+    }
+
+    # Prometheus metrics are not public: an internal listener (metrics_port)
+    # and/or /metrics on the API port behind a bearer token (metrics_token)
+    metrics_port: int = 0  # 0 - no internal listener
+    metrics_host: str = "127.0.0.1"
+    metrics_token: str = ""  # empty - /metrics is not served on the API port
 
     class Config:
         env_file = ".env"
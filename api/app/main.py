@@ -3,10 +3,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.config import settings
 from app.routes import api
+from app.utils.admission import AdmissionControl
 import logging
 
 logger = logging.getLogger(__name__)
 
+try:
+    # The shared metrics module lives at the repository root (subscription_service adds it to the path)
+    from utils.metrics import install_http_metrics, start_metrics_server
+except ImportError as e:
+    logger.warning(f"⚠️ Metrics module not available: {e}")
+    install_http_metrics = start_metrics_server = None
+
 # Create FastAPI app with optimized settings
 app = FastAPI(
     title=settings.app_name,
@@ -23,6 +31,13 @@ async def startup_event():
     logger.info("🚀 Starting YoVPN WebApp API...")
     logger.info(f"📡 Marzban API URL: {settings.marzban_api_url}")
     
+    # Internal metrics listener (not reachable through the public API port)
+    if start_metrics_server and settings.metrics_port:
+        try:
+            app.state.metrics_server = start_metrics_server(settings.metrics_port, host=settings.metrics_host)
+        except OSError as e:
+            logger.warning(f"⚠️ Failed to start metrics server on port {settings.metrics_port}: {e}")
+    
     # Initialize cache
     try:
         from app.utils.cache import cache
@@ -55,6 +70,10 @@ async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("👋 Shutting down YoVPN WebApp API...")
     
+    metrics_server = getattr(app.state, "metrics_server", None)
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    
     # Close cache connection
     try:
         from app.utils.cache import cache
@@ -73,6 +92,28 @@ async def shutdown_event():
     except Exception as e:
         logger.error(f"❌ Error during shutdown: {e}")
 
+# HTTP metrics; /metrics on the API port only with a token
+if install_http_metrics:
+    install_http_metrics(
+        app,
+        "webapp_api",
+        expose=bool(settings.metrics_token),
+        token=settings.metrics_token or None,
+    )
+
+# Admission control: bounded concurrency and a short queue, 503 when saturated,
+# 504 past request_timeout (added before CORS so rejections still carry CORS headers)
+app.add_middleware(
+    AdmissionControl,
+    router=app.router,
+    app_name="webapp_api",
+    max_concurrent=settings.max_concurrent_requests,
+    route_limits=settings.route_concurrency_limits,
+    queue_size=settings.max_queued_requests,
+    queue_timeout=settings.queue_timeout,
+    request_timeout=settings.request_timeout,
+)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Header
+from fastapi import APIRouter, Depends, Header, HTTPException
 from typing import Optional
 from app.models.schemas import (
     TelegramInitData,
@@ -11,7 +11,7 @@ from app.models.schemas import (
     ActivateSubscriptionResponse,
     ErrorResponse,
 )
-from app.utils.telegram import validate_telegram_init_data, extract_user_id_from_init_data
+from app.utils.telegram import InitData, init_data_validator, telegram_init_data
 from app.services.subscription_service import subscription_service
 from app.config import settings
 
@@ -21,11 +21,10 @@ router = APIRouter(tags=["api"])
 @router.post("/validate", response_model=ValidationResponse)
 async def validate_init_data(data: TelegramInitData):
     """Validate Telegram WebApp init data"""
-    is_valid, parsed_data = validate_telegram_init_data(data.init_data)
+    init_data = init_data_validator.validate(data.init_data)
     
-    if is_valid:
-        user_id = extract_user_id_from_init_data(data.init_data)
-        return ValidationResponse(valid=True, user_id=user_id)
+    if init_data:
+        return ValidationResponse(valid=True, user_id=init_data.user_id)
     else:
         return ValidationResponse(valid=False)
 
@@ -33,16 +32,10 @@ async def validate_init_data(data: TelegramInitData):
 @router.get("/subscription/{user_id}", response_model=SubscriptionResponse)
 async def get_subscription(
     user_id: int,
-    x_telegram_init_data: Optional[str] = Header(None)
+    init_data: Optional[InitData] = Depends(telegram_init_data)
 ):
     """Get subscription for user"""
     
-    # Validate init data if provided
-    if x_telegram_init_data:
-        is_valid, _ = validate_telegram_init_data(x_telegram_init_data)
-        if not is_valid:
-            raise HTTPException(status_code=401, detail="Invalid Telegram data")
-    
     # Get subscription
     subscription_data = await subscription_service.get_subscription_uri(user_id)
     
@@ -79,16 +72,10 @@ async def get_latest_version(platform: str):
 @router.post("/track/activation", response_model=ActivationTrackResponse)
 async def track_activation(
     data: ActivationTrackRequest,
-    x_telegram_init_data: Optional[str] = Header(None)
+    init_data: Optional[InitData] = Depends(telegram_init_data)
 ):
     """Track activation event"""
     
-    # Validate init data if provided
-    if x_telegram_init_data:
-        is_valid, _ = validate_telegram_init_data(x_telegram_init_data)
-        if not is_valid:
-            raise HTTPException(status_code=401, detail="Invalid Telegram data")
-    
     # Track activation
     success = await subscription_service.track_activation(data.user_id, data.platform)
     
@@ -101,24 +88,21 @@ async def track_activation(
 @router.post("/subscription/activate", response_model=ActivateSubscriptionResponse)
 async def activate_subscription(
     data: ActivateSubscriptionRequest,
-    x_telegram_init_data: Optional[str] = Header(None)
+    init_data: Optional[InitData] = Depends(telegram_init_data),
+    idempotency_key: Optional[str] = Header(None)
 ):
     """
     Activate subscription - creates or updates user in Marzban
     This is the main endpoint for subscription activation
+    Repeated requests of a user (same Idempotency-Key header) share one activation
     """
     
-    # Validate init data if provided
-    if x_telegram_init_data:
-        is_valid, _ = validate_telegram_init_data(x_telegram_init_data)
-        if not is_valid:
-            raise HTTPException(status_code=401, detail="Invalid Telegram data")
-    
     # Activate subscription in Marzban
     result = await subscription_service.activate_subscription(
         user_id=data.user_id,
         platform=data.platform,
-        telegram_username=data.telegram_username
+        telegram_username=data.telegram_username,
+        idempotency_key=idempotency_key
     )
     
     if not result:
@@ -1,11 +1,20 @@
+import asyncio
 import sys
 import os
-from typing import Optional
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Days of subscription granted by an activation
+ACTIVATION_DAYS = 30
+
+# How long a finished activation is replayed to duplicate requests (seconds)
+ACTIVATION_RESULT_TTL = 60
+
 # Add parent directory to path to import from existing bot services
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../..'))
 
@@ -56,6 +65,13 @@ class SubscriptionServiceAPI:
             self.marzban_service = None
         
         self.user_service = UserService() if UserService else None
+        
+        # (user_id, idempotency key) -> in-flight or finished activation
+        self._activations: Dict[Tuple[int, Optional[str]], asyncio.Future] = {}
+        # Finished activations in completion order -> when they stop being replayed
+        self._activation_expires: "OrderedDict[Tuple[int, Optional[str]], float]" = OrderedDict()
+        self._user_locks: Dict[int, asyncio.Lock] = {}
+        self._lock_holders: Dict[int, int] = {}
     
     async def get_subscription_uri(self, user_id: int) -> Optional[dict]:
         """
@@ -121,21 +137,89 @@ class SubscriptionServiceAPI:
             print(f"Error tracking activation: {e}")
             return False
     
-    async def activate_subscription(self, user_id: int, platform: str, telegram_username: Optional[str] = None) -> Optional[dict]:
+    async def activate_subscription(
+        self,
+        user_id: int,
+        platform: str,
+        telegram_username: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> Optional[dict]:
         """
         Activate subscription - creates or updates user in Marzban
         
+        Concurrent and repeated requests with the same idempotency key (by
+        default one key per user, so WebApp double taps) share one activation
+        and its result for ACTIVATION_RESULT_TTL seconds. Activations of one
+        user with different keys run one after another.
+        
         Args:
             user_id: Telegram user ID
             platform: Platform name
             telegram_username: Optional Telegram username
+            idempotency_key: Optional client key (Idempotency-Key header)
             
         Returns:
             Subscription data with URI or None on failure
         """
+        key = (user_id, idempotency_key)
+        now = time.monotonic()
+        self._prune_activations(now)
+        
+        activation = self._activations.get(key)
+        if activation is None:
+            activation = asyncio.ensure_future(
+                self._activate_exclusive(user_id, platform, telegram_username)
+            )
+            self._activations[key] = activation
+            activation.add_done_callback(lambda done: self._finish_activation(key, done))
+        else:
+            logger.info(f"🔁 Activation for user {user_id} already in progress or done, sharing result")
+        
+        # shield: a client that disconnects does not cancel the shared activation
+        return await asyncio.shield(activation)
+    
+    def _finish_activation(self, key: Tuple[int, Optional[str]], activation: asyncio.Future):
+        if activation.cancelled() or activation.exception() or activation.result() is None:
+            # Failed activations are not replayed - the next request retries
+            self._activations.pop(key, None)
+            self._activation_expires.pop(key, None)
+        else:
+            self._activation_expires[key] = time.monotonic() + ACTIVATION_RESULT_TTL
+            self._activation_expires.move_to_end(key)
+    
+    def _prune_activations(self, now: float):
+        while self._activation_expires:
+            key, expires_at = next(iter(self._activation_expires.items()))
+            if expires_at > now:
+                break
+            del self._activation_expires[key]
+            self._activations.pop(key, None)
+    
+    async def _activate_exclusive(self, user_id: int, platform: str, telegram_username: Optional[str]) -> Optional[dict]:
+        """Run the activation under the per-user lock"""
+        lock = self._user_locks.get(user_id)
+        if lock is None:
+            lock = self._user_locks[user_id] = asyncio.Lock()
+        self._lock_holders[user_id] = self._lock_holders.get(user_id, 0) + 1
+        try:
+            async with lock:
+                return await self._activate(user_id, platform, telegram_username)
+        finally:
+            self._lock_holders[user_id] -= 1
+            if not self._lock_holders[user_id]:
+                del self._lock_holders[user_id]
+                del self._user_locks[user_id]
+    
+    async def _activate(self, user_id: int, platform: str, telegram_username: Optional[str]) -> Optional[dict]:
+        """
+        Create or extend the Marzban user
+        
+        Two Marzban round trips: GET the user, then PUT or POST. The
+        subscription URL is built from the PUT/POST response.
+        """
         try:
             if not self.marzban_service or not self.user_service:
-                print(f"⚠️ Marzban service not available, returning mock data")
+                logger.warning("⚠️ Marzban service not available, returning mock data")
                 # Mock data for development
                 return {
                     'success': True,
@@ -151,72 +235,46 @@ class SubscriptionServiceAPI:
             else:
                 marzban_username = f'user_{user_id}'
             
-            print(f"🔄 Activating subscription for user {user_id} (marzban: {marzban_username})")
+            logger.info(f"🔄 Activating subscription for user {user_id} on {platform} (marzban: {marzban_username})")
             
-            # Check if user exists in Marzban
+            expire_date = datetime.now() + timedelta(days=ACTIVATION_DAYS)
             existing_user = await self.marzban_service.get_user(marzban_username)
             
             if existing_user:
-                print(f"👤 User {marzban_username} already exists in Marzban, updating...")
-                
-                # Update existing user - extend subscription by 30 days
-                expire_date = datetime.now() + timedelta(days=30)
-                expire_timestamp = int(expire_date.timestamp())
-                
-                update_result = await self.marzban_service.update_user(marzban_username, {
-                    'expire': expire_timestamp,
+                # Extend existing user - subscription runs 30 days from now
+                marzban_user = await self.marzban_service.modify_user(marzban_username, {
+                    'expire': int(expire_date.timestamp()),
                     'status': 'active',
                 })
-                
-                if update_result:
-                    subscription_data = await self.marzban_service.get_user_subscription(marzban_username)
-                    
-                    return {
-                        'success': True,
-                        'message': 'Subscription extended successfully',
-                        'subscription_uri': subscription_data.get('subscription_url') if subscription_data else None,
-                        'expires_at': expire_date.isoformat(),
-                        'marzban_username': marzban_username
-                    }
-                else:
-                    print(f"❌ Failed to update user in Marzban")
-                    return None
-            
+                message = 'Subscription extended successfully'
             else:
-                print(f"🆕 Creating new user {marzban_username} in Marzban...")
-                
-                # Create new user with 30 days trial
-                new_user = await self.marzban_service.create_user(
-                    username=marzban_username,
-                    telegram_id=user_id,
-                    days=30,
-                    data_limit=0  # Unlimited traffic
-                )
-                
-                if new_user:
-                    # Get subscription URL
-                    subscription_data = await self.marzban_service.get_user_subscription(marzban_username)
-                    
-                    # Update user in local database
-                    await self.user_service.update_user(user_id, {
-                        'marzban_username': marzban_username,
-                        'subscription_active': True,
-                        'subscription_expires': datetime.now() + timedelta(days=30)
-                    })
-                    
-                    return {
-                        'success': True,
-                        'message': 'Subscription created successfully',
-                        'subscription_uri': subscription_data.get('subscription_url') if subscription_data else None,
-                        'expires_at': (datetime.now() + timedelta(days=30)).isoformat(),
-                        'marzban_username': marzban_username
-                    }
-                else:
-                    print(f"❌ Failed to create user in Marzban")
-                    return None
+                # Create new user with 30 days trial, unlimited traffic
+                marzban_user = await self.marzban_service.create_user(marzban_username, {
+                    'days': ACTIVATION_DAYS,
+                    'data_limit': 0,
+                    'note': f"Created via YoVPN WebApp - Telegram ID {user_id}",
+                })
+                message = 'Subscription created successfully'
+            
+            if not marzban_user:
+                logger.error(f"❌ Failed to activate {marzban_username} in Marzban")
+                return None
+            
+            # Marzban is the source of truth for the subscription. The local UserService
+            # is a snapshot loaded at API startup, not the bot's live store, so
+            # nothing is written to it here
+            subscription_data = self.marzban_service.build_user_config(marzban_username, marzban_user)
+            
+            return {
+                'success': True,
+                'message': message,
+                'subscription_uri': subscription_data.get('subscription_url') if subscription_data else None,
+                'expires_at': expire_date.isoformat(),
+                'marzban_username': marzban_username
+            }
                     
         except Exception as e:
-            print(f"❌ Error activating subscription: {e}")
+            logger.error(f"❌ Error activating subscription: {e}")
             import traceback
             traceback.print_exc()
             return None
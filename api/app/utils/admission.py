@@ -0,0 +1,284 @@
+"""
+Admission control for the WebApp API
+Bounded concurrency with a short queue instead of unlimited in-flight requests
+
+When Marzban slows down, activations pile up in SubscriptionServiceAPI and
+every new request makes the backlog longer. This ASGI middleware admits a
+request only when both the global limit and the limit of its route have a
+free slot. Otherwise the request waits in a short FIFO queue until a
+deadline; a full queue or an expired deadline answers 503 with Retry-After
+right away, so clients back off instead of piling up. An admitted request
+that runs past request_timeout is cancelled and answered 504, so a stuck
+Marzban call cannot hold its slot forever. Health checks and /metrics are
+never queued.
+"""
+import asyncio
+import logging
+import math
+from collections import deque
+from typing import Deque, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.routing import Match, Router
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+try:
+    from utils.metrics import HTTP_IN_FLIGHT, HTTP_QUEUE_WAIT, HTTP_REJECTED
+except ImportError:
+    HTTP_IN_FLIGHT = HTTP_QUEUE_WAIT = HTTP_REJECTED = None
+
+# Paths that bypass admission control (and everything below them)
+EXEMPT_PATHS = ("/metrics", "/api/health", "/health")
+
+
+def _expire(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(False)
+
+
+class _Gate:
+    """Concurrency limit with a bounded FIFO queue"""
+
+    def __init__(self, limit: int, queue_size: int):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.active = 0
+        # Waiters get True when a slot is handed over, False on deadline
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def try_acquire(self) -> bool:
+        """Take a free slot without queueing"""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        return False
+
+    async def wait(self, deadline: float) -> Optional[str]:
+        """
+        Wait in the queue for a slot until the deadline (event loop time)
+
+        Returns:
+            None if admitted, otherwise the rejection reason
+        """
+        if len(self._waiters) >= self.queue_size:
+            return "queue_full"
+
+        loop = asyncio.get_running_loop()
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            return "timeout"
+
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        timer = loop.call_later(timeout, _expire, waiter)
+        try:
+            granted = await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled() and waiter.result():
+                # The slot was already handed to us - pass it on
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+        finally:
+            timer.cancel()
+
+        if granted:
+            return None
+        self._discard(waiter)
+        return "timeout"
+
+    def release(self):
+        """Hand the slot to the oldest waiter or free it"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.active -= 1
+
+    def _discard(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+
+class AdmissionControl:
+    """
+    ASGI middleware with global and per-route concurrency limits
+
+    Responsibilities:
+    - Admit up to max_concurrent requests, and up to route_limits[route]
+      for the listed route templates
+    - Queue up to queue_size requests per limit for at most queue_timeout seconds
+    - Answer 503 + Retry-After when saturated
+    - Cancel admitted requests that run past request_timeout (504)
+    - Export in-flight, queue wait and rejection metrics per route
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        router: Optional[Router] = None,
+        app_name: str = "webapp_api",
+        max_concurrent: int = 100,
+        route_limits: Optional[Mapping[str, int]] = None,
+        queue_size: int = 50,
+        queue_timeout: float = 1.0,
+        request_timeout: Optional[float] = None,
+        exempt_paths: Sequence[str] = EXEMPT_PATHS,
+    ):
+        """
+        Args:
+            app: Wrapped ASGI application
+            router: Router used to resolve route templates for limits and metric labels
+            app_name: Value of the app metric label
+            max_concurrent: Global limit of requests in flight
+            route_limits: Limits per route template (e.g. /api/subscription/activate)
+            queue_size: How many requests may wait for each limit
+            queue_timeout: How long a request may wait in the queue (seconds)
+            request_timeout: How long an admitted request may run (seconds, None - no limit)
+            exempt_paths: Paths that bypass admission control
+        """
+        self.app = app
+        self.router = router
+        self.app_name = app_name
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+        self.exempt_paths = tuple(exempt_paths)
+        self.retry_after = str(max(1, math.ceil(queue_timeout)))
+        self._global = _Gate(max_concurrent, queue_size)
+        self._routes: Dict[str, _Gate] = {
+            route: _Gate(limit, queue_size) for route, limit in (route_limits or {}).items()
+        }
+        self.stats = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or self._exempt(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route(scope)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        gates, queued, reason = await self._admit(route, started + self.queue_timeout)
+        if reason is not None:
+            await self._reject(route, reason, scope, receive, send)
+            return
+
+        self.stats["admitted"] += 1
+        if queued:
+            self.stats["queued"] += 1
+        in_flight = None
+        if HTTP_IN_FLIGHT is not None:
+            HTTP_QUEUE_WAIT.labels(self.app_name, route).observe(loop.time() - started if queued else 0.0)
+            in_flight = HTTP_IN_FLIGHT.labels(self.app_name, route)
+            in_flight.inc()
+        try:
+            await self._run(route, scope, receive, send)
+        finally:
+            if in_flight is not None:
+                in_flight.dec()
+            for gate in gates:
+                gate.release()
+
+    async def _run(self, route: str, scope: Scope, receive: Receive, send: Send):
+        """Run the request within request_timeout; 504 if it has not started responding"""
+        if not self.request_timeout:
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def tracked_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            async with asyncio.timeout(self.request_timeout) as deadline:
+                await self.app(scope, receive, tracked_send)
+        except TimeoutError:
+            if not deadline.expired():
+                raise
+            self.stats["timed_out"] += 1
+            logger.warning(f"⚠️ {scope['method']} {route} exceeded {self.request_timeout}s")
+            if HTTP_REJECTED is not None:
+                HTTP_REJECTED.labels(self.app_name, route, "deadline").inc()
+            if response_started:
+                # Half-sent response: the server drops the connection
+                raise
+            response = JSONResponse(
+                status_code=504,
+                content={
+                    "error": "Gateway Timeout",
+                    "message": "Request took too long, please retry later",
+                },
+            )
+            await response(scope, receive, send)
+
+    async def _admit(self, route: str, deadline: float) -> Tuple[List[_Gate], bool, Optional[str]]:
+        """
+        Take the route slot, then the global one (a queued request holds no global slot)
+
+        Returns:
+            Taken gates, whether the request had to queue, rejection reason
+        """
+        acquired: List[_Gate] = []
+        queued = False
+        for gate in (self._routes.get(route), self._global):
+            if gate is None:
+                continue
+            if not gate.try_acquire():
+                queued = True
+                try:
+                    reason = await gate.wait(deadline)
+                except BaseException:
+                    for taken in acquired:
+                        taken.release()
+                    raise
+                if reason is not None:
+                    for taken in acquired:
+                        taken.release()
+                    return [], queued, reason
+            acquired.append(gate)
+        return acquired, queued, None
+
+    async def _reject(self, route: str, reason: str, scope: Scope, receive: Receive, send: Send):
+        self.stats["rejected"] += 1
+        logger.debug(f"⚠️ Rejected {scope['method']} {route}: {reason}")
+        if HTTP_REJECTED is not None:
+            HTTP_REJECTED.labels(self.app_name, route, reason).inc()
+        response = JSONResponse(
+            status_code=503,
+            content={
+                "error": "Service Unavailable",
+                "message": "Server is busy, please retry later",
+            },
+            headers={"Retry-After": self.retry_after},
+        )
+        await response(scope, receive, send)
+
+    def _exempt(self, path: str) -> bool:
+        return any(path == exempt or path.startswith(exempt + "/") for exempt in self.exempt_paths)
+
+    def _route(self, scope: Scope) -> str:
+        """Route template of the request (bounded metric labels)"""
+        if self.router is None:
+            return scope["path"] if scope["path"] in self._routes else "all"
+        partial = None
+        for route in self.router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", None) or "unmatched"
+            if match == Match.PARTIAL and partial is None:
+                partial = route
+        return getattr(partial, "path", None) or "unmatched"
@@ -11,6 +11,12 @@ from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+try:
+    from utils.metrics import record_cache
+except ImportError:
+    def record_cache(cache: str, hit: bool):
+        pass
+
 
 class RedisCache:
     """
@@ -125,8 +131,10 @@ def cached(ttl: int = 300, key_prefix: str = ""):
             # Try to get from cache
             cached_value = await cache.get(cache_key)
             if cached_value is not None:
+                record_cache("redis", True)
                 logger.debug(f"✅ Cache hit for {cache_key}")
                 return cached_value
+            record_cache("redis", False)
             
             # Execute function and cache result
             result = await func(*args, **kwargs)
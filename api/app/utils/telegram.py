@@ -1,77 +1,182 @@
+"""
+Telegram WebApp initData validation
+The secret key is derived once per bot token, initData is parsed in one pass
+and recently validated strings are remembered until their auth_date expires
+"""
 import hashlib
 import hmac
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
 from urllib.parse import parse_qsl
-from typing import Optional, Dict
+
+from fastapi import Header, HTTPException
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+try:
+    from utils.metrics import record_cache
+except ImportError:
+    def record_cache(cache: str, hit: bool):
+        pass
+
+# Length of the hex HMAC-SHA256 signature in the hash field
+HASH_LENGTH = 64
+
+
+@dataclass(frozen=True)
+class InitData:
+    """Validated Telegram WebApp init data"""
+    fields: Dict[str, str]
+    user_id: Optional[int]
+    auth_date: int
+
+
+class InitDataValidator:
+    """
+    Telegram initData validator with a bounded cache of validated strings
+
+    Only strings with a correct signature are cached, so invalid input
+    cannot evict valid entries. An entry lives until auth_date + max_age.
+    """
+
+    def __init__(
+        self,
+        bot_token: str,
+        max_age: int = 86400,
+        cache_size: int = 10000,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            bot_token: Telegram bot token
+            max_age: Seconds initData stays valid after auth_date (0 - no expiry)
+            cache_size: How many validated initData strings to remember
+            clock: Time source (seconds)
+        """
+        self._secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+        self.max_age = max_age
+        self.cache_size = cache_size
+        self._clock = clock
+        # init_data -> (result, expires_at)
+        self._cache: "OrderedDict[str, tuple[InitData, float]]" = OrderedDict()
+
+    def validate(self, init_data: str) -> Optional[InitData]:
+        """
+        Validate init data
+
+        Args:
+            init_data: The init data string from Telegram WebApp
+
+        Returns:
+            InitData or None if the signature is wrong or auth_date expired
+        """
+        now = self._clock()
+        cached = self._cache.get(init_data)
+        if cached is not None:
+            result, expires_at = cached
+            if now < expires_at:
+                self._cache.move_to_end(init_data)
+                record_cache("init_data", True)
+                return result
+            del self._cache[init_data]
+        record_cache("init_data", False)
+
+        result = self._verify(init_data)
+        if result is None:
+            return None
+
+        expires_at = result.auth_date + self.max_age if self.max_age else float("inf")
+        if now >= expires_at:
+            return None
+
+        self._cache[init_data] = (result, expires_at)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def _verify(self, init_data: str) -> Optional[InitData]:
+        """Check the signature and parse the fields in one pass"""
+        fields = dict(parse_qsl(init_data))
+        received_hash = fields.pop('hash', None)
+        # HMAC-SHA256 hex digest; anything else (e.g. non-ASCII) is rejected before comparing
+        if not received_hash or len(received_hash) != HASH_LENGTH:
+            return None
+
+        data_check_string = '\n'.join(f"{k}={v}" for k, v in sorted(fields.items()))
+        calculated_hash = hmac.new(self._secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(calculated_hash.encode(), received_hash.encode()):
+            return None
+
+        try:
+            auth_date = int(fields.get('auth_date', ''))
+        except ValueError:
+            return None
+
+        user_id = None
+        try:
+            user = json.loads(fields.get('user', '{}'))
+            if isinstance(user, dict) and isinstance(user.get('id'), int):
+                user_id = user['id']
+        except ValueError as e:
+            logger.warning(f"⚠️ Invalid user field in init data: {e}")
+
+        return InitData(fields=fields, user_id=user_id, auth_date=auth_date)
+
+
+init_data_validator = InitDataValidator(
+    settings.telegram_bot_token,
+    max_age=settings.telegram_init_data_max_age,
+    cache_size=settings.telegram_init_data_cache_size,
+)
+
 
 def validate_telegram_init_data(init_data: str) -> tuple[bool, Optional[Dict]]:
     """
     Validate Telegram WebApp init data
-    
+
     Args:
         init_data: The init data string from Telegram WebApp
-        
+
     Returns:
         Tuple of (is_valid, parsed_data)
     """
-    try:
-        # Parse init data
-        parsed_data = dict(parse_qsl(init_data))
-        
-        # Get hash
-        received_hash = parsed_data.pop('hash', None)
-        if not received_hash:
-            return False, None
-        
-        # Create data check string
-        data_check_arr = [f"{k}={v}" for k, v in sorted(parsed_data.items())]
-        data_check_string = '\n'.join(data_check_arr)
-        
-        # Calculate hash
-        secret_key = hmac.new(
-            "WebAppData".encode(),
-            settings.telegram_bot_token.encode(),
-            hashlib.sha256
-        ).digest()
-        
-        calculated_hash = hmac.new(
-            secret_key,
-            data_check_string.encode(),
-            hashlib.sha256
-        ).hexdigest()
-        
-        # Compare hashes
-        is_valid = hmac.compare_digest(calculated_hash, received_hash)
-        
-        if is_valid:
-            return True, parsed_data
-        else:
-            return False, None
-            
-    except Exception as e:
-        print(f"Error validating init data: {e}")
+    result = init_data_validator.validate(init_data)
+    if result is None:
         return False, None
+    return True, dict(result.fields)
 
 
 def extract_user_id_from_init_data(init_data: str) -> Optional[int]:
     """
     Extract user ID from Telegram init data
-    
+
     Args:
         init_data: The init data string from Telegram WebApp
-        
+
     Returns:
         User ID or None
     """
-    is_valid, parsed_data = validate_telegram_init_data(init_data)
-    
-    if not is_valid or not parsed_data:
-        return None
-    
-    try:
-        import json
-        user_data = json.loads(parsed_data.get('user', '{}'))
-        return user_data.get('id')
-    except:
+    result = init_data_validator.validate(init_data)
+    return result.user_id if result else None
+
+
+async def telegram_init_data(
+    x_telegram_init_data: Optional[str] = Header(None),
+) -> Optional[InitData]:
+    """
+    FastAPI dependency: validated X-Telegram-Init-Data header
+
+    The header is optional; when present it must be valid (401 otherwise).
+    FastAPI caches the dependency, so a request validates it once.
+    """
+    if not x_telegram_init_data:
         return None
+    result = init_data_validator.validate(x_telegram_init_data)
+    if result is None:
+        raise HTTPException(status_code=401, detail="Invalid Telegram data")
+    return result
@@ -5,15 +5,25 @@ Marzban API Client
 
 import aiohttp
 import logging
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, AsyncIterator
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 import asyncio
 import json
 
+from utils.metrics import marzban_trace_config
+
 logger = logging.getLogger(__name__)
 
 
+class MarzbanPageError(Exception):
+    """Страница пользователей Marzban не получена (ошибка API, сети или формата ответа)"""
+
+    def __init__(self, offset: int):
+        super().__init__(f"Не удалось получить пользователей Marzban начиная с offset={offset}")
+        self.offset = offset
+
+
 @dataclass
 class SubscriptionData:
     """Данные подписки"""
@@ -66,7 +76,8 @@ class MarzbanAPI:
             }
             self._session = aiohttp.ClientSession(
                 headers=headers,
-                timeout=self.timeout
+                timeout=self.timeout,
+                trace_configs=[marzban_trace_config("admin")]
             )
         return self._session
     
@@ -367,12 +378,56 @@ class MarzbanAPI:
             Список подписок
         """
         result = await self._make_request('GET', '/api/users')
-        
+
+        if result and isinstance(result, dict):
+            result = result.get('users', [])
+
         if result and isinstance(result, list):
             return [self._parse_subscription_data(user) for user in result]
-        
+
         return []
-    
+
+    async def iter_subscription_pages(self, page_size: int = 500) -> AsyncIterator[List[SubscriptionData]]:
+        """
+        Постранично получить все подписки
+
+        Страницы запрашиваются через offset/limit и отдаются по одной,
+        поэтому в памяти одновременно находится не больше page_size записей.
+
+        Args:
+            page_size: Размер страницы
+
+        Yields:
+            Список подписок очередной страницы
+
+        Raises:
+            MarzbanPageError: Страница не получена - список пользователей неполон
+        """
+        offset = 0
+
+        while True:
+            result = await self._make_request(
+                'GET', f'/api/users?offset={offset}&limit={page_size}'
+            )
+
+            if isinstance(result, dict):
+                users = result.get('users', [])
+            elif isinstance(result, list):
+                users = result
+            else:
+                raise MarzbanPageError(offset)
+
+            if not users:
+                return
+
+            yield [self._parse_subscription_data(user) for user in users]
+
+            # Старые версии панели отдают список без пагинации - это единственная страница
+            if isinstance(result, list) or len(users) < page_size:
+                return
+
+            offset += len(users)
+
     async def check_api_availability(self) -> bool:
         """
         Проверить доступность API
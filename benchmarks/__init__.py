@@ -0,0 +1,4 @@
+"""
+Бенчмарки
+Нагрузочные тесты и локальные заглушки внешних сервисов
+"""
@@ -0,0 +1,696 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест бота
+Прогоняет синтетический трафик через настоящий Dispatcher из bot.main.YoVPNBot
+
+Запуск:
+    python -m benchmarks.bot_load --mix mixed --rate 200 --duration 30
+    python -m benchmarks.bot_load --mix menu --save-trace /tmp/menu.jsonl
+    python -m benchmarks.bot_load --replay /tmp/menu.jsonl --json report.json
+
+Сеть не нужна: Bot API заменяется FakeTelegramSession,
+Marzban - локальным FakeMarzbanServer.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import psutil
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.fake_marzban import FakeMarzbanServer, FaultProfile, LatencyDistribution, DEFAULT_TOKEN
+from benchmarks.fake_telegram import FakeTelegramSession, BOT_USER
+from bot.sharding import ShardRouter, consume_shard, shard_for_update
+from utils.metrics import normalize_callback, normalize_message
+
+logger = logging.getLogger("yovpn.benchmarks")
+
+# Фиктивный токен правильного формата (aiogram проверяет формат при создании Bot)
+FAKE_BOT_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+
+# Интервал тикера для измерения задержки event loop (секунды)
+LAG_TICK = 0.01
+
+# Первый Telegram ID синтетических пользователей
+BASE_USER_ID = 900_000_000
+
+MENU_CALLBACKS = ["main_menu", "my_subscriptions", "top_up", "stats", "settings", "support"]
+PAYMENT_FLOW = ["top_up", "pay_40", "pay_80", "pay_120", "pay_200", "pay_400",
+                "pay_method_demo", "my_balance", "activate_subscription"]
+
+# (at, update) - время отправки от начала прогона и сырой апдейт
+TraceEvent = Tuple[float, Dict[str, Any]]
+
+
+# ----- Генерация апдейтов -----
+
+class UpdateFactory:
+    """Сборка сырых апдейтов Telegram в формате Bot API"""
+
+    def __init__(self):
+        self._update_id = 0
+
+    def _next_id(self) -> int:
+        self._update_id += 1
+        return self._update_id
+
+    @staticmethod
+    def _user(user_id: int) -> Dict[str, Any]:
+        return {
+            "id": user_id,
+            "is_bot": False,
+            "first_name": f"Load{user_id % 100000}",
+            "username": f"load_{user_id}",
+            "language_code": "ru",
+        }
+
+    def message(self, user_id: int, text: str) -> Dict[str, Any]:
+        update_id = self._next_id()
+        message = {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": self._user(user_id),
+            "text": text,
+        }
+        if text.startswith("/"):
+            command = text.split()[0]
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        return {"update_id": update_id, "message": message}
+
+    def callback(self, user_id: int, data: str) -> Dict[str, Any]:
+        update_id = self._next_id()
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": self._user(user_id),
+                "chat_instance": str(user_id),
+                "data": data,
+                "message": {
+                    "message_id": update_id,
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private"},
+                    "from": BOT_USER,
+                    "text": "menu",
+                },
+            },
+        }
+
+
+def _start_storm(rng: random.Random, factory: UpdateFactory, users: int, count: int) -> Iterable[Dict[str, Any]]:
+    """Лавина /start от новых пользователей"""
+    for index in range(count):
+        yield factory.message(BASE_USER_ID + users + index, "/start")
+
+
+def _menu(rng: random.Random, factory: UpdateFactory, users: int, count: int) -> Iterable[Dict[str, Any]]:
+    """Навигация по меню существующими пользователями"""
+    for _ in range(count):
+        yield factory.callback(BASE_USER_ID + rng.randrange(users), rng.choice(MENU_CALLBACKS))
+
+
+def _payments(rng: random.Random, factory: UpdateFactory, users: int, count: int) -> Iterable[Dict[str, Any]]:
+    """Сценарии пополнения и активации подписки"""
+    for _ in range(count):
+        yield factory.callback(BASE_USER_ID + rng.randrange(users), rng.choice(PAYMENT_FLOW))
+
+
+def _referral(rng: random.Random, factory: UpdateFactory, users: int, count: int) -> Iterable[Dict[str, Any]]:
+    """Переходы по реферальным ссылкам и просмотр раздела рефералов"""
+    for index in range(count):
+        if rng.random() < 0.5:
+            referrer = BASE_USER_ID + rng.randrange(users)
+            yield factory.message(BASE_USER_ID + users + index, f"/start ref_{referrer}")
+        else:
+            yield factory.callback(BASE_USER_ID + rng.randrange(users), "referrals")
+
+
+def _mixed(rng: random.Random, factory: UpdateFactory, users: int, count: int) -> Iterable[Dict[str, Any]]:
+    """Смесь, близкая к реальному трафику"""
+    generators = [
+        (0.55, _menu(rng, factory, users, count)),
+        (0.20, _payments(rng, factory, users, count)),
+        (0.15, _start_storm(rng, factory, users, count)),
+        (0.10, _referral(rng, factory, users + count, count)),
+    ]
+    weights = [weight for weight, _ in generators]
+    for _ in range(count):
+        _, generator = rng.choices(generators, weights=weights)[0]
+        yield next(generator)
+
+
+MIXES: Dict[str, Callable[..., Iterable[Dict[str, Any]]]] = {
+    "start_storm": _start_storm,
+    "menu": _menu,
+    "payments": _payments,
+    "referral": _referral,
+    "mixed": _mixed,
+}
+
+
+def build_trace(mix: str, rate: float, duration: float, users: int, seed: int) -> List[TraceEvent]:
+    """
+    Построить открытое расписание апдейтов (пуассоновский поток)
+
+    Args:
+        mix: Название смеси трафика
+        rate: Целевая интенсивность (апдейтов в секунду)
+        duration: Длительность (секунды)
+        users: Размер пула существующих пользователей
+        seed: Seed генератора
+
+    Returns:
+        List[TraceEvent]: Отсортированное по времени расписание
+    """
+    rng = random.Random(seed)
+    offsets = []
+    at = 0.0
+    while True:
+        at += rng.expovariate(rate)
+        if at >= duration:
+            break
+        offsets.append(at)
+
+    updates = MIXES[mix](rng, UpdateFactory(), users, len(offsets))
+    return list(zip(offsets, updates))
+
+
+def save_trace(trace: List[TraceEvent], path: str):
+    """Сохранить расписание в JSONL"""
+    with open(path, "w", encoding="utf-8") as f:
+        for at, update in trace:
+            f.write(json.dumps({"at": round(at, 6), "update": update}, ensure_ascii=False) + "\n")
+
+
+def load_trace(path: str) -> List[TraceEvent]:
+    """Загрузить расписание из JSONL"""
+    trace = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                trace.append((float(record["at"]), record["update"]))
+    trace.sort(key=lambda event: event[0])
+    return trace
+
+
+def warmup_updates(users: int) -> List[Dict[str, Any]]:
+    """/start для пула пользователей, чтобы они существовали до замера"""
+    factory = UpdateFactory()
+    factory._update_id = 10**9
+    return [factory.message(BASE_USER_ID + index, "/start") for index in range(users)]
+
+
+def handler_label(update: Dict[str, Any]) -> str:
+    """Метка обработчика в тех же терминах, что и MetricsMiddleware"""
+    if "callback_query" in update:
+        return f"callback:{normalize_callback(update['callback_query'].get('data'))}"
+    if "message" in update:
+        return f"message:{normalize_message(update['message'].get('text'))}"
+    return "other"
+
+
+# ----- Прогон -----
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль по отсортированной выборке (ближайший ранг)"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(q * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max в миллисекундах"""
+    ordered = sorted(values)
+    return {
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round((ordered[-1] if ordered else 0.0) * 1000, 3),
+    }
+
+
+class LoopLagMonitor:
+    """Тикер, измеряющий задержку event loop"""
+
+    def __init__(self, tick: float = LAG_TICK):
+        self.tick = tick
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.tick
+            await asyncio.sleep(self.tick)
+            self.samples.append(max(0.0, loop.time() - expected))
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+class LoadRunner:
+    """
+    Драйвер нагрузки поверх YoVPNBot
+
+    Отвечает за:
+    - Сборку настоящего бота с подменой сессии Bot API и Marzban
+    - Открытую подачу апдейтов по расписанию
+    - Сбор задержек, ошибок, задержки event loop и роста памяти
+    """
+
+    def __init__(self, tg_latency: float = 0.0, tg_jitter: float = 0.0,
+                 use_marzban: bool = True, seed: int = 0,
+                 marzban_profile: Optional[FaultProfile] = None):
+        self.tg_latency = tg_latency
+        self.tg_jitter = tg_jitter
+        self.use_marzban = use_marzban
+        self.marzban_profile = marzban_profile
+        self.seed = seed
+        self.app = None
+        self.session: Optional[FakeTelegramSession] = None
+        self.marzban: Optional[FakeMarzbanServer] = None
+        self._workdir: Optional[tempfile.TemporaryDirectory] = None
+        self._cwd: Optional[str] = None
+
+    async def setup(self):
+        """Собрать бота в изолированной рабочей директории"""
+        os.environ.setdefault("TELEGRAM_BOT_TOKEN", FAKE_BOT_TOKEN)
+
+        # UserService хранит данные в ./data - не трогаем рабочие файлы
+        self._cwd = os.getcwd()
+        self._workdir = tempfile.TemporaryDirectory(prefix="yovpn-load-")
+        os.chdir(self._workdir.name)
+
+        from bot.main import YoVPNBot
+
+        self.app = YoVPNBot()
+        self.session = FakeTelegramSession(self.tg_latency, self.tg_jitter, seed=self.seed)
+        self.app.bot.session = self.session
+
+        if self.use_marzban:
+            self.marzban = FakeMarzbanServer(profile=self.marzban_profile, seed=self.seed)
+            url = await self.marzban.start()
+            marzban_service = self.app.services.marzban_service
+            marzban_service.api_url = url
+            marzban_service.admin_token = DEFAULT_TOKEN
+            await marzban_service.check_api_availability()
+
+    async def teardown(self):
+        """Освободить ресурсы и вернуть рабочую директорию"""
+        if self.app:
+            await self.app.services.marzban_service.close()
+        if self.marzban:
+            await self.marzban.stop()
+        if self._cwd:
+            os.chdir(self._cwd)
+        if self._workdir:
+            self._workdir.cleanup()
+
+    async def feed(self, update: Dict[str, Any]):
+        """Передать апдейт в Dispatcher"""
+        await self.app.dp.feed_raw_update(self.app.bot, update)
+
+    async def warmup(self, updates: List[Dict[str, Any]], concurrency: int = 50):
+        """Прогнать апдейты без замеров"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(update):
+            async with semaphore:
+                try:
+                    await self.feed(update)
+                except Exception:
+                    pass
+
+        await asyncio.gather(*(one(update) for update in updates))
+        self.session.reset()
+
+    async def run(self, trace: List[TraceEvent]) -> Dict[str, Any]:
+        """
+        Подать апдейты по расписанию и собрать отчет
+
+        Задержка считается от запланированного момента отправки,
+        поэтому отставание генератора попадает в результат
+        (без coordinated omission).
+        """
+        loop = asyncio.get_running_loop()
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        errors: Dict[str, int] = defaultdict(int)
+        tasks: List[asyncio.Task] = []
+
+        async def one(scheduled: float, update: Dict[str, Any]):
+            label = handler_label(update)
+            try:
+                await self.feed(update)
+            except Exception:
+                errors[label] += 1
+            latencies[label].append(loop.time() - scheduled)
+
+        gc.collect()
+        process = psutil.Process(os.getpid())
+        rss_start = process.memory_info().rss
+        monitor = LoopLagMonitor()
+        monitor.start()
+        api_calls_before = dict(self.session.calls)
+        marzban_before = self.marzban.requests if self.marzban else 0
+
+        started = loop.time()
+        for at, update in trace:
+            scheduled = started + at
+            delay = scheduled - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(scheduled, update)))
+        sent_at = loop.time()
+
+        await asyncio.gather(*tasks)
+        elapsed = loop.time() - started
+        await monitor.stop()
+        gc.collect()
+
+        return build_report(
+            trace,
+            latencies,
+            errors,
+            elapsed=elapsed,
+            send_lag=sent_at - started - (trace[-1][0] if trace else 0.0),
+            loop_lag=monitor.samples,
+            rss=(rss_start, process.memory_info().rss),
+            api_calls=self.api_calls_since(api_calls_before),
+            marzban_requests=(self.marzban.requests - marzban_before) if self.marzban else 0,
+        )
+
+    def api_calls_since(self, before: Dict[str, int]) -> Dict[str, int]:
+        """Вызовы Bot API с момента снимка before"""
+        return {
+            method: count - before.get(method, 0)
+            for method, count in sorted(self.session.calls.items())
+        }
+
+
+def build_report(
+    trace: List[TraceEvent],
+    latencies: Dict[str, List[float]],
+    errors: Dict[str, int],
+    elapsed: float,
+    send_lag: float,
+    loop_lag: List[float],
+    rss: Tuple[int, int],
+    api_calls: Dict[str, int],
+    marzban_requests: int
+) -> Dict[str, Any]:
+    """Сводный отчет по сырым замерам"""
+    completed = sum(len(values) for values in latencies.values())
+    all_latencies = [value for values in latencies.values() for value in values]
+    rss_start, rss_end = rss
+
+    return {
+        "updates": len(trace),
+        "completed": completed,
+        "errors": sum(errors.values()),
+        "elapsed_s": round(elapsed, 3),
+        "offered_rate": round(len(trace) / trace[-1][0], 2) if trace and trace[-1][0] > 0 else 0.0,
+        "throughput": round(completed / elapsed, 2) if elapsed > 0 else 0.0,
+        "send_lag_s": round(max(0.0, send_lag), 3),
+        "latency": summarize(all_latencies),
+        "handlers": {
+            label: {"count": len(values), "errors": errors.get(label, 0), **summarize(values)}
+            for label, values in sorted(latencies.items())
+        },
+        "loop_lag": summarize(loop_lag),
+        "rss_mb": {
+            "start": round(rss_start / 1024**2, 2),
+            "end": round(rss_end / 1024**2, 2),
+            "growth": round((rss_end - rss_start) / 1024**2, 2),
+        },
+        "api_calls": api_calls,
+        "marzban_requests": marzban_requests,
+    }
+
+
+# ----- Прогон с шардированием по процессам -----
+
+def _shard_load_worker(index: int, shards: int, inbox, results, options: Dict[str, Any]):
+    """Процесс-воркер нагрузочного прогона (точка входа ShardRouter)"""
+    asyncio.run(_run_shard_load_worker(index, shards, inbox, results, options))
+
+
+async def _run_shard_load_worker(index: int, shards: int, inbox, results, options: Dict[str, Any]):
+    os.environ["LOG_LEVEL"] = options["log_level"]
+    logging.basicConfig(level=options["log_level"])
+    logging.getLogger().setLevel(options["log_level"])
+
+    runner = LoadRunner(
+        options["tg_latency"],
+        options["tg_jitter"],
+        use_marzban=options["use_marzban"],
+        seed=options["seed"] + index,
+        marzban_profile=options["marzban_profile"],
+    )
+    await runner.setup()
+    try:
+        if options["warmup_users"]:
+            own = [
+                update for update in warmup_updates(options["warmup_users"])
+                if shard_for_update(update, shards) == index
+            ]
+            await runner.warmup(own)
+
+        latencies: Dict[str, List[float]] = defaultdict(list)
+        errors: Dict[str, int] = defaultdict(int)
+        process = psutil.Process(os.getpid())
+        gc.collect()
+        rss_start = process.memory_info().rss
+        monitor = LoopLagMonitor()
+        monitor.start()
+        api_calls_before = dict(runner.session.calls)
+        marzban_before = runner.marzban.requests if runner.marzban else 0
+        results.put(("ready", index))
+
+        async def process_update(update: Dict[str, Any], scheduled: float):
+            label = handler_label(update)
+            try:
+                await runner.feed(update)
+            except Exception:
+                errors[label] += 1
+            # Время стены общее для процессов на одной машине
+            latencies[label].append(time.time() - scheduled)
+
+        await consume_shard(inbox, process_update)
+        finished = time.time()
+        await monitor.stop()
+        gc.collect()
+
+        results.put(("report", index, {
+            "latencies": dict(latencies),
+            "errors": dict(errors),
+            "finished": finished,
+            "loop_lag": monitor.samples,
+            "rss": (rss_start, process.memory_info().rss),
+            "api_calls": runner.api_calls_since(api_calls_before),
+            "marzban_requests": (runner.marzban.requests - marzban_before) if runner.marzban else 0,
+        }))
+    finally:
+        await runner.teardown()
+
+
+async def run_sharded(trace: List[TraceEvent], workers: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Прогон через ShardRouter: апдейты раскладываются по процессам
+    по пользователю (user_id % workers)
+    """
+    results = multiprocessing.get_context("spawn").Queue()
+    router = ShardRouter(workers, target=_shard_load_worker, target_args=(results, options))
+    router.start()
+    try:
+        for _ in range(workers):
+            await asyncio.to_thread(results.get)
+
+        loop = asyncio.get_running_loop()
+        started_wall = time.time()
+        started = loop.time()
+        for at, update in trace:
+            delay = started + at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await router.route(update, meta=started_wall + at)
+        sent_at = loop.time()
+
+        router.signal_stop()
+        messages = [await asyncio.to_thread(results.get) for _ in range(workers)]
+        shard_reports = [report for _, _, report in sorted(messages, key=lambda message: message[1])]
+    finally:
+        await router.stop()
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    api_calls: Dict[str, int] = defaultdict(int)
+    loop_lag: List[float] = []
+    for shard in shard_reports:
+        for label, values in shard["latencies"].items():
+            latencies[label].extend(values)
+        for label, count in shard["errors"].items():
+            errors[label] += count
+        for method, count in shard["api_calls"].items():
+            api_calls[method] += count
+        loop_lag.extend(shard["loop_lag"])
+
+    report = build_report(
+        trace,
+        latencies,
+        errors,
+        elapsed=max(shard["finished"] for shard in shard_reports) - started_wall,
+        send_lag=sent_at - started - (trace[-1][0] if trace else 0.0),
+        loop_lag=loop_lag,
+        rss=(
+            sum(shard["rss"][0] for shard in shard_reports),
+            sum(shard["rss"][1] for shard in shard_reports),
+        ),
+        api_calls=dict(sorted(api_calls.items())),
+        marzban_requests=sum(shard["marzban_requests"] for shard in shard_reports),
+    )
+    report["workers"] = workers
+    report["per_worker"] = [sum(len(v) for v in shard["latencies"].values()) for shard in shard_reports]
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Текстовый отчет для терминала"""
+    latency = report["latency"]
+    lines = [
+        f"📊 Апдейтов: {report['updates']} (завершено {report['completed']}, ошибок {report['errors']})",
+        f"⏱️ Время: {report['elapsed_s']}s, заявлено {report['offered_rate']}/s, "
+        f"пропускная способность {report['throughput']}/s",
+        f"📈 Задержка: p50 {latency['p50_ms']}ms, p95 {latency['p95_ms']}ms, "
+        f"p99 {latency['p99_ms']}ms, max {latency['max_ms']}ms",
+        f"🔄 Задержка event loop: p99 {report['loop_lag']['p99_ms']}ms, max {report['loop_lag']['max_ms']}ms",
+        f"💾 RSS: {report['rss_mb']['start']} → {report['rss_mb']['end']} MB "
+        f"({report['rss_mb']['growth']:+} MB)",
+        "",
+        f"{'handler':<36}{'count':>8}{'err':>6}{'p50':>10}{'p95':>10}{'p99':>10}",
+    ]
+    for label, stats in report["handlers"].items():
+        lines.append(
+            f"{label:<36}{stats['count']:>8}{stats['errors']:>6}"
+            f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+        )
+    lines.append("")
+    lines.append("📤 Вызовы Bot API: " + ", ".join(f"{m}={c}" for m, c in report["api_calls"].items()))
+    lines.append(f"🌐 Запросов к Marzban: {report['marzban_requests']}")
+    if report.get("workers"):
+        lines.append(f"🔀 Воркеров: {report['workers']}, апдейтов по воркерам: {report['per_worker']}")
+    return "\n".join(lines)
+
+
+async def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """Полный прогон: подготовка, прогрев, нагрузка"""
+    if args.replay:
+        trace = load_trace(args.replay)
+    else:
+        trace = build_trace(args.mix, args.rate, args.duration, args.users, args.seed)
+    if args.save_trace:
+        save_trace(trace, args.save_trace)
+
+    marzban_profile = FaultProfile(
+        latency=LatencyDistribution.parse(args.marzban_latency),
+        error_rate=args.marzban_error_rate,
+    )
+    warmup_users = args.users if args.users and args.mix != "start_storm" and not args.no_warmup else 0
+
+    if args.workers > 1:
+        report = await run_sharded(trace, args.workers, {
+            "tg_latency": args.tg_latency,
+            "tg_jitter": args.tg_jitter,
+            "use_marzban": not args.no_marzban,
+            "seed": args.seed,
+            "marzban_profile": marzban_profile,
+            "warmup_users": warmup_users,
+            "log_level": args.log_level.upper(),
+        })
+        report["mix"] = "replay" if args.replay else args.mix
+        report["seed"] = args.seed
+        return report
+
+    runner = LoadRunner(
+        args.tg_latency,
+        args.tg_jitter,
+        use_marzban=not args.no_marzban,
+        seed=args.seed,
+        marzban_profile=marzban_profile,
+    )
+    await runner.setup()
+    try:
+        if warmup_users:
+            await runner.warmup(warmup_updates(warmup_users))
+        report = await runner.run(trace)
+    finally:
+        await runner.teardown()
+
+    report["mix"] = "replay" if args.replay else args.mix
+    report["seed"] = args.seed
+    return report
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест YoVPN Bot")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed", help="Смесь трафика")
+    parser.add_argument("--rate", type=float, default=100.0, help="Целевая интенсивность, апдейтов/с")
+    parser.add_argument("--duration", type=float, default=10.0, help="Длительность, секунды")
+    parser.add_argument("--users", type=int, default=500, help="Пул существующих пользователей")
+    parser.add_argument("--seed", type=int, default=1, help="Seed генератора трафика")
+    parser.add_argument("--workers", type=int, default=1, help="Процессов-воркеров (шардирование по пользователям)")
+    parser.add_argument("--tg-latency", type=float, default=0.02, help="Задержка Bot API, секунды")
+    parser.add_argument("--tg-jitter", type=float, default=0.01, help="Разброс задержки Bot API, секунды")
+    parser.add_argument("--no-marzban", action="store_true", help="Не поднимать фейковый Marzban")
+    parser.add_argument("--marzban-latency", default="0", help="Задержка Marzban: kind:a:b (см. fake_marzban)")
+    parser.add_argument("--marzban-error-rate", type=float, default=0.0, help="Доля ошибок 500 от Marzban")
+    parser.add_argument("--no-warmup", action="store_true", help="Не регистрировать пул пользователей заранее")
+    parser.add_argument("--save-trace", help="Сохранить расписание в JSONL")
+    parser.add_argument("--replay", help="Воспроизвести расписание из JSONL")
+    parser.add_argument("--json", dest="json_out", help="Записать отчет в JSON")
+    parser.add_argument("--log-level", default="CRITICAL", help="Уровень логирования бота")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    # Логи бота на INFO сами по себе заметно нагружают прогон
+    os.environ["LOG_LEVEL"] = args.log_level.upper()
+    logging.basicConfig(level=args.log_level.upper())
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    report = asyncio.run(run_benchmark(args))
+    print(format_report(report))
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
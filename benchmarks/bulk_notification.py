@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк массовой рассылки NotificationService
+Последовательная отправка против пула с ограниченным параллелизмом
+
+Запуск:
+    python -m benchmarks.bulk_notification --users 5000 --dead 0.1
+
+Fake Telegram отвечает с задержкой --latency; доля --dead получателей
+заблокировала бота или удалила чат. Лимит Telegram здесь не
+моделируется (--rate включает очередь отправки с этим лимитом), чтобы
+было видно, сколько стоит ожидание ответов. Второй прогон пула
+показывает, что мертвые чаты пропускаются без запросов к API.
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aiogram import Bot
+
+from benchmarks.fake_telegram import FakeTelegramSession
+from bot.services.notification_service import NotificationService
+from utils.send_queue import install_send_queue
+
+FAKE_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+
+
+async def run_mode(concurrency: int, runs: int, args: argparse.Namespace) -> Dict[str, float]:
+    session = FakeTelegramSession(latency=args.latency, jitter=args.latency / 2, seed=args.seed)
+    rng = random.Random(args.seed)
+    user_ids = list(range(1, args.users + 1))
+    dead = rng.sample(user_ids, int(args.users * args.dead))
+    session.blocked_chats = set(dead[::2])
+    session.missing_chats = set(dead[1::2])
+
+    bot = Bot(FAKE_TOKEN, session=session)
+    queue = install_send_queue(bot, global_rate=args.rate) if args.rate else None
+    notifications = NotificationService(bot)
+
+    stats: Dict[str, float] = {}
+    for run in range(runs):
+        calls_before = session.calls["sendMessage"]
+        started = time.perf_counter()
+        result = await notifications.send_bulk_notification(user_ids, "Плановые работы", concurrency=concurrency)
+        stats[f"run{run + 1}_s"] = round(time.perf_counter() - started, 2)
+        stats[f"run{run + 1}_calls"] = session.calls["sendMessage"] - calls_before
+        stats["unreachable"] = result.blocked + result.chat_not_found + result.skipped
+
+    if queue is not None:
+        await queue.close()
+    return stats
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    return {
+        "sequential": await run_mode(1, 1, args),
+        f"pool x{args.concurrency}": await run_mode(args.concurrency, 2, args),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк массовой рассылки")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--dead", type=float, default=0.1)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    for mode, stats in results.items():
+        print(f"{mode:<12} " + "  ".join(f"{key}={value}" for key, value in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
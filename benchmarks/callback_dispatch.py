@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк маршрутизации callback запросов
+Перебор фильтров aiogram против таблицы bot.callback_table
+
+Запуск:
+    python -m benchmarks.callback_dispatch --rounds 20 --scale 1 4 16
+
+Фильтры берутся из настоящих обработчиков бота (register_handlers), сами
+обработчики заменяются пустыми, поэтому измеряется только маршрутизация.
+--scale N размножает набор обработчиков в N раз (с другими значениями
+callback data), чтобы показать зависимость от числа обработчиков.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+from benchmarks.bot_load import FAKE_BOT_TOKEN, summarize
+from benchmarks.fake_telegram import FakeTelegramSession
+from bot.callback_table import _parse_filter, install_callback_table
+from bot.handlers import register_handlers
+
+
+def collect_specs() -> List[List[Tuple[str, str]]]:
+    """Фильтры настоящих обработчиков: по списку (kind, value) на роутер"""
+    dp = Dispatcher()
+    register_handlers(dp)
+    specs = []
+
+    def walk(router: Router):
+        specs.append([_parse_filter(handler) for handler in router.callback_query.handlers])
+        for sub_router in router.sub_routers:
+            walk(sub_router)
+
+    walk(dp)
+    return specs
+
+
+def build_dispatcher(specs: List[List[Tuple[str, str]]], scale: int, table: bool) -> Dispatcher:
+    """Диспетчер с теми же фильтрами и пустыми обработчиками"""
+
+    async def noop(callback: CallbackQuery):
+        return None
+
+    dp = Dispatcher()
+    for copy in range(scale):
+        suffix = "" if copy == 0 else f"_x{copy}"
+        for router_specs in specs:
+            router = Router()
+            for kind, value in router_specs:
+                if kind == "exact":
+                    router.callback_query.register(noop, F.data == value + suffix)
+                else:
+                    router.callback_query.register(noop, F.data.startswith(f"x{copy}_" * bool(copy) + value))
+            dp.include_router(router)
+    if table:
+        install_callback_table(dp)
+    return dp
+
+
+def sample_data(specs: List[List[Tuple[str, str]]], scale: int) -> List[str]:
+    """Callback data, попадающие во все обработчики, плюс промах"""
+    data = []
+    for copy in range(scale):
+        for router_specs in specs:
+            for kind, value in router_specs:
+                if kind == "exact":
+                    data.append(value + ("" if copy == 0 else f"_x{copy}"))
+                else:
+                    data.append(f"x{copy}_" * bool(copy) + value + "12345")
+    data.append("no_such_callback")
+    return data
+
+
+def make_update(update_id: int, data: str) -> Update:
+    user = User(id=1000 + update_id, is_bot=False, first_name="Bench")
+    message = Message(message_id=1, date=0, chat=Chat(id=user.id, type="private"), text="menu")
+    callback = CallbackQuery(id=str(update_id), from_user=user, chat_instance="bench", message=message, data=data)
+    return Update(update_id=update_id, callback_query=callback)
+
+
+async def time_dispatch(dp: Dispatcher, bot: Bot, updates: List[Update], rounds: int) -> List[float]:
+    """Время dp.feed_update на один апдейт"""
+    timings = []
+    for _ in range(rounds):
+        for update in updates:
+            started = time.perf_counter()
+            await dp.feed_update(bot, update)
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+async def run(args: argparse.Namespace) -> Dict[int, Dict[str, Dict[str, float]]]:
+    specs = collect_specs()
+    bot = Bot(token=FAKE_BOT_TOKEN, session=FakeTelegramSession())
+    results = {}
+    try:
+        for scale in args.scale:
+            updates = [make_update(number, data) for number, data in enumerate(sample_data(specs, scale))]
+            results[scale] = {
+                "linear": summarize(await time_dispatch(build_dispatcher(specs, scale, False), bot, updates, args.rounds)),
+                "table": summarize(await time_dispatch(build_dispatcher(specs, scale, True), bot, updates, args.rounds)),
+            }
+            results[scale]["handlers"] = sum(len(router_specs) for router_specs in specs) * scale
+    finally:
+        await bot.session.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк маршрутизации callback запросов")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    print(f"{'handlers':>9}{'mode':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for scale, modes in results.items():
+        for mode in ("linear", "table"):
+            stats = modes[mode]
+            print(f"{modes['handlers']:>9}{mode:>8}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+        speedup = modes["linear"]["p50_ms"] / max(modes["table"]["p50_ms"], 1e-9)
+        print(f"{'':>9}{'x':>8}{round(speedup, 2):>10}")
+
+
+if __name__ == "__main__":
+    main()
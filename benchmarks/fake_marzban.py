@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Fake Marzban Server
+Локальная замена панели Marzban на aiohttp с состоянием в памяти
+и управляемыми задержками и сбоями
+
+Запуск отдельно (например, для ручной проверки бота или API):
+    python -m benchmarks.fake_marzban --port 8800 --latency lognormal:0.05:0.5 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import base64
+import math
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from aiohttp import web
+
+DEFAULT_TOKEN = "fake-marzban-token"
+
+# Префиксы, под которыми публикуются эндпоинты API: клиенты в проекте
+# настраиваются то с /api в MARZBAN_API_URL, то без него
+API_PREFIXES = ("/api", "")
+
+
+@dataclass(frozen=True)
+class LatencyDistribution:
+    """
+    Распределение задержки ответа (секунды)
+
+    kind:
+    - fixed: всегда a
+    - uniform: равномерно в [a, b]
+    - normal: нормальное со средним a и отклонением b (отрицательные обрезаются)
+    - lognormal: медиана a, параметр формы b (тяжелый хвост, как у реальных сетей)
+    - exponential: среднее a
+    """
+    kind: str = "fixed"
+    a: float = 0.0
+    b: float = 0.0
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+    def __post_init__(self):
+        if self.kind not in self.KINDS:
+            raise ValueError(f"Неизвестное распределение задержки: {self.kind}")
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyDistribution":
+        """
+        Разобрать строку вида "kind:a:b" ("0.05" означает fixed:0.05)
+        """
+        parts = spec.split(":")
+        if len(parts) == 1:
+            return cls("fixed", float(parts[0]))
+        return cls(parts[0], *(float(value) for value in parts[1:3]))
+
+    def sample(self, rng: random.Random) -> float:
+        """Случайная задержка из распределения"""
+        if self.kind == "fixed":
+            return self.a
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b)
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(self.a, self.b))
+        if self.kind == "lognormal":
+            return rng.lognormvariate(math.log(self.a), self.b) if self.a > 0 else 0.0
+        return rng.expovariate(1 / self.a) if self.a > 0 else 0.0
+
+
+@dataclass
+class FaultProfile:
+    """
+    Профиль задержек и сбоев для эндпоинта
+
+    Все случайные решения принимаются генератором сервера с заданным seed,
+    а пачки ошибок привязаны к номеру запроса, поэтому прогоны повторяемы.
+    """
+    latency: LatencyDistribution = field(default_factory=LatencyDistribution)
+    # Доля запросов, завершающихся error_status
+    error_rate: float = 0.0
+    error_status: int = 500
+    # В каждом окне из burst_every запросов последние burst_length получают burst_status
+    burst_every: int = 0
+    burst_length: int = 0
+    burst_status: int = 429
+    # Значение заголовка Retry-After для 429/503
+    retry_after: Optional[int] = 1
+    # Медленное тело: ответ отдается кусками по slow_body_chunk байт
+    # с паузой slow_body_delay между ними
+    slow_body_chunk: int = 0
+    slow_body_delay: float = 0.0
+
+
+class FakeMarzbanServer:
+    """
+    Реализация API Marzban для бенчмарков и тестов устойчивости
+
+    Отвечает за:
+    - Эндпоинты, которыми пользуются клиенты в проекте: /api/user,
+      /api/user/{name}, /api/users, /api/system, /sub/{name}
+    - Хранение пользователей в памяти
+    - Внедрение задержек, случайных ошибок, пачек 429/5xx и медленных тел
+      (глобально или для отдельного эндпоинта)
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        token: Optional[str] = DEFAULT_TOKEN,
+        profile: Optional[FaultProfile] = None,
+        seed: int = 0
+    ):
+        """
+        Args:
+            host: Адрес для прослушивания
+            port: Порт (0 - выбрать свободный)
+            token: Ожидаемый Bearer токен (None - без проверки)
+            profile: Профиль сбоев по умолчанию
+            seed: Seed генератора задержек и ошибок
+        """
+        self.host = host
+        self.port = port
+        self.token = token
+        self.profile = profile or FaultProfile()
+        self.route_profiles: Dict[str, FaultProfile] = {}
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.requests = 0
+        self.faults = 0
+        self._route_requests: Dict[str, int] = {}
+        self._forced: list = []
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+        self.app = self._build_app()
+
+    def _build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._fault_middleware])
+        for prefix in API_PREFIXES:
+            # Имя маршрута "<эндпоинт>:<префикс>" - профили сбоев задаются по эндпоинту
+            suffix = prefix.strip("/") or "root"
+            app.router.add_get(f"{prefix}/system", self.handle_system, name=f"system:{suffix}")
+            app.router.add_post(f"{prefix}/user", self.handle_create_user, name=f"create_user:{suffix}")
+            app.router.add_get(f"{prefix}/user/{{name}}", self.handle_get_user, name=f"get_user:{suffix}")
+            app.router.add_put(f"{prefix}/user/{{name}}", self.handle_update_user, name=f"update_user:{suffix}")
+            app.router.add_delete(f"{prefix}/user/{{name}}", self.handle_delete_user, name=f"delete_user:{suffix}")
+            app.router.add_get(f"{prefix}/users", self.handle_list_users, name=f"list_users:{suffix}")
+        app.router.add_get("/sub/{name}", self.handle_subscription, name="subscription")
+        return app
+
+    # ----- Управление сбоями -----
+
+    def set_profile(self, route: Optional[str], profile: FaultProfile):
+        """
+        Задать профиль сбоев
+
+        Args:
+            route: Эндпоинт (system, create_user, get_user, update_user,
+                delete_user, list_users, subscription) или None для всех
+            profile: Профиль
+        """
+        if route is None:
+            self.profile = profile
+        else:
+            self.route_profiles[route] = profile
+
+    def fail_next(self, count: int, status: int = 503, retry_after: Optional[int] = 1):
+        """Следующие count запросов завершатся status"""
+        self._forced.extend([(status, retry_after)] * count)
+
+    def reset_faults(self):
+        """Убрать все профили и принудительные ошибки"""
+        self.profile = FaultProfile()
+        self.route_profiles.clear()
+        self._forced.clear()
+
+    def _pick_fault(self, route: str, profile: FaultProfile) -> Optional[Tuple[int, Optional[int]]]:
+        """Решить, завершится ли запрос ошибкой"""
+        if self._forced:
+            return self._forced.pop(0)
+
+        number = self._route_requests.get(route, 0)
+        self._route_requests[route] = number + 1
+        if profile.burst_every and profile.burst_length:
+            if number % profile.burst_every >= profile.burst_every - profile.burst_length:
+                return profile.burst_status, profile.retry_after
+
+        if profile.error_rate and self._random.random() < profile.error_rate:
+            return profile.error_status, profile.retry_after
+        return None
+
+    @web.middleware
+    async def _fault_middleware(self, request: web.Request, handler):
+        self.requests += 1
+        name = request.match_info.route.name or ""
+        route = name.split(":", 1)[0]
+        profile = self.route_profiles.get(route, self.profile)
+
+        delay = profile.latency.sample(self._random)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        fault = self._pick_fault(route, profile)
+        if fault is not None:
+            self.faults += 1
+            status, retry_after = fault
+            headers = {"Retry-After": str(retry_after)} if retry_after and status in (429, 503) else None
+            return web.json_response({"detail": f"Injected fault {status}"}, status=status, headers=headers)
+
+        if self.token and route != "subscription":
+            if request.headers.get("Authorization") != f"Bearer {self.token}":
+                return web.json_response({"detail": "Not authenticated"}, status=401)
+
+        response = await handler(request)
+        if profile.slow_body_chunk > 0 and isinstance(response, web.Response) and response.body:
+            return await self._send_slowly(request, response, profile)
+        return response
+
+    async def _send_slowly(self, request: web.Request, response: web.Response, profile: FaultProfile):
+        """Отдать тело ответа кусками с паузами"""
+        body = response.body
+        stream = web.StreamResponse(status=response.status, headers={"Content-Type": response.content_type})
+        stream.content_length = len(body)
+        await stream.prepare(request)
+        for offset in range(0, len(body), profile.slow_body_chunk):
+            await stream.write(body[offset:offset + profile.slow_body_chunk])
+            await asyncio.sleep(profile.slow_body_delay)
+        await stream.write_eof()
+        return stream
+
+    # ----- Жизненный цикл -----
+
+    async def start(self) -> str:
+        """Запустить сервер и вернуть базовый URL"""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.url
+
+    async def stop(self):
+        """Остановить сервер"""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def __aenter__(self) -> "FakeMarzbanServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    # ----- Эндпоинты -----
+
+    def _user_view(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        links = [
+            f"vless://{settings['id']}@{self.host}:443?security=reality&type=tcp#{user['username']}"
+            for protocol, settings in user["proxies"].items()
+            if protocol == "vless" and settings.get("id")
+        ]
+        return {**user, "links": links, "subscription_url": f"/sub/{user['username']}"}
+
+    async def handle_system(self, request: web.Request) -> web.Response:
+        active = sum(1 for user in self.users.values() if user["status"] == "active")
+        return web.json_response({
+            "version": "0.4.9-fake",
+            "mem_total": 8 * 1024**3,
+            "mem_used": 2 * 1024**3,
+            "cpu_cores": 4,
+            "cpu_usage": 12.5,
+            "total_user": len(self.users),
+            "users_active": active,
+            "incoming_bandwidth": 0,
+            "outgoing_bandwidth": 0,
+        })
+
+    async def handle_create_user(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        username = payload.get("username")
+        if not username:
+            return web.json_response({"detail": "username is required"}, status=422)
+        if username in self.users:
+            return web.json_response({"detail": "User already exists"}, status=409)
+
+        proxies = payload.get("proxies") or {"vless": {}}
+        for settings in proxies.values():
+            settings.setdefault("id", str(uuid.uuid4()))
+
+        self.users[username] = {
+            "username": username,
+            "proxies": proxies,
+            "inbounds": payload.get("inbounds", {}),
+            "expire": payload.get("expire"),
+            "data_limit": payload.get("data_limit", 0),
+            "data_limit_reset_strategy": payload.get("data_limit_reset_strategy", "no_reset"),
+            "status": payload.get("status", "active"),
+            "note": payload.get("note", ""),
+            "used_traffic": 0,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        return web.json_response(self._user_view(self.users[username]))
+
+    async def handle_get_user(self, request: web.Request) -> web.Response:
+        user = self.users.get(request.match_info["name"])
+        if user is None:
+            return web.json_response({"detail": "User not found"}, status=404)
+        return web.json_response(self._user_view(user))
+
+    async def handle_update_user(self, request: web.Request) -> web.Response:
+        user = self.users.get(request.match_info["name"])
+        if user is None:
+            return web.json_response({"detail": "User not found"}, status=404)
+        updates = await request.json()
+        user.update({key: value for key, value in updates.items() if key != "username"})
+        return web.json_response(self._user_view(user))
+
+    async def handle_delete_user(self, request: web.Request) -> web.Response:
+        if self.users.pop(request.match_info["name"], None) is None:
+            return web.json_response({"detail": "User not found"}, status=404)
+        return web.json_response({"detail": "User successfully deleted"})
+
+    async def handle_list_users(self, request: web.Request) -> web.Response:
+        offset = int(request.query.get("offset", 0))
+        limit = request.query.get("limit")
+        users = list(self.users.values())
+        page = users[offset:offset + int(limit)] if limit else users[offset:]
+        return web.json_response({
+            "users": [self._user_view(user) for user in page],
+            "total": len(users),
+        })
+
+    async def handle_subscription(self, request: web.Request) -> web.Response:
+        user = self.users.get(request.match_info["name"])
+        if user is None:
+            return web.json_response({"detail": "User not found"}, status=404)
+
+        links = "\n".join(self._user_view(user)["links"])
+        userinfo = (
+            f"upload=0; download={user['used_traffic']}; "
+            f"total={user['data_limit'] or 0}; expire={user['expire'] or 0}"
+        )
+        return web.Response(
+            body=base64.b64encode(links.encode()),
+            content_type="text/plain",
+            headers={"subscription-userinfo": userinfo},
+        )
+
+
+async def _serve(args: argparse.Namespace):
+    profile = FaultProfile(
+        latency=LatencyDistribution.parse(args.latency),
+        error_rate=args.error_rate,
+        burst_every=args.burst_every,
+        burst_length=args.burst_length,
+        burst_status=args.burst_status,
+        slow_body_chunk=args.slow_body_chunk,
+        slow_body_delay=args.slow_body_delay,
+    )
+    server = FakeMarzbanServer(args.host, args.port, token=args.token or None, profile=profile, seed=args.seed)
+    url = await server.start()
+    print(f"🚀 Fake Marzban: {url} (токен: {args.token or 'не требуется'})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный Marzban для тестов")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--token", default=DEFAULT_TOKEN, help="Bearer токен (пустая строка - без проверки)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", default="0", help="Задержка: kind:a:b, например lognormal:0.05:0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--burst-every", type=int, default=0)
+    parser.add_argument("--burst-length", type=int, default=0)
+    parser.add_argument("--burst-status", type=int, default=429)
+    parser.add_argument("--slow-body-chunk", type=int, default=0)
+    parser.add_argument("--slow-body-delay", type=float, default=0.0)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
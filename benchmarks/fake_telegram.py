@@ -0,0 +1,186 @@
+"""
+Fake Telegram Session
+Сессия aiogram, которая не ходит в сеть, а записывает исходящие вызовы Bot API
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter, defaultdict, deque
+from typing import Any, AsyncGenerator, Dict, List, Mapping, Optional, Set, Tuple
+
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import Message, User
+
+BOT_USER = {"id": 7000000001, "is_bot": True, "first_name": "YoVPN", "username": "YoVPNBot"}
+
+
+class FakeTelegramSession(BaseSession):
+    """
+    Сессия Bot API для бенчмарков и тестов
+
+    Каждый вызов записывается, ждет заданную задержку и возвращает
+    правдоподобный ответ, который проходит через обычную десериализацию
+    aiogram (check_response), поэтому стоимость разбора ответа учитывается.
+    С global_limit/chat_limit сессия, как Telegram, отвечает 429 на
+    сообщения сверх лимита за последнюю секунду. Чаты из blocked_chats
+    отвечают 403 (бот заблокирован), из missing_chats - 400 (чат не найден).
+    Пользователи из non_members не подписаны на каналы (getChatMember - left).
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: Optional[int] = None,
+        global_limit: Optional[int] = None,
+        chat_limit: Optional[int] = None,
+    ):
+        """
+        Args:
+            latency: Базовая задержка ответа Bot API (секунды)
+            jitter: Случайная добавка к задержке (0..jitter секунд)
+            seed: Seed генератора задержек
+            global_limit: Сообщений в секунду на бота до 429 (None - без лимита)
+            chat_limit: Сообщений в секунду в один чат до 429 (None - без лимита)
+        """
+        super().__init__()
+        self.latency = latency
+        self.jitter = jitter
+        self.calls: Counter = Counter()
+        self.uploads: Counter = Counter()
+        self.log: List[Tuple[float, str, Dict[str, Any]]] = []
+        self.record_payloads = False
+        self._random = random.Random(seed)
+        self._message_ids = itertools.count(1_000_000)
+        self._file_ids = itertools.count(1)
+        self.global_limit = global_limit
+        self.chat_limit = chat_limit
+        self.flood_errors = 0
+        self.blocked_chats: Set[Any] = set()
+        self.missing_chats: Set[Any] = set()
+        self.non_members: Set[Any] = set()
+        self._sent: deque = deque()
+        self._sent_to_chat: Dict[Any, deque] = defaultdict(deque)
+
+    async def make_request(self, bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        api_method = method.__api_method__
+        self.calls[api_method] += 1
+        if self.record_payloads:
+            self.log.append((time.monotonic(), api_method, method.model_dump(exclude_none=True)))
+
+        if self._flooded(method):
+            self.flood_errors += 1
+            content = json.dumps({
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1},
+            })
+            self.check_response(bot=bot, method=method, status_code=429, content=content)
+
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id in self.blocked_chats:
+            error = {"ok": False, "error_code": 403, "description": "Forbidden: bot was blocked by the user"}
+            self.check_response(bot=bot, method=method, status_code=403, content=json.dumps(error))
+        if chat_id in self.missing_chats:
+            error = {"ok": False, "error_code": 400, "description": "Bad Request: chat not found"}
+            self.check_response(bot=bot, method=method, status_code=400, content=json.dumps(error))
+
+        content = json.dumps({"ok": True, "result": self._build_result(method)}, default=str)
+        response = self.check_response(bot=bot, method=method, status_code=200, content=content)
+        return response.result
+
+    def _flooded(self, method: TelegramMethod) -> bool:
+        """Превышен ли лимит сообщений за последнюю секунду"""
+        chat_id = getattr(method, "chat_id", None)
+        api_method = method.__api_method__
+        if chat_id is None or not api_method.startswith(("send", "edit")) or api_method == "sendChatAction":
+            return False
+
+        now = time.monotonic()
+        chat_sent = self._sent_to_chat[chat_id]
+        for sent in (self._sent, chat_sent):
+            while sent and sent[0] <= now - 1:
+                sent.popleft()
+        if (self.global_limit is not None and len(self._sent) >= self.global_limit) or (
+            self.chat_limit is not None and len(chat_sent) >= self.chat_limit
+        ):
+            return True
+        self._sent.append(now)
+        chat_sent.append(now)
+        return False
+
+    def _build_result(self, method: TelegramMethod) -> Any:
+        """Ответ по типу, который возвращает метод"""
+        returning = method.__returning__
+        variants = getattr(returning, "__args__", (returning,))
+
+        if Message in variants:
+            chat_id = getattr(method, "chat_id", None) or 0
+            message_id = getattr(method, "message_id", None) or next(self._message_ids)
+            message = {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "from": BOT_USER,
+                "text": getattr(method, "text", None) or getattr(method, "caption", None) or "",
+            }
+            for kind in ("photo", "document", "sticker"):
+                media = getattr(method, kind, None)
+                if media is not None:
+                    message[kind] = self._build_media(kind, media)
+            return message
+        if returning is User:
+            return BOT_USER
+        if any(getattr(variant, "__name__", "").startswith("ChatMember") for variant in variants):
+            user_id = getattr(method, "user_id", 0)
+            status = "left" if user_id in self.non_members else "member"
+            return {"status": status, "user": {"id": user_id, "is_bot": False, "first_name": "User"}}
+        if getattr(returning, "__origin__", None) is list:
+            return []
+        return True
+
+    def _build_media(self, kind: str, media: Any) -> Any:
+        """Вложение ответа: file_id переданный или новый, если файл загружается"""
+        if isinstance(media, str):
+            file_id = media
+        else:
+            self.uploads[kind] += 1
+            file_id = f"fake-{kind}-{next(self._file_ids)}"
+        info = {"file_id": file_id, "file_unique_id": file_id[-16:]}
+        if kind == "photo":
+            return [{**info, "width": 512, "height": 512}]
+        if kind == "sticker":
+            return {**info, "type": "regular", "width": 512, "height": 512, "is_animated": False, "is_video": False}
+        return info
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: Optional[Dict[str, Any]] = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        if False:
+            yield b""
+
+    async def close(self) -> None:
+        pass
+
+    def reset(self):
+        """Сбросить записанные вызовы"""
+        self.calls.clear()
+        self.uploads.clear()
+        self.log.clear()
+        self.flood_errors = 0
+        self._sent.clear()
+        self._sent_to_chat.clear()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк FSM хранилища
+Добавленная задержка на апдейт: RedisFSMStorage против MemoryStorage
+
+Запуск (нужен локальный Redis):
+    python -m benchmarks.fsm_storage --redis-url redis://localhost:6379/15 --users 1000 --updates 20000
+
+Один апдейт повторяет то, что делает aiogram: FSMContextMiddleware читает
+состояние, обработчик читает данные, каждый пятый апдейт меняет состояние.
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aiogram.fsm.storage.base import BaseStorage, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from benchmarks.bot_load import summarize
+from utils.fsm_storage import RedisFSMStorage
+
+# Бюджет добавленной задержки на апдейт (секунды)
+BUDGET = 0.001
+
+
+async def simulate(storage: BaseStorage, users: int, updates: int, seed: int) -> List[float]:
+    """Задержки операций хранилища на каждый апдейт"""
+    rng = random.Random(seed)
+    timings = []
+    for number in range(updates):
+        user_id = rng.randrange(users)
+        key = StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+        started = time.perf_counter()
+        await storage.get_state(key)
+        await storage.get_data(key)
+        if number % 5 == 0:
+            await storage.set_state(key, f"Flow:step_{number % 3}")
+            await storage.update_data(key, {"amount": number})
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    results = {"memory": summarize(await simulate(MemoryStorage(), args.users, args.updates, args.seed))}
+
+    for name, local_ttl in (("redis", 0.0), ("redis+local", 5.0)):
+        storage = RedisFSMStorage.from_url(args.redis_url, prefix="fsm-bench", local_ttl=local_ttl)
+        try:
+            await storage.redis.ping()
+            results[name] = summarize(await simulate(storage, args.users, args.updates, args.seed))
+        finally:
+            keys = [key async for key in storage.redis.scan_iter("fsm-bench:*")]
+            if keys:
+                await storage.redis.delete(*keys)
+            await storage.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк FSM хранилища")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        results = asyncio.run(run(args))
+    except (OSError, RedisConnectionError) as e:
+        print(f"❌ Redis недоступен ({args.redis_url}): {e}")
+        sys.exit(1)
+
+    baseline = results["memory"]["p50_ms"]
+    print(f"{'storage':<14}{'p50':>10}{'p95':>10}{'p99':>10}{'+p50':>10}")
+    for name, stats in results.items():
+        print(
+            f"{name:<14}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+            f"{round(stats['p50_ms'] - baseline, 3):>10}"
+        )
+    added = results["redis+local"]["p50_ms"] - baseline
+    verdict = "✅" if added < BUDGET * 1000 else "⚠️"
+    print(f"{verdict} Добавленная задержка (p50): {added:.3f} мс, бюджет {BUDGET * 1000:.0f} мс")
+
+
+if __name__ == "__main__":
+    main()
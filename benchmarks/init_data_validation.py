@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк эндпоинта /api/validate WebApp API
+Прежняя проверка initData против InitDataValidator
+
+Запуск:
+    python -m benchmarks.init_data_validation --requests 5000 --users 200
+
+Запросы идут в настоящее FastAPI приложение через ASGI-транспорт httpx,
+без сети. "Было" повторяет проверку в том виде, в каком она была до
+app.utils.telegram.InitDataValidator: секрет HMAC на каждый вызов и вторая
+проверка той же строки ради user_id. Mini App шлет одну и ту же initData
+весь сеанс, поэтому строки повторяются: --users сеансов на --requests запросов.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import parse_qsl
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.webapp_api import FAKE_TOKEN, make_init_data
+from app.models.schemas import TelegramInitData, ValidationResponse
+from app.routes import api
+
+
+def legacy_validate(init_data: str):
+    """Проверка до InitDataValidator"""
+    try:
+        parsed_data = dict(parse_qsl(init_data))
+        received_hash = parsed_data.pop("hash", None)
+        if not received_hash:
+            return False, None
+        data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(parsed_data.items()))
+        secret_key = hmac.new("WebAppData".encode(), FAKE_TOKEN.encode(), hashlib.sha256).digest()
+        calculated_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+        if hmac.compare_digest(calculated_hash, received_hash):
+            return True, parsed_data
+        return False, None
+    except Exception:
+        return False, None
+
+
+def legacy_extract_user_id(init_data: str):
+    is_valid, parsed_data = legacy_validate(init_data)
+    if not is_valid or not parsed_data:
+        return None
+    try:
+        return json.loads(parsed_data.get("user", "{}")).get("id")
+    except Exception:
+        return None
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(api.router, prefix="/api")
+
+    @app.post("/legacy/validate", response_model=ValidationResponse)
+    async def legacy_validate_init_data(data: TelegramInitData):
+        is_valid, _ = legacy_validate(data.init_data)
+        if is_valid:
+            return ValidationResponse(valid=True, user_id=legacy_extract_user_id(data.init_data))
+        return ValidationResponse(valid=False)
+
+    return app
+
+
+async def run_mode(app: FastAPI, path: str, payloads: List[str]) -> Dict[str, float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+        started = time.perf_counter()
+        for init_data in payloads:
+            response = await client.post(path, json={"init_data": init_data})
+            assert response.json()["valid"], response.text
+        elapsed = time.perf_counter() - started
+    return {"rps": round(len(payloads) / elapsed), "per_request_us": round(elapsed / len(payloads) * 1e6, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк /api/validate")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=200, help="Сколько разных initData (сеансов Mini App)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sessions = [make_init_data(100000 + i) for i in range(args.users)]
+    payloads = [rng.choice(sessions) for _ in range(args.requests)]
+
+    app = build_app()
+    for mode, path in (("legacy", "/legacy/validate"), ("validator", "/api/validate")):
+        stats = asyncio.run(run_mode(app, path, payloads))
+        print(f"{mode:<10} " + "  ".join(f"{key}={value}" for key, value in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
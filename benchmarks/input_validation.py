@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарк проверки пользовательского ввода
+Последовательный перебор регулярных выражений против PatternScanner
+
+Запуск:
+    python -m benchmarks.input_validation --number 2000
+
+Нагрузка - типичные обращения в поддержку (русский текст, иногда ссылки),
+юзернеймы и короткие ответы. Базовые функции повторяют проверки в том
+виде, в каком они были до перехода на utils.pattern_scanner.
+"""
+
+import argparse
+import logging
+import random
+import re
+import sys
+import timeit
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bot.services.security_service import SecurityService as BotSecurityService
+from src.config.monitoring import SecurityConfig
+from src.services.security_service import _PATH_TRAVERSAL_PATTERNS, _SQL_PATTERNS, _XSS_PATTERNS, SecurityService
+
+SUPPORT_MESSAGES = [
+    "Здравствуйте! Оплатил подписку вчера, но баланс не пополнился. Что делать?",
+    "Не работает VPN на айфоне, пишет ошибку подключения. Переустанавливал приложение, не помогло.",
+    "Подскажите, как подключить второе устройство? У меня ноутбук и телефон.",
+    "Добрый день. Скорость очень низкая вечером, около 2 мбит. Сервер Нидерланды.",
+    "Пополнил на 100 рублей через СБП, деньги списались, в боте 0. Номер операции 1234567890",
+    "Ссылка на подписку не открывается в v2rayNG: https://sub.example.com/sub/user_42",
+    "Друг пришел по моей ссылке t.me/YoVPNBot?start=ref_42, а бонус не начислился",
+    "Можно ли вернуть деньги за неиспользованные дни? Уезжаю на месяц.",
+    "Пишите мне на почту ivan@example.ru или в телеграм @ivan_support, удобнее там",
+    "спасибо, все заработало!",
+]
+
+SHORT_INPUTS = [
+    "ivan_petrov", "maria2024", "vpn_user_777", "alex", "Сергей", "100", "500",
+    "да", "нет", "/start", "/help", "menu", "settings",
+]
+
+ATTACKS = [
+    "'; DROP TABLE users; --",
+    "<script>alert(1)</script>",
+    "../../etc/passwd",
+    "1 UNION SELECT password FROM users",
+]
+
+
+def build_payloads(count: int, seed: int) -> List[str]:
+    """Смесь: 45% обращений, 50% коротких строк, 5% атак"""
+    rng = random.Random(seed)
+    payloads = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.45:
+            payloads.append(rng.choice(SUPPORT_MESSAGES))
+        elif roll < 0.95:
+            payloads.append(rng.choice(SHORT_INPUTS))
+        else:
+            payloads.append(rng.choice(ATTACKS))
+    return payloads
+
+
+def legacy_dangerous(patterns: List[str]) -> Callable[[str], list]:
+    def check(text: str) -> list:
+        return [pattern for pattern in patterns if re.search(pattern, text, re.IGNORECASE | re.DOTALL)]
+    return check
+
+
+def legacy_validate_input(commands: List[str]) -> Callable[[str], bool]:
+    def check(text: str) -> bool:
+        for pattern in _SQL_PATTERNS + _XSS_PATTERNS + _PATH_TRAVERSAL_PATTERNS:
+            if re.search(pattern, text, re.IGNORECASE):
+                return False
+        for cmd in commands:
+            if cmd in text.lower():
+                return False
+        return True
+    return check
+
+
+def legacy_spam(text: str) -> bool:
+    spam_patterns = [
+        'http://', 'https://', 'www.', '.com', '.ru', '.net',
+        'telegram.me', 't.me', '@', 'bit.ly'
+    ]
+    return sum(1 for pattern in spam_patterns if pattern.lower() in text.lower()) >= 3
+
+
+def measure(check: Callable[[str], object], payloads: List[str], number: int) -> float:
+    """Среднее время одной проверки (микросекунды)"""
+    def run():
+        for payload in payloads:
+            check(payload)
+    seconds = min(timeit.repeat(run, number=number, repeat=3))
+    return seconds / (number * len(payloads)) * 1e6
+
+
+def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    payloads = build_payloads(args.payloads, args.seed)
+    config = SecurityConfig(
+        secret_key="bench", jwt_secret="bench", encryption_key="bench",
+        allowed_origins=[], allowed_methods=[], allowed_headers=[], csrf_secret="bench"
+    )
+    security = SecurityService(secret_key="bench")
+    bot_security = BotSecurityService()
+
+    cases = {
+        "dangerous_patterns": (legacy_dangerous(config.dangerous_patterns), config.dangerous_scanner.scan),
+        "validate_input": (legacy_validate_input(security.dangerous_commands), security.validate_input),
+        "validate_user_input": (legacy_spam, bot_security.validate_user_input),
+    }
+    results = {}
+    for name, (legacy, current) in cases.items():
+        results[name] = {
+            "legacy_us": round(measure(legacy, payloads, args.number), 3),
+            "scanner_us": round(measure(current, payloads, args.number), 3),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарк проверки пользовательского ввода")
+    parser.add_argument("--payloads", type=int, default=500)
+    parser.add_argument("--number", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # validate_input логирует каждую атаку
+    logging.disable(logging.WARNING)
+
+    print(f"{'check':<22}{'legacy, us':>12}{'scanner, us':>13}{'x':>7}")
+    for name, stats in run(args).items():
+        speedup = stats["legacy_us"] / max(stats["scanner_us"], 1e-9)
+        print(f"{name:<22}{stats['legacy_us']:>12}{stats['scanner_us']:>13}{round(speedup, 2):>7}")
+
+
+if __name__ == "__main__":
+    main()
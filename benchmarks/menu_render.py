@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк процессорной цены клика по меню
+Сборка клавиатуры на каждый клик против готовых клавиатур
+
+Запуск:
+    python -m benchmarks.menu_render --clicks 20000
+
+Клик - это то, что обработчик меню делает без сети: текст, клавиатура,
+EditMessageText и тело запроса к Telegram (build_form_data). "Было" строит
+клавиатуру исходным построителем и сериализует ее обычной сессией aiohttp,
+"стало" берет запомненную клавиатуру и ее готовый JSON.
+"""
+
+import argparse
+import functools
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.enums import ParseMode
+from aiogram.methods import EditMessageText
+
+from bot.keyboards.menu_kb import MenuKeyboards
+from bot.services.ui_service import UIService
+from bot.utils.texts import get_main_menu_text, get_settings_text, get_subscriptions_text, get_support_text, get_topup_text
+from utils.frozen_markup import PreparedMarkupSession
+
+FAKE_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+
+ui = UIService()
+
+
+def screen(text: Callable[[], str], builder: Callable, *args) -> Tuple[Callable[[], str], Callable, Callable, tuple]:
+    """Экран меню: текст, запоминающий построитель, исходный построитель, аргументы"""
+    original = builder.__wrapped__
+    if hasattr(builder, "__self__"):
+        original = functools.partial(original, builder.__self__)
+    return text, builder, original, args
+
+
+# Экраны, которые открываются кнопками меню
+SCREENS = [
+    screen(lambda: get_main_menu_text("Иван", 42.0, 10, True), MenuKeyboards.get_main_menu),
+    screen(lambda: get_subscriptions_text(True, 10), MenuKeyboards.get_subscription_menu, True),
+    screen(get_settings_text, MenuKeyboards.get_settings_menu),
+    screen(get_support_text, MenuKeyboards.get_support_menu),
+    screen(get_topup_text, MenuKeyboards.get_payment_amounts),
+    screen(get_topup_text, ui.create_payment_keyboard, (40, 80, 120, 200, 400)),
+    screen(get_settings_text, ui.create_back_keyboard, "settings"),
+]
+
+
+def run_mode(frozen: bool, clicks: int, seed: int) -> Dict[str, float]:
+    session = PreparedMarkupSession() if frozen else AiohttpSession()
+    bot = Bot(FAKE_TOKEN, session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    rng = random.Random(seed)
+    screens = [rng.choice(SCREENS) for _ in range(clicks)]
+
+    started = time.process_time()
+    for text, builder, original, args in screens:
+        keyboard = builder(*args) if frozen else original(*args)
+        method = EditMessageText(chat_id=1, message_id=1, text=text(), reply_markup=keyboard)
+        session.build_form_data(bot, method)
+    elapsed = time.process_time() - started
+
+    return {"cpu_s": round(elapsed, 3), "per_click_us": round(elapsed / clicks * 1e6, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк клика по меню")
+    parser.add_argument("--clicks", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    for mode, frozen in (("rebuild", False), ("frozen", True)):
+        stats = run_mode(frozen, args.clicks, args.seed)
+        print(f"{mode:<8} " + "  ".join(f"{key}={value}" for key, value in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
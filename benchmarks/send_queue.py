@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк очереди исходящих сообщений
+Рассылка, уведомления и ответы пользователям одновременно
+
+Запуск:
+    python -m benchmarks.send_queue --broadcast 200 --notifications 100 --replies 40
+
+Fake Telegram отвечает 429 сверх 30 сообщений в секунду на бота и
+сверх 3 в секунду в один чат. Без очереди отправители не знают друг о
+друге: рассылка идет с паузой 0.05 с, уведомления пачкой, и 429
+достаются всем. С очередью те же отправители идут через SendQueue.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from aiogram import Bot
+
+from benchmarks.bot_load import summarize
+from benchmarks.fake_telegram import FakeTelegramSession
+from utils.send_queue import Lane, install_send_queue, send_lane
+
+FAKE_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+
+
+async def run_mode(queued: bool, args: argparse.Namespace) -> Dict[str, float]:
+    session = FakeTelegramSession(latency=0.02, global_limit=30, chat_limit=3)
+    bot = Bot(FAKE_TOKEN, session=session)
+    queue = install_send_queue(bot) if queued else None
+    failures = {"count": 0}
+    reply_timings: List[float] = []
+
+    async def send(chat_id: int, text: str) -> bool:
+        try:
+            await bot.send_message(chat_id, text)
+            return True
+        except Exception:
+            failures["count"] += 1
+            return False
+
+    async def broadcast():
+        with send_lane(Lane.BROADCAST):
+            for chat_id in range(10_000, 10_000 + args.broadcast):
+                await send(chat_id, "Новости YoVPN")
+                if not queued:
+                    await asyncio.sleep(0.05)
+
+    async def notifications():
+        with send_lane(Lane.NOTIFICATION):
+            await asyncio.gather(*(send(chat_id, "Низкий баланс") for chat_id in range(20_000, 20_000 + args.notifications)))
+
+    async def replies():
+        for index in range(args.replies):
+            started = time.perf_counter()
+            if await send(30_000 + index, "Ответ"):
+                reply_timings.append(time.perf_counter() - started)
+            await asyncio.sleep(0.1)
+
+    started = time.perf_counter()
+    await asyncio.gather(broadcast(), notifications(), replies())
+    elapsed = time.perf_counter() - started
+    if queue is not None:
+        await queue.close()
+
+    stats = summarize(reply_timings) if reply_timings else {"p50_ms": 0.0, "p99_ms": 0.0}
+    return {
+        "total_s": round(elapsed, 2),
+        "flood_429": session.flood_errors,
+        "failed": failures["count"],
+        "reply_p50_ms": stats["p50_ms"],
+        "reply_p99_ms": stats["p99_ms"],
+    }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    return {"direct": await run_mode(False, args), "queue": await run_mode(True, args)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк очереди исходящих сообщений")
+    parser.add_argument("--broadcast", type=int, default=200)
+    parser.add_argument("--notifications", type=int, default=100)
+    parser.add_argument("--replies", type=int, default=40)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(f"{'mode':<8}{'total, s':>10}{'429':>8}{'failed':>8}{'reply p50':>12}{'reply p99':>12}")
+    for mode, stats in results.items():
+        print(
+            f"{mode:<8}{stats['total_s']:>10}{stats['flood_429']:>8}{stats['failed']:>8}"
+            f"{stats['reply_p50_ms']:>12}{stats['reply_p99_ms']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
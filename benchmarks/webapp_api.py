@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный стенд WebApp API
+Открытая нагрузка на настоящее приложение app.main с fake Marzban
+
+Запуск:
+    python -m benchmarks.webapp_api --rate 150 --duration 10 --marzban-latency 0.5
+
+Запросы идут в FastAPI приложение через ASGI-транспорт httpx (без сети),
+Marzban - локальный FakeMarzbanServer с настраиваемой задержкой. Смесь:
+активации подписки (с двойными нажатиями), запросы подписки и health.
+Задержка считается от запланированного момента, поэтому очередь внутри
+приложения не прячется. Режимы: admission - как в бою, с AdmissionControl;
+unbounded - без него.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlencode
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "api"))
+
+FAKE_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+
+# Обязательные настройки WebApp API (app.config.Settings)
+for name, value in {
+    "TELEGRAM_BOT_TOKEN": FAKE_TOKEN,
+    "SECRET_KEY": "benchmark",
+    "MARZBAN_API_URL": "http://127.0.0.1:9",
+    "ANDROID_APK_URL": "https://example.com/app.apk",
+    "IOS_APP_STORE_URL": "https://example.com/ios",
+    "MACOS_DMG_URL": "https://example.com/app.dmg",
+    "WINDOWS_EXE_URL": "https://example.com/app.exe",
+    "ANDROID_TV_APK_URL": "https://example.com/tv.apk",
+}.items():
+    os.environ.setdefault(name, value)
+
+import httpx
+
+from benchmarks.fake_marzban import DEFAULT_TOKEN, FakeMarzbanServer, FaultProfile, LatencyDistribution
+
+
+def sign_init_data(fields: Dict[str, str], bot_token: str = FAKE_TOKEN) -> str:
+    """initData, подписанная так же, как ее подписывает Telegram"""
+    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    signature = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    return urlencode({**fields, "hash": signature})
+
+
+def make_init_data(user_id: int, auth_date: Optional[int] = None) -> str:
+    user = {"id": user_id, "first_name": "Иван", "username": f"user_{user_id}", "language_code": "ru"}
+    return sign_init_data({
+        "query_id": f"AAH{user_id:010d}",
+        "user": json.dumps(user, ensure_ascii=False, separators=(",", ":")),
+        "auth_date": str(auth_date or int(time.time())),
+    })
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def build_app(admission: bool):
+    """app.main.app с AdmissionControl или без него (стек middleware собирается заново)"""
+    from app.main import app
+    from app.utils.admission import AdmissionControl
+
+    if not hasattr(app.state, "all_middleware"):
+        app.state.all_middleware = list(app.user_middleware)
+    app.user_middleware = [
+        middleware for middleware in app.state.all_middleware
+        if admission or middleware.cls is not AdmissionControl
+    ]
+    app.middleware_stack = None
+    return app
+
+
+class WebAppApiLoad:
+    """
+    Прогон нагрузки на WebApp API
+
+    Отвечает за:
+    - Fake Marzban с заранее созданными пользователями
+    - Подключение subscription_service к fake Marzban и временному UserService
+    - Открытую нагрузку и сбор задержек по маршрутам
+    """
+
+    def __init__(self, options: argparse.Namespace):
+        self.options = options
+        self.rng = random.Random(options.seed)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def run(self, admission: bool) -> Dict:
+        from app.services.subscription_service import subscription_service
+        from bot.services.marzban_service import MarzbanService
+        from bot.services.user_service import UserService
+
+        options = self.options
+        users = [100000 + i for i in range(options.users)]
+        existing = set(self.rng.sample(users, int(len(users) * options.existing)))
+
+        async with FakeMarzbanServer(seed=options.seed) as marzban:
+            marzban_service = MarzbanService(api_url=marzban.url, admin_token=DEFAULT_TOKEN)
+            await marzban_service.check_api_availability()
+            await asyncio.gather(*(
+                marzban_service.create_user(f"user_{user_id}", {"days": 30}) for user_id in existing
+            ))
+            marzban.set_profile(None, FaultProfile(latency=LatencyDistribution.parse(options.marzban_latency)))
+
+            with tempfile.TemporaryDirectory(prefix="yovpn-api-load-") as workdir:
+                subscription_service.marzban_service = marzban_service
+                subscription_service.user_service = UserService(str(Path(workdir) / "data.json"))
+                # Активации прошлого прогона привязаны к его event loop
+                subscription_service._activations.clear()
+                subscription_service._activation_expires.clear()
+
+                transport = httpx.ASGITransport(app=build_app(admission))
+                async with httpx.AsyncClient(transport=transport, base_url="http://api", timeout=None) as client:
+                    marzban.requests = 0
+                    started = time.perf_counter()
+                    await self._drive(client, users)
+                    elapsed = time.perf_counter() - started
+                    marzban_calls = marzban.requests
+
+            await marzban_service.close()
+
+        return self._report(elapsed, marzban_calls)
+
+    async def _drive(self, client: httpx.AsyncClient, users: List[int]):
+        options = self.options
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        tasks = []
+        at = 0.0
+        while at < options.duration:
+            at += self.rng.expovariate(options.rate)
+            delay = start + at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            user_id = self.rng.choice(users)
+            roll = self.rng.random()
+            if roll < options.activate_share:
+                tasks.append(asyncio.ensure_future(self._activate(client, user_id, start + at)))
+                if self.rng.random() < options.double_tap:
+                    tasks.append(asyncio.ensure_future(self._activate(client, user_id, start + at)))
+            elif roll < options.activate_share + options.health_share:
+                tasks.append(asyncio.ensure_future(self._request(client, "health", "GET", "/api/health", start + at)))
+            else:
+                tasks.append(asyncio.ensure_future(
+                    self._request(client, "version", "GET", "/api/version/android", start + at)
+                ))
+        await asyncio.gather(*tasks)
+
+    async def _activate(self, client: httpx.AsyncClient, user_id: int, scheduled: float):
+        await self._request(
+            client, "activate", "POST", "/api/subscription/activate", scheduled,
+            json={"user_id": user_id, "platform": "android"},
+            headers={"X-Telegram-Init-Data": make_init_data(user_id)},
+        )
+
+    async def _request(self, client: httpx.AsyncClient, label: str, method: str, url: str, scheduled: float, **kwargs):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = response.status_code
+        except Exception:
+            status = 0
+        finally:
+            self.in_flight -= 1
+        self.statuses[label][status] += 1
+        if status == 200:
+            self.latencies[label].append(asyncio.get_running_loop().time() - scheduled)
+
+    def _report(self, elapsed: float, marzban_calls: int) -> Dict:
+        routes = {}
+        for label, statuses in sorted(self.statuses.items()):
+            latencies = self.latencies[label]
+            routes[label] = {
+                "statuses": dict(sorted(statuses.items())),
+                "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+            }
+        activations = sum(self.statuses["activate"].values())
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "peak_in_flight": self.peak_in_flight,
+            "marzban_calls": marzban_calls,
+            "marzban_calls_per_activation": round(marzban_calls / activations, 2) if activations else 0,
+            "routes": routes,
+        }
+
+
+def print_report(mode: str, report: Dict):
+    print(f"=== {mode}: {report['elapsed_s']} с, пик в обработке {report['peak_in_flight']}, "
+          f"вызовов Marzban {report['marzban_calls']} ({report['marzban_calls_per_activation']} на активацию)")
+    for label, stats in report["routes"].items():
+        statuses = ", ".join(f"{status}={count}" for status, count in stats["statuses"].items())
+        print(f"  {label:<9} {statuses:<28} p50={stats['p50_ms']} мс p95={stats['p95_ms']} мс p99={stats['p99_ms']} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный стенд WebApp API")
+    parser.add_argument("--rate", type=float, default=100.0, help="Запросов в секунду")
+    parser.add_argument("--duration", type=float, default=10.0, help="Длительность подачи (секунды)")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--existing", type=float, default=0.5, help="Доля пользователей, уже созданных в Marzban")
+    parser.add_argument("--activate-share", type=float, default=0.6)
+    parser.add_argument("--health-share", type=float, default=0.1)
+    parser.add_argument("--double-tap", type=float, default=0.2, help="Доля активаций с повторным нажатием")
+    parser.add_argument("--marzban-latency", default="lognormal:0.1:0.5", help="Задержка Marzban (kind:a:b)")
+    parser.add_argument("--modes", default="unbounded,admission")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Сохранить отчет в файл")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    reports = {}
+    for mode in args.modes.split(","):
+        reports[mode] = asyncio.run(WebAppApiLoad(args).run(admission=mode == "admission"))
+        print_report(mode, reports[mode])
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(reports, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
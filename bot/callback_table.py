@@ -0,0 +1,202 @@
+"""
+Таблица маршрутизации callback запросов
+Поиск обработчика callback_query за O(1) вместо перебора фильтров
+
+aiogram проверяет фильтры обработчиков по очереди во всех роутерах, пока
+какой-то не сработает. Почти все callback обработчики бота зарегистрированы
+с фильтром F.data == "..." или F.data.startswith("..."), поэтому их можно
+заранее разложить в словарь точных значений и префиксное дерево.
+
+Таблица ставится первым обработчиком в dp.callback_query. Если она нашла
+обработчик, он вызывается сразу (через те же middleware); если нет - aiogram
+перебирает фильтры как обычно, так что поведение не меняется.
+"""
+
+import logging
+import operator
+from typing import Any, Dict, Optional, Tuple
+
+from aiogram import Dispatcher, Router
+from aiogram.dispatcher.event.handler import FilterObject, HandlerObject
+from aiogram.types import CallbackQuery
+from magic_filter import MagicFilter
+from magic_filter.operations import CallOperation, ComparatorOperation, GetAttributeOperation
+
+logger = logging.getLogger(__name__)
+
+# Позиция обработчика в исходном порядке проверки и сам обработчик
+_Entry = Tuple[int, HandlerObject]
+
+# Ключ конца префикса в узле дерева
+_LEAF = ""
+
+
+def _parse_filter(handler: HandlerObject) -> Optional[Tuple[str, str]]:
+    """
+    Распознать простой фильтр по callback data
+
+    Returns:
+        ("exact", value), ("prefix", value) или None для сложных фильтров
+    """
+    if not handler.filters or len(handler.filters) != 1:
+        return None
+    magic = handler.filters[0].magic
+    if not isinstance(magic, MagicFilter):
+        return None
+
+    operations = magic._operations
+    if not operations or not isinstance(operations[0], GetAttributeOperation) or operations[0].name != "data":
+        return None
+
+    if (
+        len(operations) == 2
+        and isinstance(operations[1], ComparatorOperation)
+        and operations[1].comparator is operator.eq
+        and isinstance(operations[1].right, str)
+    ):
+        return "exact", operations[1].right
+
+    if (
+        len(operations) == 3
+        and isinstance(operations[1], GetAttributeOperation)
+        and operations[1].name == "startswith"
+        and isinstance(operations[2], CallOperation)
+        and len(operations[2].args) == 1
+        and isinstance(operations[2].args[0], str)
+        and not operations[2].kwargs
+    ):
+        return "prefix", operations[2].args[0]
+
+    return None
+
+
+def _is_transparent(router: Router) -> bool:
+    """Нет ли у роутера своих фильтров и middleware для callback_query"""
+    observer = router.callback_query
+    return not (observer._handler.filters or list(observer.middleware) or list(observer.outer_middleware))
+
+
+class CallbackTable:
+    """
+    Словарь точных значений и префиксное дерево callback data
+
+    Сохраняет семантику aiogram "первый подходящий по порядку регистрации":
+    из нескольких кандидатов выбирается зарегистрированный раньше, а
+    кандидат после первого сложного обработчика не выбирается вовсе
+    (сложный фильтр мог бы сработать раньше него).
+    """
+
+    def __init__(self):
+        self.exact: Dict[str, _Entry] = {}
+        self.trie: Dict[str, Any] = {}
+        self.indexed = 0
+        self.complex = 0
+        self.barrier = float("inf")
+
+    def add(self, position: int, handler: HandlerObject) -> bool:
+        """Добавить обработчик; False - фильтр слишком сложный для таблицы"""
+        parsed = _parse_filter(handler)
+        if parsed is None:
+            self.mark_complex(position)
+            return False
+
+        kind, value = parsed
+        if kind == "exact":
+            self.exact.setdefault(value, (position, handler))
+        else:
+            node = self.trie
+            for char in value:
+                node = node.setdefault(char, {})
+            node.setdefault(_LEAF, (position, handler))
+        self.indexed += 1
+        return True
+
+    def mark_complex(self, position: int):
+        """Запомнить позицию обработчика, который таблица не покрывает"""
+        self.complex += 1
+        self.barrier = min(self.barrier, position)
+
+    def resolve(self, data: Optional[str]) -> Optional[HandlerObject]:
+        """Обработчик для callback data или None"""
+        if data is None:
+            return None
+
+        best = self.exact.get(data)
+        node = self.trie
+        if _LEAF in node and (best is None or node[_LEAF][0] < best[0]):
+            best = node[_LEAF]
+        for char in data:
+            node = node.get(char)
+            if node is None:
+                break
+            entry = node.get(_LEAF)
+            if entry is not None and (best is None or entry[0] < best[0]):
+                best = entry
+
+        if best is None or best[0] > self.barrier:
+            return None
+        return best[1]
+
+    def __len__(self) -> int:
+        return self.indexed
+
+
+def build_callback_table(dp: Dispatcher) -> CallbackTable:
+    """
+    Собрать таблицу по уже зарегистрированным обработчикам
+
+    Обходит роутеры в том же порядке, в котором aiogram распространяет
+    событие: сначала обработчики роутера, затем вложенные роутеры.
+    """
+    table = CallbackTable()
+    position = 0
+
+    def walk(router: Router, indexable: bool):
+        nonlocal position
+        for handler in router.callback_query.handlers:
+            if indexable:
+                table.add(position, handler)
+            else:
+                table.mark_complex(position)
+            position += 1
+        for sub_router in router.sub_routers:
+            walk(sub_router, indexable and _is_transparent(sub_router))
+
+    # Фильтры и middleware самого dp применяются и к таблице, поэтому dp не проверяем
+    walk(dp, not dp.callback_query._handler.filters)
+    return table
+
+
+def install_callback_table(dp: Dispatcher) -> CallbackTable:
+    """
+    Поставить таблицу первым обработчиком dp.callback_query
+
+    Вызывается после регистрации всех обработчиков. Обработчики бота не
+    используют SkipHandler; если он появится, найденный таблицей обработчик
+    будет проверен повторно при обычном переборе.
+
+    Returns:
+        CallbackTable: Построенная таблица (для статистики и тестов)
+    """
+    table = build_callback_table(dp)
+
+    def match(callback: CallbackQuery, **kwargs: Any):
+        target = table.resolve(callback.data)
+        if target is None:
+            return False
+        # data["handler"] в middleware указывает на настоящий обработчик
+        return {"handler": target}
+
+    async def dispatch(callback: CallbackQuery, **kwargs: Any) -> Any:
+        target: HandlerObject = kwargs["handler"]
+        # Фильтр цели - F.data == ... / startswith, он уже проверен таблицей
+        return await target.call(callback, **kwargs)
+
+    dp.callback_query.handlers.insert(0, HandlerObject(callback=dispatch, filters=[FilterObject(callback=match)]))
+
+    logger.info(
+        f"⚡ Таблица callback: {len(table.exact)} точных, "
+        f"{table.indexed - len(table.exact)} по префиксу, {table.complex} через фильтры"
+    )
+    return table
+
@@ -12,6 +12,7 @@ from .payment_handler import register_payment_handler
 from .settings_handler import register_settings_handler
 from .support_handler import register_support_handler
 from .callback_handler import register_callback_handler  # Legacy support
+from .channel_handler import register_channel_handler
 from .admin_handler import admin_router, init_admin_panel
 
 def register_handlers(dp):
@@ -32,6 +33,7 @@ def register_handlers(dp):
     register_payment_handler(dp)
     register_settings_handler(dp)
     register_support_handler(dp)
+    register_channel_handler(dp)
     
     # Legacy callback handler (для обратной совместимости)
     register_callback_handler(dp)
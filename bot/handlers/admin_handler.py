@@ -14,6 +14,7 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.exceptions import TelegramBadRequest
 
+from utils.send_queue import Lane, send_lane
 from ..services.user_service import UserService
 from ..services.marzban_service import MarzbanService
 from ..services.ui_service import UIService
@@ -678,17 +679,18 @@ async def process_broadcast_message(message: Message, state: FSMContext):
         sent_count = 0
         failed_count = 0
         
-        for user_id in users.keys():
-            try:
-                await message.bot.send_message(
-                    chat_id=user_id,
-                    text=f"📢 <b>Сообщение от администратора:</b>\n\n{broadcast_text}"
-                )
-                sent_count += 1
-                await asyncio.sleep(0.1)  # Задержка между отправками
-            except Exception as e:
-                failed_count += 1
-                logger.warning(f"⚠️ Не удалось отправить сообщение пользователю {user_id}: {e}")
+        # Темп задает очередь отправки: рассылка идет с низшим приоритетом
+        with send_lane(Lane.BROADCAST):
+            for user_id in users.keys():
+                try:
+                    await message.bot.send_message(
+                        chat_id=user_id,
+                        text=f"📢 <b>Сообщение от администратора:</b>\n\n{broadcast_text}"
+                    )
+                    sent_count += 1
+                except Exception as e:
+                    failed_count += 1
+                    logger.warning(f"⚠️ Не удалось отправить сообщение пользователю {user_id}: {e}")
         
         await message.reply(
             f"📢 <b>Рассылка завершена!</b>\n\n"
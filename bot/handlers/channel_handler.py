@@ -0,0 +1,38 @@
+"""
+Обработчик апдейтов участников канала
+Подписка и отписка сразу обновляют кэш проверки подписки
+"""
+
+import logging
+from aiogram import Dispatcher
+from aiogram.types import ChatMemberUpdated
+
+logger = logging.getLogger(__name__)
+
+
+async def handle_channel_member(update: ChatMemberUpdated, **kwargs):
+    """
+    Обработчик chat_member: пользователь подписался на канал или отписался
+    
+    Приходит, только если бот - администратор канала
+    """
+    services = kwargs.get("services")
+    if not services:
+        return
+    
+    await services.get_channel_service().on_chat_member(update)
+    logger.debug(
+        f"📢 Участник канала {update.new_chat_member.user.id}: {update.new_chat_member.status}"
+    )
+
+
+def register_channel_handler(dp: Dispatcher):
+    """
+    Регистрация обработчика участников канала
+    
+    Args:
+        dp: Диспетчер бота
+    """
+    dp.chat_member.register(handle_channel_member)
+    
+    logger.info("✅ Обработчик участников канала зарегистрирован")
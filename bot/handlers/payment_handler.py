@@ -47,7 +47,7 @@ async def handle_top_up(callback: CallbackQuery, **kwargs):
         """
         
         # Создаем клавиатуру с суммами
-        keyboard = ui_service.create_payment_keyboard([40, 80, 120, 200, 400])
+        keyboard = ui_service.create_payment_keyboard((40, 80, 120, 200, 400))
         
         await callback.message.edit_text(
             message_text,
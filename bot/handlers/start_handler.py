@@ -50,14 +50,14 @@ async def start_command(message: Message, **kwargs):
         if is_new_user:
             logger.info(f"🎉 Новый пользователь: {first_name} (ID: {user_id})")
             
-            # 🎬 Показываем современную анимацию загрузки
-            await animation_service.show_loading_animation(message)
-            
-            # Создаем пользователя (с автоматическим бонусом 15₽)
-            user = await user_service.create_or_update_user(
-                user_id=user_id,
-                username=username,
-                first_name=first_name
+            # 🎬 Создаем пользователя (с автоматическим бонусом 15₽) под анимацией загрузки
+            user = await animation_service.show_loading_animation(
+                message,
+                user_service.create_or_update_user(
+                    user_id=user_id,
+                    username=username,
+                    first_name=first_name
+                )
             )
             
             # Отправляем приветствие для нового пользователя
@@ -30,19 +30,17 @@ class TextModeHandler:
         self.user_service = services.get_user_service()
         self.marzban_service = services.get_marzban_service()
         self.animation_service = services.get_animation_service()
+        self.channel_service = services.get_channel_service()
         
         # Поддержка
         self.support_username = "@yovpnsupbot"
-        self.required_channel = "@yodevelop"
+        self.required_channel = self.channel_service.channel
     
-    async def check_channel_subscription(self, user_id: int, bot) -> bool:
-        """Проверка подписки на канал"""
-        try:
-            member = await bot.get_chat_member(chat_id=self.required_channel, user_id=user_id)
-            return member.status in ['member', 'administrator', 'creator']
-        except Exception as e:
-            logger.error(f"Ошибка проверки подписки: {e}")
-            return False
+    async def check_channel_subscription(
+        self, user_id: int, bot, force: bool = False, recheck_negative: bool = False
+    ) -> bool:
+        """Проверка подписки на канал (из кэша, Telegram - только по истечении TTL)"""
+        return await self.channel_service.is_member(user_id, force=force, recheck_negative=recheck_negative)
     
     async def send_subscription_required(self, message: Message):
         """Отправка сообщения о необходимости подписки"""
@@ -70,17 +68,45 @@ class TextModeHandler:
         4. Создание пользователя в MySQL
         5. Отображение главного меню
         """
-        user_id = message.from_user.id
-        username = message.from_user.username
-        first_name = message.from_user.first_name or "Пользователь"
-        
-        # Проверяем подписку на канал
-        is_subscribed = await self.check_channel_subscription(user_id, message.bot)
+        # Проверяем подписку на канал: неподписанного перепроверяем - он мог
+        # подписаться и вернуться
+        is_subscribed = await self.check_channel_subscription(
+            message.from_user.id, message.bot, recheck_negative=True
+        )
         
         if not is_subscribed:
             await self.send_subscription_required(message)
             return
         
+        await self.show_start(message, message.from_user)
+    
+    async def check_subscription_callback(self, callback: CallbackQuery, state: FSMContext):
+        """Кнопка "Я подписался": проверка в Telegram, минуя кэш"""
+        is_subscribed = await self.check_channel_subscription(callback.from_user.id, callback.bot, force=True)
+        
+        if not is_subscribed:
+            await callback.answer(
+                f"❌ Подписка на {self.required_channel} не найдена. Подпишитесь и нажмите кнопку еще раз",
+                show_alert=True
+            )
+            return
+        
+        await callback.answer("✅ Подписка подтверждена")
+        await callback.message.delete()
+        await self.show_start(callback.message, callback.from_user)
+    
+    async def show_start(self, message: Message, from_user):
+        """
+        Приветствие после проверки подписки
+        
+        Args:
+            message: Сообщение в чате пользователя (для ответа)
+            from_user: Пользователь Telegram
+        """
+        user_id = from_user.id
+        username = from_user.username
+        first_name = from_user.first_name or "Пользователь"
+        
         # Получаем или создаем пользователя
         user = await self.user_service.get_user(user_id)
         is_new_user = user is None
@@ -398,6 +424,7 @@ class TextModeHandler:
         dp.message.register(self.unknown_command_handler, F.text & ~F.text.startswith('/start'))
         
         # Callbacks
+        dp.callback_query.register(self.check_subscription_callback, F.data == "check_subscription")
         dp.callback_query.register(self.activate_start_callback, F.data == "activate_start")
         dp.callback_query.register(self.platform_selected_callback, F.data.startswith("platform_"))
         dp.callback_query.register(self.app_installed_callback, F.data == "app_installed")
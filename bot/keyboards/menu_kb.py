@@ -6,14 +6,20 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from typing import List, Dict, Any
 
+from utils.frozen_markup import frozen_keyboard
+
 
 class MenuKeyboards:
     """
     Класс для создания всех клавиатур бота
     Современный минималистичный дизайн
+    
+    Клавиатуры строятся один раз на набор аргументов и общие для всех
+    пользователей - изменять их нельзя.
     """
     
     @staticmethod
+    @frozen_keyboard
     def get_main_menu() -> InlineKeyboardMarkup:
         """
         Главное меню - современный дизайн с акцентом на основные действия
@@ -64,6 +70,7 @@ class MenuKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     
     @staticmethod
+    @frozen_keyboard
     def get_subscription_menu(has_active: bool = False) -> InlineKeyboardMarkup:
         """
         Меню подписок - адаптивное в зависимости от наличия активной подписки
@@ -127,6 +134,7 @@ class MenuKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     
     @staticmethod
+    @frozen_keyboard
     def get_payment_amounts() -> InlineKeyboardMarkup:
         """
         Клавиатура выбора суммы пополнения
@@ -181,6 +189,7 @@ class MenuKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     
     @staticmethod
+    @frozen_keyboard
     def get_payment_methods() -> InlineKeyboardMarkup:
         """
         Способы оплаты
@@ -215,6 +224,7 @@ class MenuKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     
     @staticmethod
+    @frozen_keyboard
     def get_settings_menu() -> InlineKeyboardMarkup:
         """
         Меню настроек
@@ -251,6 +261,7 @@ class MenuKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     
     @staticmethod
+    @frozen_keyboard
     def get_back_button(callback_data: str = "main_menu", text: str = "🏠 Главное меню") -> InlineKeyboardMarkup:
         """
         Универсальная кнопка "Назад"
@@ -271,6 +282,7 @@ class MenuKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     
     @staticmethod
+    @frozen_keyboard
     def get_referral_menu() -> InlineKeyboardMarkup:
         """
         Меню реферальной программы
@@ -299,6 +311,7 @@ class MenuKeyboards:
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     
     @staticmethod
+    @frozen_keyboard
     def get_support_menu() -> InlineKeyboardMarkup:
         """
         Меню поддержки
@@ -329,3 +342,15 @@ class MenuKeyboards:
         ]
         
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+
+# Статичные клавиатуры строятся при импорте - первое нажатие тоже дешевое
+for _builder in (
+    MenuKeyboards.get_main_menu,
+    MenuKeyboards.get_payment_amounts,
+    MenuKeyboards.get_payment_methods,
+    MenuKeyboards.get_settings_menu,
+    MenuKeyboards.get_referral_menu,
+    MenuKeyboards.get_support_menu,
+):
+    _builder()
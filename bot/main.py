@@ -26,14 +26,20 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.exceptions import TelegramConflictError
 
 # Импорты конфигурации и сервисов
 from src.config import config
+from src.config.monitoring import MonitoringConfig, setup_prometheus
+from utils.fsm_storage import create_fsm_storage
 from bot.handlers import register_handlers, init_admin_panel
+from bot.callback_table import install_callback_table
 from bot.middleware import register_middleware
 from bot.services import BotServices
+from bot.webhook import WebhookServer
+from utils.frozen_markup import PreparedMarkupSession
+from utils.render_diff import install_render_diff
+from utils.send_queue import install_send_queue
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 LOG_TO_FILE = os.getenv("LOG_TO_FILE", "0") == "1"
@@ -55,6 +61,11 @@ else:
     stream_handler.setFormatter(formatter)
     logger.addHandler(stream_handler)
 
+# Типы апдейтов, которые получает бот
+# chat_member приходит, только если бот - администратор канала: обновляет кэш подписки
+# (ChannelService; проверку подписки сейчас делает только TextModeHandler, он не подключен)
+ALLOWED_UPDATES = ["message", "callback_query", "chat_member"]
+
 # Файл блокировки для предотвращения запуска нескольких экземпляров
 LOCK_FILE = "/tmp/yovpn_bot.lock"
 lock_file_handle = None
@@ -102,12 +113,25 @@ class YoVPNBot:
         """Инициализация бота"""
         self.bot = Bot(
             token=config.BOT_TOKEN,
+            # Готовые клавиатуры меню уходят уже сериализованными
+            session=PreparedMarkupSession(),
             default=DefaultBotProperties(parse_mode=ParseMode.HTML)
         )
-        self.dp = Dispatcher(storage=MemoryStorage())
+        # Правки, не меняющие сообщение, отсекаются до очереди отправки
+        self.render_diff = install_render_diff(self.bot)
+        # Все исходящие сообщения - через общую очередь с лимитами Telegram;
+        # часть лимита токена отдана рассылкам админки, боту - остаток
+        self.send_queue = install_send_queue(self.bot, global_rate=config.BOT_SEND_RATE, chat_rate=config.SEND_CHAT_RATE)
+        self.dp = Dispatcher(
+            storage=create_fsm_storage(config.FSM_STORAGE, config.REDIS_URL, config.REDIS_PASSWORD)
+        )
         
         # Создаем сервисы ОДИН РАЗ
         self.services = BotServices(self.bot)
+        # Пока очередь отправки перегружена, анимации заменяются статичным сообщением
+        self.services.animation_service.load_probe = self.send_queue.is_congested
+        self.metrics_server = None
+        self.webhook_server = None
         
         # Регистрируем middleware с готовыми сервисами
         register_middleware(self.dp, self.services)
@@ -115,6 +139,9 @@ class YoVPNBot:
         # Регистрируем обработчики
         register_handlers(self.dp)
         
+        # Простые callback фильтры - в таблицу вместо перебора
+        self.callback_table = install_callback_table(self.dp)
+        
         # Инициализируем админ панель с ВСЕМИ сервисами
         init_admin_panel(
             self.services.user_service,
@@ -131,6 +158,14 @@ class YoVPNBot:
         base_delay = 5.0  # Базовая задержка в секундах
         max_delay = 60.0  # Максимальная задержка в секундах
         
+        # Экспорт метрик Prometheus
+        if self.metrics_server is None:
+            self.metrics_server = setup_prometheus(MonitoringConfig.from_env())
+        
+        if config.BOT_MODE == "webhook":
+            await self.run_webhook()
+            return
+        
         for attempt in range(max_retries):
             try:
                 logger.info("🚀 Запуск YoVPN Bot...")
@@ -141,7 +176,7 @@ class YoVPNBot:
                 # Запускаем бота
                 await self.dp.start_polling(
                     self.bot,
-                    allowed_updates=["message", "callback_query"]
+                    allowed_updates=ALLOWED_UPDATES
                 )
                 
                 # Если polling завершился без ошибок, выходим
@@ -187,17 +222,65 @@ class YoVPNBot:
                 logger.error(f"❌ Ошибка при запуске бота: {e}")
                 raise
     
+    async def run_webhook(self):
+        """Запуск в режиме webhook (работает до отмены задачи)"""
+        logger.info("🚀 Запуск YoVPN Bot в режиме webhook...")
+        
+        # Без WEBHOOK_URL webhook регистрируют вручную, и случайный секрет сервера
+        # никому не известен: Telegram получал бы 401 на каждый апдейт
+        if not config.WEBHOOK_SECRET and not config.WEBHOOK_URL:
+            raise RuntimeError("В режиме webhook нужен WEBHOOK_SECRET (или WEBHOOK_URL для автоматической регистрации)")
+        
+        await self.services.start_background_tasks()
+        
+        self.webhook_server = WebhookServer(
+            self.dp,
+            self.bot,
+            path=config.WEBHOOK_PATH,
+            secret_token=config.WEBHOOK_SECRET,
+            queue_size=config.WEBHOOK_QUEUE_SIZE,
+            workers=config.WEBHOOK_WORKERS
+        )
+        await self.webhook_server.start(config.WEBHOOK_HOST, config.WEBHOOK_PORT)
+        
+        if config.WEBHOOK_URL:
+            webhook_url = config.WEBHOOK_URL.rstrip("/") + config.WEBHOOK_PATH
+            await self.bot.set_webhook(
+                url=webhook_url,
+                # Секрет из WEBHOOK_SECRET или сгенерированный сервером
+                secret_token=self.webhook_server.secret_token,
+                allowed_updates=ALLOWED_UPDATES,
+                max_connections=config.WEBHOOK_MAX_CONNECTIONS
+            )
+            logger.info(f"✅ Webhook зарегистрирован: {webhook_url}")
+        else:
+            logger.warning("⚠️ WEBHOOK_URL не задан: webhook не зарегистрирован в Telegram")
+        
+        # Апдейты приходят в WebhookServer, здесь просто ждем остановки
+        await asyncio.Event().wait()
+    
     async def stop(self):
         """Остановка бота"""
         try:
             logger.info("🛑 Остановка YoVPN Bot...")
             
+            # Дообрабатываем принятые по webhook апдейты
+            if self.webhook_server:
+                await self.webhook_server.stop()
+                self.webhook_server = None
+            
             # Останавливаем фоновые задачи
             await self.services.stop_background_tasks()
             
-            # Закрываем сессию бота
+            # Останавливаем очередь отправки и закрываем сессию бота
+            await self.send_queue.close()
             await self.bot.session.close()
             
+            # Останавливаем сервер метрик
+            if self.metrics_server:
+                self.metrics_server.shutdown()
+                self.metrics_server = None
+            
             logger.info("✅ Бот успешно остановлен")
             
         except Exception as e:
@@ -206,7 +289,8 @@ class YoVPNBot:
 async def main():
     """Главная функция"""
     # Проверяем, не запущен ли уже другой экземпляр
-    if not acquire_lock():
+    # (в режиме webhook конфликта getUpdates нет, порт и так занимает один процесс)
+    if config.BOT_MODE != "webhook" and not acquire_lock():
         logger.error("🚫 Запуск отменен: обнаружен конфликт с другим экземпляром бота")
         logger.error("💡 Решение проблемы:")
         logger.error("   1. Остановите все запущенные экземпляры бота")
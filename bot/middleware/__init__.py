@@ -3,6 +3,7 @@ Middleware для бота
 Промежуточное ПО для обработки запросов
 """
 
+from .metrics_middleware import MetricsMiddleware
 from .services_middleware import ServicesMiddleware
 from .logging_middleware import LoggingMiddleware
 from .rate_limit_middleware import RateLimitMiddleware
@@ -15,11 +16,17 @@ def register_middleware(dp, services):
         dp: Диспетчер бота
         services: Объект BotServices (создается ОДИН РАЗ в main.py)
     """
+    # Метрики регистрируем первыми, чтобы учитывать полное время обработки
+    metrics_middleware = MetricsMiddleware()
+    dp.message.middleware(metrics_middleware)
+    dp.callback_query.middleware(metrics_middleware)
+    
     # Добавляем middleware для сервисов с готовыми сервисами
     # ВАЖНО: Передаем готовые сервисы, чтобы избежать повторной инициализации
     services_middleware = ServicesMiddleware(services)
     dp.message.middleware(services_middleware)
     dp.callback_query.middleware(services_middleware)
+    dp.chat_member.middleware(services_middleware)
     
     # Добавляем middleware для rate limiting (ПОСЛЕ сервисов)
     dp.message.middleware(RateLimitMiddleware())
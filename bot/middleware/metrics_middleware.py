@@ -0,0 +1,52 @@
+"""
+Middleware для метрик
+Гистограммы времени обработки по обработчикам
+"""
+
+import time
+from typing import Callable, Dict, Any, Awaitable
+from aiogram import BaseMiddleware
+from aiogram.types import Message, CallbackQuery
+
+from utils.metrics import HANDLER_LATENCY, HANDLER_ERRORS, normalize_callback, normalize_message
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Middleware для сбора метрик
+
+    Регистрируется первым, поэтому измеряет полное время обработки
+    апдейта, включая остальные middleware
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[Message | CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+        event: Message | CallbackQuery,
+        data: Dict[str, Any]
+    ) -> Any:
+        """
+        Обработка middleware
+
+        Args:
+            handler: Обработчик события
+            event: Событие (Message или CallbackQuery)
+            data: Данные события
+
+        Returns:
+            Any: Результат обработки
+        """
+        if isinstance(event, CallbackQuery):
+            kind = "callback"
+            name = normalize_callback(event.data)
+        else:
+            kind = "message"
+            name = normalize_message(getattr(event, "text", None))
+
+        start_time = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.labels(kind, name).inc()
+            raise
+        finally:
+            HANDLER_LATENCY.labels(kind, name).observe(time.perf_counter() - start_time)
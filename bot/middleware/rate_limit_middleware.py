@@ -8,6 +8,8 @@ from typing import Callable, Dict, Any, Awaitable
 from aiogram import BaseMiddleware
 from aiogram.types import Message, CallbackQuery
 
+from utils.metrics import RATE_LIMIT_REJECTIONS
+
 logger = logging.getLogger(__name__)
 
 class RateLimitMiddleware(BaseMiddleware):
@@ -54,6 +56,8 @@ class RateLimitMiddleware(BaseMiddleware):
         allowed, error_message = security_service.check_rate_limit(user_id)
         
         if not allowed:
+            RATE_LIMIT_REJECTIONS.labels("bot").inc()
+            
             # Отправляем сообщение об ошибке
             if isinstance(event, Message):
                 await event.reply(error_message)
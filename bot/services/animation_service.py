@@ -3,8 +3,10 @@
 Управление анимированными эффектами сообщений и стикерами
 """
 
+import asyncio
+import itertools
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Awaitable, Callable, List, Set, Tuple, TypeVar
 from aiogram import Bot
 from aiogram.types import Message
 
@@ -12,6 +14,25 @@ from assets.animations.effects import MESSAGE_EFFECTS, get_effect_id, get_usage_
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Кадры анимации загрузки: (текст, сколько показывать в секундах)
+LOADING_FRAMES: List[Tuple[str, float]] = [
+    ("🔄 <b>Инициализация системы...</b>", 0.8),
+    ("🔐 <b>Настройка шифрования...</b>\n\n███▒▒▒▒▒▒▒ 30%", 0.9),
+    ("🌐 <b>Подключение к серверам...</b>\n\n██████▒▒▒▒ 60%", 0.9),
+    ("🛡️ <b>Активация защиты...</b>\n\n█████████▒ 90%", 0.8),
+]
+
+# Длительность анимации без операции (как у прежней фиксированной последовательности)
+LOADING_DURATION = 4.4
+
+# Операции быстрее этого (секунды) обходятся без анимации
+ANIMATION_GRACE = 0.3
+
+# Сколько анимаций одновременно могут править сообщения; остальные - статичные
+ANIMATION_BUDGET = 20
+
 class AnimationService:
     """
     Сервис для работы с анимациями и эффектами
@@ -31,6 +52,17 @@ class AnimationService:
             bot: Экземпляр бота
         """
         self.bot = bot
+        
+        # Бюджет анимаций: сколько одновременно могут править сообщения
+        self.animation_budget = ANIMATION_BUDGET
+        self.animation_grace = ANIMATION_GRACE
+        self.loading_frames = LOADING_FRAMES
+        # Внешний признак нагрузки (например, глубина очереди отправки)
+        self.load_probe: Optional[Callable[[], bool]] = None
+        self.animation_stats = {"animated": 0, "static": 0, "skipped": 0, "frames": 0}
+        self._active_animations = 0
+        self._animations: Set[asyncio.Task] = set()
+        
         self.stickers = {
             'loading': [],
             'success': [],
@@ -43,35 +75,82 @@ class AnimationService:
         
         logger.info("✅ AnimationService инициализирован")
     
-    async def show_loading_animation(self, message: Message) -> None:
+    async def show_loading_animation(self, message: Message, work: Optional[Awaitable[T]] = None) -> Optional[T]:
         """
-        Показать современную анимацию загрузки с прогресс-баром
+        Показать анимацию загрузки, пока выполняется операция
         Стиль: система подключается к серверам
         
+        Анимация живет в отдельной задаче и не задерживает операцию:
+        - операция быстрее ANIMATION_GRACE - сообщений нет вовсе;
+        - кадры, время которых прошло, пропускаются (показывается последний);
+        - после завершения операции сообщение сразу удаляется;
+        - при нагрузке (больше ANIMATION_BUDGET анимаций или сработал
+          load_probe) показывается одно статичное сообщение без правок.
+        
         Args:
-            message: Сообщение для редактирования
+            message: Сообщение, в чат которого отправляется анимация
+            work: Операция, на время которой показывается анимация
+                (None - только анимация, как раньше)
+        
+        Returns:
+            Результат операции
         """
-        import asyncio
+        task = asyncio.ensure_future(work if work is not None else asyncio.sleep(LOADING_DURATION))
         
-        steps = [
-            {"text": "🔄 <b>Инициализация системы...</b>", "delay": 0.8},
-            {"text": "🔐 <b>Настройка шифрования...</b>\n\n███▒▒▒▒▒▒▒ 30%", "delay": 0.9},
-            {"text": "🌐 <b>Подключение к серверам...</b>\n\n██████▒▒▒▒ 60%", "delay": 0.9},
-            {"text": "🛡️ <b>Активация защиты...</b>\n\n█████████▒ 90%", "delay": 0.8},
-            {"text": "✅ <b>Система готова к работе!</b>\n\n██████████ 100%", "delay": 1.0}
-        ]
+        animated = self._active_animations < self.animation_budget and not (self.load_probe and self.load_probe())
+        if animated:
+            self._active_animations += 1
         
-        loading_msg = await message.answer(steps[0]["text"], parse_mode='HTML')
+        animator = asyncio.create_task(self._run_animation(message, task, animated))
+        self._animations.add(animator)
+        animator.add_done_callback(self._animations.discard)
         
-        for i, step in enumerate(steps[1:], 1):
-            await asyncio.sleep(steps[i-1]["delay"])
+        result = await task
+        return result if work is not None else None
+    
+    async def _run_animation(self, message: Message, task: asyncio.Future, animated: bool):
+        """Кадры анимации до завершения операции"""
+        try:
+            done, _ = await asyncio.wait({task}, timeout=self.animation_grace)
+            if done:
+                self.animation_stats["skipped"] += 1
+                return
+            
+            frames = self.loading_frames if animated else self.loading_frames[:1]
+            self.animation_stats["animated" if animated else "static"] += 1
             try:
-                await loading_msg.edit_text(step["text"], parse_mode='HTML')
+                loading_msg = await message.answer(frames[0][0], parse_mode='HTML')
             except Exception as e:
-                logger.debug(f"Ошибка редактирования анимации: {e}")
-        
-        await asyncio.sleep(steps[-1]["delay"])
-        await loading_msg.delete()
+                logger.debug(f"Ошибка отправки анимации: {e}")
+                return
+            
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            # Время начала каждого кадра от первого
+            starts = list(itertools.accumulate([0.0] + [delay for _, delay in frames[:-1]]))
+            shown = 0
+            
+            while shown < len(frames) - 1:
+                done, _ = await asyncio.wait({task}, timeout=max(0.0, started + starts[shown + 1] - loop.time()))
+                if done:
+                    break
+                # Правка могла занять больше паузы: показываем сразу актуальный кадр
+                elapsed = loop.time() - started
+                shown = max(index for index, start in enumerate(starts) if start <= elapsed)
+                try:
+                    await loading_msg.edit_text(frames[shown][0], parse_mode='HTML')
+                    self.animation_stats["frames"] += 1
+                except Exception as e:
+                    logger.debug(f"Ошибка редактирования анимации: {e}")
+            
+            await asyncio.wait({task})
+            try:
+                await loading_msg.delete()
+            except Exception as e:
+                logger.debug(f"Ошибка удаления анимации: {e}")
+        finally:
+            if animated:
+                self._active_animations -= 1
     
     async def send_welcome_message(self, message: Message, user_name: str, balance: float = 0.0, subscription_days: int = 0, is_new: bool = False) -> Message:
         """
@@ -14,6 +14,7 @@ from .notification_service import NotificationService
 from .animation_service import AnimationService
 from .ui_service import UIService
 from .security_service import SecurityService
+from .channel_service import ChannelService
 
 logger = logging.getLogger(__name__)
 
@@ -42,10 +43,15 @@ class BotServices:
         self.user_service = UserService()
         self.marzban_service = MarzbanService()
         self.payment_service = PaymentService(self.user_service, self.marzban_service)
-        self.notification_service = NotificationService(bot)
+        self.notification_service = NotificationService(
+            bot,
+            user_service=self.user_service,
+            daily_cost=self.payment_service.daily_cost
+        )
         self.animation_service = AnimationService(bot)
         self.ui_service = UIService()
         self.security_service = SecurityService()
+        self.channel_service = ChannelService(bot, self.user_service)
         
         logger.info("✅ Все сервисы инициализированы (включая SecurityService)")
     
@@ -113,4 +119,8 @@ class BotServices:
     
     def get_security_service(self) -> SecurityService:
         """Получить сервис безопасности"""
-        return self.security_service
\ No newline at end of file
+        return self.security_service
+    
+    def get_channel_service(self) -> ChannelService:
+        """Получить сервис проверки подписки на канал"""
+        return self.channel_service
@@ -9,6 +9,8 @@ from typing import Optional, Any, Dict, Callable
 from functools import wraps
 import asyncio
 
+from utils.metrics import record_cache
+
 logger = logging.getLogger(__name__)
 
 class CacheService:
@@ -22,14 +24,16 @@ class CacheService:
     - Уменьшение нагрузки на БД и API
     """
     
-    def __init__(self, default_ttl: int = 300):
+    def __init__(self, default_ttl: int = 300, name: str = "default"):
         """
         Инициализация сервиса кэширования
         
         Args:
             default_ttl: Время жизни кэша по умолчанию (в секундах)
+            name: Имя кэша для метрик
         """
         self.default_ttl = default_ttl
+        self.name = name
         self._cache: Dict[str, Dict[str, Any]] = {}
         self._stats = {
             'hits': 0,
@@ -75,6 +79,7 @@ class CacheService:
         """
         if key not in self._cache:
             self._stats['misses'] += 1
+            record_cache(self.name, False)
             return None
         
         entry = self._cache[key]
@@ -84,10 +89,12 @@ class CacheService:
             # Удаляем устаревшую запись
             del self._cache[key]
             self._stats['misses'] += 1
+            record_cache(self.name, False)
             logger.debug(f"🗑️ Кэш устарел: {key}")
             return None
         
         self._stats['hits'] += 1
+        record_cache(self.name, True)
         logger.debug(f"✅ Попадание в кэш: {key}")
         return entry['value']
     
@@ -0,0 +1,177 @@
+"""
+Сервис проверки подписки на канал
+Кэш членства в канале вместо get_chat_member на каждое действие
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+from aiogram.types import ChatMemberUpdated
+
+logger = logging.getLogger(__name__)
+
+# Канал, подписка на который открывает доступ к боту
+REQUIRED_CHANNEL = "@yodevelop"
+
+# Статусы участника, которые считаются подпиской
+MEMBER_STATUSES = {"member", "administrator", "creator"}
+
+# Сколько доверять результату проверки (секунды): подписчики отписываются
+# редко, а неподписанный пользователь обычно подписывается и сразу возвращается
+POSITIVE_TTL = 6 * 60 * 60
+NEGATIVE_TTL = 60
+
+# Сколько результатов держать в памяти (давно не проверявшиеся вытесняются)
+MEMBER_CACHE_SIZE = 50000
+
+
+class ChannelService:
+    """
+    Сервис проверки подписки на канал
+
+    Отвечает за:
+    - Кэш результата get_chat_member с разными TTL для подписчиков и нет
+    - Хранение результата в записи пользователя (channel_subscribed, channel_check_at)
+    - Одну проверку на пользователя при одновременных запросах
+    - Обновление кэша по апдейтам chat_member (только для пользователей бота)
+    """
+
+    def __init__(
+        self,
+        bot,
+        user_service=None,
+        channel: str = REQUIRED_CHANNEL,
+        positive_ttl: float = POSITIVE_TTL,
+        negative_ttl: float = NEGATIVE_TTL,
+        cache_size: int = MEMBER_CACHE_SIZE,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            bot: Экземпляр бота
+            user_service: Сервис пользователей (для хранения результата проверки)
+            channel: Канал (@username или id)
+            positive_ttl: Сколько доверять подписке (секунды)
+            negative_ttl: Сколько доверять отсутствию подписки (секунды)
+            cache_size: Сколько результатов держать в памяти
+            clock: Источник времени (секунды)
+        """
+        self.bot = bot
+        self.user_service = user_service
+        self.channel = channel
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.cache_size = cache_size
+        self._clock = clock
+        # user_id -> (подписан, когда проверено), LRU
+        self._members: "OrderedDict[int, Tuple[bool, float]]" = OrderedDict()
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self.stats = {"hits": 0, "checks": 0, "errors": 0, "updates": 0}
+
+    async def is_member(self, user_id: int, force: bool = False, recheck_negative: bool = False) -> bool:
+        """
+        Подписан ли пользователь на канал
+
+        Args:
+            user_id: ID пользователя
+            force: Спросить Telegram, не глядя в кэш и не присоединяясь к уже
+                идущей проверке (кнопка "Я подписался")
+            recheck_negative: Из кэша брать только подписку, отсутствие подписки
+                перепроверять (пользователь вернулся после подписки, /start)
+        """
+        cached = None if force else self._cached(user_id)
+        if cached or (cached is False and not recheck_negative):
+            self.stats["hits"] += 1
+            return cached
+
+        inflight = None if force else self._inflight.get(user_id)
+        if inflight is None:
+            # Проверка, начатая до подписки, могла вернуть "не подписан" -
+            # принудительная заменяет ее для следующих ожидающих
+            inflight = asyncio.ensure_future(self._check(user_id))
+            self._inflight[user_id] = inflight
+            inflight.add_done_callback(lambda done: self._forget_inflight(user_id, done))
+        # shield: отмена одного ожидающего не отменяет проверку для остальных
+        return await asyncio.shield(inflight)
+
+    def _forget_inflight(self, user_id: int, check: asyncio.Future):
+        if self._inflight.get(user_id) is check:
+            del self._inflight[user_id]
+
+    def invalidate(self, user_id: int):
+        """Следующая проверка пойдет в Telegram"""
+        entry = self._members.get(user_id) or self._load(user_id)
+        # Прошлый результат остается запасным на случай ошибки Telegram
+        self._store(user_id, (entry is not None and entry[0], float("-inf")))
+
+    async def on_chat_member(self, update: ChatMemberUpdated):
+        """Апдейт chat_member: пользователь подписался или отписался"""
+        if not self._is_channel(update.chat):
+            return
+        member = update.new_chat_member
+        # Подписчики канала, не пользующиеся ботом, кэшу не нужны
+        if self.user_service is not None and member.user.id not in self.user_service.users:
+            return
+        self.stats["updates"] += 1
+        await self._remember(member.user.id, member.status in MEMBER_STATUSES)
+
+    def _is_channel(self, chat) -> bool:
+        if isinstance(self.channel, int):
+            return chat.id == self.channel
+        return chat.username is not None and f"@{chat.username}".lower() == str(self.channel).lower()
+
+    def _cached(self, user_id: int) -> Optional[bool]:
+        entry = self._members.get(user_id)
+        if entry is None:
+            entry = self._load(user_id)
+            if entry is None:
+                return None
+        self._store(user_id, entry)
+
+        subscribed, checked_at = entry
+        ttl = self.positive_ttl if subscribed else self.negative_ttl
+        if self._clock() - checked_at >= ttl:
+            return None
+        return subscribed
+
+    async def _check(self, user_id: int) -> bool:
+        self.stats["checks"] += 1
+        try:
+            member = await self.bot.get_chat_member(chat_id=self.channel, user_id=user_id)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"❌ Ошибка проверки подписки на канал для {user_id}: {e}")
+            # Telegram недоступен - подписчик, проверенный раньше, не теряет доступ
+            entry = self._members.get(user_id)
+            return entry is not None and entry[0]
+
+        subscribed = member.status in MEMBER_STATUSES
+        await self._remember(user_id, subscribed)
+        return subscribed
+
+    def _load(self, user_id: int) -> Optional[Tuple[bool, float]]:
+        """Результат прошлой проверки из записи пользователя (переживает перезапуск)"""
+        user = self.user_service.users.get(user_id) if self.user_service else None
+        if not user or not user.get('channel_check_at'):
+            return None
+        try:
+            checked_at = datetime.fromisoformat(user['channel_check_at']).timestamp()
+        except (TypeError, ValueError):
+            return None
+        return bool(user.get('channel_subscribed')), checked_at
+
+    def _store(self, user_id: int, entry: Tuple[bool, float]):
+        self._members[user_id] = entry
+        self._members.move_to_end(user_id)
+        while len(self._members) > self.cache_size:
+            self._members.popitem(last=False)
+
+    async def _remember(self, user_id: int, subscribed: bool):
+        now = self._clock()
+        self._store(user_id, (subscribed, now))
+        if self.user_service is not None:
+            await self.user_service.set_channel_membership(user_id, subscribed, datetime.fromtimestamp(now))
@@ -7,6 +7,8 @@ import logging
 import aiohttp
 from typing import Optional, Dict, Any, List
 
+from utils.metrics import marzban_trace_config
+
 logger = logging.getLogger(__name__)
 
 class MarzbanService:
@@ -43,7 +45,8 @@ class MarzbanService:
                     'Authorization': f'Bearer {self.admin_token}',
                     'Content-Type': 'application/json'
                 },
-                timeout=aiohttp.ClientTimeout(total=30)
+                timeout=aiohttp.ClientTimeout(total=30),
+                trace_configs=[marzban_trace_config("bot")]
             )
         return self.session
     
@@ -205,9 +208,23 @@ class MarzbanService:
         Returns:
             bool: Успешность обновления
         """
+        return await self.modify_user(username, updates) is not None
+    
+    async def modify_user(self, username: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Обновить пользователя в Marzban и вернуть его данные из ответа
+        (без отдельного GET после обновления)
+        
+        Args:
+            username: Имя пользователя
+            updates: Обновления
+        
+        Returns:
+            Optional[Dict]: Данные обновленного пользователя
+        """
         if not self._available:
             logger.warning("⚠️ Marzban API недоступен, пропускаем обновление пользователя")
-            return False
+            return None
         
         try:
             session = await self._get_session()
@@ -215,15 +232,15 @@ class MarzbanService:
             async with session.put(f"{self.api_url}/user/{username}", json=updates) as response:
                 if response.status == 200:
                     logger.info(f"✅ Пользователь {username} обновлен в Marzban")
-                    return True
+                    return await response.json()
                 else:
                     error_text = await response.text()
                     logger.error(f"❌ Ошибка обновления пользователя {username}: {error_text}")
-                    return False
+                    return None
                     
         except Exception as e:
             logger.error(f"❌ Ошибка обновления пользователя в Marzban: {e}")
-            return False
+            return None
     
     async def get_user(self, username: str) -> Optional[Dict[str, Any]]:
         """
@@ -302,7 +319,20 @@ class MarzbanService:
         user_data = await self.get_user(username)
         if not user_data:
             return None
+        return self.build_user_config(username, user_data)
+    
+    def build_user_config(self, username: str, user_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Собрать конфигурацию из уже полученных данных пользователя
+        (ответа get_user, create_user или modify_user)
         
+        Args:
+            username: Имя пользователя
+            user_data: Данные пользователя из Marzban
+        
+        Returns:
+            Optional[Dict]: Конфигурация пользователя
+        """
         try:
             # Генерируем VLESS конфигурацию
             vless_config = self._generate_vless_config(user_data)
@@ -5,11 +5,73 @@
 
 import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Iterable, List, Dict, Any, Optional
 from datetime import datetime, timedelta
 
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from utils.depletion_schedule import DepletionSchedule
+from utils.send_queue import Lane, send_lane
+
 logger = logging.getLogger(__name__)
 
+# Дольше не спим даже без предупреждений в расписании: расписание считается
+# по настенным часам, а переведенные часы asyncio не заметит
+NOTIFICATION_MAX_SLEEP = 60 * 60
+
+# Одновременных отправок в массовой рассылке (темп задает очередь отправки,
+# пул только прячет задержку ответов Telegram)
+BULK_CONCURRENCY = 50
+
+# Причины, по которым рассылки до пользователя больше не доходят
+UNREACHABLE_CATEGORIES = ("blocked", "chat_not_found")
+
+
+def classify_send_error(error: Exception) -> str:
+    """
+    Категория ошибки отправки
+    
+    Returns:
+        str: blocked, chat_not_found, flood, transient или failed
+    """
+    if isinstance(error, TelegramForbiddenError):
+        return "blocked"
+    if isinstance(error, TelegramBadRequest):
+        return "chat_not_found" if "chat not found" in error.message.lower() else "failed"
+    if isinstance(error, TelegramRetryAfter):
+        return "flood"
+    if isinstance(error, (TelegramNetworkError, TelegramServerError, asyncio.TimeoutError)):
+        return "transient"
+    return "failed"
+
+
+@dataclass
+class BulkSendResult:
+    """Итог массовой рассылки по категориям"""
+    total: int = 0
+    sent: int = 0
+    skipped: int = 0          # известные недоступные чаты, без запроса к API
+    blocked: int = 0
+    chat_not_found: int = 0
+    flood: int = 0
+    transient: int = 0
+    failed: int = 0
+    retry_ids: List[int] = field(default_factory=list)  # flood и transient: можно повторить позже
+    
+    def as_dict(self) -> Dict[str, int]:
+        """Счетчики без списка повторов"""
+        counts = asdict(self)
+        counts.pop('retry_ids')
+        return counts
+
 class NotificationService:
     """
     Сервис для отправки уведомлений
@@ -21,18 +83,34 @@ class NotificationService:
     - Массовые рассылки
     """
     
-    def __init__(self, bot):
+    def __init__(self, bot, user_service=None, daily_cost: float = 4.0):
         """
         Инициализация сервиса
         
         Args:
             bot: Экземпляр бота
+            user_service: Сервис пользователей (источник балансов для предупреждений)
+            daily_cost: Стоимость дня подписки
         """
         self.bot = bot
+        self.user_service = user_service
+        self._unreachable: Dict[int, str] = {}  # без user_service отметки живут в памяти
         self._running = False
+        self._wakeup: Optional[asyncio.Event] = None
+        
+        # Предупреждения о низком балансе по прогнозу исчерпания
+        self.low_balance = DepletionSchedule(daily_cost)
+        if user_service is not None:
+            self.load_balances(user_service.users)
+            user_service.add_balance_listener(self.track_balance)
         
         logger.info("✅ NotificationService инициализирован")
     
+    async def _send(self, user_id: int, text: str, lane: Lane = Lane.NOTIFICATION):
+        """Отправить сообщение с приоритетом уведомлений (ниже ответов пользователям)"""
+        with send_lane(lane):
+            return await self.bot.send_message(user_id, text)
+    
     async def send_payment_success_notification(self, user_id: int, amount: float, days: int):
         """
         Отправить уведомление об успешной оплате
@@ -54,7 +132,7 @@ class NotificationService:
 Теперь вы можете активировать подписку или продолжить использование VPN.
             """
             
-            await self.bot.send_message(user_id, message)
+            await self._send(user_id, message)
             logger.info(f"📧 Уведомление об оплате отправлено пользователю {user_id}")
             
         except Exception as e:
@@ -83,7 +161,7 @@ class NotificationService:
 3. 🚀 Наслаждайтесь безопасным интернетом!
             """
             
-            await self.bot.send_message(user_id, message)
+            await self._send(user_id, message)
             logger.info(f"📧 Уведомление об активации подписки отправлено пользователю {user_id}")
             
         except Exception as e:
@@ -114,7 +192,7 @@ class NotificationService:
 • После пополнения подписка возобновится автоматически
             """
             
-            await self.bot.send_message(user_id, message)
+            await self._send(user_id, message)
             logger.info(f"📧 Предупреждение о низком балансе отправлено пользователю {user_id}")
             
         except Exception as e:
@@ -144,7 +222,7 @@ class NotificationService:
 <b>Нужна помощь?</b> Обратитесь в поддержку 👇
             """
             
-            await self.bot.send_message(user_id, message)
+            await self._send(user_id, message)
             logger.info(f"📧 Уведомление о приостановке подписки отправлено пользователю {user_id}")
             
         except Exception as e:
@@ -171,7 +249,7 @@ class NotificationService:
 Продолжайте наслаждаться безопасным интернетом.
             """
             
-            await self.bot.send_message(user_id, message)
+            await self._send(user_id, message)
             logger.info(f"📧 Уведомление о ежедневном списании отправлено пользователю {user_id}")
             
         except Exception as e:
@@ -205,75 +283,172 @@ class NotificationService:
 <b>Время:</b> {datetime.now().strftime('%d.%m.%Y %H:%M')}
             """
             
-            await self.bot.send_message(user_id, formatted_message)
+            await self._send(user_id, formatted_message)
             logger.info(f"📧 Системное уведомление отправлено пользователю {user_id}: {title}")
             
         except Exception as e:
             logger.error(f"❌ Ошибка отправки системного уведомления: {e}")
     
+    def load_balances(self, users: Dict[int, Dict[str, Any]]):
+        """
+        Построить расписание предупреждений по всем пользователям (при запуске)
+        
+        Args:
+            users: Пользователи UserService
+        """
+        for user_id, user in users.items():
+            if user.get('low_balance_warned'):
+                self.low_balance.mark_warned(user_id)
+            self.track_balance(user_id, user)
+        logger.info(f"📅 Предупреждений о низком балансе в расписании: {len(self.low_balance)}")
+    
+    def track_balance(self, user_id: int, user: Dict[str, Any]):
+        """
+        Пересчитать прогноз после изменения баланса или подписки
+        
+        Args:
+            user_id: ID пользователя
+            user: Данные пользователя
+        """
+        self.low_balance.update(
+            user_id,
+            user.get('balance', 0.0),
+            active=user.get('subscription_active', False)
+        )
+        if user.get('low_balance_warned') and not self.low_balance.is_warned(user_id):
+            # Баланс пополнен: следующий эпизод низкого баланса предупреждаем заново
+            user['low_balance_warned'] = False
+        if self._wakeup is not None:
+            self._wakeup.set()
+    
+    def set_daily_cost(self, daily_cost: float):
+        """
+        Пересчитать расписание под новую стоимость дня
+        
+        Args:
+            daily_cost: Стоимость дня подписки
+        """
+        self.low_balance.set_daily_cost(daily_cost)
+        if self._wakeup is not None:
+            self._wakeup.set()
+    
     async def notification_loop(self):
         """
         Основной цикл уведомлений
-        Проверяет пользователей и отправляет уведомления
+        Спит до ближайшего предупреждения в расписании или до изменения баланса
         """
         self._running = True
+        self._wakeup = asyncio.Event()
         logger.info("🔄 Запуск цикла уведомлений")
         
         while self._running:
             try:
+                self._wakeup.clear()
                 await self._check_and_send_notifications()
-                # Проверяем каждые 6 часов
-                await asyncio.sleep(6 * 60 * 60)
+                
+                timeout = NOTIFICATION_MAX_SLEEP
+                next_due = self.low_balance.next_due()
+                if next_due is not None:
+                    timeout = min(timeout, max(0.0, next_due - time.time()))
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
             except Exception as e:
                 logger.error(f"❌ Ошибка в цикле уведомлений: {e}")
-                await asyncio.sleep(60 * 60)  # Ждем час при ошибке
+                await asyncio.sleep(60)
     
     async def _check_and_send_notifications(self):
         """
-        Проверить пользователей и отправить необходимые уведомления
+        Отправить предупреждения о низком балансе, срок которых подошел
         """
-        try:
-            # Здесь была бы проверка всех пользователей
-            # и отправка уведомлений о низком балансе
-            logger.debug("🔍 Проверка пользователей для уведомлений")
-            
-        except Exception as e:
-            logger.error(f"❌ Ошибка проверки уведомлений: {e}")
+        for due in self.low_balance.pop_due():
+            await self.send_low_balance_warning(due.user_id, due.balance, due.days_left)
+            if self.user_service is not None:
+                await self.user_service.set_low_balance_warned(due.user_id)
     
-    async def send_bulk_notification(self, user_ids: List[int], message: str, title: str = "Уведомление"):
+    async def send_bulk_notification(
+        self,
+        user_ids: Iterable[int],
+        message: str,
+        title: str = "Уведомление",
+        concurrency: int = BULK_CONCURRENCY
+    ) -> BulkSendResult:
         """
         Отправить массовое уведомление
         
         Args:
-            user_ids: Список ID пользователей
+            user_ids: ID пользователей
             message: Текст сообщения
             title: Заголовок сообщения
+            concurrency: Одновременных отправок
+        
+        Returns:
+            BulkSendResult: Счетчики по категориям и ID для повтора
         """
-        try:
-            formatted_message = f"""
+        user_ids = list(user_ids)
+        result = BulkSendResult(total=len(user_ids))
+        unreachable: Dict[int, str] = {}
+        formatted_message = f"""
 📢 <b>{title}</b>
 
 {message}
 
 <b>Время:</b> {datetime.now().strftime('%d.%m.%Y %H:%M')}
             """
-            
-            success_count = 0
-            for user_id in user_ids:
+        
+        # Общий итератор: каждый ID забирает ровно один воркер
+        pending = iter(user_ids)
+        
+        async def worker():
+            for user_id in pending:
+                if self._is_unreachable(user_id):
+                    result.skipped += 1
+                    continue
                 try:
-                    await self.bot.send_message(user_id, formatted_message)
-                    success_count += 1
+                    await self._send(user_id, formatted_message, Lane.BROADCAST)
+                    result.sent += 1
                 except Exception as e:
-                    logger.error(f"❌ Ошибка отправки уведомления пользователю {user_id}: {e}")
-            
-            logger.info(f"📧 Массовое уведомление отправлено: {success_count}/{len(user_ids)}")
-            
-        except Exception as e:
-            logger.error(f"❌ Ошибка массовой рассылки: {e}")
+                    category = classify_send_error(e)
+                    setattr(result, category, getattr(result, category) + 1)
+                    if category in UNREACHABLE_CATEGORIES:
+                        unreachable[user_id] = category
+                    elif category in ("flood", "transient"):
+                        result.retry_ids.append(user_id)
+                    else:
+                        logger.error(f"❌ Ошибка отправки уведомления пользователю {user_id}: {e}")
+        
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(user_ids))))))
+        finally:
+            if unreachable:
+                await self._mark_unreachable(unreachable)
+        
+        logger.info(f"📧 Массовое уведомление: {result.as_dict()}")
+        return result
+    
+    def _is_unreachable(self, user_id: int) -> bool:
+        # Отметка в данных пользователя снимается, когда он снова пишет боту
+        user = self.user_service.users.get(user_id) if self.user_service is not None else None
+        if user is not None:
+            return bool(user.get('unreachable'))
+        return user_id in self._unreachable
+    
+    async def _mark_unreachable(self, reasons: Dict[int, str]):
+        known = {}
+        for user_id, reason in reasons.items():
+            if self.user_service is not None and user_id in self.user_service.users:
+                known[user_id] = reason
+            else:
+                self._unreachable[user_id] = reason
+        if known:
+            await self.user_service.mark_unreachable(known)
     
     async def stop(self):
         """Остановить сервис"""
         self._running = False
+        if self._wakeup is not None:
+            self._wakeup.set()
         logger.info("🛑 NotificationService остановлен")
     
     def is_running(self) -> bool:
@@ -5,9 +5,12 @@
 
 import asyncio
 import logging
+import time
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
 
+from utils.metrics import BILLING_PROCESSED, BILLING_RUN_DURATION
+
 logger = logging.getLogger(__name__)
 
 class PaymentService:
@@ -114,6 +117,7 @@ class PaymentService:
         """
         Обработать ежедневные платежи для всех пользователей
         """
+        start_time = time.perf_counter()
         try:
             users = await self.user_service.get_all_users()
             processed_count = 0
@@ -137,15 +141,18 @@ class PaymentService:
                         # Обновляем подписку в Marzban
                         await self._update_marzban_subscription(user_id, user_data)
                         processed_count += 1
+                        BILLING_PROCESSED.labels("charged").inc()
                         
                         logger.info(f"💰 Списано {self.daily_cost} ₽ с пользователя {user_id}")
                     else:
+                        BILLING_PROCESSED.labels("failed").inc()
                         logger.error(f"❌ Ошибка списания с пользователя {user_id}")
                 else:
                     # Недостаточно средств - деактивируем подписку
                     await self.user_service.deactivate_subscription(user_id)
                     await self._deactivate_marzban_subscription(user_id, user_data)
                     deactivated_count += 1
+                    BILLING_PROCESSED.labels("deactivated").inc()
                     
                     logger.info(f"❌ Подписка деактивирована для пользователя {user_id} (недостаточно средств)")
             
@@ -153,6 +160,9 @@ class PaymentService:
             
         except Exception as e:
             logger.error(f"❌ Ошибка обработки ежедневных платежей: {e}")
+        
+        finally:
+            BILLING_RUN_DURATION.observe(time.perf_counter() - start_time)
     
     async def _update_marzban_subscription(self, user_id: int, user_data: Dict[str, Any]):
         """
@@ -9,6 +9,14 @@ from typing import Dict, Optional, Tuple
 from collections import defaultdict
 from datetime import datetime, timedelta
 
+from utils.pattern_scanner import PatternScanner
+
+# Маркеры спама: ссылки, домены, упоминания
+_SPAM_SCANNER = PatternScanner.literals([
+    'http://', 'https://', 'www.', '.com', '.ru', '.net',
+    'telegram.me', 't.me', '@', 'bit.ly'
+])
+
 logger = logging.getLogger(__name__)
 
 class SecurityService:
@@ -140,14 +148,8 @@ class SecurityService:
         if len(text) > max_length:
             return False, f"❌ Текст слишком длинный (максимум {max_length} символов)"
         
-        # Проверяем на спам-паттерны
-        spam_patterns = [
-            'http://', 'https://', 'www.', '.com', '.ru', '.net',
-            'telegram.me', 't.me', '@', 'bit.ly'
-        ]
-        
-        suspicious_count = sum(1 for pattern in spam_patterns if pattern.lower() in text.lower())
-        if suspicious_count >= 3:
+        # Проверяем на спам-паттерны (все маркеры за один проход)
+        if len(_SPAM_SCANNER.scan(text)) >= 3:
             return False, "❌ Обнаружен подозрительный контент"
         
         return True, None
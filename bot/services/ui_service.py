@@ -4,10 +4,11 @@
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 
 from assets.emojis.interface import EMOJI, get_emoji_combination, create_progress_bar, format_balance, format_days
+from utils.frozen_markup import frozen_keyboard
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +21,9 @@ class UIService:
     - Форматирование сообщений
     - Создание прогресс-баров
     - Управление навигацией
+    
+    Клавиатуры create_*_keyboard строятся один раз на набор аргументов
+    и общие для всех пользователей - изменять их нельзя.
     """
     
     def __init__(self):
@@ -31,6 +35,7 @@ class UIService:
         from datetime import datetime
         return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
+    @frozen_keyboard
     def create_main_menu_keyboard(self) -> InlineKeyboardMarkup:
         """
         Создать клавиатуру главного меню с современным дизайном 2025-2026
@@ -83,6 +88,7 @@ class UIService:
         
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     
+    @frozen_keyboard
     def create_subscription_menu_keyboard(self, has_active_subscription: bool = False) -> InlineKeyboardMarkup:
         """
         Создать клавиатуру меню подписки
@@ -140,7 +146,8 @@ class UIService:
         
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     
-    def create_payment_keyboard(self, amounts: List[float] = None) -> InlineKeyboardMarkup:
+    @frozen_keyboard
+    def create_payment_keyboard(self, amounts: Optional[Sequence[float]] = None) -> InlineKeyboardMarkup:
         """
         Создать клавиатуру для выбора суммы платежа (UX 2025-2026)
         
@@ -150,7 +157,7 @@ class UIService:
         - Визуально привлекательные эмодзи
         
         Args:
-            amounts: Список сумм для отображения
+            amounts: Суммы для отображения (кортеж - чтобы клавиатура запомнилась)
         
         Returns:
             InlineKeyboardMarkup: Клавиатура платежей
@@ -208,6 +215,7 @@ class UIService:
         
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     
+    @frozen_keyboard
     def create_payment_methods_keyboard(self) -> InlineKeyboardMarkup:
         """
         Создать клавиатуру способов оплаты
@@ -244,6 +252,7 @@ class UIService:
         
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     
+    @frozen_keyboard
     def create_settings_keyboard(self) -> InlineKeyboardMarkup:
         """
         Создать клавиатуру настроек
@@ -282,6 +291,7 @@ class UIService:
         
         return InlineKeyboardMarkup(inline_keyboard=keyboard)
     
+    @frozen_keyboard
     def create_back_keyboard(self, callback_data: str = "main_menu") -> InlineKeyboardMarkup:
         """
         Создать клавиатуру с кнопкой "Назад"
@@ -5,7 +5,8 @@
 
 import json
 import logging
-from typing import Optional, Dict, Any
+from datetime import datetime
+from typing import Optional, Dict, Any, Callable, List
 from pathlib import Path
 from .cache_service import get_cache
 
@@ -43,6 +44,9 @@ class UserService:
         self.data_file.parent.mkdir(parents=True, exist_ok=True)
         
         self.users = self._load_users()
+        
+        # Подписчики на изменения баланса и подписки (например, расписание предупреждений)
+        self._balance_listeners: List[Callable[[int, Dict[str, Any]], None]] = []
         logger.info(f"✅ UserService инициализирован, загружено {len(self.users)} пользователей")
         logger.info(f"📁 Файл данных: {self.data_file.absolute()}")
     
@@ -56,7 +60,9 @@ class UserService:
         try:
             if self.data_file.exists():
                 with open(self.data_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                    users = json.load(f)
+                # JSON хранит ключи строками, а сервисы ищут пользователей по int user_id
+                return {int(user_id): user for user_id, user in users.items()}
             return {}
         except Exception as e:
             logger.error(f"❌ Ошибка загрузки пользователей: {e}")
@@ -94,6 +100,22 @@ class UserService:
             import traceback
             logger.error(traceback.format_exc())
     
+    def add_balance_listener(self, listener: Callable[[int, Dict[str, Any]], None]):
+        """
+        Подписаться на изменения баланса и подписки
+        
+        Args:
+            listener: Вызывается с (user_id, user) до сохранения данных
+        """
+        self._balance_listeners.append(listener)
+    
+    def _notify_balance_change(self, user_id: int, user: Dict[str, Any]):
+        for listener in self._balance_listeners:
+            try:
+                listener(user_id, user)
+            except Exception as e:
+                logger.error(f"❌ Ошибка обработчика изменения баланса: {e}")
+    
     async def create_or_update_user(self, user_id: int, username: Optional[str], first_name: str) -> Dict[str, Any]:
         """
         Создать или обновить пользователя
@@ -137,6 +159,8 @@ class UserService:
                 'first_name': first_name,
                 'last_activity': self._get_current_timestamp()
             })
+            # Пользователь снова пишет боту - рассылки до него доходят
+            self.users[user_id].pop('unreachable', None)
             logger.debug(f"👤 Обновлен пользователь: {first_name} (ID: {user_id})")
         
         self._save_users()
@@ -217,6 +241,7 @@ class UserService:
             return False
         
         user['balance'] = round(new_balance, 2)
+        self._notify_balance_change(user_id, user)
         self._save_users()
         
         logger.info(f"💰 Баланс пользователя {user_id}: {current_balance} → {new_balance}")
@@ -268,6 +293,7 @@ class UserService:
         user['subscription_days'] = days
         user['subscription_started'] = self._get_current_timestamp()
         
+        self._notify_balance_change(user_id, user)
         self._save_users()
         logger.info(f"✅ Подписка активирована для пользователя {user_id}: {days} дней")
         return True
@@ -289,10 +315,63 @@ class UserService:
         user['subscription_active'] = False
         user['subscription_days'] = 0
         
+        self._notify_balance_change(user_id, user)
         self._save_users()
         logger.info(f"❌ Подписка деактивирована для пользователя {user_id}")
         return True
     
+    async def set_low_balance_warned(self, user_id: int, warned: bool = True):
+        """
+        Отметить, что пользователь предупрежден о низком балансе
+        (отметка переживает перезапуск и не дает предупредить повторно)
+        
+        Args:
+            user_id: ID пользователя
+            warned: Предупрежден ли пользователь
+        """
+        user = self.users.get(user_id)
+        if user is None or bool(user.get('low_balance_warned')) == warned:
+            return
+        user['low_balance_warned'] = warned
+        self._save_users()
+    
+    async def set_channel_membership(self, user_id: int, subscribed: bool, checked_at: datetime):
+        """
+        Сохранить результат проверки подписки на канал
+        (файл переписывается только при смене статуса - время проверки
+        сохранится с ближайшей записью)
+        
+        Args:
+            user_id: ID пользователя
+            subscribed: Подписан ли на канал
+            checked_at: Время проверки
+        """
+        user = self.users.get(user_id)
+        if user is None:
+            return
+        changed = bool(user.get('channel_subscribed')) != subscribed
+        user['channel_subscribed'] = subscribed
+        user['channel_check_at'] = checked_at.isoformat()
+        if changed:
+            self._save_users()
+    
+    async def mark_unreachable(self, reasons: Dict[int, str]):
+        """
+        Отметить пользователей, до которых не доходят сообщения
+        (массовые рассылки их пропускают, пока пользователь снова не напишет боту)
+        
+        Args:
+            reasons: user_id -> причина (blocked, chat_not_found)
+        """
+        changed = False
+        for user_id, reason in reasons.items():
+            user = self.users.get(user_id)
+            if user is not None and user.get('unreachable') != reason:
+                user['unreachable'] = reason
+                changed = True
+        if changed:
+            self._save_users()
+    
     async def get_user_stats(self, user_id: int) -> Dict[str, Any]:
         """
         Получить статистику пользователя
@@ -0,0 +1,253 @@
+"""
+Шардирование апдейтов по пользователям
+Один вход раскладывает апдейты по N процессам-воркерам
+
+Апдейты одного пользователя всегда попадают в один и тот же процесс
+(user_id % N), поэтому порядок их обработки сохраняется, а состояние,
+привязанное к пользователю (FSM, rate limit, кэш), живет внутри шарда.
+
+Бот работает одним процессом: данные пользователей (JSON UserService)
+пишутся и от имени других пользователей (админка, рефералы, рассылки) и не
+разделяются между процессами. ShardRouter используется нагрузочным стендом.
+"""
+
+import asyncio
+import logging
+import queue
+import threading
+import multiprocessing
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from utils.metrics import QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+# Емкость очереди между входом и одним воркером
+SHARD_QUEUE_SIZE = 10000
+
+# Сколько апдейтов разных пользователей воркер обрабатывает одновременно
+SHARD_CONCURRENCY = 256
+
+# Сколько ждать завершения воркеров при остановке (секунды)
+SHARD_STOP_TIMEOUT = 30.0
+
+# Ключи апдейта, в которых лежит объект с полем from
+_USER_EVENT_KEYS = (
+    "message", "edited_message", "callback_query", "inline_query",
+    "chosen_inline_result", "shipping_query", "pre_checkout_query",
+    "my_chat_member", "chat_member", "chat_join_request", "poll_answer",
+)
+
+
+def shard_key(update: Dict[str, Any]) -> int:
+    """
+    Ключ шардирования апдейта
+
+    from.id для пользовательских событий, иначе id чата, иначе update_id
+    """
+    for key in _USER_EVENT_KEYS:
+        event = update.get(key)
+        if event:
+            user = event.get("from") or event.get("user")
+            if user and "id" in user:
+                return int(user["id"])
+            chat = event.get("chat")
+            if chat and "id" in chat:
+                return int(chat["id"])
+    return int(update.get("update_id", 0))
+
+
+def shard_for_update(update: Dict[str, Any], shards: int) -> int:
+    """Номер шарда для апдейта"""
+    return shard_key(update) % shards
+
+
+class KeyedSerializer:
+    """
+    Исполнитель, сохраняющий порядок внутри ключа
+
+    Задачи с одним ключом выполняются строго друг за другом в порядке
+    поступления, задачи с разными ключами - параллельно (до concurrency).
+    """
+
+    def __init__(self, concurrency: int = SHARD_CONCURRENCY):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tails: Dict[int, asyncio.Task] = {}
+        self._tasks: set = set()
+
+    def submit(self, key: int, job: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Поставить задачу в цепочку ключа"""
+        previous = self._tails.get(key)
+        task = asyncio.create_task(self._run(previous, job))
+        self._tails[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(lambda done, key=key: self._release(key, done))
+        return task
+
+    def _release(self, key: int, task: asyncio.Task):
+        self._tasks.discard(task)
+        if self._tails.get(key) is task:
+            del self._tails[key]
+
+    async def _run(self, previous: Optional[asyncio.Task], job: Callable[[], Awaitable[Any]]):
+        if previous is not None:
+            await asyncio.wait([previous])
+        async with self._semaphore:
+            await job()
+
+    async def join(self):
+        """Дождаться выполнения всех поставленных задач"""
+        while self._tasks:
+            await asyncio.wait(list(self._tasks))
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+
+async def consume_shard(
+    inbox: "multiprocessing.Queue",
+    process_update: Callable[[Dict[str, Any], Any], Awaitable[Any]],
+    concurrency: int = SHARD_CONCURRENCY
+):
+    """
+    Цикл воркера: читает апдейты из межпроцессной очереди до сигнала остановки
+
+    Чтение из multiprocessing.Queue блокирующее, поэтому его ведет отдельный
+    поток, а event loop получает апдейты через локальную asyncio очередь.
+
+    Args:
+        inbox: Очередь от входа; элементы (update, meta), None - остановка
+        process_update: Обработчик апдейта
+        concurrency: Параллелизм между разными пользователями
+    """
+    loop = asyncio.get_running_loop()
+    local: asyncio.Queue = asyncio.Queue()
+
+    def reader():
+        while True:
+            item = inbox.get()
+            loop.call_soon_threadsafe(local.put_nowait, item)
+            if item is None:
+                break
+
+    threading.Thread(target=reader, name="shard-inbox", daemon=True).start()
+    serializer = KeyedSerializer(concurrency)
+
+    async def handle(update: Dict[str, Any], meta: Any):
+        try:
+            await process_update(update, meta)
+        except Exception as e:
+            logger.error(f"❌ Ошибка обработки апдейта {update.get('update_id')}: {e}")
+
+    while True:
+        item = await local.get()
+        if item is None:
+            break
+        update, meta = item
+        serializer.submit(shard_key(update), lambda update=update, meta=meta: handle(update, meta))
+
+    await serializer.join()
+
+
+class ShardRouter:
+    """
+    Маршрутизатор апдейтов по процессам-воркерам
+
+    Отвечает за:
+    - Запуск N процессов-воркеров
+    - Выбор шарда по пользователю и передачу апдейта в его очередь
+    - Учет глубины очередей и остановку воркеров
+    """
+
+    def __init__(
+        self,
+        shards: int,
+        target: Callable[..., None],
+        target_args: Sequence[Any] = (),
+        queue_size: int = SHARD_QUEUE_SIZE
+    ):
+        """
+        Args:
+            shards: Количество процессов-воркеров
+            target: Точка входа воркера: target(index, shards, inbox, *target_args)
+            target_args: Дополнительные аргументы воркера
+            queue_size: Емкость очереди одного воркера
+        """
+        if shards < 1:
+            raise ValueError("Количество шардов должно быть не меньше 1")
+        self.shards = shards
+        self.target = target
+        self.target_args = tuple(target_args)
+        self.queue_size = queue_size
+        self.queues: List[multiprocessing.Queue] = []
+        self.processes: List[multiprocessing.Process] = []
+        self.routed = [0] * shards
+        self._stopping = False
+        self._depth = [QUEUE_DEPTH.labels(f"shard_{index}") for index in range(shards)]
+
+    def start(self):
+        """Запустить процессы-воркеры"""
+        # spawn: воркер не наследует event loop и сессии родителя
+        context = multiprocessing.get_context("spawn")
+        self.queues = [context.Queue(self.queue_size) for _ in range(self.shards)]
+        self.processes = [
+            context.Process(
+                target=self.target,
+                args=(index, self.shards, self.queues[index], *self.target_args),
+                name=f"yovpn-shard-{index}",
+            )
+            for index in range(self.shards)
+        ]
+        for process in self.processes:
+            process.start()
+        logger.info(f"🚀 Запущено воркеров: {self.shards}")
+
+    async def route(self, update: Dict[str, Any], meta: Any = None) -> int:
+        """
+        Передать апдейт воркеру его пользователя
+
+        Returns:
+            int: Номер шарда
+        """
+        index = shard_for_update(update, self.shards)
+        inbox = self.queues[index]
+        try:
+            inbox.put_nowait((update, meta))
+        except queue.Full:
+            # Воркер не успевает: ждем место, не блокируя event loop входа
+            await asyncio.to_thread(inbox.put, (update, meta))
+        self.routed[index] += 1
+        if self.routed[index] % 100 == 0:
+            self._update_depth(index)
+        return index
+
+    def _update_depth(self, index: int):
+        try:
+            self._depth[index].set(self.queues[index].qsize())
+        except NotImplementedError:
+            # qsize() недоступен на macOS
+            pass
+
+    def is_alive(self) -> bool:
+        """Все ли воркеры работают"""
+        return bool(self.processes) and all(process.is_alive() for process in self.processes)
+
+    def signal_stop(self):
+        """Отправить воркерам сигнал остановки (они дообработают свои очереди)"""
+        if not self._stopping:
+            self._stopping = True
+            for inbox in self.queues:
+                inbox.put(None)
+
+    async def stop(self, timeout: float = SHARD_STOP_TIMEOUT):
+        """Отправить сигнал остановки и дождаться воркеров"""
+        await asyncio.to_thread(self.signal_stop)
+        for process in self.processes:
+            await asyncio.to_thread(process.join, timeout)
+            if process.is_alive():
+                logger.warning(f"⚠️ Воркер {process.name} не завершился, принудительная остановка")
+                process.terminate()
+        self.processes = []
+        self.queues = []
+        self._stopping = False
+        logger.info("✅ Воркеры остановлены")
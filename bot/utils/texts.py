@@ -3,6 +3,7 @@
 Все тексты в одном месте для легкой локализации и редактирования
 """
 
+from functools import lru_cache
 from typing import Dict, Any
 
 # ═══════════════════════════════════════════════════════════════════
@@ -181,11 +182,7 @@ def get_referrals_text(referrals_count: int, referral_code: str, referral_link:
 # ⚙️ НАСТРОЙКИ
 # ═══════════════════════════════════════════════════════════════════
 
-def get_settings_text() -> str:
-    """
-    Текст настроек
-    """
-    return f"""
+SETTINGS_TEXT = """
 <b>⚙️ Настройки</b>
 
 Управляй своим аккаунтом и уведомлениями
@@ -205,15 +202,18 @@ def get_settings_text() -> str:
 """.strip()
 
 
+def get_settings_text() -> str:
+    """
+    Текст настроек
+    """
+    return SETTINGS_TEXT
+
+
 # ═══════════════════════════════════════════════════════════════════
 # 🆘 ПОДДЕРЖКА
 # ═══════════════════════════════════════════════════════════════════
 
-def get_support_text() -> str:
-    """
-    Текст поддержки
-    """
-    return f"""
+SUPPORT_TEXT = """
 <b>🆘 Служба поддержки</b>
 
 Мы всегда на связи! 💬
@@ -238,6 +238,13 @@ def get_support_text() -> str:
 """.strip()
 
 
+def get_support_text() -> str:
+    """
+    Текст поддержки
+    """
+    return SUPPORT_TEXT
+
+
 # ═══════════════════════════════════════════════════════════════════
 # 🔄 АНИМАЦИЯ ЗАГРУЗКИ
 # ═══════════════════════════════════════════════════════════════════
@@ -285,9 +292,10 @@ def get_loading_step(step: int) -> Dict[str, Any]:
 # 💳 ПОДПИСКИ
 # ═══════════════════════════════════════════════════════════════════
 
+@lru_cache(maxsize=512)
 def get_subscriptions_text(has_active: bool, days_left: int = 0) -> str:
     """
-    Текст раздела подписок
+    Текст раздела подписок (запоминается: вариантов - по числу оставшихся дней)
     """
     if has_active:
         return f"""
@@ -329,11 +337,7 @@ def get_subscriptions_text(has_active: bool, days_left: int = 0) -> str:
 # 💰 ПОПОЛНЕНИЕ БАЛАНСА
 # ═══════════════════════════════════════════════════════════════════
 
-def get_topup_text() -> str:
-    """
-    Текст пополнения баланса
-    """
-    return f"""
+TOPUP_TEXT = """
 <b>💎 Пополнение баланса</b>
 
 Выбери сумму или введи свою 👇
@@ -356,6 +360,13 @@ def get_topup_text() -> str:
 """.strip()
 
 
+def get_topup_text() -> str:
+    """
+    Текст пополнения баланса
+    """
+    return TOPUP_TEXT
+
+
 # ═══════════════════════════════════════════════════════════════════
 # 🎯 ФУНКЦИИ-ПОМОЩНИКИ
 # ═══════════════════════════════════════════════════════════════════
@@ -365,6 +376,7 @@ def format_balance(balance: float) -> str:
     return f"{balance:.2f}₽"
 
 
+@lru_cache(maxsize=512)
 def format_days(days: int) -> str:
     """Форматирует дни с правильным склонением"""
     if days % 10 == 1 and days % 100 != 11:
@@ -0,0 +1,230 @@
+"""
+Webhook сервер бота
+Прием апдейтов Telegram по HTTP как альтернатива long polling
+
+Апдейт подтверждается ответом 200 сразу после постановки в очередь,
+а обрабатывается пулом воркеров. Так всплески нагрузки сглаживаются
+очередью, а не таймаутами на стороне Telegram.
+"""
+
+import asyncio
+import hmac
+import logging
+import secrets
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+
+from utils.metrics import QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+# Заголовок, в котором Telegram передает секрет из setWebhook(secret_token=...)
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+# Сколько последних update_id помнить для отсечения повторов
+DEDUP_WINDOW = 10000
+
+# Сколько ждать обработки оставшихся апдейтов при остановке (секунды)
+DRAIN_TIMEOUT = 10.0
+
+
+class UpdateDeduplicator:
+    """
+    Окно последних update_id
+
+    Telegram повторяет доставку, если не получил 200 вовремя, поэтому
+    один и тот же апдейт может прийти дважды. Храним ограниченное
+    окно идентификаторов: O(1) на проверку, память фиксирована.
+    """
+
+    def __init__(self, size: int = DEDUP_WINDOW):
+        self.size = size
+        self._seen: Set[int] = set()
+        self._order: Deque[int] = deque()
+
+    def add(self, update_id: int) -> bool:
+        """
+        Запомнить update_id
+
+        Returns:
+            bool: True, если апдейт новый
+        """
+        if update_id in self._seen:
+            return False
+        self._seen.add(update_id)
+        self._order.append(update_id)
+        if len(self._order) > self.size:
+            self._seen.discard(self._order.popleft())
+        return True
+
+    def forget(self, update_id: int):
+        """Забыть update_id (апдейт не принят и будет доставлен повторно)"""
+        self._seen.discard(update_id)
+
+    def __contains__(self, update_id: int) -> bool:
+        return update_id in self._seen
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+class WebhookServer:
+    """
+    HTTP приемник апдейтов с очередью и пулом воркеров
+
+    Отвечает за:
+    - Проверку секретного токена webhook
+    - Отсечение повторных доставок по update_id
+    - Немедленный ответ 200 после постановки апдейта в ограниченную очередь
+    - Ответ 503 при переполнении очереди (Telegram доставит апдейт позже)
+    - Обработку апдейтов воркерами через Dispatcher
+    """
+
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        path: str = "/webhook/telegram",
+        secret_token: str = "",
+        queue_size: int = 1000,
+        workers: int = 32,
+        dedup_size: int = DEDUP_WINDOW,
+        **kwargs: Any
+    ):
+        """
+        Инициализация сервера
+
+        Args:
+            dp: Диспетчер бота
+            bot: Экземпляр бота
+            path: Путь, на который Telegram отправляет апдейты
+            secret_token: Секрет для проверки заголовка (пустой - сгенерировать случайный)
+            queue_size: Максимальное число апдейтов в очереди
+            workers: Количество воркеров обработки
+            dedup_size: Размер окна дедупликации
+            **kwargs: Дополнительные данные для обработчиков (как в start_polling)
+        """
+        self.dp = dp
+        self.bot = bot
+        self.path = path
+        # Без секрета любой, кто достучится до порта, мог бы прислать поддельный апдейт
+        self.secret_token = secret_token or secrets.token_urlsafe(32)
+        self.workers = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dedup = UpdateDeduplicator(dedup_size)
+        self.kwargs = kwargs
+        self.stats = {"received": 0, "duplicates": 0, "rejected": 0, "processed": 0, "errors": 0}
+
+        self._worker_tasks: List[asyncio.Task] = []
+        self._runner: Optional[web.AppRunner] = None
+        self._site: Optional[web.TCPSite] = None
+        self._depth = QUEUE_DEPTH.labels("webhook")
+        self.app = self._build_app()
+
+    def _build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle_update)
+        app.router.add_get("/healthz", self.handle_health)
+        return app
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        """Принять апдейт от Telegram"""
+        received = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(received.encode(), self.secret_token.encode()):
+            return web.Response(status=401)
+
+        try:
+            update: Dict[str, Any] = await request.json()
+            update_id = int(update["update_id"])
+        except (ValueError, KeyError, TypeError):
+            return web.Response(status=400)
+
+        self.stats["received"] += 1
+        if not self.dedup.add(update_id):
+            self.stats["duplicates"] += 1
+            return web.Response(status=200)
+
+        try:
+            self.queue.put_nowait(update)
+        except asyncio.QueueFull:
+            # Не подтверждаем: Telegram повторит доставку, когда очередь разгрузится
+            self.dedup.forget(update_id)
+            self.stats["rejected"] += 1
+            logger.warning(f"⚠️ Очередь webhook переполнена ({self.queue.maxsize}), апдейт {update_id} отклонен")
+            return web.Response(status=503, headers={"Retry-After": "1"})
+
+        self._depth.set(self.queue.qsize())
+        return web.Response(status=200)
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        """Состояние очереди для проверок живости"""
+        return web.json_response({
+            "status": "ok",
+            "queue": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "workers": sum(1 for task in self._worker_tasks if not task.done()),
+            **self.stats,
+        })
+
+    async def _worker(self):
+        """Воркер: берет апдейты из очереди и передает в Dispatcher"""
+        while True:
+            update = await self.queue.get()
+            self._depth.set(self.queue.qsize())
+            try:
+                await self.dp.feed_raw_update(self.bot, update, **self.kwargs)
+                self.stats["processed"] += 1
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"❌ Ошибка обработки апдейта {update.get('update_id')}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def start_workers(self):
+        """Запустить пул воркеров"""
+        if not self._worker_tasks:
+            self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def start(self, host: str = "0.0.0.0", port: int = 8081) -> int:
+        """
+        Запустить HTTP сервер и воркеры
+
+        Returns:
+            int: Фактический порт (полезно при port=0)
+        """
+        self.start_workers()
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        self._site = web.TCPSite(self._runner, host, port)
+        await self._site.start()
+        port = self._runner.addresses[0][1]
+        logger.info(f"🌐 Webhook сервер слушает {host}:{port}{self.path} (воркеров: {self.workers})")
+        return port
+
+    async def stop(self, drain_timeout: float = DRAIN_TIMEOUT):
+        """
+        Остановить прием, дообработать очередь и остановить воркеры
+
+        Args:
+            drain_timeout: Сколько ждать обработки уже принятых апдейтов
+        """
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+        if self._worker_tasks:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ Не дождались обработки {self.queue.qsize()} апдейтов из очереди")
+
+            for task in self._worker_tasks:
+                task.cancel()
+            await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+            self._worker_tasks = []
+
+        self._depth.set(0)
+        logger.info("✅ Webhook сервер остановлен")
@@ -13,10 +13,14 @@ from aiogram import Bot, Dispatcher, types
 from aiogram.filters import Command, CommandStart
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
+from aiogram.client.session.base import BaseSession
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.fsm.storage.memory import MemoryStorage
 
 # Импорты наших сервисов
+from src.config import config
+from utils.fsm_storage import create_fsm_storage
+from utils.render_diff import install_render_diff
+from utils.send_queue import install_send_queue
 from src.services.ux_service import UXService, ResponseType
 from src.services.validation_service import ValidationService, ValidationError
 from src.services.security_service import SecurityService
@@ -40,9 +44,16 @@ class BotStates(StatesGroup):
 class AsyncYoVPNBot:
     """Асинхронный YoVPN бот"""
     
-    def __init__(self, token: str, marzban_api_url: str, marzban_admin_token: str):
-        self.bot = Bot(token=token)
-        self.dp = Dispatcher(storage=MemoryStorage())
+    def __init__(self, token: str, marzban_api_url: str, marzban_admin_token: str,
+                 session: Optional[BaseSession] = None):
+        self.bot = Bot(token=token, session=session)
+        self.render_diff = install_render_diff(self.bot)
+        self.send_queue = install_send_queue(
+            self.bot, global_rate=config.BOT_SEND_RATE, chat_rate=config.SEND_CHAT_RATE
+        )
+        self.dp = Dispatcher(
+            storage=create_fsm_storage(config.FSM_STORAGE, config.REDIS_URL, config.REDIS_PASSWORD)
+        )
         
         # Инициализация сервисов
         self.ux_service = UXService(self.bot)
@@ -55,11 +66,7 @@ class AsyncYoVPNBot:
         self.copy_service = CopyService(self.bot)
         self.interaction_service = InteractionService(self.bot)
         self.notification_service = NotificationService(self.bot)
-        self.daily_payment_service = DailyPaymentService(
-            self.user_service, 
-            self.marzban_service, 
-            self.notification_service
-        )
+        self.daily_payment_service = DailyPaymentService(self.marzban_service, self.user_service)
         
         # Настройка обработчиков
         self._setup_handlers()
@@ -276,10 +283,10 @@ class AsyncYoVPNBot:
                 await self.handle_simulate_payment(callback_query.message, amount)
             elif data.startswith("copy_"):
                 copy_type = data.replace("copy_", "")
-                await self.handle_copy_request(callback_query.message, copy_type)
+                await self.handle_copy_request(callback_query, copy_type)
             elif data.startswith("qr_"):
                 qr_type = data.replace("qr_", "")
-                await self.handle_qr_request(callback_query.message, qr_type)
+                await self.handle_qr_request(callback_query, qr_type)
             else:
                 await self.ux_service.send_error_response(
                     callback_query.message.chat.id,
@@ -361,6 +368,9 @@ class AsyncYoVPNBot:
             # Создаем пользователя если не существует
             if self.user_service.get_balance(user_id) >= 4:
                 user_info = self.marzban_service.create_test_user(username, 1)
+                if user_info:
+                    # Подписка активна: с этого момента идут списания и предупреждения
+                    self.user_service.update_user_record(user_id, {'subscription_active': True})
         
         subscription_info = {
             'status': user_info.get('status', 'inactive') if user_info else 'inactive',
@@ -385,7 +395,7 @@ class AsyncYoVPNBot:
     async def show_invite_menu(self, message: Message):
         """Показать реферальное меню"""
         user_id = message.from_user.id
-        referral_link = f"https://t.me/your_bot?start=ref_{user_id}"
+        referral_link = self.get_referral_link(user_id)
         
         # Создаем клавиатуру
         keyboard = self.ui_service.create_referral_keyboard(referral_link)
@@ -495,13 +505,54 @@ class AsyncYoVPNBot:
         # Показываем обновленную информацию о балансе
         await self.show_balance_menu(message)
 
-    async def handle_copy_request(self, message: Message, copy_type: str):
+    async def handle_copy_request(self, callback_query: CallbackQuery, copy_type: str):
         """Обработать запрос на копирование"""
-        await self.copy_service.handle_copy_request(message, copy_type)
+        link_type = copy_type.replace("_link", "")
+        link = await self.get_user_link(callback_query.from_user, link_type)
+        if not link:
+            await self.ux_service.send_error_response(callback_query.message.chat.id, "E999")
+            return
+        await self.copy_service.handle_copy_request(callback_query.message.chat.id, link, link_type)
 
-    async def handle_qr_request(self, message: Message, qr_type: str):
+    async def handle_qr_request(self, callback_query: CallbackQuery, qr_type: str):
         """Обработать запрос на QR-код"""
-        await self.copy_service.handle_qr_request(message, qr_type)
+        link_type = qr_type.replace("_link", "")
+        link = await self.get_user_link(callback_query.from_user, link_type)
+        if not link:
+            await self.ux_service.send_error_response(callback_query.message.chat.id, "E999")
+            return
+        await self.copy_service.handle_qr_request(callback_query.message.chat.id, link, link_type)
+
+    def get_referral_link(self, user_id: int) -> str:
+        """Реферальная ссылка пользователя"""
+        return f"https://t.me/your_bot?start=ref_{user_id}"
+
+    async def get_user_link(self, from_user: types.User, link_type: str) -> Optional[str]:
+        """
+        Ссылка, которую копируют или показывают QR-кодом
+        
+        Args:
+            from_user: Пользователь, нажавший кнопку (callback_query.message - сообщение бота)
+            link_type: vless, subscription или referral
+        """
+        if link_type == "referral":
+            return self.get_referral_link(from_user.id)
+        
+        # Сохраненная ссылка, иначе - из Marzban (синхронный клиент - вне event loop)
+        user = self.user_service.get_user_record(from_user.id)
+        if link_type == "vless" and user and user.vless_link:
+            return user.vless_link
+        if link_type == "subscription" and user and user.subscription_url:
+            return user.subscription_url
+        if link_type not in ("vless", "subscription") or not from_user.username:
+            return None
+        
+        user_info = await asyncio.to_thread(self.marzban_service.get_user_info, from_user.username)
+        if not user_info:
+            return None
+        if link_type == "vless":
+            return next((link for link in user_info.get("links", []) if link.startswith("vless://")), None)
+        return user_info.get("subscription_url") or None
 
     async def start_background_tasks(self):
         """Запуск фоновых задач"""
@@ -540,6 +591,7 @@ class AsyncYoVPNBot:
         """Остановка бота"""
         logger.info("Остановка бота...")
         await self.stop_background_tasks()
+        await self.send_queue.close()
         await self.bot.session.close()
 
 # Функция для запуска бота
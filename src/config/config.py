@@ -7,6 +7,10 @@ import os
 from decouple import config as decouple_config
 from typing import Optional
 
+# Часть лимита токена (сообщений в секунду), отданная рассылкам админ-панели:
+# это отдельный процесс с тем же токеном, бот отправляет с остатком
+ADMIN_BROADCAST_RATE = 10.0
+
 class BotConfig:
     """
     Конфигурация бота
@@ -26,7 +30,29 @@ class BotConfig:
         self.BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN') or os.environ.get('USERBOT_TOKEN') or decouple_config('TELEGRAM_BOT_TOKEN', default=decouple_config('USERBOT_TOKEN', default=''))
         self.BOT_USERNAME = os.environ.get('BOT_USERNAME') or decouple_config('BOT_USERNAME', default='YoVPNBot')
         self.BOT_DESCRIPTION = decouple_config('BOT_DESCRIPTION', default='Современный VPN-бот с ежедневной оплатой')
-        
+
+        # Режим получения апдейтов: polling или webhook
+        self.BOT_MODE = (os.environ.get('BOT_MODE') or decouple_config('BOT_MODE', default='polling')).lower()
+
+        # Настройки webhook (используются при BOT_MODE=webhook)
+        self.WEBHOOK_URL = decouple_config('WEBHOOK_URL', default='')  # Публичный адрес, например https://bot.example.com
+        self.WEBHOOK_PATH = decouple_config('WEBHOOK_PATH', default='/webhook/telegram')
+        self.WEBHOOK_HOST = decouple_config('WEBHOOK_HOST', default='0.0.0.0')
+        self.WEBHOOK_PORT = int(decouple_config('WEBHOOK_PORT', default='8081'))
+        # Пустой - случайный секрет при регистрации через WEBHOOK_URL, без WEBHOOK_URL бот не запустится
+        self.WEBHOOK_SECRET = decouple_config('WEBHOOK_SECRET', default='')
+        self.WEBHOOK_QUEUE_SIZE = int(decouple_config('WEBHOOK_QUEUE_SIZE', default='1000'))
+        self.WEBHOOK_WORKERS = int(decouple_config('WEBHOOK_WORKERS', default='32'))
+        self.WEBHOOK_MAX_CONNECTIONS = int(decouple_config('WEBHOOK_MAX_CONNECTIONS', default='40'))
+
+        # Лимиты исходящих сообщений (сообщений в секунду): на весь токен и на один чат.
+        # Токен делят бот и рассылки админ-панели: админке - ADMIN_BROADCAST_RATE,
+        # боту - остаток BOT_SEND_RATE
+        self.SEND_GLOBAL_RATE = float(decouple_config('SEND_GLOBAL_RATE', default='30'))
+        self.SEND_CHAT_RATE = float(decouple_config('SEND_CHAT_RATE', default='1'))
+        self.ADMIN_BROADCAST_RATE = float(decouple_config('ADMIN_BROADCAST_RATE', default=str(ADMIN_BROADCAST_RATE)))
+        self.BOT_SEND_RATE = max(self.SEND_GLOBAL_RATE - self.ADMIN_BROADCAST_RATE, 1.0)
+
         # Настройки Marzban
         self.MARZBAN_API_URL = os.environ.get('MARZBAN_API_URL') or decouple_config('MARZBAN_API_URL', default='')
         self.MARZBAN_ADMIN_TOKEN = os.environ.get('MARZBAN_ADMIN_TOKEN') or decouple_config('MARZBAN_ADMIN_TOKEN', default='')
@@ -54,6 +80,9 @@ class BotConfig:
         self.REDIS_URL = decouple_config('REDIS_URL', default='redis://localhost:6379')
         self.REDIS_PASSWORD = decouple_config('REDIS_PASSWORD', default='')
         
+        # Хранилище FSM: memory или redis (состояния переживают перезапуск)
+        self.FSM_STORAGE = (os.environ.get('FSM_STORAGE') or decouple_config('FSM_STORAGE', default='memory')).lower()
+        
         # Настройки платежей
         self.DAILY_COST = float(decouple_config('DAILY_COST', default='4.0'))
         self.MIN_BALANCE_WARNING = float(decouple_config('MIN_BALANCE_WARNING', default='8.0'))
@@ -88,6 +117,13 @@ class BotConfig:
         self.UPLOAD_DIR = decouple_config('UPLOAD_DIR', default='uploads')
         self.TEMP_DIR = decouple_config('TEMP_DIR', default='temp')
         self.MAX_FILE_SIZE = int(decouple_config('MAX_FILE_SIZE', default='10485760'))  # 10MB
+        
+        # Кэш QR-кодов: каталог (пусто - только память, по умолчанию), бюджеты и пул рендера
+        self.QR_CACHE_DIR = decouple_config('QR_CACHE_DIR', default='')
+        self.QR_CACHE_MEMORY_MB = int(decouple_config('QR_CACHE_MEMORY_MB', default='16'))
+        self.QR_CACHE_DISK_MB = int(decouple_config('QR_CACHE_DISK_MB', default='256'))
+        self.QR_RENDER_EXECUTOR = decouple_config('QR_RENDER_EXECUTOR', default='process')  # process, thread, inline
+        self.QR_RENDER_WORKERS = int(decouple_config('QR_RENDER_WORKERS', default='1'))
     
     def validate_config(self) -> bool:
         """
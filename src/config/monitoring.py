@@ -3,9 +3,12 @@
 """
 
 import os
+import re
 import logging
 from typing import Dict, Any, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+from utils.pattern_scanner import PatternScanner
 
 @dataclass
 class MonitoringConfig:
@@ -106,6 +109,9 @@ class SecurityConfig:
     dangerous_patterns: list = None
     blocked_extensions: list = None
     
+    # Все dangerous_patterns одним выражением (собирается в __post_init__)
+    dangerous_scanner: PatternScanner = field(default=None, init=False, repr=False, compare=False)
+    
     def __post_init__(self):
         if self.dangerous_patterns is None:
             self.dangerous_patterns = [
@@ -131,6 +137,12 @@ class SecurityConfig:
                 '.exe', '.bat', '.cmd', '.com', '.pif', '.scr',
                 '.vbs', '.js', '.jar', '.sh', '.ps1', '.py'
             ]
+        
+        # DOTALL: <script>...</script> может занимать несколько строк
+        self.dangerous_scanner = PatternScanner(
+            [(pattern, pattern) for pattern in self.dangerous_patterns],
+            flags=re.IGNORECASE | re.DOTALL
+        )
     
     @classmethod
     def from_env(cls) -> 'SecurityConfig':
@@ -218,47 +230,19 @@ def setup_sentry(config: MonitoringConfig) -> None:
         )
 
 def setup_prometheus(config: MonitoringConfig) -> Optional[Any]:
-    """Настройка Prometheus метрик"""
+    """
+    Запуск экспорта метрик Prometheus на prometheus_port
+    
+    Returns:
+        HTTP сервер метрик или None, если экспорт выключен или порт занят
+    """
     if not config.prometheus_enabled:
         return None
     
+    from utils.metrics import start_metrics_server
+    
     try:
-        from prometheus_client import start_http_server, Counter, Histogram, Gauge
-        
-        # Метрики
-        request_count = Counter(
-            'bot_requests_total',
-            'Total number of requests',
-            ['method', 'endpoint', 'status']
-        )
-        
-        request_duration = Histogram(
-            'bot_request_duration_seconds',
-            'Request duration in seconds',
-            ['method', 'endpoint']
-        )
-        
-        active_users = Gauge(
-            'bot_active_users',
-            'Number of active users'
-        )
-        
-        error_count = Counter(
-            'bot_errors_total',
-            'Total number of errors',
-            ['error_type', 'error_code']
-        )
-        
-        # Запуск HTTP сервера для метрик
-        start_http_server(config.prometheus_port)
-        
-        return {
-            'request_count': request_count,
-            'request_duration': request_duration,
-            'active_users': active_users,
-            'error_count': error_count
-        }
-        
-    except ImportError:
-        logging.warning("Prometheus client не установлен, метрики отключены")
-        return None
\ No newline at end of file
+        return start_metrics_server(config.prometheus_port)
+    except OSError as e:
+        logging.warning(f"Не удалось запустить сервер метрик на порту {config.prometheus_port}: {e}")
+        return None
@@ -4,11 +4,13 @@
 """
 
 import logging
-import time
+import os
 import asyncio
 from typing import Optional, List, Dict, Any
 from enum import Enum
 
+from utils.media_registry import get_media_registry
+
 logger = logging.getLogger(__name__)
 
 class AnimationType(Enum):
@@ -27,6 +29,7 @@ class StickerService:
         self.bot = bot
         # Временно отключаем стикеры из-за неправильных ID
         # В реальной версии нужно использовать валидные ID стикеров
+        # или пути к файлам стикеров (загружаются один раз через реестр медиа)
         self.stickers = {
             'loading': [],  # Пустой список - стикеры отключены
             'success': [],
@@ -54,7 +57,7 @@ class StickerService:
             return self.stickers[category][index]
         return None
     
-    def send_sticker(self, chat_id: int, category: str, index: int = 0) -> bool:
+    async def send_sticker(self, chat_id: int, category: str, index: int = 0) -> bool:
         """Отправить стикер"""
         if not self.bot:
             logger.warning("Бот не установлен, стикер не отправлен")
@@ -74,19 +77,26 @@ class StickerService:
             }
             emoji = emoji_map.get(category, '📱')
             try:
-                self.bot.send_message(chat_id, emoji)
+                await self.bot.send_message(chat_id, emoji)
                 return True
             except Exception as e:
                 logger.error(f"Ошибка отправки эмодзи: {e}")
                 return False
         
         try:
-            self.bot.send_sticker(chat_id, sticker_id)
+            if os.path.isfile(sticker_id):
+                return await self._send_sticker_file(chat_id, sticker_id)
+            await self.bot.send_sticker(chat_id, sticker_id)
             return True
         except Exception as e:
             logger.error(f"Ошибка отправки стикера: {e}")
             return False
     
+    async def _send_sticker_file(self, chat_id: int, path: str) -> bool:
+        """Отправить стикер из локального файла: загрузка один раз, дальше по file_id"""
+        await get_media_registry().send_cached_sticker(self.bot, chat_id, path)
+        return True
+    
     def create_progress_bar(self, current: int, total: int, width: int = 10) -> str:
         """Создать прогресс-бар из эмодзи"""
         if total <= 0:
@@ -100,7 +110,7 @@ class StickerService:
         
         return f"{bar} {percentage}%"
     
-    def create_loading_animation(self, chat_id: int, steps: List[Dict[str, Any]], 
+    async def create_loading_animation(self, chat_id: int, steps: List[Dict[str, Any]], 
                                delay: float = 1.0) -> List[int]:
         """Создать анимацию загрузки с несколькими шагами"""
         if not self.bot:
@@ -113,8 +123,8 @@ class StickerService:
             for i, step in enumerate(steps):
                 # Отправляем стикер если указан
                 if step.get('sticker'):
-                    self.send_sticker(chat_id, step['sticker'])
-                    time.sleep(0.5)
+                    await self.send_sticker(chat_id, step['sticker'])
+                    await asyncio.sleep(0.5)
                 
                 # Отправляем текстовое сообщение
                 text = step.get('text', '')
@@ -125,12 +135,12 @@ class StickerService:
                     )
                     text = f"{text}\n\n{progress}"
                 
-                message = self.bot.send_message(chat_id, text, parse_mode='HTML')
+                message = await self.bot.send_message(chat_id, text, parse_mode='HTML')
                 message_ids.append(message.message_id)
                 
                 # Задержка между шагами
                 if i < len(steps) - 1:  # Не ждем после последнего шага
-                    time.sleep(delay)
+                    await asyncio.sleep(delay)
             
             return message_ids
             
@@ -138,7 +148,7 @@ class StickerService:
             logger.error(f"Ошибка создания анимации загрузки: {e}")
             return []
     
-    def animate_creation_process(self, chat_id: int, username: str) -> List[int]:
+    async def animate_creation_process(self, chat_id: int, username: str) -> List[int]:
         """Анимировать процесс создания пользователя"""
         steps = [
             {
@@ -163,9 +173,9 @@ class StickerService:
             }
         ]
         
-        return self.create_loading_animation(chat_id, steps, delay=1.5)
+        return await self.create_loading_animation(chat_id, steps, delay=1.5)
     
-    def animate_payment_process(self, chat_id: int, amount: float) -> List[int]:
+    async def animate_payment_process(self, chat_id: int, amount: float) -> List[int]:
         """Анимировать процесс платежа"""
         steps = [
             {
@@ -182,9 +192,9 @@ class StickerService:
             }
         ]
         
-        return self.create_loading_animation(chat_id, steps, delay=1.0)
+        return await self.create_loading_animation(chat_id, steps, delay=1.0)
     
-    def animate_subscription_activation(self, chat_id: int, days: int) -> List[int]:
+    async def animate_subscription_activation(self, chat_id: int, days: int) -> List[int]:
         """Анимировать активацию подписки"""
         steps = [
             {
@@ -201,9 +211,9 @@ class StickerService:
             }
         ]
         
-        return self.create_loading_animation(chat_id, steps, delay=1.2)
+        return await self.create_loading_animation(chat_id, steps, delay=1.2)
     
-    def send_celebration(self, chat_id: int, message: str = "🎉 Поздравляем!") -> bool:
+    async def send_celebration(self, chat_id: int, message: str = "🎉 Поздравляем!") -> bool:
         """Отправить праздничное сообщение со стикерами"""
         if not self.bot:
             return False
@@ -211,28 +221,28 @@ class StickerService:
         try:
             # Отправляем несколько праздничных стикеров
             for i in range(3):
-                self.send_sticker(chat_id, 'celebration', i % 2)
-                time.sleep(0.3)
+                await self.send_sticker(chat_id, 'celebration', i % 2)
+                await asyncio.sleep(0.3)
             
             # Отправляем текстовое сообщение
-            self.bot.send_message(chat_id, message, parse_mode='HTML')
+            await self.bot.send_message(chat_id, message, parse_mode='HTML')
             return True
             
         except Exception as e:
             logger.error(f"Ошибка отправки празднования: {e}")
             return False
     
-    def send_error_animation(self, chat_id: int, error_message: str) -> bool:
+    async def send_error_animation(self, chat_id: int, error_message: str) -> bool:
         """Отправить анимацию ошибки"""
         if not self.bot:
             return False
         
         try:
             # Отправляем стикер ошибки
-            self.send_sticker(chat_id, 'error')
+            await self.send_sticker(chat_id, 'error')
             
             # Отправляем сообщение об ошибке
-            self.bot.send_message(
+            await self.bot.send_message(
                 chat_id, 
                 f"❌ <b>Ошибка</b>\n\n{error_message}", 
                 parse_mode='HTML'
@@ -10,6 +10,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import json
 
+from utils.depletion_schedule import DepletionSchedule
 from ..config import config
 from .marzban_service import MarzbanService
 from .user_service import UserService
@@ -25,7 +26,41 @@ class DailyPaymentService:
         self.daily_cost = 4  # Стоимость дня в рублях
         self.is_running = False
         self.thread = None
+        # Предупреждения о низком балансе: пересчитываются при изменении баланса, а не обходом всех пользователей
+        self.low_balance = DepletionSchedule(self.daily_cost)
+        # Расписание меняют поток проверки и обработчики бота
+        self._schedule_lock = threading.Lock()
+        self.load_balances()
+        self.user_service.add_balance_listener(self.track_balance)
         
+    def load_balances(self):
+        """Построить расписание предупреждений по всем пользователям (при запуске)"""
+        for telegram_id, user_data in self.user_service.get_all_user_data().items():
+            with self._schedule_lock:
+                if user_data.get('low_balance_warned'):
+                    self.low_balance.mark_warned(telegram_id)
+            self.track_balance(telegram_id, user_data)
+        logger.info(f"Предупреждений о низком балансе в расписании: {len(self.low_balance)}")
+    
+    def track_balance(self, telegram_id: int, user_data: Dict):
+        """
+        Пересчитать прогноз после пополнения, списания или активации подписки
+        
+        Args:
+            telegram_id: ID пользователя
+            user_data: Данные пользователя из UserService
+        """
+        with self._schedule_lock:
+            self.low_balance.update(
+                telegram_id,
+                user_data.get('balance_rub', 0),
+                active=user_data.get('subscription_active', False)
+            )
+            rearmed = user_data.get('low_balance_warned') and not self.low_balance.is_warned(telegram_id)
+        if rearmed:
+            # Баланс пополнен: следующий эпизод низкого баланса предупреждаем заново
+            self.user_service.update_user_record(telegram_id, {'low_balance_warned': False})
+    
     def start_daily_checker(self):
         """Запустить ежедневную проверку баланса"""
         if self.is_running:
@@ -55,6 +90,9 @@ class DailyPaymentService:
                 if now.hour == 0 and now.minute < 5:  # Проверяем в течение первых 5 минут после полуночи
                     self._process_daily_payments()
                 
+                # Предупреждения, срок которых подошел (обычно пусто)
+                self.check_low_balance_users()
+                
                 # Спим до следующей проверки (каждые 5 минут)
                 time.sleep(300)  # 5 минут
                 
@@ -140,6 +178,8 @@ class DailyPaymentService:
                 # Списываем средства
                 new_balance = balance - self.daily_cost
                 self.user_service.update_user_balance(telegram_id, new_balance)
+                # Списание идет только с подключенных: отмечаем подписку (обновит и расписание)
+                self.user_service.update_user_record(telegram_id, {'subscription_active': True})
                 
                 # Продлеваем подписку на 1 день
                 self._extend_subscription(username, 1)
@@ -152,6 +192,7 @@ class DailyPaymentService:
                 
             else:
                 # Недостаточно средств - приостанавливаем подписку
+                self.user_service.update_user_record(telegram_id, {'subscription_active': False})
                 self._suspend_subscription(username)
                 
                 # Отправляем уведомление о приостановке
@@ -236,90 +277,35 @@ class DailyPaymentService:
         except Exception as e:
             logger.error(f"Ошибка отправки уведомления для {telegram_id}: {e}")
     
-    def check_low_balance_users(self):
-        """Проверить пользователей с низким балансом и отправить уведомления"""
-        logger.info("Проверяем пользователей с низким балансом")
-        
-        try:
-            # Получаем всех пользователей из Marzban
-            all_users = self.marzban_service.get_all_users()
-            if not all_users:
-                return
-            
-            low_balance_count = 0
-            
-            for user_data in all_users:
-                try:
-                    username = user_data.get('username')
-                    if not username:
-                        continue
-                    
-                    # Находим telegram_id
-                    telegram_id = self._find_telegram_id_by_username(username)
-                    if not telegram_id:
-                        continue
-                    
-                    # Получаем статистику пользователя
-                    user_stats = self.user_service.get_user_stats(telegram_id)
-                    balance = user_stats.get('balance', 0)
-                    
-                    # Проверяем, нужно ли отправить уведомление
-                    if self._should_send_low_balance_notification(telegram_id, balance):
-                        self._send_low_balance_notification(telegram_id, balance)
-                        low_balance_count += 1
-                        
-                except Exception as e:
-                    logger.error(f"Ошибка проверки баланса для {username}: {e}")
-            
-            logger.info(f"Отправлено {low_balance_count} уведомлений о низком балансе")
-            
-        except Exception as e:
-            logger.error(f"Ошибка проверки пользователей с низким балансом: {e}")
+    def set_daily_cost(self, daily_cost: float):
+        """Изменить стоимость дня и пересчитать расписание предупреждений"""
+        self.daily_cost = daily_cost
+        with self._schedule_lock:
+            self.low_balance.set_daily_cost(daily_cost)
     
-    def _should_send_low_balance_notification(self, telegram_id: int, balance: float) -> bool:
-        """Проверить, нужно ли отправить уведомление о низком балансе"""
+    def check_low_balance_users(self):
+        """Отправить предупреждения о низком балансе, срок которых подошел"""
         try:
-            # Проверяем, отправляли ли уже уведомление сегодня
-            today = datetime.now().date().isoformat()
-            
-            # Читаем файл данных пользователей
-            with open(config.DATA_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            with self._schedule_lock:
+                due = self.low_balance.pop_due()
+            for warning in due:
+                self._send_low_balance_notification(warning.user_id, warning.balance)
             
-            users = data.get('users', {})
-            user_info = users.get(str(telegram_id), {})
-            last_notification = user_info.get('last_low_balance_notification')
-            
-            # Если уведомление уже отправлялось сегодня, не отправляем повторно
-            if last_notification == today:
-                return False
-            
-            # Отправляем уведомление, если баланс меньше 4 рублей (1 день)
-            return balance < self.daily_cost
+            if due:
+                logger.info(f"Отправлено {len(due)} уведомлений о низком балансе")
             
         except Exception as e:
-            logger.error(f"Ошибка проверки необходимости уведомления для {telegram_id}: {e}")
-            return False
+            logger.error(f"Ошибка отправки уведомлений о низком балансе: {e}")
     
     def _send_low_balance_notification(self, telegram_id: int, balance: float):
         """Отправить уведомление о низком балансе"""
         try:
-            # Обновляем дату последнего уведомления
+            # Флаг в записи пользователя: после перезапуска предупреждение не повторится
             today = datetime.now().date().isoformat()
-            
-            with open(config.DATA_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            if 'users' not in data:
-                data['users'] = {}
-            
-            if str(telegram_id) not in data['users']:
-                data['users'][str(telegram_id)] = {}
-            
-            data['users'][str(telegram_id)]['last_low_balance_notification'] = today
-            
-            with open(config.DATA_FILE, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.user_service.update_user_record(telegram_id, {
+                'low_balance_warned': True,
+                'last_low_balance_notification': today,
+            })
             
             # Логируем уведомление (здесь должна быть отправка через Telegram)
             logger.info(f"Уведомление о низком балансе для {telegram_id}: баланс {balance} руб.")
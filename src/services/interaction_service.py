@@ -3,32 +3,53 @@
 Сервис для микровзаимодействий и обратной связи
 """
 
+import asyncio
 import logging
-import time
-from typing import Optional, Dict, Any, List
-from telebot import types
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List, AsyncIterator
+
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+
+from utils.send_queue import is_governed
 
 logger = logging.getLogger(__name__)
 
+# Telegram показывает действие чата около 5 секунд: чаще отправлять незачем
+CHAT_ACTION_INTERVAL = 5.0
+
+# Отметки давно неактивных чатов чистятся, когда их становится больше
+CHAT_ACTION_STATES_LIMIT = 10000
+
 class InteractionService:
     """Сервис для микровзаимодействий и обратной связи"""
     
     def __init__(self, bot=None):
-        self.bot = bot
+        self.bot = None
         self.pending_actions = {}  # Хранение ожидающих действий
+        self._last_action: Dict[int, float] = {}  # chat_id -> время последнего действия чата
+        self._typing: Dict[int, asyncio.Task] = {}  # chat_id -> задача индикатора печати
+        self.set_bot(bot)
     
     def set_bot(self, bot):
         """Установить экземпляр бота"""
         self.bot = bot
+        if bot is not None and self._stop_typing_on_reply not in bot.session.middleware:
+            # Индикатор печати гаснет, как только в чат уходит настоящий ответ
+            bot.session.middleware(self._stop_typing_on_reply)
+    
+    async def _stop_typing_on_reply(self, make_request, bot, method):
+        if is_governed(method):
+            self.stop_typing(method.chat_id)
+        return await make_request(bot, method)
     
-    def answer_callback_query(self, callback_query_id: str, text: str = None, 
+    async def answer_callback_query(self, callback_query_id: str, text: str = None, 
                             show_alert: bool = False, url: str = None) -> bool:
         """Ответить на callback query с улучшенной обратной связью"""
         if not self.bot:
             return False
         
         try:
-            self.bot.answer_callback_query(
+            await self.bot.answer_callback_query(
                 callback_query_id=callback_query_id,
                 text=text,
                 show_alert=show_alert,
@@ -39,81 +60,138 @@ class InteractionService:
             logger.error(f"Ошибка ответа на callback query: {e}")
             return False
     
-    def show_loading_feedback(self, callback_query_id: str, action: str = "Загрузка...") -> bool:
+    async def show_loading_feedback(self, callback_query_id: str, action: str = "Загрузка...") -> bool:
         """Показать обратную связь о загрузке"""
-        return self.answer_callback_query(
+        return await self.answer_callback_query(
             callback_query_id=callback_query_id,
             text=f"🔄 {action}",
             show_alert=False
         )
     
-    def show_success_feedback(self, callback_query_id: str, message: str = "Готово!") -> bool:
+    async def show_success_feedback(self, callback_query_id: str, message: str = "Готово!") -> bool:
         """Показать обратную связь об успехе"""
-        return self.answer_callback_query(
+        return await self.answer_callback_query(
             callback_query_id=callback_query_id,
             text=f"✅ {message}",
             show_alert=False
         )
     
-    def show_error_feedback(self, callback_query_id: str, message: str = "Ошибка!") -> bool:
+    async def show_error_feedback(self, callback_query_id: str, message: str = "Ошибка!") -> bool:
         """Показать обратную связь об ошибке"""
-        return self.answer_callback_query(
+        return await self.answer_callback_query(
             callback_query_id=callback_query_id,
             text=f"❌ {message}",
             show_alert=True
         )
     
-    def show_warning_feedback(self, callback_query_id: str, message: str = "Внимание!") -> bool:
+    async def show_warning_feedback(self, callback_query_id: str, message: str = "Внимание!") -> bool:
         """Показать обратную связь с предупреждением"""
-        return self.answer_callback_query(
+        return await self.answer_callback_query(
             callback_query_id=callback_query_id,
             text=f"⚠️ {message}",
             show_alert=True
         )
     
-    def show_info_feedback(self, callback_query_id: str, message: str = "Информация") -> bool:
+    async def show_info_feedback(self, callback_query_id: str, message: str = "Информация") -> bool:
         """Показать информационную обратную связь"""
-        return self.answer_callback_query(
+        return await self.answer_callback_query(
             callback_query_id=callback_query_id,
             text=f"ℹ️ {message}",
             show_alert=False
         )
     
-    def create_typing_indicator(self, chat_id: int, duration: float = 2.0) -> bool:
-        """Показать индикатор печати"""
+    async def send_chat_action(self, chat_id: int, action: str = 'typing') -> bool:
+        """Отправить действие чата не чаще раза в CHAT_ACTION_INTERVAL"""
         if not self.bot:
             return False
         
+        now = asyncio.get_running_loop().time()
+        last = self._last_action.get(chat_id)
+        if last is not None and now - last < CHAT_ACTION_INTERVAL:
+            return False
+        
+        if len(self._last_action) >= CHAT_ACTION_STATES_LIMIT:
+            self._last_action = {
+                chat: sent for chat, sent in self._last_action.items() if now - sent < CHAT_ACTION_INTERVAL
+            }
+        self._last_action[chat_id] = now
+        await self.bot.send_chat_action(chat_id=chat_id, action=action)
+        return True
+    
+    def create_typing_indicator(self, chat_id: int, duration: Optional[float] = None,
+                              action: str = 'typing') -> Optional[asyncio.Task]:
+        """
+        Показывать индикатор печати в фоне
+        
+        Индикатор держится, пока в чат не уйдет ответ, не вызван stop_typing
+        или не прошло duration секунд (None - без ограничения).
+        """
+        if not self.bot:
+            return None
+        
+        self.stop_typing(chat_id)
+        task = asyncio.get_running_loop().create_task(self._keep_typing(chat_id, action, duration))
+        self._typing[chat_id] = task
+        return task
+    
+    def stop_typing(self, chat_id: int):
+        """Погасить индикатор печати"""
+        task = self._typing.pop(chat_id, None)
+        if task is not None:
+            task.cancel()
+    
+    @asynccontextmanager
+    async def typing(self, chat_id: int, action: str = 'typing') -> AsyncIterator[None]:
+        """Индикатор печати на время блока"""
+        self.create_typing_indicator(chat_id, action=action)
         try:
-            self.bot.send_chat_action(chat_id, 'typing')
-            time.sleep(duration)
-            return True
+            yield
+        finally:
+            self.stop_typing(chat_id)
+    
+    async def _keep_typing(self, chat_id: int, action: str, duration: Optional[float]):
+        loop = asyncio.get_running_loop()
+        deadline = None if duration is None else loop.time() + duration
+        try:
+            while deadline is None or loop.time() < deadline:
+                await self.send_chat_action(chat_id, action)
+                # Следующее действие - когда погаснет текущее
+                wait = CHAT_ACTION_INTERVAL - (loop.time() - self._last_action[chat_id])
+                if deadline is not None:
+                    wait = min(wait, deadline - loop.time())
+                await asyncio.sleep(max(wait, 0.0))
         except Exception as e:
             logger.error(f"Ошибка показа индикатора печати: {e}")
-            return False
+        finally:
+            if self._typing.get(chat_id) is asyncio.current_task():
+                del self._typing[chat_id]
+    
+    @staticmethod
+    def _progress_text(text: str, progress: int, total: int) -> str:
+        # Создаем прогресс-бар
+        if total > 0:
+            percentage = int((progress / total) * 100)
+            bar_length = 10
+            filled = int((progress / total) * bar_length)
+            empty = bar_length - filled
+            
+            progress_bar = "⬛" * filled + "⬜" * empty
+            progress_text = f"\n\n{progress_bar} {percentage}%"
+        else:
+            progress_text = ""
+        
+        return f"🔄 {text}{progress_text}"
     
-    def create_loading_message(self, chat_id: int, text: str, 
+    async def create_loading_message(self, chat_id: int, text: str, 
                              progress: int = 0, total: int = 100) -> Optional[int]:
         """Создать сообщение загрузки с прогрессом"""
         if not self.bot:
             return None
         
         try:
-            # Создаем прогресс-бар
-            if total > 0:
-                percentage = int((progress / total) * 100)
-                bar_length = 10
-                filled = int((progress / total) * bar_length)
-                empty = bar_length - filled
-                
-                progress_bar = "⬛" * filled + "⬜" * empty
-                progress_text = f"\n\n{progress_bar} {percentage}%"
-            else:
-                progress_text = ""
-            
-            message_text = f"🔄 {text}{progress_text}"
+            message_text = self._progress_text(text, progress, total)
             
-            message = self.bot.send_message(
+            message = await self.bot.send_message(
                 chat_id=chat_id,
                 text=message_text,
                 parse_mode='HTML'
@@ -125,28 +203,16 @@ class InteractionService:
             logger.error(f"Ошибка создания сообщения загрузки: {e}")
             return None
     
-    def update_loading_message(self, chat_id: int, message_id: int, text: str,
+    async def update_loading_message(self, chat_id: int, message_id: int, text: str,
                               progress: int = 0, total: int = 100) -> bool:
         """Обновить сообщение загрузки"""
         if not self.bot:
             return False
         
         try:
-            # Создаем прогресс-бар
-            if total > 0:
-                percentage = int((progress / total) * 100)
-                bar_length = 10
-                filled = int((progress / total) * bar_length)
-                empty = bar_length - filled
-                
-                progress_bar = "⬛" * filled + "⬜" * empty
-                progress_text = f"\n\n{progress_bar} {percentage}%"
-            else:
-                progress_text = ""
-            
-            message_text = f"🔄 {text}{progress_text}"
+            message_text = self._progress_text(text, progress, total)
             
-            self.bot.edit_message_text(
+            await self.bot.edit_message_text(
                 chat_id=chat_id,
                 message_id=message_id,
                 text=message_text,
@@ -159,29 +225,19 @@ class InteractionService:
             logger.error(f"Ошибка обновления сообщения загрузки: {e}")
             return False
     
-    def create_confirmation_dialog(self, chat_id: int, title: str, message: str,
+    async def create_confirmation_dialog(self, chat_id: int, title: str, message: str,
                                  confirm_action: str, cancel_action: str = "cancel") -> bool:
         """Создать диалог подтверждения"""
         if not self.bot:
             return False
         
         try:
-            keyboard = types.InlineKeyboardMarkup(row_width=2)
-            
-            keyboard.add(
-                types.InlineKeyboardButton(
-                    "✅ Подтвердить", 
-                    callback_data=f"confirm_{confirm_action}",
-                    color_indicator="🟢"
-                ),
-                types.InlineKeyboardButton(
-                    "❌ Отмена", 
-                    callback_data=f"cancel_{cancel_action}",
-                    color_indicator="🔴"
-                )
-            )
+            keyboard = InlineKeyboardMarkup(inline_keyboard=[[
+                InlineKeyboardButton(text="✅ Подтвердить", callback_data=f"confirm_{confirm_action}"),
+                InlineKeyboardButton(text="❌ Отмена", callback_data=f"cancel_{cancel_action}")
+            ]])
             
-            self.bot.send_message(
+            await self.bot.send_message(
                 chat_id=chat_id,
                 text=f"⚠️ <b>{title}</b>\n\n{message}",
                 parse_mode='HTML',
@@ -194,7 +250,7 @@ class InteractionService:
             logger.error(f"Ошибка создания диалога подтверждения: {e}")
             return False
     
-    def create_success_animation(self, chat_id: int, message: str) -> bool:
+    async def create_success_animation(self, chat_id: int, message: str) -> bool:
         """Создать анимацию успеха"""
         if not self.bot:
             return False
@@ -210,10 +266,10 @@ class InteractionService:
             
             for i, msg in enumerate(messages):
                 if i < len(messages) - 1:
-                    self.bot.send_message(chat_id, msg)
-                    time.sleep(0.5)
+                    await self.bot.send_message(chat_id, msg)
+                    await asyncio.sleep(0.5)
                 else:
-                    self.bot.send_message(chat_id, msg, parse_mode='HTML')
+                    await self.bot.send_message(chat_id, msg, parse_mode='HTML')
             
             return True
             
@@ -221,7 +277,7 @@ class InteractionService:
             logger.error(f"Ошибка создания анимации успеха: {e}")
             return False
     
-    def create_error_animation(self, chat_id: int, message: str) -> bool:
+    async def create_error_animation(self, chat_id: int, message: str) -> bool:
         """Создать анимацию ошибки"""
         if not self.bot:
             return False
@@ -236,10 +292,10 @@ class InteractionService:
             
             for i, msg in enumerate(messages):
                 if i < len(messages) - 1:
-                    self.bot.send_message(chat_id, msg)
-                    time.sleep(0.3)
+                    await self.bot.send_message(chat_id, msg)
+                    await asyncio.sleep(0.3)
                 else:
-                    self.bot.send_message(chat_id, msg, parse_mode='HTML')
+                    await self.bot.send_message(chat_id, msg, parse_mode='HTML')
             
             return True
             
@@ -247,7 +303,7 @@ class InteractionService:
             logger.error(f"Ошибка создания анимации ошибки: {e}")
             return False
     
-    def create_celebration_animation(self, chat_id: int, message: str) -> bool:
+    async def create_celebration_animation(self, chat_id: int, message: str) -> bool:
         """Создать праздничную анимацию"""
         if not self.bot:
             return False
@@ -265,10 +321,10 @@ class InteractionService:
             
             for i, msg in enumerate(messages):
                 if i < len(messages) - 1:
-                    self.bot.send_message(chat_id, msg)
-                    time.sleep(0.4)
+                    await self.bot.send_message(chat_id, msg)
+                    await asyncio.sleep(0.4)
                 else:
-                    self.bot.send_message(chat_id, msg, parse_mode='HTML')
+                    await self.bot.send_message(chat_id, msg, parse_mode='HTML')
             
             return True
             
@@ -276,7 +332,7 @@ class InteractionService:
             logger.error(f"Ошибка создания праздничной анимации: {e}")
             return False
     
-    def create_loading_sequence(self, chat_id: int, steps: List[Dict[str, Any]], 
+    async def create_loading_sequence(self, chat_id: int, steps: List[Dict[str, Any]], 
                                delay: float = 1.0) -> List[int]:
         """Создать последовательность загрузки"""
         if not self.bot:
@@ -287,7 +343,7 @@ class InteractionService:
         try:
             for i, step in enumerate(steps):
                 # Создаем сообщение загрузки
-                message_id = self.create_loading_message(
+                message_id = await self.create_loading_message(
                     chat_id=chat_id,
                     text=step.get('text', 'Загрузка...'),
                     progress=step.get('progress', 0),
@@ -299,7 +355,7 @@ class InteractionService:
                 
                 # Задержка между шагами
                 if i < len(steps) - 1:
-                    time.sleep(delay)
+                    await asyncio.sleep(delay)
             
             return message_ids
             
@@ -307,7 +363,7 @@ class InteractionService:
             logger.error(f"Ошибка создания последовательности загрузки: {e}")
             return []
     
-    def cleanup_messages(self, chat_id: int, message_ids: List[int]) -> bool:
+    async def cleanup_messages(self, chat_id: int, message_ids: List[int]) -> bool:
         """Удалить сообщения (очистка после анимации)"""
         if not self.bot:
             return False
@@ -315,7 +371,7 @@ class InteractionService:
         try:
             for message_id in message_ids:
                 try:
-                    self.bot.delete_message(chat_id, message_id)
+                    await self.bot.delete_message(chat_id, message_id)
                 except Exception as e:
                     logger.warning(f"Не удалось удалить сообщение {message_id}: {e}")
             
@@ -6,12 +6,14 @@
 import requests
 import json
 import logging
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List
 import urllib3
 from urllib3.exceptions import InsecureRequestWarning
 
 from ..config import config
+from utils.metrics import observe_marzban
 
 logger = logging.getLogger(__name__)
 
@@ -42,9 +44,15 @@ class MarzbanService:
         """Безопасный запрос к API с обработкой ошибок"""
         url = f"{self.api_url}{endpoint}"
         
+        start_time = time.perf_counter()
         try:
             logger.debug(f"Выполняем запрос: {method} {url}")
-            response = self.session.request(method, url, **kwargs)
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except Exception as e:
+                observe_marzban("legacy", method, endpoint, type(e).__name__, time.perf_counter() - start_time)
+                raise
+            observe_marzban("legacy", method, endpoint, str(response.status_code), time.perf_counter() - start_time)
             
             # Логируем запрос для отладки
             logger.debug(f"{method} {url} - Status: {response.status_code}")
@@ -3,10 +3,13 @@
 Сервис для отправки уведомлений пользователям
 """
 
+import asyncio
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Set
 from datetime import datetime, timedelta
 
+from utils.send_queue import Lane, send_lane
+
 logger = logging.getLogger(__name__)
 
 class NotificationService:
@@ -15,11 +18,30 @@ class NotificationService:
     def __init__(self, bot=None):
         self.bot = bot
         self.daily_cost = 4  # Стоимость дня в рублях
+        self._tasks: Set[asyncio.Task] = set()
     
     def set_bot(self, bot):
         """Установить экземпляр бота для отправки сообщений"""
         self.bot = bot
     
+    def _send(self, telegram_id: int, text: str):
+        """
+        Поставить уведомление в очередь отправки бота
+        
+        Методы сервиса синхронные, а бот асинхронный: отправка идет
+        отдельной задачей с приоритетом уведомлений.
+        """
+        task = asyncio.get_running_loop().create_task(self._deliver(telegram_id, text))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _deliver(self, telegram_id: int, text: str):
+        try:
+            with send_lane(Lane.NOTIFICATION):
+                await self.bot.send_message(chat_id=telegram_id, text=text, parse_mode='HTML')
+        except Exception as e:
+            logger.error(f"Ошибка доставки уведомления пользователю {telegram_id}: {e}")
+    
     def send_payment_notification(self, telegram_id: int, amount: float, balance: float, action: str):
         """Отправить уведомление о платеже"""
         if not self.bot:
@@ -50,11 +72,7 @@ class NotificationService:
             else:
                 return False
             
-            self.bot.send_message(
-                chat_id=telegram_id,
-                text=text,
-                parse_mode='HTML'
-            )
+            self._send(telegram_id, text)
             
             logger.info(f"Уведомление о платеже отправлено пользователю {telegram_id}")
             return True
@@ -100,11 +118,7 @@ class NotificationService:
 Пополните баланс заранее для бесперебойной работы VPN.
 """
             
-            self.bot.send_message(
-                chat_id=telegram_id,
-                text=text,
-                parse_mode='HTML'
-            )
+            self._send(telegram_id, text)
             
             logger.info(f"Уведомление о низком балансе отправлено пользователю {telegram_id}")
             return True
@@ -129,11 +143,7 @@ class NotificationService:
 Добро пожаловать обратно! 🎉
 """
             
-            self.bot.send_message(
-                chat_id=telegram_id,
-                text=text,
-                parse_mode='HTML'
-            )
+            self._send(telegram_id, text)
             
             logger.info(f"Уведомление о возобновлении подписки отправлено пользователю {telegram_id}")
             return True
@@ -162,11 +172,7 @@ class NotificationService:
 Наслаждайтесь быстрым и безопасным VPN! 🚀
 """
             
-            self.bot.send_message(
-                chat_id=telegram_id,
-                text=text,
-                parse_mode='HTML'
-            )
+            self._send(telegram_id, text)
             
             logger.info(f"Уведомление о приветственном бонусе отправлено пользователю {telegram_id}")
             return True
@@ -12,6 +12,35 @@ from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 import json
 
+from utils.pattern_scanner import PatternScanner
+
+# Допустимые символы callback data (компилируется один раз)
+_CALLBACK_DATA_RE = re.compile(r'[a-zA-Z0-9_\-]+')
+
+# Паттерны SQL инъекций
+_SQL_PATTERNS = [
+    r'union\s+select',
+    r'drop\s+table',
+    r'delete\s+from',
+    r'insert\s+into',
+    r'update\s+set',
+    r'exec\s*\(',
+    r'execute\s*\(',
+]
+
+# Паттерны XSS
+_XSS_PATTERNS = [
+    r'<script[^>]*>',
+    r'javascript:',
+    r'on\w+\s*=',
+    r'<iframe[^>]*>',
+    r'<object[^>]*>',
+    r'<embed[^>]*>',
+]
+
+# Path traversal: ../ и ..\
+_PATH_TRAVERSAL_PATTERNS = [r'\.\./', r'\.\.\\']
+
 logger = logging.getLogger(__name__)
 
 class SecurityService:
@@ -48,6 +77,14 @@ class SecurityService:
             'bash', 'sh', 'cmd', 'powershell'
         ]
         
+        # Правила validate_input в порядке проверки, скомпилированные один раз
+        self._input_scanner = PatternScanner(
+            [(f'sql:{pattern}', pattern) for pattern in _SQL_PATTERNS]
+            + [(f'xss:{pattern}', pattern) for pattern in _XSS_PATTERNS]
+            + [(f'path:{pattern}', pattern) for pattern in _PATH_TRAVERSAL_PATTERNS]
+            + [(f'command:{cmd}', re.escape(cmd)) for cmd in self.dangerous_commands]
+        )
+        
         # Rate limiting
         self.rate_limits = {}
         self.max_requests_per_minute = 60
@@ -88,49 +125,21 @@ class SecurityService:
         if not input_data:
             return False
         
-        # Проверяем на SQL инъекции
-        sql_patterns = [
-            r'union\s+select',
-            r'drop\s+table',
-            r'delete\s+from',
-            r'insert\s+into',
-            r'update\s+set',
-            r'exec\s*\(',
-            r'execute\s*\(',
-        ]
-        
-        for pattern in sql_patterns:
-            if re.search(pattern, input_data, re.IGNORECASE):
-                logger.warning(f"Обнаружена SQL инъекция: {input_data[:50]}...")
-                return False
-        
-        # Проверяем на XSS
-        xss_patterns = [
-            r'<script[^>]*>',
-            r'javascript:',
-            r'on\w+\s*=',
-            r'<iframe[^>]*>',
-            r'<object[^>]*>',
-            r'<embed[^>]*>',
-        ]
-        
-        for pattern in xss_patterns:
-            if re.search(pattern, input_data, re.IGNORECASE):
-                logger.warning(f"Обнаружена XSS атака: {input_data[:50]}...")
-                return False
+        # SQL инъекции, XSS, path traversal и command injection - одним проходом
+        matched = self._input_scanner.scan(input_data)
+        if not matched:
+            return True
         
-        # Проверяем на path traversal
-        if '../' in input_data or '..\\' in input_data:
+        category, _, detail = matched[0].partition(':')
+        if category == 'sql':
+            logger.warning(f"Обнаружена SQL инъекция: {input_data[:50]}...")
+        elif category == 'xss':
+            logger.warning(f"Обнаружена XSS атака: {input_data[:50]}...")
+        elif category == 'path':
             logger.warning(f"Обнаружена path traversal атака: {input_data[:50]}...")
-            return False
-        
-        # Проверяем на command injection
-        for cmd in self.dangerous_commands:
-            if cmd in input_data.lower():
-                logger.warning(f"Обнаружена попытка выполнения команды: {cmd}")
-                return False
-        
-        return True
+        else:
+            logger.warning(f"Обнаружена попытка выполнения команды: {detail}")
+        return False
 
     def validate_callback_data(self, callback_data: str) -> bool:
         """Валидация callback data от Telegram"""
@@ -141,24 +150,11 @@ class SecurityService:
         if len(callback_data) > 64:
             return False
         
-        # Проверяем на допустимые символы
-        if not re.match(r'^[a-zA-Z0-9_\-]+$', callback_data):
+        # Проверяем на допустимые символы. Алфавит не содержит точек, двоеточий,
+        # "<" и "(", поэтому паттерны вроде "..", "<script", "eval(" через него не пройдут
+        if not _CALLBACK_DATA_RE.fullmatch(callback_data):
             return False
         
-        # Проверяем на подозрительные паттерны
-        suspicious_patterns = [
-            r'\.\.',
-            r'<script',
-            r'javascript:',
-            r'eval\(',
-            r'exec\(',
-        ]
-        
-        for pattern in suspicious_patterns:
-            if re.search(pattern, callback_data, re.IGNORECASE):
-                logger.warning(f"Подозрительный callback data: {callback_data}")
-                return False
-        
         return True
 
     def check_rate_limit(self, user_id: int, action: str = "general") -> bool:
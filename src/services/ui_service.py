@@ -5,7 +5,8 @@
 
 import logging
 from typing import List, Dict, Any, Optional, Tuple
-from telebot import types
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from aiogram.utils.keyboard import InlineKeyboardBuilder
 
 logger = logging.getLogger(__name__)
 
@@ -102,7 +103,7 @@ class UIService:
         }
     
     def create_button(self, text: str, callback_data: str = None, url: str = None, 
-                     emoji: str = None, color_indicator: str = None) -> types.InlineKeyboardButton:
+                     emoji: str = None, color_indicator: str = None) -> InlineKeyboardButton:
         """Создать кнопку с улучшенным дизайном"""
         # Добавляем эмодзи если указан
         if emoji:
@@ -118,24 +119,24 @@ class UIService:
         
         # Создаем кнопку
         if url:
-            return types.InlineKeyboardButton(button_text, url=url)
+            return InlineKeyboardButton(text=button_text, url=url)
         elif callback_data:
-            return types.InlineKeyboardButton(button_text, callback_data=callback_data)
+            return InlineKeyboardButton(text=button_text, callback_data=callback_data)
         else:
-            return types.InlineKeyboardButton(button_text, callback_data="noop")
+            return InlineKeyboardButton(text=button_text, callback_data="noop")
     
-    def create_main_menu_keyboard(self, user_stats: Dict, has_subscription: bool = False) -> types.InlineKeyboardMarkup:
+    def create_main_menu_keyboard(self, user_stats: Dict, has_subscription: bool = False) -> InlineKeyboardMarkup:
         """Создать главное меню с улучшенной навигацией"""
-        keyboard = types.InlineKeyboardMarkup(row_width=2)
+        keyboard = InlineKeyboardBuilder()
         
         # Группа подписок
         if has_subscription:
-            keyboard.add(
+            keyboard.row(
                 self.create_button("Мои подписки", "my_subscriptions", emoji="🟢"),
                 self.create_button("Продлить", "extend_subscription", emoji="⏰")
             )
         else:
-            keyboard.add(
+            keyboard.row(
                 self.create_button("Активировать", "activate_subscription", emoji="🟢"),
                 self.create_button("Мои подписки", "my_subscriptions", emoji="📋")
             )
@@ -144,138 +145,138 @@ class UIService:
         balance = user_stats.get('balance', 0)
         balance_emoji = "🚨" if balance < 4 else "⚠️" if balance < 12 else "💰"
         
-        keyboard.add(
+        keyboard.row(
             self.create_button("Баланс", "balance", emoji=balance_emoji),
             self.create_button("Пополнить", "top_up_balance", emoji="💳")
         )
         
         # Группа рефералов
-        keyboard.add(
+        keyboard.row(
             self.create_button("Пригласить друга", "invite_friend", emoji="👥"),
             self.create_button("Мои рефералы", "my_referrals", emoji="📊")
         )
         
         # Группа поддержки
-        keyboard.add(
+        keyboard.row(
             self.create_button("Помощь", "help", emoji="❓"),
             self.create_button("О сервисе", "about_service", emoji="ℹ️")
         )
         
-        return keyboard
+        return keyboard.as_markup()
     
-    def create_subscription_keyboard(self, subscription_info: Dict) -> types.InlineKeyboardMarkup:
+    def create_subscription_keyboard(self, subscription_info: Dict) -> InlineKeyboardMarkup:
         """Создать клавиатуру для управления подпиской"""
-        keyboard = types.InlineKeyboardMarkup(row_width=2)
+        keyboard = InlineKeyboardBuilder()
         
         status = subscription_info.get('status', 'inactive')
         
         if status == 'active':
             # Активная подписка
-            keyboard.add(
+            keyboard.row(
                 self.create_button("Продлить", "extend_subscription", emoji="⏰"),
                 self.create_button("Настройки", "subscription_settings", emoji="⚙️")
             )
-            keyboard.add(
+            keyboard.row(
                 self.create_button("Скопировать ссылку", "copy_subscription_link", emoji="📋"),
                 self.create_button("QR-код", "show_subscription_qr", emoji="📱")
             )
         else:
             # Неактивная подписка
-            keyboard.add(
+            keyboard.row(
                 self.create_button("Активировать", "activate_subscription", emoji="🟢"),
                 self.create_button("Пополнить баланс", "top_up_balance", emoji="💳")
             )
         
-        keyboard.add(
+        keyboard.row(
             self.create_button("Назад", "back_to_main", emoji="⬅️")
         )
         
-        return keyboard
+        return keyboard.as_markup()
     
-    def create_balance_keyboard(self, balance: float) -> types.InlineKeyboardMarkup:
+    def create_balance_keyboard(self, balance: float) -> InlineKeyboardMarkup:
         """Создать клавиатуру для управления балансом"""
-        keyboard = types.InlineKeyboardMarkup(row_width=2)
+        keyboard = InlineKeyboardBuilder()
         
         # Быстрые суммы для пополнения
         quick_amounts = [20, 50, 100, 200]  # 5, 12, 25, 50 дней
         
         for amount in quick_amounts:
             days = int(amount / 4)
-            keyboard.add(
+            keyboard.row(
                 self.create_button(f"{amount} ₽ ({days} дн.)", f"quick_top_up_{amount}", emoji="💳")
             )
         
-        keyboard.add(
+        keyboard.row(
             self.create_button("Другая сумма", "custom_top_up", emoji="✏️"),
             self.create_button("История платежей", "payment_history", emoji="📊")
         )
         
-        keyboard.add(
+        keyboard.row(
             self.create_button("Активировать купон", "activate_coupon", emoji="🎫")
         )
         
-        keyboard.add(
+        keyboard.row(
             self.create_button("Назад", "back_to_main", emoji="⬅️")
         )
         
-        return keyboard
+        return keyboard.as_markup()
     
-    def create_referral_keyboard(self, referral_link: str) -> types.InlineKeyboardMarkup:
+    def create_referral_keyboard(self, referral_link: str) -> InlineKeyboardMarkup:
         """Создать клавиатуру для реферальной системы"""
-        keyboard = types.InlineKeyboardMarkup(row_width=2)
+        keyboard = InlineKeyboardBuilder()
         
-        keyboard.add(
+        keyboard.row(
             self.create_button("Поделиться", "share_referral", emoji="📤"),
             self.create_button("QR-код", "show_referral_qr", emoji="📱")
         )
         
-        keyboard.add(
+        keyboard.row(
             self.create_button("Скопировать ссылку", "copy_referral_link", emoji="📋"),
             self.create_button("Статистика", "referral_stats", emoji="📊")
         )
         
-        keyboard.add(
+        keyboard.row(
             self.create_button("Назад", "back_to_main", emoji="⬅️")
         )
         
-        return keyboard
+        return keyboard.as_markup()
     
-    def create_copy_keyboard(self, text: str, copy_type: str) -> types.InlineKeyboardMarkup:
+    def create_copy_keyboard(self, text: str, copy_type: str) -> InlineKeyboardMarkup:
         """Создать клавиатуру для копирования текста"""
-        keyboard = types.InlineKeyboardMarkup(row_width=1)
+        keyboard = InlineKeyboardBuilder()
         
         # Кнопка копирования (отправляем текст в отдельном сообщении)
-        keyboard.add(
+        keyboard.row(
             self.create_button("📋 Скопировать", f"copy_{copy_type}", emoji="📋")
         )
         
         # Кнопка QR-кода
-        keyboard.add(
+        keyboard.row(
             self.create_button("📱 Показать QR-код", f"qr_{copy_type}", emoji="📱")
         )
         
-        keyboard.add(
+        keyboard.row(
             self.create_button("Назад", "back_to_previous", emoji="⬅️")
         )
         
-        return keyboard
+        return keyboard.as_markup()
     
     def create_confirmation_keyboard(self, action: str, confirm_text: str = "Подтвердить", 
-                                   cancel_text: str = "Отмена") -> types.InlineKeyboardMarkup:
+                                   cancel_text: str = "Отмена") -> InlineKeyboardMarkup:
         """Создать клавиатуру подтверждения"""
-        keyboard = types.InlineKeyboardMarkup(row_width=2)
+        keyboard = InlineKeyboardBuilder()
         
-        keyboard.add(
+        keyboard.row(
             self.create_button(confirm_text, f"confirm_{action}", emoji="✅", color_indicator="🟢"),
             self.create_button(cancel_text, f"cancel_{action}", emoji="❌", color_indicator="🔴")
         )
         
-        return keyboard
+        return keyboard.as_markup()
     
     def create_pagination_keyboard(self, current_page: int, total_pages: int, 
-                                 base_callback: str) -> types.InlineKeyboardMarkup:
+                                 base_callback: str) -> InlineKeyboardMarkup:
         """Создать клавиатуру пагинации"""
-        keyboard = types.InlineKeyboardMarkup(row_width=5)
+        keyboard = InlineKeyboardBuilder()
         
         # Кнопки навигации
         nav_buttons = []
@@ -309,9 +310,9 @@ class UIService:
                 self.create_button("⏭️", f"{base_callback}_page_{total_pages}")
             )
         
-        keyboard.add(*nav_buttons)
+        keyboard.row(*nav_buttons)
         
-        return keyboard
+        return keyboard.as_markup()
     
     def format_balance_message(self, balance: float, days_remaining: int) -> str:
         """Форматировать сообщение о балансе"""
@@ -376,7 +377,7 @@ class UIService:
         
         return f"🔄 {text}{progress_text}"
     
-    def create_button_with_emoji(self, text: str, callback_data: str, button_type: str = "info") -> types.InlineKeyboardButton:
+    def create_button_with_emoji(self, text: str, callback_data: str, button_type: str = "info") -> InlineKeyboardButton:
         """Создать кнопку с эмодзи"""
         emoji = self.button_emojis.get(button_type, "ℹ️")
-        return types.InlineKeyboardButton(f"{emoji} {text}", callback_data=callback_data)
\ No newline at end of file
+        return InlineKeyboardButton(text=f"{emoji} {text}", callback_data=callback_data)
\ No newline at end of file
@@ -7,7 +7,7 @@ import os
 import json
 import threading
 import logging
-from typing import Optional, Dict, List
+from typing import Callable, Optional, Dict, List
 from datetime import datetime
 
 from ..models.user import User
@@ -21,6 +21,8 @@ class UserService:
     def __init__(self):
         self.data_file = config.DATA_FILE
         self.data_lock = threading.Lock()
+        # Подписчики на изменения баланса и подписки (например, расписание предупреждений)
+        self._balance_listeners: List[Callable[[int, Dict], None]] = []
         self._load_data()
     
     def _load_data(self) -> Dict:
@@ -45,6 +47,23 @@ class UserService:
             logger.error(f"Ошибка сохранения данных: {e}")
             return False
     
+    def add_balance_listener(self, listener: Callable[[int, Dict], None]):
+        """
+        Подписаться на изменения баланса и подписки
+        
+        Args:
+            listener: Вызывается с (user_id, данные пользователя) после сохранения
+        """
+        self._balance_listeners.append(listener)
+    
+    def _notify_balance_change(self, user_id: int, user_data: Dict):
+        """Сообщить подписчикам об изменении (вызывается без data_lock)"""
+        for listener in self._balance_listeners:
+            try:
+                listener(user_id, dict(user_data))
+            except Exception as e:
+                logger.error(f"Ошибка обработчика изменения баланса: {e}")
+    
     def _sanitize_username(self, username: Optional[str], fallback_name: Optional[str]) -> str:
         """Нормализация username"""
         if username:
@@ -101,7 +120,11 @@ class UserService:
             user_data['updated_at'] = datetime.now().isoformat()
             
             # Сохраняем
-            return self._save_data(data)
+            success = self._save_data(data)
+        
+        if success:
+            self._notify_balance_change(user_id, user_data)
+        return success
     
     def credit_balance(self, user_id: int, amount_rub: int, reason: str = "") -> bool:
         """Зачисление средств на баланс"""
@@ -119,9 +142,11 @@ class UserService:
             user_data['updated_at'] = datetime.now().isoformat()
             
             success = self._save_data(data)
-            if success:
-                logger.info(f"Зачисление {amount_rub} ₽ пользователю {user_id}. Причина: {reason}")
-            return success
+        
+        if success:
+            logger.info(f"Зачисление {amount_rub} ₽ пользователю {user_id}. Причина: {reason}")
+            self._notify_balance_change(user_id, user_data)
+        return success
     
     def find_user_id_by_username(self, username: str) -> Optional[int]:
         """Поиск пользователя по username"""
@@ -176,9 +201,11 @@ class UserService:
             referrer_user['updated_at'] = datetime.now().isoformat()
             
             success = self._save_data(data)
-            if success:
-                logger.info(f"Реферал: {referrer_user_id} получил {ref_bonus} ₽ за {referred_user_id}")
-            return success
+        
+        if success:
+            logger.info(f"Реферал: {referrer_user_id} получил {ref_bonus} ₽ за {referred_user_id}")
+            self._notify_balance_change(referrer_user_id, referrer_user)
+        return success
     
     def get_all_users(self) -> List[User]:
         """Получение всех пользователей"""
@@ -188,6 +215,12 @@ class UserService:
             
             return [User.from_dict(user_data) for user_data in users.values()]
     
+    def get_all_user_data(self) -> Dict[int, Dict]:
+        """Данные всех пользователей как в файле (с int ключами)"""
+        with self.data_lock:
+            data = self._load_data()
+            return {int(user_key): user_data for user_key, user_data in data.get("users", {}).items()}
+    
     def get_user_stats(self, user_id: int) -> Dict:
         """Получение статистики пользователя"""
         user = self.get_user_record(user_id)
@@ -220,7 +253,11 @@ class UserService:
             users[user_key]['balance_rub'] = max(0, new_balance)
             users[user_key]['updated_at'] = datetime.now().isoformat()
             
-            return self._save_data(data)
+            success = self._save_data(data)
+        
+        if success:
+            self._notify_balance_change(user_id, users[user_key])
+        return success
     
     def add_balance(self, user_id: int, amount: float) -> bool:
         """Добавить средства на баланс пользователя"""
@@ -236,7 +273,11 @@ class UserService:
             users[user_key]['balance_rub'] = current_balance + amount
             users[user_key]['updated_at'] = datetime.now().isoformat()
             
-            return self._save_data(data)
+            success = self._save_data(data)
+        
+        if success:
+            self._notify_balance_change(user_id, users[user_key])
+        return success
     
     def get_balance(self, user_id: int) -> float:
         """Получить баланс пользователя"""
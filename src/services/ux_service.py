@@ -101,7 +101,7 @@ class UXService:
         try:
             if callback_query_id:
                 # Для callback query - быстрый ответ
-                self.bot.answer_callback_query(
+                await self.bot.answer_callback_query(
                     callback_query_id=callback_query_id,
                     text=message,
                     show_alert=False
@@ -119,8 +119,8 @@ class UXService:
         """Показать индикатор печати"""
         try:
             if self.bot:
-                # Для синхронного бота используем send_chat_action
-                self.bot.send_chat_action(chat_id, 'typing')
+                # Индикатор печати через send_chat_action
+                await self.bot.send_chat_action(chat_id, 'typing')
         except Exception as e:
             logger.error(f"Ошибка показа typing indicator: {e}")
 
@@ -144,7 +144,7 @@ class UXService:
 """
             
             if self.bot:
-                self.bot.edit_message_text(
+                await self.bot.edit_message_text(
                     text=text,
                     chat_id=chat_id,
                     message_id=message_id,
@@ -182,7 +182,7 @@ class UXService:
             
             if message_id and self.bot:
                 # Редактируем существующее сообщение
-                self.bot.edit_message_text(
+                await self.bot.edit_message_text(
                     text=text,
                     chat_id=chat_id,
                     message_id=message_id,
@@ -190,7 +190,7 @@ class UXService:
                 )
             elif self.bot:
                 # Отправляем новое сообщение
-                self.bot.send_message(
+                await self.bot.send_message(
                     chat_id=chat_id,
                     text=text,
                     parse_mode='HTML'
@@ -231,7 +231,7 @@ class UXService:
             
             if message_id and self.bot:
                 # Редактируем существующее сообщение
-                self.bot.edit_message_text(
+                await self.bot.edit_message_text(
                     text=text,
                     chat_id=chat_id,
                     message_id=message_id,
@@ -239,7 +239,7 @@ class UXService:
                 )
             elif self.bot:
                 # Отправляем новое сообщение
-                self.bot.send_message(
+                await self.bot.send_message(
                     chat_id=chat_id,
                     text=text,
                     parse_mode='HTML'
@@ -256,7 +256,7 @@ class UXService:
         """Выполнить операцию с показом прогресса"""
         try:
             # Отправляем начальное сообщение
-            initial_message = self.bot.send_message(
+            initial_message = await self.bot.send_message(
                 chat_id=chat_id,
                 text=f"{self.get_random_emoji(ResponseType.LOADING)} <b>Начинаю {operation_name.lower()}...</b>",
                 parse_mode='HTML'
@@ -9,6 +9,11 @@ from typing import Optional, Union, List, Dict, Any
 from pydantic import BaseModel, validator, Field
 from enum import Enum
 
+from utils.pattern_scanner import PatternScanner
+
+# Path traversal: ../, ..\ и абсолютные пути (/ и \)
+_PATH_TRAVERSAL_SCANNER = PatternScanner.literals(['../', '..\\', '/', '\\'], flags=0)
+
 logger = logging.getLogger(__name__)
 
 class PaymentMethod(str, Enum):
@@ -36,7 +41,7 @@ class PaymentRequest(BaseModel):
     amount: int = Field(..., gt=0, le=10000, description="Сумма платежа в рублях")
     payment_method: PaymentMethod
     user_id: int = Field(..., gt=0)
-    currency: str = Field(default="RUB", regex="^[A-Z]{3}$")
+    currency: str = Field(default="RUB", pattern="^[A-Z]{3}$")
     
     @validator('amount')
     def validate_amount(cls, v):
@@ -60,7 +65,7 @@ class UserRegistration(BaseModel):
     username: Optional[str] = Field(None, max_length=32)
     first_name: Optional[str] = Field(None, max_length=64)
     last_name: Optional[str] = Field(None, max_length=64)
-    language_code: str = Field(default="ru", regex="^[a-z]{2}(-[A-Z]{2})?$")
+    language_code: str = Field(default="ru", pattern="^[a-z]{2}(-[A-Z]{2})?$")
     
     @validator('username')
     def validate_username(cls, v):
@@ -86,10 +91,10 @@ class UserRegistration(BaseModel):
 class ServerConfig(BaseModel):
     """Валидация конфигурации сервера"""
     server_name: str = Field(..., min_length=1, max_length=50)
-    server_ip: str = Field(..., regex=r'^(?:[0-9]{1,3}\.){3}[0-9]{1,3}$')
+    server_ip: str = Field(..., pattern=r'^(?:[0-9]{1,3}\.){3}[0-9]{1,3}$')
     server_port: int = Field(..., ge=1, le=65535)
-    protocol: str = Field(..., regex="^(vless|vmess|trojan)$")
-    encryption: str = Field(default="none", regex="^(none|aes-128-gcm|chacha20-poly1305)$")
+    protocol: str = Field(..., pattern="^(vless|vmess|trojan)$")
+    encryption: str = Field(default="none", pattern="^(none|aes-128-gcm|chacha20-poly1305)$")
     
     @validator('server_ip')
     def validate_ip(cls, v):
@@ -124,7 +129,7 @@ class BalanceOperation(BaseModel):
     """Валидация операции с балансом"""
     user_id: int = Field(..., gt=0)
     amount: float = Field(..., gt=0, le=100000)
-    operation_type: str = Field(..., regex="^(add|subtract|set)$")
+    operation_type: str = Field(..., pattern="^(add|subtract|set)$")
     reason: str = Field(default="", max_length=200)
     
     @validator('amount')
@@ -240,17 +245,9 @@ class ValidationService:
             return False
         
         # Проверяем на path traversal атаки
-        dangerous_patterns = [
-            r'\.\./',  # ../
-            r'\.\.\\', # ..\
-            r'/',      # абсолютный путь
-            r'\\',     # Windows абсолютный путь
-        ]
-        
-        for pattern in dangerous_patterns:
-            if re.search(pattern, path):
-                logger.warning(f"Попытка path traversal: {path}")
-                return False
+        if _PATH_TRAVERSAL_SCANNER.matches(path):
+            logger.warning(f"Попытка path traversal: {path}")
+            return False
         
         return True
     
@@ -6,6 +6,11 @@ import re
 import logging
 from typing import Optional, Union, List, Dict, Any
 
+from utils.pattern_scanner import PatternScanner
+
+# Path traversal: ../ и ..\
+_PATH_TRAVERSAL_SCANNER = PatternScanner.literals(['../', '..\\'], flags=0)
+
 logger = logging.getLogger(__name__)
 
 class ValidationError(Exception):
@@ -126,15 +131,9 @@ class ValidationService:
             return False
         
         # Проверяем на path traversal атаки
-        dangerous_patterns = [
-            r'\.\./',  # ../
-            r'\.\.\\', # ..\
-        ]
-        
-        for pattern in dangerous_patterns:
-            if re.search(pattern, path):
-                logger.warning(f"Попытка path traversal: {path}")
-                return False
+        if _PATH_TRAVERSAL_SCANNER.matches(path):
+            logger.warning(f"Попытка path traversal: {path}")
+            return False
         
         return True
     
@@ -1,21 +1,344 @@
 #!/usr/bin/env python3
 """
 Утилиты для генерации QR-кодов
+
+QR-код зависит только от (data, size, border), поэтому PNG кэшируется по
+хэшу этих параметров: в памяти, на диске и - после первой отправки - в виде
+file_id Telegram, чтобы повторная отправка обходилась без загрузки файла.
+Рендер (чистый Python, ~20 мс на VLESS ссылку) выполняется в пуле, а не в
+event loop.
 """
 
-import qrcode
-from io import BytesIO
-from typing import Optional
+import asyncio
+import hashlib
 import logging
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Optional
+
+import qrcode
 
 logger = logging.getLogger(__name__)
 
+# Бюджеты кэша по умолчанию (байты)
+QR_CACHE_MEMORY_BYTES = 16 * 1024 * 1024
+QR_CACHE_DISK_BYTES = 256 * 1024 * 1024
+
+
+def render_qr_png(data: str, size: int = 10, border: int = 4) -> bytes:
+    """
+    Отрендерить QR-код в PNG
+
+    Функция уровня модуля: выполняется в процессах пула рендера.
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=size,
+        border=border,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    bio = BytesIO()
+    img.save(bio, format='PNG')
+    return bio.getvalue()
+
+
+def qr_cache_key(data: str, size: int = 10, border: int = 4) -> str:
+    """Ключ кэша: sha256 от (data, size, border)"""
+    return hashlib.sha256(f"{size}:{border}:{data}".encode()).hexdigest()
+
+
+class QRCache:
+    """
+    Кэш QR-кодов с адресацией по содержимому
+
+    Отвечает за:
+    - LRU кэш PNG в памяти с бюджетом в байтах
+    - Кэш PNG на диске с бюджетом в байтах (вытесняются давно не читанные)
+    - Запоминание file_id Telegram для уже загруженных QR-кодов
+    - Рендер в пуле и объединение одновременных запросов одного QR-кода
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_memory_bytes: int = QR_CACHE_MEMORY_BYTES,
+        max_disk_bytes: int = QR_CACHE_DISK_BYTES,
+        executor: str = "process",
+        workers: int = 1
+    ):
+        """
+        Args:
+            cache_dir: Каталог дискового кэша (None - только память)
+            max_memory_bytes: Бюджет кэша в памяти
+            max_disk_bytes: Бюджет кэша на диске
+            executor: Пул рендера: process, thread или inline (в текущем потоке)
+            workers: Размер пула рендера
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.executor_kind = executor
+        self.workers = workers
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._file_ids: Dict[str, str] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._executor: Optional[Executor] = None
+        self._disk_bytes = 0
+        # Каталог создается и читается при первом обращении к диску, а не в конструкторе
+        self._disk_opened = False
+        # Запись и чистка диска идут в потоках (asyncio.to_thread)
+        self._disk_lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "renders": 0, "file_id_hits": 0}
+
+    @classmethod
+    def from_config(cls) -> "QRCache":
+        """Кэш с настройками из src.config.config"""
+        from src.config.config import config
+
+        return cls(
+            cache_dir=config.QR_CACHE_DIR or None,
+            max_memory_bytes=config.QR_CACHE_MEMORY_MB * 1024 * 1024,
+            max_disk_bytes=config.QR_CACHE_DISK_MB * 1024 * 1024,
+            executor=config.QR_RENDER_EXECUTOR,
+            workers=config.QR_RENDER_WORKERS,
+        )
+
+    # Память
+
+    def _remember(self, key: str, png: bytes):
+        if len(png) > self.max_memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = png
+        self._memory_bytes += len(png)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    # Диск
+
+    def _open_disk(self):
+        """Создать каталог, посчитать занятое место и прочитать file_id (один раз)"""
+        with self._disk_lock:
+            if self._disk_opened or not self.cache_dir:
+                return
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                self._disk_bytes = sum(path.stat().st_size for path in self.cache_dir.glob("*.png"))
+                for path in self.cache_dir.glob("*.fid"):
+                    # file_id, запомненные до открытия диска, новее сохраненных
+                    self._file_ids.setdefault(path.stem, path.read_text().strip())
+            except OSError as e:
+                logger.warning(f"⚠️ Не удалось открыть кэш QR-кодов {self.cache_dir}: {e}")
+            self._disk_opened = True
+
+    async def _ensure_disk(self):
+        if self.cache_dir and not self._disk_opened:
+            await asyncio.to_thread(self._open_disk)
+
+    def _disk_path(self, key: str) -> Optional[Path]:
+        return self.cache_dir / f"{key}.png" if self.cache_dir else None
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self._disk_path(key)
+        if path is None:
+            return None
+        self._open_disk()
+        try:
+            png = path.read_bytes()
+        except OSError:
+            return None
+        # Время доступа - основа вытеснения
+        os.utime(path)
+        return png
+
+    def _write_disk(self, key: str, png: bytes):
+        path = self._disk_path(key)
+        if path is None or len(png) > self.max_disk_bytes:
+            return
+        self._open_disk()
+        with self._disk_lock:
+            try:
+                # Перезапись файла не добавляет его размер второй раз
+                try:
+                    previous_size = path.stat().st_size
+                except FileNotFoundError:
+                    previous_size = 0
+                temp = path.with_suffix(".tmp")
+                temp.write_bytes(png)
+                temp.replace(path)
+                self._disk_bytes += len(png) - previous_size
+                if self._disk_bytes > self.max_disk_bytes:
+                    self._trim_disk()
+            except OSError as e:
+                logger.warning(f"⚠️ Не удалось записать QR-код в кэш: {e}")
+
+    def _trim_disk(self):
+        """Удалить давно не читанные PNG, пока не уложимся в 90% бюджета"""
+        files = sorted(self.cache_dir.glob("*.png"), key=lambda path: path.stat().st_mtime)
+        total = sum(path.stat().st_size for path in files)
+        for path in files:
+            if total <= self.max_disk_bytes * 0.9:
+                break
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+        self._disk_bytes = total
+
+    # Поиск и рендер
+
+    def _memory_hit(self, key: str) -> Optional[bytes]:
+        png = self._memory.get(key)
+        if png is not None:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+        return png
+
+    def _disk_hit(self, key: str, png: Optional[bytes]) -> Optional[bytes]:
+        if png is not None:
+            self.stats["disk_hits"] += 1
+            self._remember(key, png)
+        return png
+
+    def get_cached(self, key: str) -> Optional[bytes]:
+        """PNG из памяти или с диска без рендера"""
+        png = self._memory_hit(key)
+        if png is not None:
+            return png
+        return self._disk_hit(key, self._read_disk(key))
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self._executor is None and self.executor_kind != "inline":
+            if self.executor_kind == "process":
+                # spawn: рабочий процесс не наследует event loop и сессии
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="qr-render")
+        return self._executor
+
+    def _store(self, key: str, png: bytes):
+        self.stats["renders"] += 1
+        self._remember(key, png)
+        self._write_disk(key, png)
+
+    def get_png_sync(self, data: str, size: int = 10, border: int = 4) -> bytes:
+        """PNG QR-кода, рендер в текущем потоке при промахе"""
+        key = qr_cache_key(data, size, border)
+        png = self.get_cached(key)
+        if png is None:
+            png = render_qr_png(data, size, border)
+            self._store(key, png)
+        return png
+
+    async def get_png(self, data: str, size: int = 10, border: int = 4) -> bytes:
+        """PNG QR-кода, рендер в пуле при промахе; диск читается и пишется вне event loop"""
+        key = qr_cache_key(data, size, border)
+        png = self._memory_hit(key)
+        if png is not None:
+            return png
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[key] = future
+        try:
+            png = None
+            if self.cache_dir:
+                png = self._disk_hit(key, await asyncio.to_thread(self._read_disk, key))
+            if png is None:
+                executor = self._get_executor()
+                if executor is None:
+                    png = render_qr_png(data, size, border)
+                else:
+                    png = await loop.run_in_executor(executor, render_qr_png, data, size, border)
+                self.stats["renders"] += 1
+                self._remember(key, png)
+                if self.cache_dir:
+                    await asyncio.to_thread(self._write_disk, key, png)
+            future.set_result(png)
+            return png
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение уже передано ожидающим; не даем asyncio жаловаться на него
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    # file_id Telegram
+
+    async def get_file_id(self, key: str) -> Optional[str]:
+        """file_id уже загруженного QR-кода"""
+        await self._ensure_disk()
+        file_id = self._file_ids.get(key)
+        if file_id:
+            self.stats["file_id_hits"] += 1
+        return file_id
+
+    async def remember_file_id(self, key: str, file_id: str):
+        """Запомнить file_id после первой загрузки"""
+        self._file_ids[key] = file_id
+        if self.cache_dir:
+            await asyncio.to_thread(self._write_file_id, key, file_id)
+
+    async def forget_file_id(self, key: str):
+        """Забыть file_id (Telegram его больше не принимает)"""
+        self._file_ids.pop(key, None)
+        if self.cache_dir:
+            await asyncio.to_thread(self._write_file_id, key, None)
+
+    def _write_file_id(self, key: str, file_id: Optional[str]):
+        """Сохранить (или удалить при None) file_id на диске"""
+        self._open_disk()
+        path = self.cache_dir / f"{key}.fid"
+        try:
+            if file_id is None:
+                path.unlink(missing_ok=True)
+            else:
+                path.write_text(file_id)
+        except OSError as e:
+            logger.warning(f"⚠️ Не удалось сохранить file_id QR-кода: {e}")
+
+    def shutdown(self):
+        """Остановить пул рендера"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
 class QRGenerator:
     """Генератор QR-кодов"""
-    
-    def __init__(self):
+
+    def __init__(self, cache: Optional[QRCache] = None):
         self.qr_available = self._check_qr_availability()
-    
+        self._cache = cache
+
+    @property
+    def cache(self) -> QRCache:
+        """Кэш QR-кодов (создается из конфигурации при первом обращении)"""
+        if self._cache is None:
+            self._cache = QRCache.from_config()
+        return self._cache
+
     def _check_qr_availability(self) -> bool:
         """Проверка доступности библиотеки qrcode"""
         try:
@@ -24,41 +347,38 @@ class QRGenerator:
         except ImportError:
             logger.warning("Библиотека qrcode недоступна")
             return False
-    
+
     def generate_qr_code(self, data: str, size: int = 10, border: int = 4) -> Optional[BytesIO]:
         """Генерация QR-кода"""
         if not self.qr_available:
             logger.warning("QR-код не может быть сгенерирован: библиотека недоступна")
             return None
-        
+
         try:
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=size,
-                border=border,
-            )
-            qr.add_data(data)
-            qr.make(fit=True)
-            
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            bio = BytesIO()
-            img.save(bio, format='PNG')
-            bio.seek(0)
-            
-            return bio
+            return BytesIO(self.cache.get_png_sync(data, size, border))
         except Exception as e:
             logger.error(f"Ошибка генерации QR-кода: {e}")
             return None
-    
+
+    async def generate_qr_code_async(self, data: str, size: int = 10, border: int = 4) -> Optional[BytesIO]:
+        """Генерация QR-кода без блокировки event loop"""
+        if not self.qr_available:
+            logger.warning("QR-код не может быть сгенерирован: библиотека недоступна")
+            return None
+
+        try:
+            return BytesIO(await self.cache.get_png(data, size, border))
+        except Exception as e:
+            logger.error(f"Ошибка генерации QR-кода: {e}")
+            return None
+
     def generate_referral_qr(self, referral_link: str) -> Optional[BytesIO]:
         """Генерация QR-кода для реферальной ссылки"""
         return self.generate_qr_code(referral_link)
-    
+
     def generate_vless_qr(self, vless_link: str) -> Optional[BytesIO]:
         """Генерация QR-кода для VLESS ссылки"""
         return self.generate_qr_code(vless_link)
 
 # Глобальный экземпляр генератора
-qr_generator = QRGenerator()
\ No newline at end of file
+qr_generator = QRGenerator()
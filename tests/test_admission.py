@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Тесты для admission control WebApp API
+"""
+
+import asyncio
+
+import benchmarks.webapp_api  # noqa: F401 - путь к api/ и настройки окружения
+import httpx
+from fastapi import FastAPI
+
+from app.utils.admission import AdmissionControl
+
+
+def build_app(**kwargs) -> tuple:
+    """Приложение с медленным маршрутом, который ждет release"""
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.get("/api/slow/{item}")
+    async def slow(item: int):
+        await release.wait()
+        return {"item": item}
+
+    @app.get("/api/health")
+    async def health():
+        return {"status": "healthy"}
+
+    app.add_middleware(AdmissionControl, router=app.router, **kwargs)
+    return app, release
+
+
+class TestAdmissionControl:
+    """Тесты для app.utils.admission.AdmissionControl"""
+
+    def test_saturated_route_rejected_with_retry_after(self):
+        """Сверх лимита и очереди маршрута - сразу 503 с Retry-After, health не ждет"""
+
+        async def scenario():
+            app, release = build_app(route_limits={"/api/slow/{item}": 1}, queue_size=1, queue_timeout=5)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                first = asyncio.ensure_future(client.get("/api/slow/1"))
+                await asyncio.sleep(0.01)
+                second = asyncio.ensure_future(client.get("/api/slow/2"))
+                await asyncio.sleep(0.01)
+
+                rejected = await asyncio.wait_for(client.get("/api/slow/3"), 1)
+                health = await asyncio.wait_for(client.get("/api/health"), 1)
+                release.set()
+                return rejected, health, await first, await second
+
+        rejected, health, first, second = asyncio.run(scenario())
+
+        assert rejected.status_code == 503
+        assert rejected.headers["Retry-After"] == "5"
+        assert health.status_code == 200
+        assert (first.status_code, second.status_code) == (200, 200)
+
+    def test_queue_deadline_and_slots_released(self):
+        """Запрос ждет в очереди не дольше queue_timeout, слоты освобождаются после ответа"""
+
+        async def scenario():
+            app, release = build_app(max_concurrent=1, queue_size=10, queue_timeout=0.05)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                first = asyncio.ensure_future(client.get("/api/slow/1"))
+                await asyncio.sleep(0.01)
+                timed_out = await client.get("/api/slow/2")
+                release.set()
+                await first
+                admitted = await client.get("/api/slow/3")
+
+            admission = app.middleware_stack
+            while not isinstance(admission, AdmissionControl):
+                admission = admission.app
+            return timed_out, admitted, admission
+
+        timed_out, admitted, admission = asyncio.run(scenario())
+
+        assert timed_out.status_code == 503
+        assert admitted.status_code == 200
+        assert admission.stats == {"admitted": 2, "queued": 0, "rejected": 1, "timed_out": 0}
+        assert admission._global.active == 0
+        assert admission._global.queued == 0
+
+    def test_request_timeout_answers_504_and_frees_slot(self):
+        """Запрос дольше request_timeout отменяется с 504, слот освобождается"""
+
+        async def scenario():
+            app, release = build_app(max_concurrent=1, request_timeout=0.05)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                stuck = await asyncio.wait_for(client.get("/api/slow/1"), 1)
+                release.set()
+                served = await client.get("/api/slow/2")
+
+            admission = app.middleware_stack
+            while not isinstance(admission, AdmissionControl):
+                admission = admission.app
+            return stuck, served, admission
+
+        stuck, served, admission = asyncio.run(scenario())
+
+        assert stuck.status_code == 504
+        assert served.status_code == 200
+        assert admission.stats["timed_out"] == 1
+        assert admission._global.active == 0
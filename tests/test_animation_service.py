@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Тесты для анимации загрузки AnimationService
+"""
+
+import asyncio
+import time
+
+from aiogram import Bot
+from aiogram.types import Chat, Message
+
+from benchmarks.fake_telegram import FakeTelegramSession
+from bot.services.animation_service import AnimationService
+
+FAKE_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+FRAMES = [("1", 0.05), ("2", 0.05), ("3", 0.05), ("4", 0.05)]
+
+
+def make_service(latency: float = 0.0):
+    session = FakeTelegramSession(latency=latency)
+    bot = Bot(FAKE_TOKEN, session=session)
+    service = AnimationService(bot)
+    service.animation_grace = 0.02
+    service.loading_frames = FRAMES
+    message = Message(message_id=1, date=0, chat=Chat(id=42, type="private"), text="/start").as_(bot)
+    return service, session, message
+
+
+async def work(seconds: float, result: str = "user"):
+    await asyncio.sleep(seconds)
+    return result
+
+
+async def run_and_settle(service: AnimationService, message: Message, seconds: float):
+    started = time.perf_counter()
+    result = await service.show_loading_animation(message, work(seconds))
+    elapsed = time.perf_counter() - started
+    await asyncio.gather(*service._animations)
+    return result, elapsed
+
+
+class TestLoadingAnimation:
+    """Тесты для AnimationService.show_loading_animation"""
+
+    def test_fast_work_sends_nothing(self):
+        """Операция быстрее порога обходится без сообщений"""
+        service, session, message = make_service()
+
+        result, _ = asyncio.run(run_and_settle(service, message, 0.0))
+
+        assert result == "user"
+        assert sum(session.calls.values()) == 0
+        assert service.animation_stats["skipped"] == 1
+
+    def test_animation_stops_with_work(self):
+        """Анимация заканчивается вместе с операцией и не задерживает ее"""
+        service, session, message = make_service()
+
+        result, elapsed = asyncio.run(run_and_settle(service, message, 0.12))
+
+        assert result == "user"
+        assert elapsed < 0.2
+        assert session.calls["sendMessage"] == 1
+        assert 1 <= session.calls["editMessageText"] <= 2
+        assert session.calls["deleteMessage"] == 1
+
+    def test_slow_edits_skip_frames(self):
+        """Медленные правки не копятся: промежуточные кадры пропускаются"""
+        service, session, message = make_service(latency=0.08)
+
+        _, elapsed = asyncio.run(run_and_settle(service, message, 0.3))
+
+        assert elapsed < 0.35
+        assert session.calls["editMessageText"] < len(FRAMES) - 1
+
+    def test_static_under_load(self):
+        """Под нагрузкой вместо анимации одно статичное сообщение"""
+        service, session, message = make_service()
+        service.load_probe = lambda: True
+
+        asyncio.run(run_and_settle(service, message, 0.12))
+
+        assert session.calls["sendMessage"] == 1
+        assert session.calls["editMessageText"] == 0
+        assert session.calls["deleteMessage"] == 1
+        assert service.animation_stats["static"] == 1
+        assert service._active_animations == 0
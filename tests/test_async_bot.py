@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Тесты для обработчиков AsyncYoVPNBot
+"""
+
+import asyncio
+
+from aiogram.types import CallbackQuery
+
+from benchmarks.fake_telegram import FakeTelegramSession
+from src.bot.async_bot import AsyncYoVPNBot
+from src.utils.qr_generator import QRCache
+
+FAKE_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+
+
+def callback(user_id: int, data: str) -> CallbackQuery:
+    return CallbackQuery.model_validate({
+        "id": f"cb{user_id}",
+        "from": {"id": user_id, "is_bot": False, "first_name": "User", "username": f"user{user_id}"},
+        "chat_instance": "1",
+        "data": data,
+        "message": {
+            "message_id": 1,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": 7000000001, "is_bot": True, "first_name": "YoVPN"},
+            "text": "Меню",
+        },
+    })
+
+
+class TestAsyncBotCallbacks:
+    """Тесты для кнопок копирования и QR-кодов"""
+
+    def test_copy_and_qr_send_user_links(self, tmp_path, monkeypatch):
+        """Кнопки отправляют ссылку пользователя, нажавшего кнопку, в его чат"""
+        monkeypatch.chdir(tmp_path)
+        session = FakeTelegramSession()
+        session.record_payloads = True
+        yobot = AsyncYoVPNBot(FAKE_TOKEN, "http://127.0.0.1:9", "token", session=session)
+        yobot.copy_service.qr_cache = QRCache(str(tmp_path / "qr"), executor="inline")
+        yobot.user_service.ensure_user_record(42, "user42", "User")
+        yobot.user_service.update_user_record(42, {"subscription_url": "https://sub.example/42"})
+
+        async def press():
+            await yobot.handle_callback(callback(42, "copy_subscription_link"), None)
+            await yobot.handle_callback(callback(42, "qr_referral"), None)
+            await yobot.bot.session.close()
+
+        asyncio.run(press())
+
+        sent = [payload for _, api_method, payload in session.log if api_method == "sendMessage"]
+        assert [payload["chat_id"] for payload in sent] == [42]
+        assert "https://sub.example/42" in sent[0]["text"]
+        photos = [payload for _, api_method, payload in session.log if api_method == "sendPhoto"]
+        assert [payload["chat_id"] for payload in photos] == [42]
+        assert "реферальной" in photos[0]["caption"]
+        assert session.calls["answerCallbackQuery"] == 2
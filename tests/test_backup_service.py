@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Тесты для BackupService
+"""
+
+import gzip
+import json
+
+import pytest
+import pytest_asyncio
+from datetime import datetime
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from database.db import Base
+from database.models import User, Subscription, Transaction, TransactionType
+from admin.services import backup_service
+from admin.services.backup_service import BackupService
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    """SQLite в памяти с тестовыми данными"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as session:
+        for i in range(1, 4):
+            session.add(User(id=i, tg_id=1000 + i, username=f"user{i}", balance=10.0 * i))
+        session.add(Subscription(user_id=1, marzban_username="user_1", start_date=datetime(2025, 1, 1)))
+        session.add(Transaction(
+            user_id=1, amount=40.0, type=TransactionType.DEPOSIT,
+            balance_before=0.0, balance_after=40.0
+        ))
+        await session.commit()
+
+    yield factory
+    await engine.dispose()
+
+
+class TestBackupService:
+    """Тесты для BackupService"""
+
+    @pytest.mark.asyncio
+    async def test_jsonl_export(self, session_factory, tmp_path):
+        """Логический экспорт таблиц в сжатый JSONL"""
+        service = BackupService(session_factory=session_factory, database_url="sqlite://", backup_dir=tmp_path)
+
+        job = service.start_backup()
+        assert job.kind == "jsonl"
+
+        job = await service.wait(job.id)
+        assert job.status == "done", job.error
+        assert job.rows_done == job.rows_total == 5
+        assert job.progress == 100.0
+        assert 0 < job.bytes_out == (tmp_path / job.to_dict()["file"]).stat().st_size
+
+        with gzip.open(job.file, "rt", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+
+        tables = [record["table"] for record in records]
+        assert tables == ["users"] * 3 + ["subscriptions", "transactions"]
+        assert records[0]["row"]["tg_id"] == 1001
+        assert records[-1]["row"]["type"] == "deposit"
+        assert job.bytes_in > 0
+
+    @pytest.mark.asyncio
+    async def test_writer_failure_marks_job_failed(self, session_factory, tmp_path, monkeypatch):
+        """Файл бэкапа не открылся - задача завершается как failed, а не висит running"""
+        def broken_writer(path, compression):
+            raise OSError("No space left on device")
+
+        monkeypatch.setattr(backup_service, "_CompressedWriter", broken_writer)
+        service = BackupService(session_factory=session_factory, database_url="sqlite://", backup_dir=tmp_path)
+
+        job = await service.wait(service.start_backup().id)
+
+        assert job.status == "failed"
+        assert job.error and job.finished_at is not None
+
+    def test_mysqldump_requires_mysql(self, tmp_path):
+        """mysqldump недоступен для не-MySQL баз"""
+        service = BackupService(database_url="sqlite://", backup_dir=tmp_path)
+
+        with pytest.raises(ValueError):
+            service.start_backup(kind="mysqldump")
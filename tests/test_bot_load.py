@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Тесты для нагрузочного стенда бота
+"""
+
+import asyncio
+
+from aiogram import Bot
+from aiogram.methods import AnswerCallbackQuery, SendMessage
+
+from benchmarks.bot_load import build_trace, handler_label, load_trace, save_trace
+from benchmarks.fake_telegram import FakeTelegramSession
+
+FAKE_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+
+
+class TestBotLoad:
+    """Тесты для benchmarks.bot_load"""
+
+    def test_trace_is_reproducible(self, tmp_path):
+        """Один seed - одно расписание, которое переживает сохранение в JSONL"""
+        first = build_trace("mixed", rate=200, duration=2, users=20, seed=7)
+        second = build_trace("mixed", rate=200, duration=2, users=20, seed=7)
+
+        assert first == second
+        assert all(a <= b for (a, _), (b, _) in zip(first, first[1:]))
+
+        path = tmp_path / "trace.jsonl"
+        save_trace(first, str(path))
+        replayed = load_trace(str(path))
+
+        assert [update for _, update in replayed] == [update for _, update in first]
+        assert {handler_label(update) for _, update in first} >= {"message:/start", "callback:pay_#"}
+
+    def test_fake_session_records_calls(self):
+        """Фейковая сессия возвращает типизированные ответы и считает вызовы"""
+        async def run():
+            session = FakeTelegramSession()
+            bot = Bot(FAKE_TOKEN, session=session)
+            message = await bot(SendMessage(chat_id=42, text="hi"))
+            answered = await bot(AnswerCallbackQuery(callback_query_id="1"))
+            return session, message, answered
+
+        session, message, answered = asyncio.run(run())
+
+        assert message.chat.id == 42 and message.text == "hi"
+        assert answered is True
+        assert session.calls == {"sendMessage": 1, "answerCallbackQuery": 1}
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Тесты для таблицы маршрутизации callback запросов
+"""
+
+import asyncio
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+from benchmarks.fake_telegram import FakeTelegramSession
+from bot.callback_table import _parse_filter, build_callback_table, install_callback_table
+from bot.handlers import register_handlers
+
+FAKE_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+
+
+def make_callback(data: str) -> CallbackQuery:
+    user = User(id=42, is_bot=False, first_name="Test")
+    message = Message(message_id=1, date=0, chat=Chat(id=42, type="private"), text="menu")
+    return CallbackQuery(id="1", from_user=user, chat_instance="test", message=message, data=data)
+
+
+async def linear_resolve(dp: Dispatcher, callback: CallbackQuery):
+    """Первый обработчик, чей фильтр сработал, в порядке aiogram"""
+    routers = [dp]
+    while routers:
+        router = routers.pop(0)
+        for handler in router.callback_query.handlers:
+            passed, _ = await handler.check(callback)
+            if passed:
+                return handler
+        routers[0:0] = router.sub_routers
+    return None
+
+
+class TestCallbackTable:
+    """Тесты для bot.callback_table"""
+
+    def test_matches_linear_scan_for_bot_handlers(self):
+        """Для всех callback data бота таблица выбирает тот же обработчик, что и перебор"""
+        dp = Dispatcher()
+        register_handlers(dp)
+        table = build_callback_table(dp)
+
+        samples = {"no_such_callback", ""}
+        routers = [dp]
+        while routers:
+            router = routers.pop()
+            routers.extend(router.sub_routers)
+            for handler in router.callback_query.handlers:
+                kind, value = _parse_filter(handler)
+                samples.update([value] if kind == "exact" else [value, value + "123", value + "x_y"])
+
+        async def check():
+            for data in sorted(samples):
+                assert table.resolve(data) is await linear_resolve(dp, make_callback(data)), data
+
+        asyncio.run(check())
+
+    def test_complex_filter_keeps_order(self):
+        """Обработчик после сложного фильтра не выбирается таблицей, срабатывает обычный перебор"""
+        called = []
+        dp = Dispatcher()
+        first, second = Router(), Router()
+
+        @first.callback_query(F.data.startswith("pay_"))
+        async def pay(callback: CallbackQuery):
+            called.append("pay")
+
+        @first.callback_query(F.data.in_({"settings", "help"}))
+        async def complex_filter(callback: CallbackQuery):
+            called.append("complex")
+
+        @second.callback_query(F.data == "settings")
+        async def settings(callback: CallbackQuery):
+            called.append("settings")
+
+        @second.callback_query(F.data == "profile")
+        async def profile(callback: CallbackQuery):
+            called.append("profile")
+
+        seen = []
+
+        @dp.callback_query.middleware()
+        async def record(handler, event, data):
+            seen.append(data["handler"].callback.__name__)
+            return await handler(event, data)
+
+        dp.include_routers(first, second)
+        table = install_callback_table(dp)
+        assert table.indexed == 3 and table.complex == 1
+
+        async def feed():
+            bot = Bot(FAKE_TOKEN, session=FakeTelegramSession())
+            for number, data in enumerate(["pay_100", "settings", "profile", "unknown"]):
+                await dp.feed_update(bot, Update(update_id=number, callback_query=make_callback(data)))
+            await bot.session.close()
+
+        asyncio.run(feed())
+
+        assert table.resolve("pay_100") is not None
+        assert table.resolve("profile") is None
+        assert called == ["pay", "complex", "profile"]
+        assert seen == ["pay", "complex_filter", "profile"]
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Тесты для кэша проверки подписки на канал
+"""
+
+import asyncio
+
+from aiogram import Bot
+from aiogram.types import ChatMemberUpdated
+
+from benchmarks.fake_telegram import FakeTelegramSession
+from bot.services.channel_service import NEGATIVE_TTL, ChannelService
+from bot.services.user_service import UserService
+
+FAKE_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+
+
+def member_update(user_id: int, status: str) -> ChatMemberUpdated:
+    user = {"id": user_id, "is_bot": False, "first_name": "User"}
+    return ChatMemberUpdated.model_validate({
+        "chat": {"id": -100123, "type": "channel", "username": "yodevelop"},
+        "from": user,
+        "date": 0,
+        "old_chat_member": {"status": "member", "user": user},
+        "new_chat_member": {"status": status, "user": user},
+    })
+
+
+class TestChannelService:
+    """Тесты для ChannelService"""
+
+    def test_concurrent_checks_single_flight_and_stored(self, tmp_path):
+        """Одновременные проверки - один запрос, результат хранится в записи пользователя"""
+        session = FakeTelegramSession(latency=0.01)
+        bot = Bot(FAKE_TOKEN, session=session)
+        user_service = UserService(str(tmp_path / "users.json"))
+        asyncio.run(user_service.create_or_update_user(7, "user7", "User"))
+        channels = ChannelService(bot, user_service)
+
+        async def menu_clicks():
+            return await asyncio.gather(*(channels.is_member(7) for _ in range(10)))
+
+        assert asyncio.run(menu_clicks()) == [True] * 10
+        assert asyncio.run(channels.is_member(7))
+        assert session.calls["getChatMember"] == 1
+        assert user_service.users[7]["channel_subscribed"] is True
+
+        # После перезапуска (UserService перечитан с диска) результат берется из записи пользователя
+        reloaded = UserService(str(tmp_path / "users.json"))
+        assert reloaded.users[7]["channel_subscribed"] is True
+        restarted = ChannelService(bot, reloaded)
+        assert asyncio.run(restarted.is_member(7))
+        assert session.calls["getChatMember"] == 1
+
+    def test_chat_member_update_and_negative_ttl(self):
+        """Отписка из апдейта видна сразу, отрицательный результат живет недолго"""
+        session = FakeTelegramSession()
+        now = [1000.0]
+        channels = ChannelService(Bot(FAKE_TOKEN, session=session), clock=lambda: now[0])
+
+        asyncio.run(channels.on_chat_member(member_update(7, "left")))
+        assert not asyncio.run(channels.is_member(7))
+        assert session.calls["getChatMember"] == 0
+
+        # Подписался обратно - после NEGATIVE_TTL проверка снова идет в Telegram
+        now[0] += NEGATIVE_TTL
+        assert asyncio.run(channels.is_member(7))
+        assert session.calls["getChatMember"] == 1
+
+    def test_cache_is_bounded(self, tmp_path):
+        """Апдейты чужих подписчиков игнорируются, кэш не растет сверх cache_size"""
+        session = FakeTelegramSession()
+        user_service = UserService(str(tmp_path / "users.json"))
+        asyncio.run(user_service.create_or_update_user(7, "user7", "User"))
+        channels = ChannelService(Bot(FAKE_TOKEN, session=session), user_service, cache_size=2)
+
+        asyncio.run(channels.on_chat_member(member_update(9, "member")))
+        assert 9 not in channels._members and channels.stats["updates"] == 0
+
+        asyncio.run(channels.on_chat_member(member_update(7, "left")))
+        assert channels._members[7][0] is False
+
+        for user_id in (1, 2, 3):
+            asyncio.run(channels.is_member(user_id))
+        assert list(channels._members) == [2, 3]
+
+    def test_subscribe_then_return(self):
+        """Подписался после отказа: /start и "Я подписался" не ждут NEGATIVE_TTL"""
+        session = FakeTelegramSession(latency=0.02)
+        session.non_members.add(7)
+        now = [1000.0]
+        channels = ChannelService(Bot(FAKE_TOKEN, session=session), clock=lambda: now[0])
+
+        assert not asyncio.run(channels.is_member(7))
+        now[0] += NEGATIVE_TTL
+        session.non_members.discard(7)
+
+        async def menu_click_and_button():
+            # Кнопка "Я подписался" не присоединяется к уже идущей проверке
+            return await asyncio.gather(channels.is_member(7), channels.is_member(7, force=True))
+
+        assert asyncio.run(menu_click_and_button()) == [True, True]
+        assert session.calls["getChatMember"] == 3
+
+        # Отказ из кэша перепроверяется на /start
+        session.non_members.add(8)
+        assert not asyncio.run(channels.is_member(8))
+        session.non_members.discard(8)
+        assert not asyncio.run(channels.is_member(8))
+        assert asyncio.run(channels.is_member(8, recheck_negative=True))
+        assert session.calls["getChatMember"] == 5
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Тесты для расписания предупреждений о низком балансе
+"""
+
+import asyncio
+
+from aiogram import Bot
+
+from benchmarks.fake_telegram import FakeTelegramSession
+from bot.services.notification_service import NotificationService
+from bot.services.user_service import UserService
+from utils.depletion_schedule import SECONDS_PER_DAY, DepletionSchedule
+
+FAKE_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+
+
+class TestDepletionSchedule:
+    """Тесты для utils.depletion_schedule.DepletionSchedule"""
+
+    def test_warns_once_when_due(self):
+        """Предупреждение приходит за день до исчерпания и только один раз"""
+        schedule = DepletionSchedule(daily_cost=4.0)
+        schedule.update("rich", 400.0, now=0)
+        schedule.update("low", 12.0, now=0)        # 3 дня - предупредить через 2
+        schedule.update("inactive", 2.0, active=False, now=0)
+
+        assert schedule.next_due() == 2 * SECONDS_PER_DAY
+        schedule.update("low", 8.0, now=SECONDS_PER_DAY)     # ежедневное списание
+        assert schedule.pop_due(now=SECONDS_PER_DAY) == []
+
+        schedule.update("low", 4.0, now=2 * SECONDS_PER_DAY)
+        due = schedule.pop_due(now=2 * SECONDS_PER_DAY)
+        assert [(warning.user_id, warning.days_left) for warning in due] == [("low", 1)]
+
+        # Следующие списания без пополнения не дают повторного предупреждения
+        schedule.update("low", 0.0, now=3 * SECONDS_PER_DAY)
+        assert schedule.pop_due(now=3 * SECONDS_PER_DAY) == []
+        assert schedule.next_due() == 99 * SECONDS_PER_DAY
+        assert schedule.stats["stale"] >= 1
+
+    def test_topup_and_price_change_reschedule(self):
+        """Пополнение сбрасывает предупреждение, смена цены сдвигает срок"""
+        schedule = DepletionSchedule(daily_cost=4.0)
+        schedule.update(1, 4.0, now=0)
+        assert len(schedule.pop_due(now=0)) == 1
+
+        schedule.update(1, 40.0, now=10)
+        assert not schedule.is_warned(1)
+        assert schedule.next_due() == 10 + 9 * SECONDS_PER_DAY
+
+        schedule.set_daily_cost(20.0)
+        assert schedule.next_due() == 10 + 1 * SECONDS_PER_DAY
+
+    def test_notification_service_follows_balance(self, tmp_path):
+        """Изменение баланса сразу ставит предупреждение, отметка сохраняется"""
+        session = FakeTelegramSession()
+        bot = Bot(FAKE_TOKEN, session=session)
+        user_service = UserService(str(tmp_path / "users.json"))
+        user_service.users[42] = {"balance": 100.0, "subscription_active": True}
+        notifications = NotificationService(bot, user_service=user_service, daily_cost=4.0)
+
+        async def scenario():
+            loop_task = asyncio.create_task(notifications.notification_loop())
+            await asyncio.sleep(0)
+            await user_service.update_user_balance(42, 97.0, "subtract")
+            await asyncio.sleep(0.05)
+            await user_service.update_user_balance(42, 1.0, "subtract")
+            await asyncio.sleep(0.05)
+            await notifications.stop()
+            await loop_task
+
+        asyncio.run(scenario())
+
+        assert session.calls["sendMessage"] == 1
+        assert user_service.users[42]["low_balance_warned"] is True
+        # Перезапуск: UserService перечитан с диска, отметка найдена по int user_id
+        reloaded = UserService(str(tmp_path / "users.json"))
+        assert NotificationService(bot, user_service=reloaded).low_balance.is_warned(42)
+        assert NotificationService(bot, user_service=reloaded).low_balance.next_due() is None
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Тесты для локального сервера Marzban
+"""
+
+import asyncio
+import base64
+import random
+import time
+
+import aiohttp
+
+from api.marzban_api import MarzbanAPI, MarzbanPageError
+from benchmarks.fake_marzban import (
+    DEFAULT_TOKEN,
+    FakeMarzbanServer,
+    FaultProfile,
+    LatencyDistribution,
+)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestFakeMarzban:
+    """Тесты для benchmarks.fake_marzban"""
+
+    def test_client_roundtrip(self):
+        """Клиент API проходит полный цикл на состоянии в памяти"""
+        async def scenario():
+            async with FakeMarzbanServer() as server:
+                client = MarzbanAPI(server.url, DEFAULT_TOKEN)
+                try:
+                    created = await client.create_subscription("tg_1", days=30)
+                    for index in range(2, 8):
+                        await client.create_subscription(f"tg_{index}", days=1)
+                    fetched = await client.get_subscription("tg_1")
+                    pages = [page async for page in client.iter_subscription_pages(page_size=3)]
+                    deleted = await client.delete_subscription("tg_7")
+                    system_ok = await client.check_api_availability()
+                finally:
+                    await client.close()
+
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(f"{server.url}/sub/tg_1") as response:
+                        sub_status = response.status
+                        links = base64.b64decode(await response.read()).decode()
+                return created, fetched, pages, deleted, system_ok, sub_status, links, server
+
+        created, fetched, pages, deleted, system_ok, sub_status, links, server = run(scenario())
+
+        assert created is not None and fetched is not None
+        assert [len(page) for page in pages] == [3, 3, 1]
+        assert deleted and system_ok
+        assert sub_status == 200 and links.startswith("vless://")
+        assert "tg_7" not in server.users
+
+    def test_failed_page_raises(self):
+        """Ошибка на странице прерывает обход исключением, а не молчаливым концом списка"""
+        async def scenario():
+            async with FakeMarzbanServer() as server:
+                client = MarzbanAPI(server.url, DEFAULT_TOKEN)
+                pages = []
+                try:
+                    for index in range(1, 8):
+                        await client.create_subscription(f"tg_{index}", days=1)
+                    async for page in client.iter_subscription_pages(page_size=3):
+                        pages.append(page)
+                        server.fail_next(1, status=502)
+                except MarzbanPageError as e:
+                    return pages, e.offset
+                finally:
+                    await client.close()
+
+        pages, offset = run(scenario())
+
+        assert [len(page) for page in pages] == [3]
+        assert offset == 3
+
+    def test_bursts_are_deterministic(self):
+        """Пачки 429 привязаны к номеру запроса, а fail_next срабатывает первым"""
+        async def scenario():
+            server = FakeMarzbanServer(token=None)
+            server.set_profile("system", FaultProfile(burst_every=5, burst_length=2, retry_after=3))
+            server.fail_next(1, status=502)
+            async with server:
+                async with aiohttp.ClientSession() as session:
+                    statuses, retry_after = [], None
+                    for _ in range(11):
+                        async with session.get(f"{server.url}/api/system") as response:
+                            statuses.append(response.status)
+                            if response.status == 429:
+                                retry_after = response.headers.get("Retry-After")
+                return statuses, retry_after
+
+        statuses, retry_after = run(scenario())
+
+        assert statuses == [502, 200, 200, 200, 429, 429, 200, 200, 200, 429, 429]
+        assert retry_after == "3"
+
+    def test_latency_and_slow_body(self):
+        """Задержки воспроизводимы по seed, медленное тело отдается целиком"""
+        lognormal = LatencyDistribution.parse("lognormal:0.05:0.5")
+        first = [lognormal.sample(random.Random(3)) for _ in range(3)]
+        second = [lognormal.sample(random.Random(3)) for _ in range(3)]
+        assert first == second and all(value > 0 for value in first)
+
+        async def scenario():
+            server = FakeMarzbanServer(token=None)
+            server.set_profile("system", FaultProfile(
+                latency=LatencyDistribution("fixed", 0.05),
+                slow_body_chunk=16,
+                slow_body_delay=0.01,
+            ))
+            async with server:
+                async with aiohttp.ClientSession() as session:
+                    started = time.perf_counter()
+                    async with session.get(f"{server.url}/system") as response:
+                        body = await response.json()
+                    return body, time.perf_counter() - started
+
+        body, elapsed = run(scenario())
+
+        assert body["version"] == "0.4.9-fake"
+        assert elapsed >= 0.05 + 0.01 * 5
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Тесты для готовых клавиатур бота
+"""
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import EditMessageText
+
+from bot.keyboards.menu_kb import MenuKeyboards
+from bot.services.ui_service import UIService
+from utils.frozen_markup import FrozenKeyboard, PreparedMarkupSession
+
+FAKE_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+
+
+def form_fields(session: AiohttpSession, method: EditMessageText) -> dict:
+    form = session.build_form_data(Bot(FAKE_TOKEN, session=session), method)
+    return {options["name"]: value for options, _, value in form._fields}
+
+
+class TestFrozenMarkup:
+    """Тесты для utils.frozen_markup"""
+
+    def test_keyboards_built_once_per_arguments(self):
+        """Клавиатура строится один раз на набор аргументов"""
+        ui = UIService()
+
+        assert MenuKeyboards.get_main_menu() is MenuKeyboards.get_main_menu()
+        assert isinstance(MenuKeyboards.get_main_menu(), FrozenKeyboard)
+        assert MenuKeyboards.get_subscription_menu(True) is not MenuKeyboards.get_subscription_menu(False)
+        assert ui.create_back_keyboard("settings") is ui.create_back_keyboard("settings")
+        # Список не хэшируется - клавиатура строится заново, но работает
+        amounts = ui.create_payment_keyboard([40, 80])
+        assert amounts.inline_keyboard[0][0].callback_data == "pay_40"
+        assert amounts is not ui.create_payment_keyboard([40, 80])
+
+    def test_prepared_json_matches_regular_serialization(self):
+        """Готовый JSON клавиатуры совпадает с обычной сериализацией aiogram"""
+        method = EditMessageText(chat_id=1, message_id=2, text="Меню", reply_markup=MenuKeyboards.get_support_menu())
+
+        expected = form_fields(AiohttpSession(), method)
+        session = PreparedMarkupSession()
+
+        assert form_fields(session, method) == expected
+        # Второй раз - из готового JSON
+        assert form_fields(session, method) == expected
+        assert method.reply_markup._prepared == expected["reply_markup"]
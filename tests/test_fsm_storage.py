@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Тесты для FSM хранилища в Redis
+"""
+
+import asyncio
+
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+
+from utils.fsm_storage import RedisFSMStorage
+
+
+class PaymentStates(StatesGroup):
+    waiting_for_amount = State()
+
+
+class InMemoryRedis:
+    """Минимальная замена redis.asyncio.Redis: hash-команды и pipeline со счетчиком round trip"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.ttl = {}
+        self.round_trips = 0
+
+    async def hgetall(self, key):
+        self.round_trips += 1
+        return {name.encode(): value.encode() for name, value in self.hashes.get(key, {}).items()}
+
+    def pipeline(self, transaction=True):
+        return _Pipeline(self)
+
+    async def aclose(self):
+        pass
+
+
+class _Pipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def hset(self, key, field, value):
+        self.commands.append(lambda: self.redis.hashes.setdefault(key, {}).__setitem__(field, value))
+
+    def hdel(self, key, field):
+        def run():
+            fields = self.redis.hashes.get(key, {})
+            fields.pop(field, None)
+            if not fields:
+                self.redis.hashes.pop(key, None)
+        self.commands.append(run)
+
+    def expire(self, key, seconds):
+        self.commands.append(lambda: self.redis.ttl.__setitem__(key, seconds))
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        for command in self.commands:
+            command()
+
+
+class SlowReadRedis(InMemoryRedis):
+    """HGETALL берет снимок сразу, а отвечает только после release()"""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = asyncio.Event()
+
+    async def hgetall(self, key):
+        snapshot = await super().hgetall(key)
+        await self.gate.wait()
+        return snapshot
+
+
+KEY = StorageKey(bot_id=1, chat_id=42, user_id=42)
+
+
+class TestRedisFSMStorage:
+    """Тесты для utils.fsm_storage"""
+
+    def test_state_and_data_in_one_round_trip(self):
+        """Первое чтение - один HGETALL, дальше локальная копия"""
+        async def scenario():
+            redis = InMemoryRedis()
+            storage = RedisFSMStorage(redis, state_ttl=3600)
+            await storage.set_state(KEY, PaymentStates.waiting_for_amount)
+            await storage.set_data(KEY, {"amount": 100})
+            writes = redis.round_trips
+
+            # Другой процесс с холодным кэшем
+            reader = RedisFSMStorage(redis)
+            state = await reader.get_state(KEY)
+            data = await reader.get_data(KEY)
+            data["amount"] = 0
+            again = await reader.get_data(KEY)
+            return redis, writes, state, again
+
+        redis, writes, state, again = asyncio.run(scenario())
+
+        assert writes == 2
+        assert redis.round_trips == writes + 1
+        assert state == "PaymentStates:waiting_for_amount"
+        assert again == {"amount": 100}
+        assert redis.ttl["fsm:1:42:42"] == 3600
+
+    def test_writes_update_local_copy(self):
+        """Запись обновляет локальную копию, очистка удаляет ключ"""
+        async def scenario():
+            redis = InMemoryRedis()
+            storage = RedisFSMStorage(redis)
+            await storage.get_state(KEY)
+            await storage.set_state(KEY, "step_two")
+            await storage.update_data(KEY, {"method": "card"})
+            before_reads = redis.round_trips
+            state, data = await storage.get_state(KEY), await storage.get_data(KEY)
+            cached_reads = redis.round_trips - before_reads
+
+            await storage.set_state(KEY, None)
+            await storage.set_data(KEY, {})
+            return state, data, cached_reads, redis.hashes, await storage.get_state(KEY)
+
+        state, data, cached_reads, hashes, cleared = asyncio.run(scenario())
+
+        assert (state, data) == ("step_two", {"method": "card"})
+        assert cached_reads == 0
+        assert hashes == {} and cleared is None
+
+    def test_write_during_read_not_cached_stale(self):
+        """Ответ HGETALL, обогнанный записью, не перетирает локальную копию"""
+        async def scenario():
+            redis = SlowReadRedis()
+            storage = RedisFSMStorage(redis)
+            reader = asyncio.create_task(storage.get_state(KEY))
+            await asyncio.sleep(0)              # чтение взяло снимок до записи
+            await storage.set_state(KEY, "paid")
+            redis.gate.set()
+            stale = await reader
+            return stale, await storage.get_state(KEY), storage._loading, storage._generations
+
+        stale, state, loading, generations = asyncio.run(scenario())
+
+        assert stale is None
+        assert state == "paid"
+        assert loading == {} and generations == {}
+
+    def test_local_copy_expires(self):
+        """С нулевым local_ttl каждое чтение идет в Redis"""
+        async def scenario():
+            redis = InMemoryRedis()
+            storage = RedisFSMStorage(redis, local_ttl=0)
+            await storage.get_state(KEY)
+            await storage.get_state(KEY)
+            return redis.round_trips
+
+        assert asyncio.run(scenario()) == 2
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Тесты для проверки initData WebApp API
+"""
+
+from benchmarks.webapp_api import FAKE_TOKEN, make_init_data, sign_init_data
+from app.utils.telegram import InitDataValidator
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestInitDataValidator:
+    """Тесты для app.utils.telegram.InitDataValidator"""
+
+    def test_valid_init_data_cached_until_expiry(self):
+        """Подпись проверяется один раз, результат живет до auth_date + max_age"""
+        clock = FakeClock(1_700_000_000)
+        validator = InitDataValidator(FAKE_TOKEN, max_age=3600, clock=clock)
+        init_data = make_init_data(42, auth_date=int(clock.now))
+
+        result = validator.validate(init_data)
+        assert result.user_id == 42
+        assert validator.validate(init_data) is result
+
+        clock.now += 3600
+        assert validator.validate(init_data) is None
+        assert not validator._cache
+
+    def test_invalid_init_data_rejected_and_not_cached(self):
+        """Чужая подпись, подмена полей и пустой hash не проходят и не попадают в кэш"""
+        clock = FakeClock(1_700_000_000)
+        validator = InitDataValidator(FAKE_TOKEN, clock=clock)
+        fields = {"user": '{"id":42}', "auth_date": str(int(clock.now))}
+
+        assert validator.validate(sign_init_data(fields, bot_token="1:other")) is None
+        assert validator.validate(sign_init_data(fields).replace("42", "43")) is None
+        assert validator.validate("user=%7B%22id%22%3A42%7D&auth_date=1") is None
+        assert not validator._cache
+
+        validator_small = InitDataValidator(FAKE_TOKEN, cache_size=2, clock=clock)
+        for user_id in (1, 2, 3):
+            validator_small.validate(make_init_data(user_id, auth_date=int(clock.now)))
+        assert len(validator_small._cache) == 2
+
+    def test_malformed_hash_rejected(self):
+        """Хэш не из ASCII или не той длины - невалидная initData, а не исключение"""
+        validator = InitDataValidator(FAKE_TOKEN, max_age=0)
+
+        assert validator.validate("auth_date=1&hash=%C3%A9") is None
+        assert validator.validate("auth_date=1&hash=" + "%C3%A9" * 64) is None
+        assert validator.validate("auth_date=1&hash=abc") is None
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Тесты для асинхронных InteractionService и CopyService
+"""
+
+import asyncio
+
+from aiogram import Bot
+
+from benchmarks.fake_telegram import FakeTelegramSession
+from src.services.copy_service import CopyService
+from src.services.interaction_service import InteractionService
+from src.utils.qr_generator import QRCache
+
+FAKE_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+
+
+class TestInteractionService:
+    """Тесты для src.services.interaction_service"""
+
+    def test_chat_action_throttled_per_chat(self):
+        """Действие чата уходит не чаще раза в интервал, чаты независимы"""
+        session = FakeTelegramSession()
+        interactions = InteractionService(Bot(FAKE_TOKEN, session=session))
+
+        async def spam():
+            return [await interactions.send_chat_action(chat_id) for chat_id in (1, 1, 1, 2)]
+
+        assert asyncio.run(spam()) == [True, False, False, True]
+        assert session.calls["sendChatAction"] == 2
+
+    def test_typing_stops_when_reply_is_sent(self):
+        """Индикатор печати - фоновая задача, которая гаснет с ответом в чат"""
+        session = FakeTelegramSession()
+        bot = Bot(FAKE_TOKEN, session=session)
+        interactions = InteractionService(bot)
+        interactions.set_bot(bot)
+
+        async def reply():
+            task = interactions.create_typing_indicator(42)
+            await asyncio.sleep(0.01)
+            await bot.send_message(42, "Готово")
+            await asyncio.sleep(0)
+            return task
+
+        task = asyncio.run(reply())
+
+        assert task.cancelled()
+        assert session.calls["sendChatAction"] == 1
+        assert not interactions._typing
+        # Повторный set_bot не регистрирует middleware второй раз
+        assert len(bot.session.middleware) == 1
+
+
+class TestCopyService:
+    """Тесты для src.services.copy_service"""
+
+    def test_qr_uploaded_once_then_sent_by_file_id(self, tmp_path):
+        """QR-код загружается один раз, дальше отправляется по file_id"""
+        session = FakeTelegramSession()
+        copies = CopyService(Bot(FAKE_TOKEN, session=session), qr_cache=QRCache(str(tmp_path), executor="inline"))
+
+        async def send_twice():
+            return [await copies.handle_qr_request(chat_id, "vless://example", "vless") for chat_id in (1, 2)]
+
+        assert asyncio.run(send_twice()) == [True, True]
+        assert session.calls["sendPhoto"] == 2
+        assert session.uploads["photo"] == 1
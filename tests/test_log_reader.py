@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Тесты для чтения хвоста лог-файла
+"""
+
+import pytest
+
+from admin.services.log_reader import LogFilter, tail_lines, read_from_offset
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    """Лог-файл из 1000 строк"""
+    path = tmp_path / "bot.log"
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(1000):
+            level = "ERROR" if i % 10 == 0 else "INFO"
+            f.write(f"2025-01-01 00:00:00 {level} yovpn.bot: Событие {i} от пользователя {100 + i % 7}\n")
+    return path
+
+
+class TestLogReader:
+    """Тесты для tail_lines / read_from_offset"""
+
+    def test_tail_lines_small_blocks(self, log_file):
+        """Последние строки совпадают с readlines() при любом размере блока"""
+        expected = log_file.read_text(encoding="utf-8").splitlines()[-25:]
+
+        for block_size in (7, 100, 4096, 1 << 20):
+            lines, offset = tail_lines(str(log_file), 25, block_size=block_size)
+            assert lines == expected
+            assert offset == log_file.stat().st_size
+
+    def test_tail_lines_more_than_file(self, log_file):
+        """Запрос больше строк, чем в файле"""
+        lines, _ = tail_lines(str(log_file), 5000, block_size=333)
+        assert len(lines) == 1000
+        assert lines[0].endswith("Событие 0 от пользователя 100")
+
+    def test_tail_lines_filter(self, log_file):
+        """Фильтрация по уровню и user id"""
+        lines, _ = tail_lines(str(log_file), 3, LogFilter(level="error", user_id=103), block_size=512)
+
+        assert len(lines) == 3
+        assert all(" ERROR " in line and line.endswith("пользователя 103") for line in lines)
+        assert lines[-1].endswith("Событие 990 от пользователя 103")
+
+    def test_read_from_offset(self, log_file):
+        """Follow отдает только новые полные строки"""
+        _, offset = tail_lines(str(log_file), 1)
+
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write("2025-01-01 00:00:01 INFO yovpn.bot: новая строка\n")
+            f.write("2025-01-01 00:00:01 INFO yovpn.bot: незаверш")
+
+        lines, new_offset = read_from_offset(str(log_file), offset)
+        assert lines == ["2025-01-01 00:00:01 INFO yovpn.bot: новая строка"]
+
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write("енная\n")
+
+        lines, _ = read_from_offset(str(log_file), new_offset)
+        assert lines == ["2025-01-01 00:00:01 INFO yovpn.bot: незавершенная"]
+
+    def test_read_from_offset_after_rotation(self, log_file):
+        """После ротации чтение начинается с начала файла"""
+        log_file.write_text("2025-01-02 00:00:00 INFO yovpn.bot: после ротации\n", encoding="utf-8")
+
+        lines, offset = read_from_offset(str(log_file), 10 ** 6)
+        assert lines == ["2025-01-02 00:00:00 INFO yovpn.bot: после ротации"]
+        assert offset == log_file.stat().st_size
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Тесты для синхронизации подписок с Marzban (POST /marzban/sync)
+"""
+
+from datetime import datetime
+from typing import List, Optional
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from admin.routes import marzban_routes
+from api.marzban_api import MarzbanPageError, SubscriptionData
+from database import get_db
+from database.db import Base
+from database.models import Subscription, User
+
+
+def remote_user(username: str, status: str = "active", used_traffic: int = 0) -> SubscriptionData:
+    return SubscriptionData(
+        username=username,
+        status=status,
+        expire_date=None,
+        data_limit=0,
+        used_traffic=used_traffic,
+        subscription_url="",
+        links=[],
+    )
+
+
+class StubMarzban:
+    """Клиент Marzban, отдающий заранее заданные страницы"""
+
+    def __init__(self, pages: List[List[SubscriptionData]], fail_at: Optional[int] = None):
+        self.pages = pages
+        self.fail_at = fail_at
+        self.closed = False
+
+    async def iter_subscription_pages(self, page_size: int = 500):
+        offset = 0
+        for index, page in enumerate(self.pages):
+            if index == self.fail_at:
+                raise MarzbanPageError(offset)
+            yield page
+            offset += len(page)
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest_asyncio.fixture
+async def sync_env():
+    """SQLite в памяти: 4 подписки, приложение с маршрутом синхронизации, счетчик SELECT"""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as session:
+        for i in range(1, 5):
+            session.add(User(id=i, tg_id=1000 + i, username=f"user{i}"))
+            session.add(Subscription(
+                user_id=i, marzban_username=f"user_{i}", start_date=datetime(2025, 1, 1),
+                is_active=True, used_traffic=0,
+            ))
+        await session.commit()
+
+    selects = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_selects(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    async def override_db():
+        async with factory() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(marzban_routes.router, prefix="/marzban")
+    app.dependency_overrides[get_db] = override_db
+
+    yield app, factory, selects
+    await engine.dispose()
+
+
+async def post_sync(app: FastAPI, monkeypatch, client: StubMarzban, **params) -> httpx.Response:
+    async def get_client():
+        return client
+
+    monkeypatch.setattr(marzban_routes, "get_marzban_client", get_client)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://admin") as http:
+        return await http.post("/marzban/sync", params=params)
+
+
+async def stored(factory):
+    async with factory() as session:
+        result = await session.execute(
+            select(Subscription.marzban_username, Subscription.is_active, Subscription.used_traffic)
+            .order_by(Subscription.id)
+        )
+        return {row.marzban_username: (row.is_active, row.used_traffic) for row in result}
+
+
+class TestMarzbanSync:
+    """Тесты для admin.routes.marzban_routes.sync_subscriptions"""
+
+    @pytest.mark.asyncio
+    async def test_pages_reconciled_with_one_select_each(self, sync_env, monkeypatch):
+        """Страница сверяется одним запросом IN, изменения записываются пакетно"""
+        app, factory, selects = sync_env
+        client = StubMarzban([
+            [remote_user("user_1", "disabled"), remote_user("user_2", used_traffic=500)],
+            [remote_user("user_3"), remote_user("ghost")],
+        ])
+
+        response = await post_sync(app, monkeypatch, client)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["success"] and not body["partial"]
+        assert body["stats"] == {"scanned": 4, "matched": 3, "updated": 2, "unchanged": 1, "missing": 1}
+        assert len(selects) == 2
+        assert client.closed
+        assert await stored(factory) == {
+            "user_1": (False, 0),
+            "user_2": (True, 500),
+            "user_3": (True, 0),
+            "user_4": (True, 0),
+        }
+
+    @pytest.mark.asyncio
+    async def test_dry_run_caps_diff_and_writes_nothing(self, sync_env, monkeypatch):
+        """dry_run возвращает не больше SYNC_DIFF_LIMIT изменений и не пишет в базу"""
+        app, factory, _ = sync_env
+        monkeypatch.setattr(marzban_routes, "SYNC_DIFF_LIMIT", 2)
+        client = StubMarzban([
+            [remote_user("user_1", "disabled"), remote_user("user_2", "disabled")],
+            [remote_user("user_3", used_traffic=7)],
+        ])
+
+        response = await post_sync(app, monkeypatch, client, dry_run="true")
+
+        body = response.json()
+        assert response.status_code == 200 and body["dry_run"]
+        assert [change["marzban_username"] for change in body["changes"]] == ["user_1", "user_2"]
+        assert body["changes"][0]["is_active"] == [True, False]
+        assert body["changes_truncated"]
+        assert body["stats"]["updated"] == 3
+        assert all(value == (True, 0) for value in (await stored(factory)).values())
+
+    @pytest.mark.asyncio
+    async def test_failed_page_keeps_reconciled_pages(self, sync_env, monkeypatch):
+        """Ошибка страницы Marzban: сверенное сохраняется, ответ 502 partial"""
+        app, factory, _ = sync_env
+        client = StubMarzban([
+            [remote_user("user_1", "disabled")],
+            [remote_user("user_2", "disabled")],
+        ], fail_at=1)
+
+        response = await post_sync(app, monkeypatch, client)
+
+        body = response.json()
+        assert response.status_code == 502
+        assert body["partial"] and not body["success"]
+        assert body["stats"]["updated"] == 1
+        data = await stored(factory)
+        assert data["user_1"] == (False, 0) and data["user_2"] == (True, 0)
+
+    @pytest.mark.asyncio
+    async def test_db_error_rolls_back_whole_run(self, sync_env, monkeypatch):
+        """Ошибка базы данных отменяет всю синхронизацию, включая уже обновленные страницы"""
+        app, factory, _ = sync_env
+        client = StubMarzban([
+            [remote_user("user_1", "disabled")],
+            [remote_user("user_2", "disabled")],
+        ])
+        reconcile = marzban_routes._reconcile_page
+        calls = []
+
+        async def failing_reconcile(db, page, stats):
+            calls.append(page)
+            if len(calls) == 2:
+                raise RuntimeError("database is locked")
+            return await reconcile(db, page, stats)
+
+        monkeypatch.setattr(marzban_routes, "_reconcile_page", failing_reconcile)
+
+        response = await post_sync(app, monkeypatch, client)
+
+        assert response.status_code == 500
+        assert not response.json()["success"]
+        assert client.closed
+        assert all(value == (True, 0) for value in (await stored(factory)).values())
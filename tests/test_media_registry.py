@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Тесты для реестра медиафайлов
+"""
+
+import asyncio
+
+from aiogram import Bot
+
+from benchmarks.fake_telegram import FakeTelegramSession
+from utils.media_registry import MediaRegistry, bot_namespace, content_key
+
+FAKE_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+IMAGE = b"\x89PNG\r\n\x1a\n" + b"broadcast image" * 100
+
+
+class TestMediaRegistry:
+    """Тесты для utils.media_registry"""
+
+    def test_concurrent_first_sends_upload_once(self, tmp_path):
+        """Одновременная рассылка одной картинки загружает ее один раз"""
+        session = FakeTelegramSession(latency=0.01)
+        bot = Bot(FAKE_TOKEN, session=session)
+        registry = MediaRegistry(str(tmp_path / "media.json"))
+
+        async def broadcast():
+            return await asyncio.gather(*(
+                registry.send_cached_photo(bot, chat_id, IMAGE, filename="news.png", caption="Новости")
+                for chat_id in range(20)
+            ))
+
+        messages = asyncio.run(broadcast())
+
+        assert session.uploads["photo"] == 1
+        assert session.calls["sendPhoto"] == 20
+        assert len({message.photo[-1].file_id for message in messages}) == 1
+        assert registry.stats == {"hits": 19, "uploads": 1, "stale": 0}
+
+    def test_failed_first_upload_retried_by_one_sender(self, tmp_path):
+        """Первая загрузка не удалась - повторяет один отправитель, а не все ожидающие"""
+        session = FakeTelegramSession(latency=0.01)
+        session.blocked_chats.add(0)
+        bot = Bot(FAKE_TOKEN, session=session)
+        registry = MediaRegistry(str(tmp_path / "media.json"))
+
+        async def broadcast():
+            return await asyncio.gather(*(
+                registry.send_cached_photo(bot, chat_id, IMAGE, filename="news.png")
+                for chat_id in range(10)
+            ), return_exceptions=True)
+
+        results = asyncio.run(broadcast())
+
+        assert isinstance(results[0], Exception)
+        assert session.uploads["photo"] == 1
+        assert session.calls["sendPhoto"] == 10
+        assert registry.stats == {"hits": 8, "uploads": 1, "stale": 0}
+
+    def test_registry_persists_per_bot(self, tmp_path):
+        """file_id переживают перезапуск и хранятся отдельно для каждого бота"""
+        path = tmp_path / "media.json"
+        document = tmp_path / "instruction.pdf"
+        document.write_bytes(b"%PDF-1.4 instruction")
+        session = FakeTelegramSession()
+        bot = Bot(FAKE_TOKEN, session=session)
+
+        asyncio.run(MediaRegistry(str(path)).send_cached_document(bot, 1, document))
+        restarted = MediaRegistry(str(path))
+        asyncio.run(restarted.send_cached_document(bot, 2, document))
+
+        assert session.uploads["document"] == 1
+        assert restarted.get(bot_namespace(bot), content_key(document.read_bytes())) == "fake-document-1"
+        assert restarted.get("7000000002", content_key(document.read_bytes())) is None
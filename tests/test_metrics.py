@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Тесты для метрик Prometheus
+"""
+
+import asyncio
+import time
+import urllib.request
+
+import pytest
+from aiogram.types import CallbackQuery, User
+
+from utils.metrics import (
+    MetricsRegistry,
+    install_http_metrics,
+    normalize_callback,
+    normalize_endpoint,
+    normalize_message,
+    start_metrics_server,
+)
+from bot.middleware.metrics_middleware import MetricsMiddleware
+
+# Бюджет накладных расходов инструментирования на один апдейт
+OVERHEAD_BUDGET_SECONDS = 50e-6
+
+
+class TestMetrics:
+    """Тесты для utils.metrics"""
+
+    def test_render_exposition_format(self):
+        """Счетчики, gauge и гистограммы в текстовом формате"""
+        registry = MetricsRegistry()
+        counter = registry.counter("test_requests_total", "Requests", ["status"])
+        gauge = registry.gauge("test_queue_depth", "Depth")
+        histogram = registry.histogram("test_latency_seconds", "Latency", ["handler"], buckets=(0.1, 1.0))
+
+        counter.labels("ok").inc()
+        counter.labels("ok").inc(2)
+        gauge.set(7)
+        histogram.labels("menu").observe(0.05)
+        histogram.labels("menu").observe(0.5)
+        histogram.labels("menu").observe(3)
+
+        text = registry.render()
+
+        assert '# TYPE test_requests_total counter' in text
+        assert 'test_requests_total{status="ok"} 3' in text
+        assert 'test_queue_depth 7' in text
+        assert 'test_latency_seconds_bucket{handler="menu",le="0.1"} 1' in text
+        assert 'test_latency_seconds_bucket{handler="menu",le="1"} 2' in text
+        assert 'test_latency_seconds_bucket{handler="menu",le="+Inf"} 3' in text
+        assert 'test_latency_seconds_count{handler="menu"} 3' in text
+
+    def test_labels_are_normalized(self):
+        """Метки не растут вместе с числом пользователей"""
+        assert normalize_callback("pay_500") == normalize_callback("pay_100") == "pay_#"
+        assert normalize_message("/start ref_123") == "/start"
+        assert normalize_message("/help@YoVPNBot") == "/help"
+        assert normalize_message("привет") == "text"
+        assert normalize_endpoint("/api/user/tg_42?x=1") == "/api/user/{username}"
+        assert normalize_endpoint("/sub/tg_42") == "/sub/{username}"
+
+    def test_metrics_server(self):
+        """Экспозиция на отдельном порту"""
+        registry = MetricsRegistry()
+        registry.counter("test_server_total", "Server").inc()
+
+        server = start_metrics_server(0, host="127.0.0.1", registry=registry)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+                body = response.read().decode()
+        finally:
+            server.shutdown()
+
+        assert "test_server_total 1" in body
+
+    def test_http_metrics_endpoint_access(self):
+        """/metrics на порту приложения: только с токеном или не отдается вовсе"""
+        import httpx
+        from fastapi import FastAPI
+
+        async def fetch(app, headers=None):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+                return (await client.get("/metrics", headers=headers)).status_code
+
+        protected = FastAPI()
+        install_http_metrics(protected, "test_protected", token="s3cret")
+        hidden = FastAPI()
+        install_http_metrics(hidden, "test_hidden", expose=False)
+
+        assert asyncio.run(fetch(protected)) == 401
+        assert asyncio.run(fetch(protected, {"Authorization": "Bearer wrong"})) == 401
+        assert asyncio.run(fetch(protected, {"Authorization": "Bearer s3cret"})) == 200
+        assert asyncio.run(fetch(hidden)) == 404
+
+    def test_middleware_overhead_budget(self):
+        """Инструментирование укладывается в бюджет на апдейт"""
+        event = CallbackQuery(
+            id="1",
+            from_user=User(id=42, is_bot=False, first_name="Test"),
+            chat_instance="1",
+            data="pay_100",
+        )
+        middleware = MetricsMiddleware()
+
+        async def handler(event, data):
+            return None
+
+        async def run(iterations: int, instrumented: bool) -> float:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                if instrumented:
+                    await middleware(handler, event, {})
+                else:
+                    await handler(event, {})
+            return time.perf_counter() - start
+
+        async def measure():
+            iterations = 20000
+            await run(1000, True)
+            baseline = min([await run(iterations, False) for _ in range(3)])
+            instrumented = min([await run(iterations, True) for _ in range(3)])
+            return (instrumented - baseline) / iterations
+
+        overhead = asyncio.run(measure())
+        assert overhead < OVERHEAD_BUDGET_SECONDS, f"{overhead * 1e6:.1f} мкс на апдейт"
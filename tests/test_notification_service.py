@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Тесты для массовой рассылки NotificationService
+"""
+
+import asyncio
+import time
+
+from aiogram import Bot
+
+from benchmarks.fake_telegram import FakeTelegramSession
+from bot.services.notification_service import NotificationService
+from bot.services.user_service import UserService
+
+FAKE_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+
+
+class TestBulkNotification:
+    """Тесты для NotificationService.send_bulk_notification"""
+
+    def test_failures_classified_and_dead_chats_skipped(self, tmp_path):
+        """Ошибки разложены по категориям, мертвые чаты потом пропускаются"""
+        session = FakeTelegramSession()
+        session.blocked_chats = {3, 7}
+        session.missing_chats = {5}
+        bot = Bot(FAKE_TOKEN, session=session)
+        user_service = UserService(str(tmp_path / "users.json"))
+        user_service.users.update({user_id: {"balance": 0.0} for user_id in range(1, 11)})
+        notifications = NotificationService(bot, user_service=user_service)
+
+        first = asyncio.run(notifications.send_bulk_notification(range(1, 11), "Техработы"))
+        second = asyncio.run(notifications.send_bulk_notification(range(1, 11), "Техработы"))
+
+        assert first.as_dict() == {
+            "total": 10, "sent": 7, "skipped": 0, "blocked": 2,
+            "chat_not_found": 1, "flood": 0, "transient": 0, "failed": 0,
+        }
+        assert (second.sent, second.skipped, second.blocked) == (7, 3, 0)
+        assert session.calls["sendMessage"] == 10 + 7
+        assert user_service.users[3]["unreachable"] == "blocked"
+
+        # Пользователь снова написал боту - рассылки до него доходят
+        asyncio.run(user_service.create_or_update_user(3, "user3", "User"))
+        assert "unreachable" not in user_service.users[3]
+
+    def test_bounded_pool_is_faster_than_sequential(self):
+        """Пул отправок прячет задержку Telegram и не превышает лимит параллелизма"""
+        session = FakeTelegramSession(latency=0.02)
+        bot = Bot(FAKE_TOKEN, session=session)
+        notifications = NotificationService(bot)
+        in_flight = {"now": 0, "max": 0}
+        send = notifications._send
+
+        async def counting_send(*args, **kwargs):
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            try:
+                return await send(*args, **kwargs)
+            finally:
+                in_flight["now"] -= 1
+
+        notifications._send = counting_send
+
+        started = time.perf_counter()
+        result = asyncio.run(notifications.send_bulk_notification(range(200), "Новости", concurrency=20))
+        elapsed = time.perf_counter() - started
+
+        assert result.sent == 200
+        assert in_flight["max"] == 20
+        assert elapsed < 200 * 0.02 / 5
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Тесты для сканера паттернов проверки ввода
+"""
+
+import re
+
+from benchmarks.input_validation import ATTACKS, SHORT_INPUTS, SUPPORT_MESSAGES, legacy_dangerous, legacy_spam
+from bot.services.security_service import SecurityService as BotSecurityService
+from src.config.monitoring import SecurityConfig
+from src.services.security_service import SecurityService
+from utils.pattern_scanner import PatternScanner
+
+SAMPLES = SUPPORT_MESSAGES + SHORT_INPUTS + ATTACKS + [
+    "<SCRIPT src=x>\nalert(1)\n</script>",
+    "Visit WWW.EXAMPLE.COM or HTTPS://bit.ly/x",
+    "onclick = steal()",
+    "..\\windows\\system32",
+    "EXEC (xp_cmdshell)",
+]
+
+
+class TestPatternScanner:
+    """Тесты для utils.pattern_scanner"""
+
+    def test_scan_matches_sequential_search(self):
+        """Один проход находит те же правила, что и перебор выражений"""
+        config = SecurityConfig(
+            secret_key="test", jwt_secret="test", encryption_key="test",
+            allowed_origins=[], allowed_methods=[], allowed_headers=[], csrf_secret="test"
+        )
+        legacy = legacy_dangerous(config.dangerous_patterns)
+        bot_security = BotSecurityService()
+
+        for text in SAMPLES:
+            assert list(config.dangerous_scanner.scan(text)) == legacy(text), text
+            assert (bot_security.validate_user_input(text)[0] is False) == legacy_spam(text), text
+
+    def test_validate_input_keeps_categories(self, caplog):
+        """validate_input отклоняет атаки и сообщает категорию первой проверки"""
+        security = SecurityService(secret_key="test")
+
+        assert security.validate_input("Здравствуйте, не приходит ключ")
+        assert not security.validate_input("1 UNION SELECT password FROM users")
+        assert not security.validate_input("<iframe src=x>")
+        assert not security.validate_input("../../etc/passwd")
+        assert not security.validate_input("please run CURL on it")
+        messages = [record.getMessage() for record in caplog.records]
+        assert "SQL инъекция" in messages[0]
+        assert "XSS" in messages[1]
+        assert "path traversal" in messages[2]
+        assert messages[3].endswith("curl")
+
+    def test_short_ascii_cached(self):
+        """Короткие ASCII строки проверяются через кэш, длинные и не-ASCII - напрямую"""
+        scanner = PatternScanner.literals(["t.me", "@"])
+
+        assert scanner.scan("@ivan t.me/x") == ("t.me", "@")
+        assert scanner.scan("@ivan t.me/x") == ("t.me", "@")
+        assert scanner._cached_scan.cache_info().hits == 1
+
+        assert scanner.scan("пишите @ivan") == ("@",)
+        assert scanner.scan("x" * 100 + "T.ME") == ("t.me",)
+        assert scanner._cached_scan.cache_info().currsize == 1
+
+        case_sensitive = PatternScanner([("upper", r"\S+X")])
+        assert case_sensitive.matches("abx")
+        assert not PatternScanner([("dots", re.escape(".."))]).matches("x.y")
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Тесты для кэша QR-кодов
+"""
+
+import asyncio
+
+from src.utils.qr_generator import QRCache, qr_cache_key, render_qr_png
+
+
+class TestQRCache:
+    """Тесты для src.utils.qr_generator.QRCache"""
+
+    def test_concurrent_requests_render_once(self, tmp_path):
+        """Одновременные запросы одного QR-кода рендерят его один раз"""
+        cache = QRCache(str(tmp_path), executor="thread")
+
+        async def scenario():
+            results = await asyncio.gather(*(cache.get_png("vless://user") for _ in range(10)))
+            results.append(await cache.get_png("vless://user"))
+            return results
+
+        results = asyncio.run(scenario())
+        cache.shutdown()
+
+        assert cache.stats["renders"] == 1
+        assert cache.stats["memory_hits"] == 1
+        assert all(png == render_qr_png("vless://user") for png in results)
+
+    def test_disk_and_file_id_survive_restart(self, tmp_path):
+        """PNG и file_id читаются с диска новым экземпляром кэша"""
+        cache = QRCache(str(tmp_path), executor="inline")
+        png = cache.get_png_sync("ref_42")
+        key = qr_cache_key("ref_42")
+        asyncio.run(cache.remember_file_id(key, "AgACAgIAAxk"))
+
+        restarted = QRCache(str(tmp_path), executor="inline")
+        assert asyncio.run(restarted.get_file_id(key)) == "AgACAgIAAxk"
+        assert restarted.get_png_sync("ref_42") == png
+        assert restarted.stats == {"memory_hits": 0, "disk_hits": 1, "renders": 0, "file_id_hits": 1}
+
+        asyncio.run(restarted.forget_file_id(key))
+        assert asyncio.run(QRCache(str(tmp_path)).get_file_id(key)) is None
+
+    def test_disk_opened_lazily(self, tmp_path):
+        """Конструктор не трогает диск, каталог создается при первом обращении"""
+        cache_dir = tmp_path / "qr"
+        cache = QRCache(str(cache_dir), executor="inline")
+        assert not cache_dir.exists()
+
+        asyncio.run(cache.get_png("vless://user"))
+        assert cache_dir.is_dir() and len(list(cache_dir.glob("*.png"))) == 1
+
+    def test_budgets(self, tmp_path):
+        """Кэш в памяти и на диске не выходит за бюджет"""
+        png_size = len(render_qr_png("user_0"))
+        cache = QRCache(str(tmp_path), max_memory_bytes=png_size * 3, max_disk_bytes=png_size * 5, executor="inline")
+
+        for user_id in range(10):
+            cache.get_png_sync(f"user_{user_id}")
+
+        assert cache._memory_bytes <= png_size * 3
+        assert qr_cache_key("user_9") in cache._memory
+        assert qr_cache_key("user_0") not in cache._memory
+        assert sum(path.stat().st_size for path in tmp_path.glob("*.png")) <= png_size * 5
+        assert (tmp_path / f"{qr_cache_key('user_9')}.png").exists()
+
+    def test_async_disk_hit_and_overwrite_accounting(self, tmp_path):
+        """get_png читает диск вне event loop, перезапись не раздувает учет размера"""
+        cache = QRCache(str(tmp_path), executor="inline")
+        png = asyncio.run(cache.get_png("vless://user"))
+        key = qr_cache_key("vless://user")
+        cache._write_disk(key, png)
+        assert cache._disk_bytes == sum(path.stat().st_size for path in tmp_path.glob("*.png")) == len(png)
+
+        restarted = QRCache(str(tmp_path), executor="inline")
+        assert asyncio.run(restarted.get_png("vless://user")) == png
+        assert restarted.stats == {"memory_hits": 0, "disk_hits": 1, "renders": 0, "file_id_hits": 0}
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Тесты для слоя рендера сообщений
+"""
+
+import asyncio
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
+
+from benchmarks.fake_telegram import FakeTelegramSession
+from utils.render_diff import install_render_diff
+
+FAKE_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+
+
+def menu(label: str = "Баланс") -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text=label, callback_data="balance")]])
+
+
+class TestRenderDiff:
+    """Тесты для utils.render_diff"""
+
+    def test_identical_edits_skipped(self):
+        """Правка с тем же текстом и клавиатурой не уходит в Telegram"""
+        session = FakeTelegramSession()
+        bot = Bot(FAKE_TOKEN, session=session)
+        render_diff = install_render_diff(bot)
+
+        async def double_taps():
+            message = await bot.send_message(1, "Главное меню", reply_markup=menu())
+            # Двойное нажатие "назад" перерисовывает то же меню
+            await message.edit_text("Главное меню", reply_markup=menu())
+            await message.edit_text("Баланс: 10 ₽", reply_markup=menu())
+            # Пропущенная правка возвращает Message, как Telegram
+            loading = await message.edit_text("Баланс: 10 ₽", reply_markup=menu())
+            assert isinstance(loading, Message) and loading.text == "Баланс: 10 ₽"
+            # Другая клавиатура - уже другое сообщение
+            await message.edit_text("Баланс: 10 ₽", reply_markup=menu("Пополнить"))
+            await message.edit_reply_markup(reply_markup=menu("Пополнить"))
+
+        asyncio.run(double_taps())
+
+        assert session.calls["editMessageText"] == 2
+        assert session.calls["editMessageReplyMarkup"] == 0
+        assert render_diff.stats["identical"] == 3
+        assert install_render_diff(bot) is render_diff
+
+    def test_burst_collapsed_into_last_edit(self):
+        """Пока правка в пути, из серии следующих правок уходит только последняя"""
+        session = FakeTelegramSession(latency=0.02)
+        bot = Bot(FAKE_TOKEN, session=session)
+        render_diff = install_render_diff(bot)
+
+        async def progress():
+            message = await bot.send_message(1, "0%")
+            results = await asyncio.gather(*(
+                bot.edit_message_text(f"{percent}%", chat_id=1, message_id=message.message_id)
+                for percent in range(10, 101, 10)
+            ))
+            return results, session.log
+
+        session.record_payloads = True
+        results, log = asyncio.run(progress())
+
+        edits = [payload["text"] for _, method, payload in log if method == "editMessageText"]
+        assert edits == ["10%", "100%"]
+        # Вытесненные правки получают сообщение из последней отправленной
+        assert [result.text for result in results] == ["10%"] + ["100%"] * 9
+        assert render_diff.stats["collapsed"] == 8
+        assert not render_diff._editing
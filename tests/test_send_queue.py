@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Тесты для очереди исходящих сообщений
+"""
+
+import asyncio
+import time
+
+from aiogram import Bot
+
+from benchmarks.fake_telegram import FakeTelegramSession
+from utils.send_queue import Lane, install_send_queue, send_lane
+
+FAKE_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+
+
+def make_bot(**session_kwargs):
+    session = FakeTelegramSession(**session_kwargs)
+    session.record_payloads = True
+    return Bot(FAKE_TOKEN, session=session), session
+
+
+class TestSendQueue:
+    """Тесты для utils.send_queue.SendQueue"""
+
+    def test_interactive_overtakes_broadcast(self):
+        """Ответ пользователю уходит раньше накопившейся рассылки"""
+        bot, session = make_bot()
+        queue = install_send_queue(bot, global_rate=40)
+
+        async def broadcast(chat_id: int):
+            with send_lane(Lane.BROADCAST):
+                await bot.send_message(chat_id, "Новости")
+
+        async def scenario():
+            tasks = [asyncio.create_task(broadcast(chat_id)) for chat_id in range(100, 140)]
+            await asyncio.sleep(0.1)
+            await bot.send_message(42, "Ответ")
+            await asyncio.gather(*tasks)
+            await queue.close()
+
+        asyncio.run(scenario())
+
+        order = [payload["chat_id"] for _, _, payload in session.log]
+        assert len(order) == 41
+        assert order.index(42) < 10
+        assert queue.depth == 0
+
+    def test_chat_and_global_limits(self):
+        """Сообщения в один чат и в сумме не выходят за лимиты"""
+        bot, session = make_bot()
+        queue = install_send_queue(bot, global_rate=50, chat_rate=10, chat_burst=1)
+
+        async def scenario():
+            started = time.perf_counter()
+            await asyncio.gather(*(bot.send_message(1, str(index)) for index in range(5)))
+            same_chat = time.perf_counter() - started
+            await asyncio.gather(*(bot.send_message(chat_id, "hi") for chat_id in range(2, 52)))
+            await queue.close()
+            return same_chat
+
+        same_chat = asyncio.run(scenario())
+
+        assert same_chat >= 0.35
+        times = [sent for sent, _, payload in session.log if payload["chat_id"] != 1]
+        assert times[-1] - times[0] >= 49 / 50 * 0.9
+        assert [payload["text"] for _, _, payload in session.log[:5]] == ["0", "1", "2", "3", "4"]
+
+    def test_retry_after_is_applied(self):
+        """429 не доходит до вызывающего: очередь ждет retry_after и повторяет"""
+        bot, session = make_bot(global_limit=3)
+        queue = install_send_queue(bot, global_rate=100)
+
+        async def scenario():
+            started = time.perf_counter()
+            messages = await asyncio.gather(*(bot.send_message(chat_id, "hi") for chat_id in range(1, 6)))
+            elapsed = time.perf_counter() - started
+            await queue.close()
+            return messages, elapsed
+
+        messages, elapsed = asyncio.run(scenario())
+
+        assert len(messages) == 5
+        assert session.flood_errors >= 1
+        assert queue.stats["retried"] == session.flood_errors
+        assert elapsed >= 1.0
+        assert session.calls["sendMessage"] == 5 + session.flood_errors
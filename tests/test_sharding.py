@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Тесты для шардирования апдейтов по воркерам
+"""
+
+import asyncio
+import multiprocessing
+
+from bot.sharding import KeyedSerializer, ShardRouter, consume_shard, shard_for_update, shard_key
+
+
+def message_update(update_id: int, user_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {"message_id": update_id, "chat": {"id": user_id}, "from": {"id": user_id}, "text": "hi"},
+    }
+
+
+def echo_worker(index: int, shards: int, inbox, results):
+    """Воркер для теста: сообщает, какие апдейты и в каком порядке получил"""
+    async def run():
+        async def process(update, meta):
+            await asyncio.sleep(0.001)
+            results.put((index, shard_key(update), update["update_id"]))
+
+        await consume_shard(inbox, process)
+
+    asyncio.run(run())
+
+
+class TestSharding:
+    """Тесты для bot.sharding"""
+
+    def test_shard_key(self):
+        """Ключ - пользователь, для событий без пользователя - чат или update_id"""
+        callback = {"update_id": 1, "callback_query": {"from": {"id": 42}, "data": "x"}}
+        channel_post = {"update_id": 2, "channel_post": {"chat": {"id": -100}}}
+
+        assert shard_key(message_update(5, 77)) == 77
+        assert shard_key(callback) == 42
+        assert shard_key(channel_post) == 2
+        assert shard_for_update(callback, 4) == 42 % 4
+
+    def test_serializer_keeps_per_key_order(self):
+        """Один ключ - строго по порядку, разные ключи - параллельно"""
+        async def scenario():
+            serializer = KeyedSerializer(concurrency=10)
+            log = []
+
+            async def job(key, number, delay):
+                await asyncio.sleep(delay)
+                log.append((key, number))
+
+            # Первая задача ключа 1 самая долгая, но порядок внутри ключа сохраняется
+            for number, delay in enumerate((0.03, 0.0, 0.01)):
+                serializer.submit(1, lambda number=number, delay=delay: job(1, number, delay))
+            serializer.submit(2, lambda: job(2, 0, 0.0))
+
+            await serializer.join()
+            return log
+
+        log = asyncio.run(scenario())
+
+        assert [number for key, number in log if key == 1] == [0, 1, 2]
+        assert log[0] == (2, 0)
+
+    def test_router_routes_by_user(self):
+        """Апдейты пользователя приходят в один процесс в исходном порядке"""
+        async def scenario():
+            results = multiprocessing.get_context("spawn").Queue()
+            router = ShardRouter(2, target=echo_worker, target_args=(results,))
+            router.start()
+            try:
+                for update_id in range(40):
+                    await router.route(message_update(update_id, user_id=100 + update_id % 5))
+            finally:
+                await router.stop()
+            return [results.get(timeout=10) for _ in range(40)]
+
+        received = asyncio.run(scenario())
+
+        for shard, user_id, _ in received:
+            assert shard == user_id % 2
+        for user_id in range(100, 105):
+            ids = [update_id for _, user, update_id in received if user == user_id]
+            assert ids == sorted(ids) and len(ids) == 8
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Тесты для активации подписки в WebApp API
+"""
+
+import asyncio
+
+import benchmarks.webapp_api  # noqa: F401 - путь к api/ и настройки окружения
+from benchmarks.fake_marzban import DEFAULT_TOKEN, FakeMarzbanServer, FaultProfile, LatencyDistribution
+from bot.services.marzban_service import MarzbanService
+from bot.services.user_service import UserService
+
+
+class TestSubscriptionActivation:
+    """Тесты для SubscriptionServiceAPI.activate_subscription"""
+
+    def test_double_tap_shares_one_activation(self, tmp_path, monkeypatch):
+        """Одновременные и повторные активации - один проход по Marzban, GET + POST"""
+        monkeypatch.chdir(tmp_path)
+        from app.services.subscription_service import SubscriptionServiceAPI
+
+        async def scenario():
+            async with FakeMarzbanServer() as marzban:
+                marzban.set_profile(None, FaultProfile(latency=LatencyDistribution("fixed", 0.02)))
+                service = SubscriptionServiceAPI()
+                service.marzban_service = MarzbanService(api_url=marzban.url, admin_token=DEFAULT_TOKEN)
+                service.user_service = UserService(str(tmp_path / "data.json"))
+                await service.marzban_service.check_api_availability()
+                marzban.requests = 0
+                try:
+                    taps = await asyncio.gather(*(service.activate_subscription(42, "android") for _ in range(3)))
+                    replay = await service.activate_subscription(42, "ios")
+                    after_replay = marzban.requests
+                    # Другой ключ - новая активация, уже продление существующего пользователя
+                    extended = await service.activate_subscription(42, "ios", idempotency_key="retry-1")
+                    return taps, replay, after_replay, extended, marzban.requests, dict(marzban.users)
+                finally:
+                    await service.marzban_service.close()
+
+        taps, replay, after_replay, extended, requests, users = asyncio.run(scenario())
+
+        assert taps[0]["message"] == "Subscription created successfully"
+        assert taps[0]["subscription_uri"].endswith("/sub/user_42")
+        assert all(tap is taps[0] for tap in taps) and replay is taps[0]
+        assert after_replay == 2
+        assert extended["message"] == "Subscription extended successfully"
+        assert requests == 4
+        assert list(users) == ["user_42"]
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Тесты для SystemSampler
+"""
+
+import asyncio
+
+import pytest
+
+from admin.services.system_sampler import SystemSampler
+
+
+class TestSystemSampler:
+    """Тесты для admin.services.system_sampler"""
+
+    def test_ring_buffer_keeps_newest(self):
+        """Буфер хранит только последние history_size замеров"""
+        sampler = SystemSampler(history_size=3)
+
+        async def scenario():
+            for lag in range(5):
+                await sampler.sample_once(loop_lag_ms=float(lag))
+
+        asyncio.run(scenario())
+
+        assert len(sampler) == 3
+        assert sampler.latest().loop_lag_ms == 4.0
+        assert sampler.history("loop_lag_ms") == [2.0, 3.0, 4.0]
+
+    def test_history_points(self):
+        """points ограничивает историю, 0 и меньше - пустой список"""
+        sampler = SystemSampler(history_size=10)
+
+        async def scenario():
+            for lag in range(4):
+                await sampler.sample_once(loop_lag_ms=float(lag))
+
+        asyncio.run(scenario())
+
+        assert sampler.history("loop_lag_ms", 2) == [2.0, 3.0]
+        assert sampler.history("loop_lag_ms", 100) == [0.0, 1.0, 2.0, 3.0]
+        assert sampler.history("loop_lag_ms", 0) == []
+        assert sampler.history("loop_lag_ms", -1) == []
+        with pytest.raises(ValueError):
+            sampler.history("unknown")
+
+    def test_start_and_stop(self):
+        """Фоновый сбор запускается один раз и останавливается"""
+        sampler = SystemSampler(interval=0.01, history_size=100)
+
+        async def scenario():
+            assert sampler.latest() is None
+            sampler.start()
+            task = sampler._task
+            sampler.start()
+            assert sampler._task is task and sampler.is_running()
+
+            await asyncio.sleep(0.1)
+            await sampler.stop()
+            collected = len(sampler)
+            await asyncio.sleep(0.05)
+            return collected
+
+        collected = asyncio.run(scenario())
+
+        assert collected >= 2
+        assert len(sampler) == collected
+        assert not sampler.is_running()
+        assert sampler.latest().cpu_percent >= 0
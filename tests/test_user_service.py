@@ -103,6 +103,22 @@ class TestUserService:
         success = self.user_service.record_referral(123, 123)
         assert success == False
     
+    def test_balance_listener(self):
+        """Подписчики видят пополнение и активацию подписки"""
+        self.user_service.ensure_user_record(123, "testuser", "Test User")
+        changes = []
+        self.user_service.add_balance_listener(
+            lambda user_id, user_data: changes.append(
+                (user_id, user_data['balance_rub'], user_data.get('subscription_active', False))
+            )
+        )
+        
+        self.user_service.credit_balance(123, 50, "test")
+        self.user_service.update_user_record(123, {"subscription_active": True})
+        
+        assert changes == [(123, 50, False), (123, 50, True)]
+        assert self.user_service.get_all_user_data()[123]['subscription_active'] is True
+    
     def test_find_user_id_by_username(self):
         """Тест поиска пользователя по username"""
         user = self.user_service.ensure_user_record(123, "testuser", "Test User")
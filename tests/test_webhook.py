@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Тесты для webhook режима бота
+"""
+
+import asyncio
+
+import aiohttp
+from aiogram import Bot, Dispatcher, F
+from aiogram.types import Message
+
+from benchmarks.fake_telegram import FakeTelegramSession
+from bot.webhook import SECRET_HEADER, UpdateDeduplicator, WebhookServer
+
+FAKE_TOKEN = "7000000001:AAFakeTokenForLoadTestingOnly0000000"
+
+
+def make_update(update_id: int, text: str = "ping") -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": 42, "type": "private"},
+            "from": {"id": 42, "is_bot": False, "first_name": "Test"},
+            "text": text,
+        },
+    }
+
+
+async def start_server(handler_delay: float = 0.0, **kwargs):
+    """Webhook сервер с одним обработчиком, который отвечает на текст"""
+    handled = []
+    release = asyncio.Event()
+    if not handler_delay:
+        release.set()
+
+    dp = Dispatcher()
+
+    @dp.message(F.text)
+    async def echo(message: Message):
+        await release.wait()
+        handled.append(message.message_id)
+        await message.answer(message.text)
+
+    session = FakeTelegramSession()
+    kwargs.setdefault("secret_token", "s3cret")
+    server = WebhookServer(dp, Bot(FAKE_TOKEN, session=session), **kwargs)
+    port = await server.start("127.0.0.1", 0)
+    return server, f"http://127.0.0.1:{port}{server.path}", handled, release, session
+
+
+class TestWebhook:
+    """Тесты для bot.webhook"""
+
+    def test_deduplicator_window(self):
+        """Повторы отсекаются, старые id вытесняются из окна"""
+        dedup = UpdateDeduplicator(size=3)
+
+        assert dedup.add(1) and dedup.add(2) and dedup.add(3)
+        assert not dedup.add(2)
+        assert dedup.add(4)
+        assert 1 not in dedup and len(dedup) == 3
+
+    def test_updates_are_acked_and_processed_once(self):
+        """Апдейт подтверждается сразу, повторная доставка не обрабатывается"""
+        async def scenario():
+            server, url, handled, _, session = await start_server(secret_token="s3cret")
+            headers = {SECRET_HEADER: "s3cret"}
+            try:
+                async with aiohttp.ClientSession() as client:
+                    statuses = []
+                    for update_id in (1, 2, 2, 3, 1):
+                        async with client.post(url, json=make_update(update_id), headers=headers) as response:
+                            statuses.append(response.status)
+                    async with client.post(url, json=make_update(9), headers={SECRET_HEADER: "bad"}) as response:
+                        unauthorized = response.status
+            finally:
+                await server.stop()
+            return statuses, unauthorized, handled, server.stats, session.calls
+
+        statuses, unauthorized, handled, stats, calls = asyncio.run(scenario())
+
+        assert statuses == [200] * 5
+        assert unauthorized == 401
+        assert sorted(handled) == [1, 2, 3]
+        assert stats["duplicates"] == 2 and stats["processed"] == 3
+        assert calls["sendMessage"] == 3
+
+    def test_full_queue_rejects_without_losing_updates(self):
+        """При переполнении очереди апдейт не подтверждается и принимается повторно"""
+        async def scenario():
+            server, url, handled, release, _ = await start_server(
+                handler_delay=1, queue_size=2, workers=1
+            )
+            headers = {SECRET_HEADER: "s3cret"}
+            try:
+                async with aiohttp.ClientSession() as client:
+                    statuses = []
+                    for update_id in range(1, 6):
+                        async with client.post(url, json=make_update(update_id), headers=headers) as response:
+                            statuses.append(response.status)
+
+                    release.set()
+                    await server.queue.join()
+
+                    async with client.post(url, json=make_update(5), headers=headers) as response:
+                        retried = response.status
+            finally:
+                await server.stop()
+            return statuses, retried, handled
+
+        statuses, retried, handled = asyncio.run(scenario())
+
+        # Первый апдейт у воркера, два в очереди, остальные отклонены
+        assert statuses.count(200) == 3 and statuses.count(503) == 2
+        assert retried == 200
+        assert 5 in handled
+
+    def test_empty_secret_is_generated(self):
+        """Без настроенного секрета сервер не принимает апдейты без заголовка"""
+        async def scenario():
+            server, url, handled, _, _ = await start_server(secret_token="")
+            try:
+                async with aiohttp.ClientSession() as client:
+                    async with client.post(url, json=make_update(1)) as response:
+                        unsigned = response.status
+                    async with client.post(url, json=make_update(2), headers={SECRET_HEADER: server.secret_token}) as response:
+                        signed = response.status
+                    await server.queue.join()
+            finally:
+                await server.stop()
+            return server.secret_token, unsigned, signed, handled
+
+        secret, unsigned, signed, handled = asyncio.run(scenario())
+
+        assert len(secret) >= 32
+        assert unsigned == 401 and signed == 200
+        assert handled == [2]
@@ -0,0 +1,154 @@
+"""
+Расписание предупреждений о низком балансе
+Предупреждение отправляется, когда оно нужно, без обхода всех пользователей
+
+При каждом изменении баланса (или цены дня) для пользователя считается
+прогноз: баланс / стоимость дня = сколько дней осталось. Момент
+предупреждения - за warn_days до исчерпания баланса - кладется в
+min-heap. Цикл уведомлений спит до ближайшего момента и забирает из кучи
+только тех, кому пора, поэтому работа пропорциональна числу
+предупреждений, а не числу пользователей.
+
+Пользователь предупреждается один раз за эпизод низкого баланса: повторно
+только после пополнения выше порога. Устаревшие записи кучи (баланс
+изменился раньше, чем подошел срок) отбрасываются по номеру версии.
+"""
+
+import heapq
+import itertools
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# За сколько дней до исчерпания баланса предупреждать
+WARN_DAYS = 1.0
+
+
+@dataclass(frozen=True)
+class DueWarning:
+    """Предупреждение, срок которого подошел"""
+    user_id: Hashable
+    balance: float
+    days_left: int
+
+
+class DepletionSchedule:
+    """
+    Min-heap моментов предупреждения по прогнозу исчерпания баланса
+
+    Отвечает за:
+    - Прогноз исчерпания баланса при каждом изменении баланса или цены
+    - Выдачу предупреждений, срок которых подошел
+    - Защиту от повторных предупреждений до пополнения
+    """
+
+    def __init__(
+        self,
+        daily_cost: float,
+        warn_days: float = WARN_DAYS,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            daily_cost: Стоимость дня подписки
+            warn_days: За сколько дней до исчерпания баланса предупреждать
+            clock: Источник времени (секунды)
+        """
+        self.daily_cost = daily_cost
+        self.warn_days = warn_days
+        self._clock = clock
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        # Последний известный баланс: (баланс, когда изменился, версия записи в куче)
+        self._balances: Dict[Hashable, Tuple[float, float, int]] = {}
+        self._warned: Set[Hashable] = set()
+        self._versions = itertools.count()
+        self.stats = {"updates": 0, "warnings": 0, "stale": 0}
+
+    def __len__(self) -> int:
+        """Пользователей, ожидающих предупреждения"""
+        return sum(1 for user_id in self._balances if user_id not in self._warned)
+
+    def update(self, user_id: Hashable, balance: float, active: bool = True, now: Optional[float] = None):
+        """
+        Пересчитать прогноз после изменения баланса
+
+        Args:
+            user_id: ID пользователя
+            balance: Новый баланс
+            active: Списывается ли сейчас плата (без подписки предупреждать не о чем)
+            now: Момент изменения (по умолчанию - сейчас)
+        """
+        self.stats["updates"] += 1
+        if not active or self.daily_cost <= 0:
+            self._balances.pop(user_id, None)
+            return
+
+        now = self._clock() if now is None else now
+        days_left = balance / self.daily_cost
+        previous = self._balances.get(user_id)
+        if days_left > self.warn_days and (previous is None or balance > previous[0]):
+            # Пополнил баланс - следующий эпизод низкого баланса предупреждаем заново
+            self._warned.discard(user_id)
+
+        version = next(self._versions)
+        self._balances[user_id] = (balance, now, version)
+        if user_id in self._warned:
+            return
+
+        warn_at = now + max(0.0, days_left - self.warn_days) * SECONDS_PER_DAY
+        heapq.heappush(self._heap, (warn_at, version, user_id))
+        self._compact()
+
+    def discard(self, user_id: Hashable):
+        """Перестать следить за пользователем"""
+        self._balances.pop(user_id, None)
+
+    def mark_warned(self, user_id: Hashable):
+        """Пользователь уже предупрежден (например, до перезапуска)"""
+        self._warned.add(user_id)
+
+    def is_warned(self, user_id: Hashable) -> bool:
+        """Предупрежден ли пользователь в текущем эпизоде низкого баланса"""
+        return user_id in self._warned
+
+    def set_daily_cost(self, daily_cost: float):
+        """Пересчитать все прогнозы под новую цену дня"""
+        self.daily_cost = daily_cost
+        for user_id, (balance, updated, _) in list(self._balances.items()):
+            self.update(user_id, balance, now=updated)
+
+    def next_due(self) -> Optional[float]:
+        """Момент ближайшего предупреждения (None - ждать нечего)"""
+        while self._heap and not self._is_current(self._heap[0]):
+            heapq.heappop(self._heap)
+            self.stats["stale"] += 1
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: Optional[float] = None) -> List[DueWarning]:
+        """Забрать предупреждения, срок которых подошел"""
+        now = self._clock() if now is None else now
+        due: List[DueWarning] = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if not self._is_current(entry):
+                self.stats["stale"] += 1
+                continue
+            user_id = entry[2]
+            balance = self._balances[user_id][0]
+            self._warned.add(user_id)
+            due.append(DueWarning(user_id, balance, int(balance / self.daily_cost)))
+        self.stats["warnings"] += len(due)
+        return due
+
+    def _is_current(self, entry: Tuple[float, int, Hashable]) -> bool:
+        _, version, user_id = entry
+        current = self._balances.get(user_id)
+        return current is not None and current[2] == version and user_id not in self._warned
+
+    def _compact(self):
+        # Частые пополнения оставляют в куче устаревшие записи - пересобираем ее
+        if len(self._heap) > 2 * len(self._balances) + 64:
+            self._heap = [entry for entry in self._heap if self._is_current(entry)]
+            heapq.heapify(self._heap)
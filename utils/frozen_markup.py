@@ -0,0 +1,101 @@
+"""
+Готовые клавиатуры бота
+Клавиатура строится и сериализуется один раз, а не на каждое нажатие
+
+Клавиатура aiogram - дерево pydantic-моделей: на каждое нажатие кнопки
+меню строится заново (валидация каждой кнопки), а при отправке еще раз
+превращается в dict и в JSON. Для дешевых кликов меню это основная
+работа процессора. Здесь:
+
+- @frozen_keyboard запоминает клавиатуру построителя по его аргументам;
+- FrozenKeyboard хранит JSON, который сессия уже отправляла, и отпечаток
+  для слоя рендера;
+- PreparedMarkupSession подставляет этот JSON вместо повторной сериализации.
+
+Запомненные клавиатуры общие для всех вызовов - их нельзя изменять.
+"""
+
+import functools
+import hashlib
+from typing import Any, Callable, Optional, TypeVar
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import InlineKeyboardMarkup
+from aiohttp import FormData
+from pydantic import PrivateAttr
+
+# Сколько вариантов параметризованной клавиатуры помнить
+FROZEN_CACHE_SIZE = 256
+
+Builder = TypeVar("Builder", bound=Callable[..., InlineKeyboardMarkup])
+
+
+def _dump_digest(markup: InlineKeyboardMarkup) -> bytes:
+    return hashlib.blake2b(repr(markup.model_dump(exclude_none=True)).encode(), digest_size=16).digest()
+
+
+def markup_digest(markup: InlineKeyboardMarkup) -> bytes:
+    """Отпечаток содержимого клавиатуры (у общих клавиатур - посчитанный один раз)"""
+    if isinstance(markup, FrozenKeyboard):
+        return markup.digest
+    return _dump_digest(markup)
+
+
+class FrozenKeyboard(InlineKeyboardMarkup):
+    """Общая неизменяемая клавиатура с сериализацией, посчитанной один раз"""
+
+    _prepared: Optional[str] = PrivateAttr(default=None)
+    _digest: Optional[bytes] = PrivateAttr(default=None)
+
+    @classmethod
+    def freeze(cls, markup: InlineKeyboardMarkup) -> "FrozenKeyboard":
+        """Сделать общую клавиатуру из собранной"""
+        if isinstance(markup, cls):
+            return markup
+        return cls(inline_keyboard=markup.inline_keyboard)
+
+    @property
+    def digest(self) -> bytes:
+        """Отпечаток содержимого клавиатуры"""
+        if self._digest is None:
+            self._digest = _dump_digest(self)
+        return self._digest
+
+
+def frozen_keyboard(builder: Builder) -> Builder:
+    """
+    Строить клавиатуру один раз на набор аргументов
+
+    Нехэшируемые аргументы (списки сумм, кнопок) строят клавиатуру заново.
+    """
+    cached = functools.lru_cache(maxsize=FROZEN_CACHE_SIZE)(
+        lambda *args, **kwargs: FrozenKeyboard.freeze(builder(*args, **kwargs))
+    )
+
+    @functools.wraps(builder)
+    def wrapper(*args, **kwargs):
+        try:
+            hash((args, tuple(kwargs.values())))
+        except TypeError:
+            return builder(*args, **kwargs)
+        return cached(*args, **kwargs)
+
+    wrapper.cache_info = cached.cache_info
+    return wrapper
+
+
+class PreparedMarkupSession(AiohttpSession):
+    """Сессия aiohttp, отправляющая FrozenKeyboard готовым JSON"""
+
+    def build_form_data(self, bot: Bot, method: TelegramMethod[Any]) -> FormData:
+        markup = getattr(method, "reply_markup", None)
+        if not isinstance(markup, FrozenKeyboard):
+            return super().build_form_data(bot, method)
+
+        form = super().build_form_data(bot, method.model_copy(update={"reply_markup": None}))
+        if markup._prepared is None:
+            markup._prepared = self.prepare_value(markup, bot=bot, files={})
+        form.add_field("reply_markup", markup._prepared)
+        return form
@@ -0,0 +1,222 @@
+"""
+FSM хранилище в Redis
+Состояния aiogram переживают перезапуск и доступны всем воркерам
+
+Состояние и данные одного ключа лежат в одном hash, поэтому чтение
+state + data - одна команда HGETALL (один сетевой round trip). Поверх
+Redis работает небольшой локальный read-through кэш: повторные чтения
+в рамках апдейта и соседних апдейтов пользователя не ходят в сеть.
+"""
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey, DEFAULT_DESTINY
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from utils.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+# Через сколько секунд бездействия состояние удаляется из Redis
+FSM_STATE_TTL = 24 * 3600
+
+# Сколько секунд локальная копия считается свежей.
+# Пока ключ пишет один процесс, копия всегда актуальна; TTL ограничивает
+# рассинхронизацию, если несколько процессов обслуживают одного пользователя.
+FSM_LOCAL_TTL = 5.0
+
+# Максимум ключей в локальном кэше
+FSM_LOCAL_SIZE = 10000
+
+_STATE_FIELD = "state"
+_DATA_FIELD = "data"
+
+# (истекает в, state, data в JSON)
+_CacheEntry = Tuple[float, Optional[str], Optional[str]]
+
+
+def _decode(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class RedisFSMStorage(BaseStorage):
+    """
+    FSM хранилище в Redis с локальным кэшем
+
+    Отвечает за:
+    - Хранение state и data одного ключа в одном hash (HGETALL за один round trip)
+    - Запись с продлением TTL одним pipeline (бездействующие состояния истекают сами)
+    - Локальный LRU кэш с коротким TTL, который обновляется при записи
+    - Защиту кэша от ответа HGETALL, который устарел из-за записи во время чтения
+    """
+
+    def __init__(
+        self,
+        redis: Any,
+        prefix: str = "fsm",
+        state_ttl: Optional[int] = FSM_STATE_TTL,
+        local_ttl: float = FSM_LOCAL_TTL,
+        local_size: int = FSM_LOCAL_SIZE
+    ):
+        """
+        Инициализация хранилища
+
+        Args:
+            redis: Клиент redis.asyncio.Redis
+            prefix: Префикс ключей
+            state_ttl: TTL ключа в секундах (None - без истечения)
+            local_ttl: Время жизни локальной копии (0 - без локального кэша)
+            local_size: Максимум ключей в локальном кэше
+        """
+        self.redis = redis
+        self.prefix = prefix
+        self.state_ttl = state_ttl
+        self.local_ttl = local_ttl
+        self.local_size = local_size
+        self._local: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        # Ключи с незавершенным HGETALL: число чтений и номер записи (поколение).
+        # Запись во время чтения меняет поколение, и ответ чтения в кэш не попадает.
+        self._loading: Dict[str, int] = {}
+        self._generations: Dict[str, int] = {}
+
+    @classmethod
+    def from_url(cls, url: str, password: Optional[str] = None, **kwargs: Any) -> "RedisFSMStorage":
+        """Создать хранилище по URL Redis"""
+        from redis.asyncio import Redis
+
+        return cls(Redis.from_url(url, password=password or None), **kwargs)
+
+    def _key(self, key: StorageKey) -> str:
+        parts = [self.prefix, str(key.bot_id), str(key.chat_id), str(key.user_id)]
+        if key.thread_id is not None:
+            parts.append(str(key.thread_id))
+        if key.destiny != DEFAULT_DESTINY:
+            parts.append(key.destiny)
+        return ":".join(parts)
+
+    # ----- Локальный кэш -----
+
+    def _cached(self, redis_key: str) -> Optional[_CacheEntry]:
+        entry = self._local.get(redis_key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._local[redis_key]
+            return None
+        self._local.move_to_end(redis_key)
+        return entry
+
+    def _remember(self, redis_key: str, state: Optional[str], data: Optional[str]):
+        if self.local_ttl <= 0:
+            return
+        self._local[redis_key] = (time.monotonic() + self.local_ttl, state, data)
+        self._local.move_to_end(redis_key)
+        if len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+
+    def invalidate(self, key: Optional[StorageKey] = None):
+        """Сбросить локальную копию ключа (или весь кэш)"""
+        if key is None:
+            self._local.clear()
+        else:
+            self._local.pop(self._key(key), None)
+
+    async def _load(self, key: StorageKey) -> Tuple[str, Optional[str], Optional[str]]:
+        """state и data ключа: из локального кэша или одним HGETALL"""
+        redis_key = self._key(key)
+        entry = self._cached(redis_key)
+        if entry is not None:
+            record_cache("fsm", True)
+            return redis_key, entry[1], entry[2]
+
+        record_cache("fsm", False)
+        generation = self._generations.get(redis_key, 0)
+        self._loading[redis_key] = self._loading.get(redis_key, 0) + 1
+        try:
+            raw = await self.redis.hgetall(redis_key)
+        finally:
+            self._loading[redis_key] -= 1
+            if not self._loading[redis_key]:
+                del self._loading[redis_key]
+                stale = self._generations.pop(redis_key, 0) != generation
+            else:
+                stale = self._generations.get(redis_key, 0) != generation
+        fields = {_decode(name): _decode(value) for name, value in raw.items()}
+        state, data = fields.get(_STATE_FIELD), fields.get(_DATA_FIELD)
+        if not stale:
+            self._remember(redis_key, state, data)
+        return redis_key, state, data
+
+    def _bump(self, redis_key: str):
+        """Отметить завершенную запись для чтений, которые еще ждут HGETALL"""
+        if redis_key in self._loading:
+            self._generations[redis_key] = self._generations.get(redis_key, 0) + 1
+
+    async def _write(self, redis_key: str, field: str, value: Optional[str]):
+        """Записать поле и продлить TTL за один round trip"""
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if value is None:
+                pipe.hdel(redis_key, field)
+            else:
+                pipe.hset(redis_key, field, value)
+                if self.state_ttl:
+                    pipe.expire(redis_key, self.state_ttl)
+            await pipe.execute()
+
+    # ----- BaseStorage -----
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        redis_key = self._key(key)
+        value = state.state if hasattr(state, "state") else state
+        await self._write(redis_key, _STATE_FIELD, value)
+        self._bump(redis_key)
+
+        entry = self._local.get(redis_key)
+        if entry is not None:
+            self._remember(redis_key, value, entry[2])
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        _, state, _ = await self._load(key)
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        redis_key = self._key(key)
+        value = json.dumps(data, ensure_ascii=False) if data else None
+        await self._write(redis_key, _DATA_FIELD, value)
+        self._bump(redis_key)
+
+        entry = self._local.get(redis_key)
+        if entry is not None:
+            self._remember(redis_key, entry[1], value)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, _, data = await self._load(key)
+        # Разбор JSON на каждое чтение отдает вызывающему независимую копию
+        return json.loads(data) if data else {}
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+def create_fsm_storage(backend: str, redis_url: str = "", redis_password: str = "") -> BaseStorage:
+    """
+    Создать FSM хранилище по настройке FSM_STORAGE
+
+    Args:
+        backend: "memory" или "redis"
+        redis_url: URL Redis для backend="redis"
+        redis_password: Пароль Redis
+
+    Returns:
+        BaseStorage: Хранилище для Dispatcher
+    """
+    if backend == "redis":
+        logger.info(f"🗄️ FSM хранилище: Redis ({redis_url})")
+        return RedisFSMStorage.from_url(redis_url, password=redis_password)
+    return MemoryStorage()
@@ -0,0 +1,191 @@
+"""
+Реестр медиафайлов Telegram
+Файл загружается один раз, дальше отправляется по file_id
+
+Ключ - sha256 содержимого, поэтому одна и та же картинка из рассылки,
+стикер или инструкция загружается в Telegram один раз, как бы ни
+назывался файл. file_id привязан к боту, поэтому реестр хранит их
+отдельно для каждого бота (по id из токена). Реестр сохраняется в JSON
+и переживает перезапуск; если несколько процессов пишут один файл,
+потерянная запись стоит только лишней загрузки.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile, Message
+
+logger = logging.getLogger(__name__)
+
+# Файл реестра по умолчанию
+MEDIA_REGISTRY_FILE = "media_registry.json"
+
+Content = Union[bytes, str, Path]
+
+
+def content_key(content: bytes) -> str:
+    """Ключ содержимого: sha256"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def bot_namespace(bot: Any) -> str:
+    """Раздел реестра для бота: id из токена (file_id действительны только для своего бота)"""
+    token = getattr(bot, "token", "") or ""
+    return token.split(":", 1)[0] or "default"
+
+
+def _extract_file_id(message: Optional[Message], kind: str) -> Optional[str]:
+    if message is None:
+        return None
+    if kind == "photo":
+        return message.photo[-1].file_id if message.photo else None
+    media = getattr(message, kind, None)
+    return media.file_id if media else None
+
+
+class MediaRegistry:
+    """
+    Постоянный реестр file_id по хэшу содержимого
+
+    Отвечает за:
+    - Хранение file_id после первой успешной загрузки
+    - Отправку по file_id, повторную загрузку, если Telegram его не принял
+    - Объединение одновременных первых загрузок одного файла (один загружающий за раз)
+    """
+
+    def __init__(self, path: Optional[str] = MEDIA_REGISTRY_FILE):
+        """
+        Args:
+            path: JSON файл реестра (None - только в памяти)
+        """
+        self.path = Path(path) if path else None
+        self._file_ids: Dict[str, Dict[str, str]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"hits": 0, "uploads": 0, "stale": 0}
+        self._load()
+
+    def _load(self):
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            self._file_ids = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Реестр медиа не прочитан, начинаем с пустого: {e}")
+            self._file_ids = {}
+
+    def _save(self):
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp = self.path.with_suffix(".tmp")
+            temp.write_text(json.dumps(self._file_ids, ensure_ascii=False), encoding="utf-8")
+            temp.replace(self.path)
+        except OSError as e:
+            logger.warning(f"⚠️ Не удалось сохранить реестр медиа: {e}")
+
+    # Синхронный доступ (для сервисов без aiogram)
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        """file_id по ключу содержимого"""
+        return self._file_ids.get(namespace, {}).get(key)
+
+    def remember(self, namespace: str, key: str, file_id: str):
+        """Запомнить file_id после загрузки"""
+        if self.get(namespace, key) != file_id:
+            self._file_ids.setdefault(namespace, {})[key] = file_id
+            self._save()
+
+    def forget(self, namespace: str, key: str):
+        """Забыть file_id, который Telegram больше не принимает"""
+        if self._file_ids.get(namespace, {}).pop(key, None) is not None:
+            self._save()
+
+    # Отправка
+
+    async def send_cached_photo(
+        self, bot: Bot, chat_id: int, content: Content, filename: str = "photo.png", **kwargs: Any
+    ) -> Message:
+        """send_photo с загрузкой файла только при первой отправке"""
+        return await self._send(bot, "photo", chat_id, content, filename, **kwargs)
+
+    async def send_cached_document(
+        self, bot: Bot, chat_id: int, content: Content, filename: str = "document", **kwargs: Any
+    ) -> Message:
+        """send_document с загрузкой файла только при первой отправке"""
+        return await self._send(bot, "document", chat_id, content, filename, **kwargs)
+
+    async def send_cached_sticker(
+        self, bot: Bot, chat_id: int, content: Content, filename: str = "sticker.webp", **kwargs: Any
+    ) -> Message:
+        """send_sticker с загрузкой файла только при первой отправке"""
+        return await self._send(bot, "sticker", chat_id, content, filename, **kwargs)
+
+    async def _send(
+        self, bot: Bot, kind: str, chat_id: int, content: Content, filename: str, **kwargs: Any
+    ) -> Message:
+        if not isinstance(content, bytes):
+            filename = os.path.basename(str(content))
+            content = await asyncio.to_thread(Path(content).read_bytes)
+
+        namespace = bot_namespace(bot)
+        key = content_key(content)
+        method = getattr(bot, f"send_{kind}")
+
+        file_id = self.get(namespace, key)
+        if file_id is not None:
+            try:
+                message = await method(chat_id, file_id, **kwargs)
+                self.stats["hits"] += 1
+                return message
+            except TelegramBadRequest as e:
+                # Ошибки чата (не найден, заблокирован) к file_id отношения не имеют
+                if "file" not in e.message.lower():
+                    raise
+                logger.warning(f"⚠️ file_id не принят Telegram, загружаем заново: {e}")
+                self.stats["stale"] += 1
+                self.forget(namespace, key)
+
+        inflight_key = f"{namespace}:{key}"
+        while True:
+            inflight = self._inflight.get(inflight_key)
+            if inflight is None:
+                break
+            # Файл уже загружается другим отправителем: ждем его file_id
+            if await asyncio.shield(inflight):
+                return await self._send(bot, kind, chat_id, content, filename, **kwargs)
+            # Загрузка не удалась (например, чат заблокировал бота): загружает
+            # следующий ожидающий, остальные снова ждут его, а не грузят все сразу
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[inflight_key] = future
+        file_id = None
+        try:
+            message = await method(chat_id, BufferedInputFile(content, filename=filename), **kwargs)
+            self.stats["uploads"] += 1
+            file_id = _extract_file_id(message, kind)
+            if file_id:
+                self.remember(namespace, key, file_id)
+            return message
+        finally:
+            future.set_result(file_id)
+            if self._inflight.get(inflight_key) is future:
+                del self._inflight[inflight_key]
+
+
+_registry: Optional[MediaRegistry] = None
+
+
+def get_media_registry() -> MediaRegistry:
+    """Общий реестр процесса (файл - MEDIA_REGISTRY_FILE из окружения)"""
+    global _registry
+    if _registry is None:
+        _registry = MediaRegistry(os.environ.get("MEDIA_REGISTRY_FILE", MEDIA_REGISTRY_FILE))
+    return _registry
@@ -0,0 +1,506 @@
+"""
+Metrics Utility
+Легковесные метрики в формате Prometheus для бота, WebApp API и админ-панели
+
+Запись метрики - это инкремент числа в уже созданной ячейке без блокировок:
+все сервисы работают в одном потоке event loop, поэтому гонок между
+корутинами нет, а из редких фоновых потоков допустима потеря единичного
+инкремента. Дочерние ячейки по меткам создаются один раз и кэшируются.
+"""
+
+import hmac
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Бакеты по умолчанию (секунды) - от быстрых callback до медленных запросов к Marzban
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    """Базовый класс метрики с метками"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Получить (или создать) ячейку для набора меток"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: ожидались метки {self.labelnames}, получено {values}")
+            child = self._new_child()
+            # setdefault атомарен - при гонке потоков останется одна ячейка
+            child = self._children.setdefault(tuple(str(v) for v in values), child)
+            self._children.setdefault(values, child)
+        return child
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], object]]:
+        seen = set()
+        items = []
+        for key, child in list(self._children.items()):
+            if id(child) in seen:
+                continue
+            seen.add(id(child))
+            items.append((tuple(str(v) for v in key), child))
+        return items
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {_escape(self.documentation)}"
+        yield f"# TYPE {self.name} {self.type_name}"
+        for values, child in self._items():
+            yield from self._collect_child(values, child)
+
+    def _collect_child(self, values, child) -> Iterable[str]:
+        yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик"""
+
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def _collect_child(self, values, child) -> Iterable[str]:
+        name = self.name if self.name.endswith("_total") else f"{self.name}_total"
+        yield f"{name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class Gauge(_Metric):
+    """Значение, которое может расти и уменьшаться"""
+
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default.dec(amount)
+
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными бакетами"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def _collect_child(self, values, child) -> Iterable[str]:
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(float(bound))}"')
+            yield f"{self.name}_bucket{labels} {cumulative}"
+        labels = _format_labels(self.labelnames, values)
+        yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+        yield f"{self.name}_count{labels} {child.count}"
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Текстовый формат экспозиции Prometheus"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# === Метрики приложения ===
+
+HANDLER_LATENCY = REGISTRY.histogram(
+    "yovpn_handler_duration_seconds",
+    "Время обработки апдейта по обработчику",
+    ["kind", "handler"]
+)
+
+HANDLER_ERRORS = REGISTRY.counter(
+    "yovpn_handler_errors_total",
+    "Количество ошибок в обработчиках",
+    ["kind", "handler"]
+)
+
+MARZBAN_LATENCY = REGISTRY.histogram(
+    "yovpn_marzban_request_duration_seconds",
+    "Время запроса к Marzban API",
+    ["client", "method", "endpoint", "status"]
+)
+
+CACHE_REQUESTS = REGISTRY.counter(
+    "yovpn_cache_requests_total",
+    "Обращения к кэшу (hit/miss)",
+    ["cache", "result"]
+)
+
+RATE_LIMIT_REJECTIONS = REGISTRY.counter(
+    "yovpn_rate_limit_rejections_total",
+    "Отклоненные rate limiter запросы",
+    ["source"]
+)
+
+BILLING_PROCESSED = REGISTRY.counter(
+    "yovpn_billing_processed_total",
+    "Обработанные при ежедневном списании пользователи",
+    ["result"]
+)
+
+BILLING_RUN_DURATION = REGISTRY.histogram(
+    "yovpn_billing_run_duration_seconds",
+    "Длительность прогона ежедневного списания",
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0)
+)
+
+QUEUE_DEPTH = REGISTRY.gauge(
+    "yovpn_queue_depth",
+    "Текущая глубина очередей",
+    ["queue"]
+)
+
+RENDER_EDITS_SAVED = REGISTRY.counter(
+    "yovpn_render_edits_saved_total",
+    "Правки сообщений, не отправленные в Telegram",
+    ["reason"]
+)
+
+HTTP_LATENCY = REGISTRY.histogram(
+    "yovpn_http_request_duration_seconds",
+    "Время обработки HTTP запроса",
+    ["app", "method", "route", "status"]
+)
+
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "yovpn_http_requests_in_flight",
+    "HTTP запросы, которые сейчас обрабатываются",
+    ["app", "route"]
+)
+
+HTTP_QUEUE_WAIT = REGISTRY.histogram(
+    "yovpn_http_queue_wait_seconds",
+    "Время ожидания HTTP запроса в очереди на обработку",
+    ["app", "route"]
+)
+
+HTTP_REJECTED = REGISTRY.counter(
+    "yovpn_http_rejected_total",
+    "HTTP запросы, отклоненные с 503 из-за перегрузки",
+    ["app", "route", "reason"]
+)
+
+
+# === Нормализация меток ===
+
+_DIGITS_RE = re.compile(r"\d+")
+_MAX_LABEL_LENGTH = 48
+
+
+def normalize_callback(data: Optional[str]) -> str:
+    """
+    Метка обработчика для callback data
+
+    Числа заменяются на '#', чтобы pay_100 и pay_500 попадали в одну серию
+    и число серий не росло вместе с пользователями.
+    """
+    if not data:
+        return "empty"
+    return _DIGITS_RE.sub("#", data)[:_MAX_LABEL_LENGTH]
+
+
+def normalize_message(text: Optional[str]) -> str:
+    """Метка обработчика для сообщения: команда или тип"""
+    if not text:
+        return "media"
+    if text.startswith("/"):
+        return text.split(maxsplit=1)[0].split("@", 1)[0][:_MAX_LABEL_LENGTH]
+    return "text"
+
+
+_USER_PATH_RE = re.compile(r"/(user|sub)/[^/?]+")
+
+
+def normalize_endpoint(path: str) -> str:
+    """Путь запроса к Marzban без имени пользователя и query"""
+    path = path.split("?", 1)[0]
+    return _USER_PATH_RE.sub(lambda m: f"/{m.group(1)}/{{username}}", path)
+
+
+# === Инструментирование ===
+
+def marzban_trace_config(client: str):
+    """
+    TraceConfig для aiohttp сессии клиента Marzban
+
+    Записывает время и статус каждого запроса в MARZBAN_LATENCY.
+
+    Args:
+        client: Имя клиента (метка client)
+    """
+    import aiohttp
+
+    async def on_request_start(session, context, params):
+        context.metrics_start = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        _observe_marzban(client, context, params.method, params.url.path, str(params.response.status))
+
+    async def on_request_exception(session, context, params):
+        _observe_marzban(client, context, params.method, params.url.path, type(params.exception).__name__)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+
+def _observe_marzban(client: str, context, method: str, path: str, status: str):
+    start = getattr(context, "metrics_start", None)
+    if start is None:
+        return
+    MARZBAN_LATENCY.labels(client, method, normalize_endpoint(path), status).observe(
+        time.perf_counter() - start
+    )
+
+
+def observe_marzban(client: str, method: str, endpoint: str, status: str, duration: float):
+    """Записать запрос к Marzban из синхронного клиента"""
+    MARZBAN_LATENCY.labels(client, method, normalize_endpoint(endpoint), status).observe(duration)
+
+
+def record_cache(cache: str, hit: bool):
+    """Записать обращение к кэшу"""
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def install_http_metrics(
+    app,
+    app_name: str,
+    exempt_paths: Sequence[str] = ("/metrics",),
+    expose: bool = True,
+    token: Optional[str] = None,
+):
+    """
+    Подключить к FastAPI приложению middleware с HTTP метриками и /metrics
+
+    Маршрут берется из шаблона пути (например, /api/subscription/{user_id}),
+    а не из фактического URL, чтобы число серий было ограничено.
+
+    Args:
+        app: FastAPI приложение
+        app_name: Значение метки app
+        exempt_paths: Пути, которые не учитываются
+        expose: Отдавать ли /metrics на порту приложения (иначе - start_metrics_server)
+        token: Bearer токен, без которого /metrics отвечает 401
+    """
+    from starlette.requests import Request
+    from starlette.responses import Response
+
+    @app.middleware("http")
+    async def metrics_middleware(request, call_next):
+        if request.url.path in exempt_paths:
+            return await call_next(request)
+
+        start = time.perf_counter()
+        status = "500"
+        try:
+            response = await call_next(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            route = request.scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_LATENCY.labels(app_name, request.method, route_path, status).observe(
+                time.perf_counter() - start
+            )
+
+    if not expose:
+        return
+
+    expected = f"Bearer {token}".encode() if token else None
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint(request: Request):
+        if expected is not None:
+            provided = request.headers.get("authorization", "").encode()
+            if not hmac.compare_digest(provided, expected):
+                return Response("Unauthorized", status_code=401, headers={"WWW-Authenticate": "Bearer"})
+        return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0", registry: MetricsRegistry = REGISTRY) -> ThreadingHTTPServer:
+    """
+    Запустить HTTP сервер экспозиции метрик в фоновом потоке
+
+    Рендеринг только читает значения, поэтому записи в event loop
+    не блокируются.
+
+    Args:
+        port: Порт (MonitoringConfig.prometheus_port)
+        host: Адрес
+        registry: Реестр метрик
+
+    Returns:
+        ThreadingHTTPServer: Запущенный сервер (для shutdown())
+    """
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+
+    logger.info(f"📈 Метрики Prometheus доступны на http://{host}:{server.server_address[1]}/metrics")
+    return server
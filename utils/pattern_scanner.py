@@ -0,0 +1,101 @@
+"""
+Сканер набора паттернов
+Проверка текста сразу по всем правилам за один проход регулярного выражения
+
+Правила (SQL, XSS, path traversal, спам-маркеры) объединяются в одно
+выражение-альтернативу, которое компилируется один раз. Чистый текст -
+почти весь пользовательский ввод - проверяется одним search. Только если
+он что-то нашел, правила проверяются по отдельности, чтобы вернуть все
+сработавшие (текст уже подозрительный, это редкий путь).
+
+Регистронезависимость для правил в нижнем регистре достигается приведением
+текста к нижнему регистру (как в прежних проверках через text.lower()):
+re.IGNORECASE отключает у альтернативы быстрый поиск по первым символам
+и замедляет проверку в десятки раз.
+
+Короткие ASCII строки (юзернеймы, команды, callback data) повторяются
+часто, поэтому результат для них кэшируется.
+"""
+
+import re
+from functools import lru_cache
+from typing import Iterable, Mapping, Tuple, Union
+
+# Размер кэша результатов для коротких строк
+SCAN_CACHE_SIZE = 4096
+
+# Максимальная длина строки, результат для которой кэшируется
+SCAN_CACHE_MAX_LENGTH = 64
+
+Rules = Union[Mapping[str, str], Iterable[Tuple[str, str]]]
+
+
+class PatternScanner:
+    """
+    Набор именованных правил, скомпилированный в одно выражение
+
+    Каждое правило - регулярное выражение; для подстрок используйте
+    PatternScanner.literals.
+    """
+
+    def __init__(
+        self,
+        rules: Rules,
+        flags: int = re.IGNORECASE,
+        cache_size: int = SCAN_CACHE_SIZE,
+        cache_max_length: int = SCAN_CACHE_MAX_LENGTH
+    ):
+        """
+        Args:
+            rules: Пары (имя правила, выражение); порядок сохраняется в результате
+            flags: Флаги компиляции для всех правил
+            cache_size: Размер кэша результатов для коротких ASCII строк (0 - без кэша)
+            cache_max_length: Максимальная длина кэшируемой строки
+        """
+        items = list(rules.items() if isinstance(rules, Mapping) else rules)
+        self.names: Tuple[str, ...] = tuple(name for name, _ in items)
+        # Правила в нижнем регистре: сравниваем с text.lower() без IGNORECASE
+        self._fold = bool(flags & re.IGNORECASE) and all(pattern == pattern.lower() for _, pattern in items)
+        if self._fold:
+            flags &= ~re.IGNORECASE
+        self._rules = tuple((name, re.compile(pattern, flags)) for name, pattern in items)
+        # Группы без захвата: номера групп внутри правил не мешают друг другу
+        self._combined = re.compile("|".join(f"(?:{pattern})" for _, pattern in items) or r"(?!)", flags)
+        self.cache_max_length = cache_max_length
+        self._cached_scan = lru_cache(maxsize=cache_size)(self._scan) if cache_size else self._scan
+
+    @classmethod
+    def literals(cls, words: Iterable[str], **kwargs) -> "PatternScanner":
+        """Сканер подстрок: имя правила - сама подстрока"""
+        return cls([(word, re.escape(word)) for word in words], **kwargs)
+
+    def _scan(self, text: str) -> Tuple[str, ...]:
+        if self._fold:
+            text = text.lower()
+        if self._combined.search(text) is None:
+            return ()
+        return tuple(name for name, pattern in self._rules if pattern.search(text))
+
+    def scan(self, text: str) -> Tuple[str, ...]:
+        """
+        Все сработавшие правила
+
+        Returns:
+            Tuple[str, ...]: Имена правил в порядке объявления (пусто - текст чистый)
+        """
+        if not text:
+            return ()
+        if len(text) <= self.cache_max_length and text.isascii():
+            return self._cached_scan(text)
+        return self._scan(text)
+
+    def matches(self, text: str) -> bool:
+        """Сработало ли хотя бы одно правило"""
+        if not text:
+            return False
+        if len(text) <= self.cache_max_length and text.isascii():
+            return bool(self._cached_scan(text))
+        return self._combined.search(text.lower() if self._fold else text) is not None
+
+    def __len__(self) -> int:
+        return len(self._rules)
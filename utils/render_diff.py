@@ -0,0 +1,259 @@
+"""
+Слой рендера сообщений бота
+Правки, которые ничего не меняют на экране, не уходят в Telegram
+
+Обработчики меню перерисовывают текущее сообщение целиком: двойное
+нажатие кнопки дает вторую правку с тем же текстом и клавиатурой, а
+Telegram отвечает на нее "message is not modified". Слой подключается
+как middleware сессии aiogram и помнит отпечаток (текст, клавиатура)
+каждого сообщения (chat_id, message_id) в ограниченном LRU-кэше:
+
+- правка с тем же отпечатком не отправляется;
+- пока правка сообщения ждет очереди или ответа Telegram, следующие
+  правки того же сообщения ждут ее, и из ждущих уходит только последняя;
+- "message is not modified" от Telegram (кэш пуст после перезапуска)
+  считается успехом.
+
+Пропущенная правка возвращает то же, что вернул бы Telegram: последнее
+сообщение (Message) из кэша, для inline-сообщений - True. Вытесненная правка
+возвращает результат правки, которая ее вытеснила.
+Слой регистрируется раньше очереди отправки, чтобы пропущенные правки не
+занимали ее лимиты.
+"""
+
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.default import Default
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import TelegramMethod
+from aiogram.types import InlineKeyboardMarkup, Message
+
+from utils.frozen_markup import markup_digest
+from utils.metrics import RENDER_EDITS_SAVED
+
+logger = logging.getLogger(__name__)
+
+# Сколько сообщений помнить (примерно по одному активному меню на пользователя)
+RENDER_CACHE_SIZE = 10000
+
+# Поля, из которых складывается видимое содержимое сообщения
+_TEXT_FIELDS = ("text", "parse_mode", "entities", "link_preview_options", "disable_web_page_preview")
+_CAPTION_FIELDS = ("caption", "parse_mode", "caption_entities")
+
+_EDIT_METHODS = {"editMessageText", "editMessageCaption", "editMessageReplyMarkup"}
+
+# Отпечаток сообщения: (содержимое, клавиатура); None - содержимое неизвестно
+Render = Tuple[Optional[bytes], bytes]
+
+# Запись кэша: отпечаток и последний ответ Telegram (Message или True для inline)
+Rendered = Tuple[Render, Any]
+
+
+def _digest(method: TelegramMethod, fields: Iterable[str]) -> bytes:
+    # Default - значение по умолчанию бота, как и незаданное поле
+    dump = method.model_dump(include=set(fields), exclude_none=True)
+    items = sorted((name, value) for name, value in dump.items() if not isinstance(value, Default))
+    return hashlib.blake2b(repr(items).encode(), digest_size=16).digest()
+
+
+def _render(method: TelegramMethod) -> Render:
+    """Отпечаток сообщения после выполнения метода"""
+    name = method.__api_method__
+    if name == "editMessageReplyMarkup":
+        content = None
+    elif name == "editMessageCaption":
+        content = _digest(method, _CAPTION_FIELDS)
+    else:
+        content = _digest(method, _TEXT_FIELDS)
+    # Правка без reply_markup убирает inline-клавиатуру, обычная клавиатура
+    # к сообщению не относится
+    markup = markup_digest(method.reply_markup) if isinstance(method.reply_markup, InlineKeyboardMarkup) else b""
+    return content, markup
+
+
+def _message_key(method: TelegramMethod) -> Optional[Hashable]:
+    inline_message_id = getattr(method, "inline_message_id", None)
+    if inline_message_id:
+        return inline_message_id
+    if method.chat_id is None or method.message_id is None:
+        return None
+    return (method.chat_id, method.message_id)
+
+
+def _consume(future: asyncio.Future):
+    # Ошибку вытеснившей правки получают только вытесненные, если они есть
+    if not future.cancelled():
+        future.exception()
+
+
+class _EditSlot:
+    __slots__ = ("waiter",)
+
+    def __init__(self):
+        # Ждущая правка: получит True, когда настанет ее очередь, или будущий
+        # результат вытеснившей ее правки
+        self.waiter: Optional[asyncio.Future] = None
+
+
+class RenderDiff(BaseRequestMiddleware):
+    """
+    Пропуск и схлопывание правок сообщений
+
+    Отвечает за:
+    - Отпечатки отправленных и отредактированных сообщений (LRU)
+    - Пропуск правок, не меняющих сообщение
+    - Схлопывание серии правок одного сообщения в последнюю
+    - Метрики сэкономленных запросов
+    """
+
+    def __init__(self, cache_size: int = RENDER_CACHE_SIZE):
+        """
+        Args:
+            cache_size: Сколько сообщений помнить
+        """
+        self.cache_size = cache_size
+        self.stats = {"edits": 0, "identical": 0, "collapsed": 0, "not_modified": 0}
+        self._rendered: "OrderedDict[Hashable, Rendered]" = OrderedDict()
+        self._editing: Dict[Hashable, _EditSlot] = {}
+        self._saved_counters = {
+            reason: RENDER_EDITS_SAVED.labels(reason) for reason in ("identical", "collapsed", "not_modified")
+        }
+
+    async def __call__(
+        self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod
+    ) -> Any:
+        name = method.__api_method__
+        if name == "sendMessage":
+            result = await make_request(bot, method)
+            if isinstance(result, Message):
+                self._remember((result.chat.id, result.message_id), _render(method), result)
+            return result
+
+        if name == "deleteMessage":
+            self._rendered.pop((method.chat_id, method.message_id), None)
+            return await make_request(bot, method)
+
+        key = _message_key(method) if name in _EDIT_METHODS else None
+        if key is None:
+            return await make_request(bot, method)
+
+        self.stats["edits"] += 1
+        slot = self._editing.get(key)
+        if slot is None:
+            slot = self._editing[key] = _EditSlot()
+            try:
+                return await self._edit(make_request, bot, key, method)
+            finally:
+                self._release(key, slot)
+
+        # Результат этой правки получат ждущие правки, которые она вытеснит
+        outcome = asyncio.get_running_loop().create_future()
+        outcome.add_done_callback(_consume)
+        try:
+            newer = await self._wait_turn(key, slot, outcome)
+            if newer is not None:
+                result = await asyncio.shield(newer)
+            else:
+                try:
+                    result = await self._edit(make_request, bot, key, method)
+                finally:
+                    self._release(key, slot)
+        except BaseException as e:
+            if isinstance(e, Exception):
+                outcome.set_exception(e)
+            else:
+                # Отменили: вытесненным нами вернется последнее известное состояние
+                outcome.set_result(self._cached_result(key))
+            raise
+        outcome.set_result(result)
+        return result
+
+    async def _wait_turn(self, key: Hashable, slot: _EditSlot, outcome: asyncio.Future) -> Optional[asyncio.Future]:
+        """Дождаться окончания текущей правки; если правку вытеснили - будущий результат новой"""
+        if slot.waiter is not None and not slot.waiter.done():
+            slot.waiter.set_result(outcome)
+            self._saved("collapsed")
+        waiter = slot.waiter = asyncio.get_running_loop().create_future()
+        try:
+            turn = await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled() and waiter.result() is True:
+                # Очередь уже передана нам - передаем ее дальше
+                self._release(key, slot)
+            raise
+        return None if turn is True else turn
+
+    def _release(self, key: Hashable, slot: _EditSlot):
+        if not self._release_turn(slot):
+            self._editing.pop(key, None)
+
+    def _release_turn(self, slot: _EditSlot) -> bool:
+        waiter, slot.waiter = slot.waiter, None
+        if waiter is None or waiter.done():
+            return False
+        waiter.set_result(True)
+        return True
+
+    async def _edit(self, make_request: NextRequestMiddlewareType, bot: Bot, key: Hashable, method: TelegramMethod) -> Any:
+        content, markup = _render(method)
+        entry = self._rendered.get(key)
+        current = entry[0] if entry is not None else None
+        if content is None and current is not None:
+            content = current[0]
+        if current == (content, markup):
+            cached = self._cached_result(key)
+            # Без запомненного Message правка уходит: вызывающему нужно сообщение
+            if cached is not None:
+                self._rendered.move_to_end(key)
+                self._saved("identical")
+                return cached
+
+        try:
+            result = await make_request(bot, method)
+        except TelegramBadRequest as e:
+            cached = self._cached_result(key)
+            if "message is not modified" not in e.message or cached is None:
+                self._rendered.pop(key, None)
+                raise
+            self._saved("not_modified")
+            result = cached
+        except Exception:
+            self._rendered.pop(key, None)
+            raise
+
+        self._remember(key, (content, markup), result)
+        return result
+
+    def _cached_result(self, key: Hashable) -> Any:
+        """Что вернул бы Telegram на правку без изменений (None - неизвестно)"""
+        if isinstance(key, str):
+            # inline_message_id: Telegram возвращает True
+            return True
+        entry = self._rendered.get(key)
+        return entry[1] if entry is not None and isinstance(entry[1], Message) else None
+
+    def _remember(self, key: Hashable, render: Render, result: Any):
+        self._rendered[key] = (render, result)
+        self._rendered.move_to_end(key)
+        if len(self._rendered) > self.cache_size:
+            self._rendered.popitem(last=False)
+
+    def _saved(self, reason: str):
+        self.stats[reason] += 1
+        self._saved_counters[reason].inc()
+
+
+def install_render_diff(bot: Bot, **kwargs: Any) -> RenderDiff:
+    """Пропускать правки сообщений бота через RenderDiff (до очереди отправки)"""
+    for middleware in bot.session.middleware:
+        if isinstance(middleware, RenderDiff):
+            return middleware
+    render_diff = RenderDiff(**kwargs)
+    bot.session.middleware(render_diff)
+    return render_diff
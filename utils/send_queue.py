@@ -0,0 +1,365 @@
+"""
+Очередь исходящих сообщений Telegram
+Общие лимиты отправки для всех сервисов бота
+
+Telegram допускает около 30 сообщений в секунду на бота и около одного
+сообщения в секунду в один чат (в группы - 20 в минуту). Очередь
+подключается как middleware сессии aiogram, поэтому через нее проходит
+каждый send_*/edit_* вызов бота, откуда бы он ни был сделан. Запросы
+ждут токен общего ведра и ведра своего чата; из ждущих первым уходит
+запрос с более высоким приоритетом:
+
+    интерактивные ответы > уведомления > рассылки
+
+Приоритет задается контекстом вызова (send_lane), по умолчанию -
+интерактивный. Ответ 429 не возвращается вызывающему: очередь
+приостанавливает отправку на retry_after и повторяет запрос.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+
+from utils.metrics import QUEUE_DEPTH, RATE_LIMIT_REJECTIONS
+
+logger = logging.getLogger(__name__)
+
+# Лимиты Telegram (сообщений в секунду)
+GLOBAL_RATE = 30.0
+CHAT_RATE = 1.0
+GROUP_RATE = 20 / 60
+
+# Короткая серия сообщений в один чат (ответ + клавиатура) уходит без ожидания,
+# в среднем чат все равно получает не больше CHAT_RATE
+CHAT_BURST = 3
+
+# Сколько раз повторять запрос после 429
+MAX_RETRIES = 3
+
+# Глубина очереди, начиная с которой отправка считается перегруженной
+CONGESTION_DEPTH = 50
+
+# Состояния простаивающих чатов чистятся, когда их становится больше
+CHAT_STATES_LIMIT = 10000
+
+# Методы, которые Telegram считает отправкой сообщений; остальные (getUpdates,
+# answerCallbackQuery, deleteMessage, sendChatAction...) идут в обход очереди
+_GOVERNED_PREFIXES = ("send", "edit", "copyMessage", "forwardMessage")
+_UNGOVERNED = {"sendChatAction"}
+
+
+class Lane(IntEnum):
+    """Приоритет отправки: меньше - важнее"""
+    INTERACTIVE = 0
+    NOTIFICATION = 1
+    BROADCAST = 2
+
+
+_current_lane: contextvars.ContextVar[Lane] = contextvars.ContextVar("send_lane", default=Lane.INTERACTIVE)
+
+
+@contextmanager
+def send_lane(lane: Lane) -> Iterator[None]:
+    """Отправлять сообщения внутри блока с приоритетом lane"""
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+def is_governed(method: TelegramMethod) -> bool:
+    """Подчиняется ли метод лимитам отправки сообщений"""
+    name = method.__api_method__
+    return (
+        getattr(method, "chat_id", None) is not None
+        and name.startswith(_GOVERNED_PREFIXES)
+        and name not in _UNGOVERNED
+    )
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated: Optional[float] = None
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        if self.updated is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Через сколько секунд будет доступен токен (0 - сейчас)"""
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def take(self, now: float):
+        """Забрать токен (после wait_time() == 0)"""
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, until: float):
+        """Не выдавать токены до момента until (retry_after от Telegram)"""
+        self.blocked_until = max(self.blocked_until, until)
+        self.tokens = min(self.tokens, 0.0)
+
+    def idle(self, now: float) -> bool:
+        """Ведро полное - состояние можно забыть без потери точности"""
+        self._refill(now)
+        return self.tokens >= self.capacity and self.blocked_until <= now
+
+
+class _ChatState:
+    __slots__ = ("bucket", "waiters")
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        # (lane, seq, future): в чате первым уходит самый приоритетный, внутри приоритета - по порядку
+        self.waiters: List[Tuple[int, int, asyncio.Future]] = []
+
+
+class SendQueue(BaseRequestMiddleware):
+    """
+    Планировщик исходящих запросов бота
+
+    Отвечает за:
+    - Общий лимит бота и лимиты отдельных чатов (ведра токенов)
+    - Приоритет интерактивных ответов над уведомлениями и рассылками
+    - Паузу и повтор после 429 с retry_after
+    - Метрики глубины очереди по приоритетам
+    """
+
+    def __init__(
+        self,
+        global_rate: float = GLOBAL_RATE,
+        chat_rate: float = CHAT_RATE,
+        group_rate: float = GROUP_RATE,
+        chat_burst: int = CHAT_BURST,
+        max_retries: int = MAX_RETRIES,
+        name: str = "send",
+    ):
+        """
+        Args:
+            global_rate: Сообщений в секунду на весь бот
+            chat_rate: Сообщений в секунду в личный чат
+            group_rate: Сообщений в секунду в группу или канал
+            chat_burst: Сколько сообщений подряд чат получает без ожидания
+            max_retries: Повторов запроса после 429
+            name: Префикс очереди в метрике QUEUE_DEPTH
+        """
+        # Без запаса: пачка в начале секунды плюс пополнение превысили бы лимит за секунду
+        self.global_bucket = TokenBucket(global_rate, 1.0)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.stats = {"sent": 0, "retried": 0, "bypassed": 0}
+
+        self._chats: Dict[Hashable, _ChatState] = {}
+        self._ready: List[Tuple[int, int, Hashable]] = []   # головы чатов, которым можно отправлять
+        self._timers: List[Tuple[float, Hashable]] = []     # чаты, ждущие своего ведра
+        self._seq = itertools.count()
+        self._depth = [0] * len(Lane)
+        self._depth_gauges = [QUEUE_DEPTH.labels(f"{name}_{lane.name.lower()}") for lane in Lane]
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # Middleware сессии
+
+    async def __call__(
+        self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod
+    ) -> Any:
+        if not is_governed(method):
+            self.stats["bypassed"] += 1
+            return await make_request(bot, method)
+
+        chat_id = method.chat_id
+        lane = _current_lane.get()
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(chat_id, lane)
+            try:
+                result = await make_request(bot, method)
+                self.stats["sent"] += 1
+                return result
+            except TelegramRetryAfter as e:
+                RATE_LIMIT_REJECTIONS.labels("telegram").inc()
+                if attempt == self.max_retries:
+                    raise
+                self.stats["retried"] += 1
+                logger.warning(f"⚠️ 429 от Telegram ({method.__api_method__}, чат {chat_id}): пауза {e.retry_after} с")
+                self.retry_after(chat_id, e.retry_after)
+
+    # Планирование
+
+    @property
+    def depth(self) -> int:
+        """Запросов в ожидании"""
+        return sum(self._depth)
+
+    def is_congested(self) -> bool:
+        """Очередь перегружена (подходит для AnimationService.load_probe)"""
+        if self.depth >= CONGESTION_DEPTH:
+            return True
+        return self._task is not None and self.global_bucket.blocked_until > asyncio.get_running_loop().time()
+
+    async def acquire(self, chat_id: Hashable, lane: Lane = Lane.INTERACTIVE):
+        """Дождаться разрешения отправить сообщение в чат"""
+        loop = asyncio.get_running_loop()
+        self._ensure_running()
+
+        state = self._chats.get(chat_id)
+        if state is None:
+            if len(self._chats) >= CHAT_STATES_LIMIT:
+                self._forget_idle(loop.time())
+            state = self._chats[chat_id] = _ChatState(self._chat_bucket(chat_id))
+
+        future = loop.create_future()
+        entry = (int(lane), next(self._seq), future)
+        heapq.heappush(state.waiters, entry)
+        self._set_depth(lane, 1)
+        if state.waiters[0] is entry:
+            heapq.heappush(self._ready, (entry[0], entry[1], chat_id))
+            self._wakeup.set()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._drop_waiter(chat_id, entry)
+            raise
+
+    def retry_after(self, chat_id: Hashable, seconds: float):
+        """Применить retry_after: пауза для чата и для всего бота"""
+        # Лимиты чатов соблюдаются ведрами, так что 429 почти всегда значит
+        # общий лимит бота - дальше ждут все, иначе 429 пойдут лавиной
+        until = asyncio.get_running_loop().time() + seconds
+        self.global_bucket.block(until)
+        state = self._chats.get(chat_id)
+        if state is not None:
+            state.bucket.block(until)
+
+    def _chat_bucket(self, chat_id: Hashable) -> TokenBucket:
+        private = isinstance(chat_id, int) and chat_id > 0
+        return TokenBucket(self.chat_rate if private else self.group_rate, self.chat_burst)
+
+    def _set_depth(self, lane: int, delta: int):
+        self._depth[lane] += delta
+        self._depth_gauges[lane].set(self._depth[lane])
+
+    def _drop_waiter(self, chat_id: Hashable, entry: Tuple[int, int, asyncio.Future]):
+        state = self._chats.get(chat_id)
+        if state is None or entry not in state.waiters:
+            return
+        state.waiters.remove(entry)
+        heapq.heapify(state.waiters)
+        self._set_depth(entry[0], -1)
+        if state.waiters:
+            head = state.waiters[0]
+            heapq.heappush(self._ready, (head[0], head[1], chat_id))
+            self._wakeup.set()
+
+    def _forget_idle(self, now: float):
+        idle = [chat_id for chat_id, state in self._chats.items() if not state.waiters and state.bucket.idle(now)]
+        for chat_id in idle:
+            del self._chats[chat_id]
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        """Выдача разрешений: самый приоритетный чат, у которого есть токен"""
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            while self._timers and self._timers[0][0] <= now:
+                _, chat_id = heapq.heappop(self._timers)
+                state = self._chats.get(chat_id)
+                if state is not None and state.waiters:
+                    head = state.waiters[0]
+                    heapq.heappush(self._ready, (head[0], head[1], chat_id))
+
+            delay = None
+            if self._ready:
+                delay = self.global_bucket.wait_time(now)
+                if delay <= 0:
+                    self._grant_next(now)
+                    continue
+
+            if self._timers:
+                until_timer = self._timers[0][0] - now
+                delay = until_timer if delay is None else min(delay, until_timer)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _grant_next(self, now: float):
+        lane, seq, chat_id = heapq.heappop(self._ready)
+        state = self._chats.get(chat_id)
+        if state is None or not state.waiters or state.waiters[0][:2] != (lane, seq):
+            # Запись устарела: голова чата уже сменилась
+            return
+
+        wait = state.bucket.wait_time(now)
+        if wait > 0:
+            heapq.heappush(self._timers, (now + wait, chat_id))
+            return
+
+        _, _, future = heapq.heappop(state.waiters)
+        self._set_depth(lane, -1)
+        if not future.done():
+            state.bucket.take(now)
+            self.global_bucket.take(now)
+            future.set_result(None)
+
+        if state.waiters:
+            head = state.waiters[0]
+            heapq.heappush(self._ready, (head[0], head[1], chat_id))
+
+    async def close(self):
+        """Остановить планировщик (ждущие запросы отменяются)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for state in self._chats.values():
+            for lane, _, future in state.waiters:
+                future.cancel()
+                self._set_depth(lane, -1)
+            state.waiters.clear()
+        self._ready.clear()
+        self._timers.clear()
+
+
+def install_send_queue(bot: Bot, **kwargs: Any) -> SendQueue:
+    """Пропускать отправку сообщений бота через SendQueue"""
+    for middleware in bot.session.middleware:
+        if isinstance(middleware, SendQueue):
+            return middleware
+    queue = SendQueue(**kwargs)
+    bot.session.middleware(queue)
+    return queue